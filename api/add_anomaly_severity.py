@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Migration : ajout de la colonne anomalies.severity (NOT NULL, 'warning' par défaut) sur une base
+existante, puis recalcul des compteurs d'alertes (regroupés par sévérité)
+Usage: python -m api.add_anomaly_severity [--url postgresql://…]
+"""
+import argparse
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.models import Base
+from api.repositories.anomaly_repo import AlertCounterRepository, AnomalyRepository
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy synchrone (défaut : DATABASE_URL)")
+    args = parser.parse_args()
+
+    if args.url:
+        engine = create_engine(args.url)
+    else:
+        from api.db.session import engine
+    db = sessionmaker(bind=engine)()
+    try:
+        # Colonne ajoutée avant create_all : les triggers des compteurs lisent anomalies.severity
+        added = AnomalyRepository.add_severity_column(db)
+        Base.metadata.create_all(engine)
+        hourly, devices = AlertCounterRepository.rebuild(db)
+    finally:
+        db.close()
+    state = "ajoutée" if added else "déjà présente"
+    print(f"Colonne anomalies.severity {state} ; compteurs recalculés : {hourly} + {devices} cases")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark couche DB synchrone vs asyncio des routes /api/v1/snmp-profiles
+Requêtes concurrentes en mémoire (ASGI, sans réseau) : req/s, p50 et p99 par mode
+Usage: python -m api.bench_db [--url postgresql://…] [-n 5000] [-c 100] [--profiles 200]
+Pool : DB_POOL_SIZE + DB_MAX_OVERFLOW ≥ concurrence, sinon le mode synchrone sature (threads bloqués)
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("CORS_ORIGINS", "")
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.db.session import async_url, pool_options
+from api.deps import get_async_db, get_db
+from api.models.snmp_profiles import SnmpProfiles
+from api.routers.v1 import snmp_profiles, snmp_profiles_async
+
+
+def seed(url: str, count: int):
+    engine = create_engine(url)
+    SnmpProfiles.__table__.drop(engine, checkfirst=True)
+    SnmpProfiles.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(SnmpProfiles), [
+            {"name": f"bench-{i}", "version": "v2c", "community": "public", "timeout_ms": 2000, "retries": 1, "port": 161}
+            for i in range(count)
+        ])
+    engine.dispose()
+
+
+def sync_app(url: str) -> FastAPI:
+    factory = sessionmaker(bind=create_engine(url, **pool_options(url)), autoflush=False)
+
+    def db():
+        s = factory()
+        try:
+            yield s
+        finally:
+            s.close()
+
+    app = FastAPI()
+    app.include_router(snmp_profiles.router)
+    app.dependency_overrides[get_db] = db
+    return app
+
+
+def async_app(url: str) -> FastAPI:
+    aurl = async_url(url)
+    factory = async_sessionmaker(bind=create_async_engine(aurl, **pool_options(aurl)), expire_on_commit=False)
+
+    async def db():
+        async with factory() as s:
+            yield s
+
+    app = FastAPI()
+    app.include_router(snmp_profiles_async.router)
+    app.dependency_overrides[get_async_db] = db
+    return app
+
+
+async def run(app: FastAPI, requests: int, concurrency: int, profiles: int):
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        counter = iter(range(requests))
+
+        async def worker():
+            for i in counter:
+                path = "/api/v1/snmp-profiles/?limit=50" if i % 2 else f"/api/v1/snmp-profiles/{i % profiles + 1}"
+                t0 = time.perf_counter()
+                r = await client.get(path)
+                latencies.append(time.perf_counter() - t0)
+                r.raise_for_status()
+
+        await client.get("/api/v1/snmp-profiles/1")  # connexions / caches à chaud
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return requests / elapsed, statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.99) - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy synchrone (défaut : fichier SQLite temporaire)")
+    parser.add_argument("-n", "--requests", type=int, default=5000)
+    parser.add_argument("-c", "--concurrency", type=int, default=100)
+    parser.add_argument("--profiles", type=int, default=200)
+    args = parser.parse_args()
+
+    tmp = None
+    url = args.url
+    if url is None:
+        fd, tmp = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        url = f"sqlite:///{tmp}"
+    try:
+        seed(url, args.profiles)
+        print(f"{args.requests} requêtes, concurrence {args.concurrency}, {url.split('://')[0]}")
+        for name, app in (("sync", sync_app(url)), ("async", async_app(url))):
+            rps, p50, p99 = asyncio.run(run(app, args.requests, args.concurrency, args.profiles))
+            print(f"{name:>6}: {rps:8.0f} req/s   p50 {p50:7.1f} ms   p99 {p99:7.1f} ms")
+    finally:
+        if tmp:
+            os.remove(tmp)
+
+
+if __name__ == "__main__":
+    main()
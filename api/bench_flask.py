@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark de l'API Flask (api/main.py) : connexion SQLite par requête vs connexion par thread
+Requêtes concurrentes via le client de test (WSGI, sans réseau) : req/s, p50 et p99 par mode
+Mélange : POST /api/snmp (insertion, équipement simulé) et GET /api/history (200 dernières lignes)
+Usage: python -m api.bench_flask [-n 5000] [-c 8] [--writes 0.5]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api import main as flask_app
+
+
+class PerRequestConnections:
+    """Comportement d'origine : sqlite3.connect() à chaque appel, sans pragmas"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def release(self):
+        pass
+
+    def close_all(self):
+        pass
+
+
+def run(requests: int, concurrency: int, writes: float):
+    local = threading.local()
+    payload = {"type": "GET", "community": "public", "target": "10.0.0.1", "oid": "1.3.6.1.2.1.1.3.0"}
+
+    def one(i: int) -> float:
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = flask_app.app.test_client()
+        start = time.perf_counter()
+        if random.random() < writes:
+            resp = client.post("/api/snmp", json=payload)
+        else:
+            resp = client.get("/api/history")
+        assert resp.status_code == 200, resp.status_code
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(min(requests, 200))))   # préchauffage (et 200 lignes d'historique)
+        start = time.perf_counter()
+        latencies = sorted(pool.map(one, range(requests)))
+        elapsed = time.perf_counter() - start
+    return requests / elapsed, statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.99) - 1] * 1000
+
+
+def _fake_get(target: str, community: str, oid: str) -> dict:
+    # Mesure la couche base de données, pas le réseau
+    return {"success": True, "values": {oid: 123456}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--requests", type=int, default=5000)
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("--writes", type=float, default=0.5, help="part des requêtes en écriture")
+    args = parser.parse_args()
+
+    flask_app.snmp_gets = flask_app.RequestCoalescer(_fake_get)
+    print(f"{args.requests} requêtes, concurrence {args.concurrency}, écritures {args.writes:.0%}")
+    for name, factory in (("connect", PerRequestConnections), ("pool", flask_app.ConnectionPool)):
+        # Base neuve par mode (le mode WAL est persistant dans le fichier)
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        flask_app.db_pool = factory(path)
+        try:
+            flask_app.init_db()
+            rps, p50, p99 = run(args.requests, args.concurrency, args.writes)
+            print(f"{name:>8}: {rps:8.0f} req/s   p50 {p50:7.1f} ms   p99 {p99:7.1f} ms")
+        finally:
+            flask_app.db_pool.close_all()
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    main()
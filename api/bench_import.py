@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark de l'import pcap (POST /frames/import?mode=pcap) : trames/s
+- décodage seul sur un cœur (decode_records)
+- import complet (décodage en pool IMPORT_WORKERS + insertion SQLite par lots)
+Objectif : 100k trames/s ; le décodeur pur Python plafonne autour de 20k trames/s par cœur,
+l'objectif suppose donc ≥ 5 workers et une base qui absorbe l'insertion (PostgreSQL)
+Usage: python -m api.bench_import [-n 200000] [--url sqlite:///bench.db]
+"""
+import argparse
+import os
+import struct
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("CORS_ORIGINS", "")
+
+from scapy.all import IP, UDP, Ether
+from scapy.asn1.asn1 import ASN1_COUNTER32, ASN1_OID, ASN1_STRING
+from scapy.layers.snmp import SNMP, SNMPresponse, SNMPvarbind
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.models.frames import CapturedFrame, FrameOid
+from api.models.import_jobs import ImportJob
+from api.services import import_export_service
+from api.services.import_export_service import ImportExportService
+from snmp.snmp_decoder import decode_records, iter_pcap
+
+TARGET = 100_000
+
+
+def write_pcap(path: str, count: int):
+    """pcap Ethernet de `count` réponses SNMP à trois varbinds"""
+    pkt = bytes(Ether() / IP(src="10.0.0.1", dst="10.0.1.1") / UDP(sport=161, dport=40000) / SNMP(
+        community="public", PDU=SNMPresponse(id=1, varbindlist=[
+            SNMPvarbind(oid=ASN1_OID("1.3.6.1.2.1.1.5.0"), value=ASN1_STRING(b"router1")),
+            SNMPvarbind(oid=ASN1_OID("1.3.6.1.2.1.2.2.1.10.1"), value=ASN1_COUNTER32(123456)),
+            SNMPvarbind(oid=ASN1_OID("1.3.6.1.2.1.2.2.1.16.1"), value=ASN1_COUNTER32(654321)),
+        ])))
+    record = struct.Struct("<IIII")
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        for i in range(count):
+            f.write(record.pack(1_700_000_000 + i // 1000, i % 1000 * 1000, len(pkt), len(pkt)))
+            f.write(pkt)
+
+
+def bench_decode(path: str) -> float:
+    with open(path, "rb") as f:
+        records = list(iter_pcap(f))
+    start = time.perf_counter()
+    frames, _ = decode_records(records, "bench-", 0)
+    return len(frames) / (time.perf_counter() - start)
+
+
+def bench_import(path: str, url: str) -> float:
+    engine = create_engine(url)
+    for table in (CapturedFrame.__table__, FrameOid.__table__, ImportJob.__table__):
+        table.drop(engine, checkfirst=True)
+        table.create(engine)
+    svc = ImportExportService(sessionmaker(bind=engine))
+    job_id = svc._create_job(os.path.basename(path), "pcap")
+    start = time.perf_counter()
+    count = svc.run_import(job_id, path, "pcap")
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark import pcap")
+    parser.add_argument("-n", type=int, default=200_000, help="Nombre de trames")
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy (défaut : SQLite temporaire)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.pcap")
+        write_pcap(path, args.n)
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        decode = bench_decode(path)
+        total = bench_import(path, url)
+    workers = import_export_service.IMPORT_WORKERS
+    print(f"{'mesure':<28} {'trames/s':>10} {'objectif':>10}")
+    print(f"{'décodage (1 cœur)':<28} {decode:>10.0f} {TARGET:>10}")
+    print(f"{f'import complet ({workers} workers)':<28} {total:>10.0f} {TARGET:>10}")
+    if total < TARGET:
+        print(f"Écart : x{TARGET / total:.1f} ; workers nécessaires au décodage ≈ {-(-TARGET // int(decode))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,21 @@ class Settings:
         if not self.DATABASE_URL:
             raise ValueError("DATABASE_URL is required but missing in .env")
 
+        # Couche asyncio (SQLAlchemy asyncio + asyncpg/aiosqlite) pour les routes devices/profils
+        self.DB_ASYNC: bool = os.getenv("DB_ASYNC", "0") == "1"
+        # URL asyncio explicite ; sinon dérivée de DATABASE_URL (pilote remplacé)
+        self.ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+
+        # Pool de connexions (ignoré pour SQLite en mémoire)
+        self.DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "20"))
+        self.DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+        self.DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+        self.DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+        # Durée (s) pendant laquelle une réponse en cache HTTP est servie sans requête ; au-delà, elle est
+        # revalidée par la version de la table (cache_versions) : écart maximal entre instances de l'API
+        self.HTTP_CACHE_TTL: float = float(os.getenv("HTTP_CACHE_TTL", "2"))
+
         # CORS_ORIGINS : string "a,b,c" → liste ["a", "b", "c"]
         cors_origins = os.getenv("CORS_ORIGINS")
         self.CORS_ORIGINS: List[str] = [
@@ -1,11 +1,64 @@
+from functools import lru_cache
+from typing import Optional
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from api.config import settings
+from api.telemetry.metrics import instrument_pool, timed_pool
+
+# Pilotes asyncio équivalents aux pilotes synchrones
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def pool_options(url: str, poolclass: Optional[type] = None) -> dict:
+    # SQLite en mémoire : pool à connexion unique de SQLAlchemy (pas de taille configurable)
+    u = make_url(url)
+    if u.get_backend_name() == "sqlite" and u.database in (None, "", ":memory:"):
+        return {}
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if poolclass is not None:
+        # Attente d'une connexion et délais dépassés mesurés (db_pool_checkout_seconds, db_pool_timeouts_total)
+        options["poolclass"] = timed_pool(poolclass)
+    return options
+
+
+def async_url(url: str) -> str:
+    """postgresql://… → postgresql+asyncpg://… ; sqlite://… → sqlite+aiosqlite://…"""
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver for {backend}")
+    return u.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
 
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
     future=True,
+    **pool_options(settings.DATABASE_URL, QueuePool),
 )
 
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)
\ No newline at end of file
+instrument_pool(engine, "sync")
+
+SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)
+
+
+@lru_cache(maxsize=1)
+def get_async_engine() -> AsyncEngine:
+    # Créé à la demande : le pilote asyncio n'est requis que si DB_ASYNC est activé
+    url = settings.ASYNC_DATABASE_URL or async_url(settings.DATABASE_URL)
+    async_engine = create_async_engine(url, pool_pre_ping=True, **pool_options(url, AsyncAdaptedQueuePool))
+    instrument_pool(async_engine.sync_engine, "async")
+    return async_engine
+
+
+@lru_cache(maxsize=1)
+def get_async_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(bind=get_async_engine(), autoflush=False, expire_on_commit=False)
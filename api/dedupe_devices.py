@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Migration : dédoublonnage des équipements par ip_address et création de l'index unique
+requis par l'upsert en masse (INSERT … ON CONFLICT (ip_address)) sur une base existante
+Les jobs, métriques, traps et anomalies des doublons sont rattachés à l'équipement conservé
+(le plus ancien), puis les compteurs d'alertes sont recalculés
+Usage: python -m api.dedupe_devices [--url postgresql://…]
+"""
+import argparse
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.models import Base
+from api.repositories.anomaly_repo import AlertCounterRepository
+from api.repositories.device_repo import DeviceRepository
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy synchrone (défaut : DATABASE_URL)")
+    args = parser.parse_args()
+
+    if args.url:
+        engine = create_engine(args.url)
+    else:
+        from api.db.session import engine
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        removed = DeviceRepository.deduplicate_ip(db)
+        if removed:
+            AlertCounterRepository.rebuild(db)
+    finally:
+        db.close()
+    print(f"{removed} équipement(s) en double fusionné(s) ; index unique devices(ip_address) en place")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from api.db.session import SessionLocal
+from api.db.session import SessionLocal, get_async_sessionmaker
 
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
@@ -8,3 +9,7 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with get_async_sessionmaker()() as db:
+        yield db
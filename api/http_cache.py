@@ -0,0 +1,121 @@
+from __future__ import annotations
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from api.config import settings
+from api.repositories.cache_version_repo import CacheVersionRepository
+
+def _etag(body: bytes) -> str:
+    # ETag fort : empreinte du corps exact renvoyé
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match : comparaison faible (RFC 9110), liste séparée par des virgules ou "*"
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in (t[2:] if t.startswith("W/") else t for t in tags)
+
+class ResponseCache:
+    """
+    Réponses JSON déjà sérialisées (corps + ETag) par URL, pour une table.
+    Un GET en cache ne fait ni requête DB ni sérialisation ; 304 si If-None-Match correspond.
+    invalidate() à chaque écriture : la génération empêche de stocker une lecture antérieure.
+    Cache local au processus : invalidate() ne vide que celui-ci. Au-delà de `ttl` secondes,
+    l'entrée est revalidée par la version de la table (cache_versions, incrémentée par trigger
+    à chaque écriture, quelle que soit l'instance) : une lecture par clé primaire, l'entrée est
+    reconduite si la version n'a pas changé. Les écritures d'une autre instance sont donc vues
+    au plus tard après `ttl` secondes ; l'ETag, empreinte du corps, est identique partout.
+    """
+
+    def __init__(self, resource: str, max_entries: int = 256, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.resource = resource
+        self.max_entries = max_entries
+        self.ttl = settings.HTTP_CACHE_TTL if ttl is None else ttl
+        self.clock = clock
+        self.generation = 0
+        # clé → (fin de validité sans revalidation, corps, ETag, version de la table)
+        self._entries: OrderedDict[str, Tuple[float, bytes, str, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(request: Request) -> str:
+        return request.url.path + "?" + "&".join(sorted(request.url.query.split("&")))
+
+    def _fresh(self, request: Request) -> Optional[Response]:
+        key = self.key(request)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                return None
+            self._entries.move_to_end(key)
+        return self._response(request, entry[1], entry[2])
+
+    def _revalidate(self, request: Request, generation: int, version: int) -> Optional[Response]:
+        key = self.key(request)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[3] != version or generation != self.generation:
+                del self._entries[key]
+                return None
+            self._entries[key] = (self.clock() + self.ttl,) + entry[1:]
+            self._entries.move_to_end(key)
+        return self._response(request, entry[1], entry[2])
+
+    def lookup(self, request: Request, db: Session) -> Tuple[Optional[Response], Tuple[int, int]]:
+        """
+        (réponse en cache ou None, jeton à passer à put). Sans requête DB dans le ttl,
+        sinon une lecture de la version de la table.
+        """
+        cached = self._fresh(request)
+        if cached is not None:
+            return cached, (self.generation, -1)
+        generation = self.generation
+        version = CacheVersionRepository.get(db, self.resource)
+        return self._revalidate(request, generation, version), (generation, version)
+
+    async def alookup(self, request: Request, db: AsyncSession) -> Tuple[Optional[Response], Tuple[int, int]]:
+        """lookup pour les routes asyncio"""
+        cached = self._fresh(request)
+        if cached is not None:
+            return cached, (self.generation, -1)
+        generation = self.generation
+        version = await db.run_sync(CacheVersionRepository.get, self.resource)
+        return self._revalidate(request, generation, version), (generation, version)
+
+    def put(self, request: Request, body: bytes, token: Tuple[int, int]) -> Response:
+        """token : renvoyé par lookup, lu avant la requête DB (entrée ignorée si une écriture a eu lieu depuis)"""
+        etag = _etag(body)
+        generation, version = token
+        with self._lock:
+            if generation == self.generation and self.ttl > 0:
+                self._entries[self.key(request)] = (self.clock() + self.ttl, body, etag, version)
+                self._entries.move_to_end(self.key(request))
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return self._response(request, body, etag)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    @staticmethod
+    def _response(request: Request, body: bytes, etag: str) -> Response:
+        # no-cache : le client revalide à chaque appel (If-None-Match), le serveur répond 304
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+# Une instance par ressource, partagée par les routes sync et async
+device_cache = ResponseCache("devices")
+profile_cache = ResponseCache("snmp_profiles")
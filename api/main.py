@@ -1,13 +1,25 @@
+import base64
+import heapq
+import json
+import os
+import sys
 import time
-import sqlite3
 from datetime import datetime
+from itertools import islice
 from flask import Flask, request, jsonify
 
+# Modules de snmp/ (imports à plat, comme lancement.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "snmp"))
+from request_coalescer import RequestCoalescer
+from snmp_decoder import typed_value
+import storage
+from storage import ConnectionPool
+
 # -------------------------
 # Configuration
 # -------------------------
 
-DB_PATH = "snmp.db"          # adapte si besoin (chemin vers ta base)
+DB_PATH = storage.DEFAULT_DB_PATH    # base commune avec l'analyseur et le polling (SNMP_DB_PATH)
 API_PREFIX = "/api"
 
 app = Flask(__name__)
@@ -17,97 +29,106 @@ app = Flask(__name__)
 # Helpers DB
 # -------------------------
 
+# Connexion par thread et pragmas : storage.ConnectionPool (moteur commun de snmp/)
+db_pool = ConnectionPool(DB_PATH)
+
+
 def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return db_pool.connection()
+
+
+@app.teardown_request
+def _release_db(exc):
+    db_pool.release()
 
 
 def init_db():
-    """Crée les tables si elles n'existent pas (schéma fourni)."""
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    cur.executescript(
-        """
-        CREATE TABLE IF NOT EXISTS snmp_metrics (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            source_ip TEXT NOT NULL,
-            oid TEXT NOT NULL,
-            value_raw TEXT,
-            value_num REAL,
-            latency_ms INTEGER
-        );
-
-        CREATE TABLE IF NOT EXISTS snmp_traps (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            source_ip TEXT,
-            version TEXT,
-            community_or_user TEXT,
-            enterprise_oid TEXT,
-            severity TEXT,
-            varbinds TEXT
-        );
-
-        CREATE TABLE IF NOT EXISTS snmp_anomalies (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            source_ip TEXT,
-            description TEXT,
-            severity TEXT,
-            type TEXT
-        );
-
-        CREATE TABLE IF NOT EXISTS devices (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            ip_address TEXT NOT NULL UNIQUE,
-            location TEXT,
-            tags TEXT,
-            enabled INTEGER DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        """
-    )
-
-    conn.commit()
-    conn.close()
+    """Crée ou met à niveau le schéma commun (snmp/storage.py)."""
+    storage.init_schema(get_db_connection())
 
 
 # -------------------------
-# (Stub) Fonction SNMP
+# Exécution SNMP
 # -------------------------
 
+SNMP_TIMEOUT = float(os.getenv("SNMP_TIMEOUT", "2.0"))       # secondes
+SNMP_RETRIES = int(os.getenv("SNMP_RETRIES", "1"))
+SNMP_CACHE_TTL = float(os.getenv("SNMP_CACHE_TTL", "0"))     # secondes, 0 : dédoublonnage seul
+
+_sender_cls = None
+
+
+def _snmp_sender():
+    """SNMPSender (scapy) importé à la première requête : l'API démarre sans scapy"""
+    global _sender_cls
+    if _sender_cls is None:
+        from send_snmp_requests import SNMPSender
+        _sender_cls = SNMPSender
+    # Un émetteur par requête : SNMPSender accumule résultats et statistiques
+    return _sender_cls()
+
+
+def _snmp_get(target: str, community: str, oid: str) -> dict:
+    return _snmp_sender().send_get_request(target, [oid], community=community,
+                                           timeout=SNMP_TIMEOUT, retries=SNMP_RETRIES)
+
+
+# GET identiques en vol partagés ; cache par (cible, community, OID) si SNMP_CACHE_TTL > 0
+snmp_gets = RequestCoalescer(_snmp_get, ttl=SNMP_CACHE_TTL)
+
+
+def _value_str(value) -> str:
+    value = getattr(value, "val", value)      # objets ASN.1 scapy
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", errors="replace")
+    return str(value)
+
+
 def perform_snmp_request(req: dict) -> dict:
     """
-    Ici tu brancheras TA vraie logique SNMP.
-    Pour l'instant, on simule une réponse pour pouvoir tester l'API + GUI.
+    Exécute la requête via SNMPSender.
+    GET : passe par snmp_gets (source "device", "coalesced" ou "cache").
+    SET : toujours envoyé à l'équipement, invalide les GET en cache de cet OID.
     """
     start = time.time()
-
-    # TODO: remplacer par pysnmp / lib SNMP réelle
-    # Exemple de pseudo-réponse :
-    if req["type"] == "GET":
-        simulated_value = f"Simulated GET value for OID {req['oid']}"
-        status = "success"
-    elif req["type"] == "SET":
-        simulated_value = f"Simulated SET value '{req['value']}' on OID {req['oid']}"
-        status = "success"
-    elif req["type"] == "TRAP":
-        simulated_value = "Simulated TRAP sent (nothing to store in metrics)"
-        status = "success"
+    source = "device"
+    try:
+        if req["type"] == "GET":
+            result, source = snmp_gets.get(req["target"], req["community"], req["oid"])
+        elif req["type"] == "SET":
+            result = _snmp_sender().send_set_request(req["target"], {req["oid"]: req["value"]},
+                                                     community=req["community"], timeout=SNMP_TIMEOUT)
+            snmp_gets.invalidate(lambda key: key[0] == req["target"] and key[2] == req["oid"])
+        elif req["type"] == "TRAP":
+            varbinds = {req["oid"]: req["value"]} if req.get("value") is not None else {}
+            result = _snmp_sender().send_trap(req["target"], community=req["community"],
+                                              enterprise_oid=req["oid"], varbinds=varbinds)
+        else:
+            result = {"success": False, "error": "Unknown type"}
+    except Exception as e:
+        # scapy absent, droits insuffisants (socket brute), OID invalide...
+        result = {"success": False, "error": str(e)}
+
+    status = "success" if result.get("success") and not result.get("error") else "error"
+    value_type, value_num = None, None
+    if status == "success":
+        values = result.get("values") or {}
+        if values:
+            # Type SMI de la valeur ASN.1 : valeur numérique directe pour les entiers
+            value_type, raw = typed_value(next(iter(values.values())))
+            value, value_num = _value_str(raw), storage.numeric_value(raw, value_type)
+        else:
+            value = "OK"
     else:
-        simulated_value = "Unknown type"
-        status = "error"
-
-    latency_ms = int((time.time() - start) * 1000)
+        value = result.get("error") or "Erreur SNMP"
 
     return {
         "status": status,
-        "value": simulated_value,
-        "latency_ms": latency_ms,
+        "value": value,
+        "value_type": value_type,
+        "value_num": value_num,
+        "latency_ms": int((time.time() - start) * 1000),
+        "source": source,
     }
 
 
@@ -143,7 +164,6 @@ def send_snmp():
     oid = data["oid"]
     value = data.get("value")
 
-    # Appel à la fonction SNMP (stub pour l'instant)
     snmp_result = perform_snmp_request({
         "type": snmp_type,
         "community": community,
@@ -152,25 +172,24 @@ def send_snmp():
         "value": value,
     })
 
-    # Si c'est un GET ou SET, on stocke dans snmp_metrics
-    if snmp_type in ("GET", "SET") and snmp_result["status"] == "success":
+    # GET ou SET exécuté sur l'équipement : on stocke dans snmp_metrics
+    # (une valeur partagée ou servie par le cache n'est pas une nouvelle mesure)
+    if snmp_type in ("GET", "SET") and snmp_result["status"] == "success" and snmp_result["source"] == "device":
         conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO snmp_metrics (source_ip, oid, value_raw, value_num, latency_ms)
-            VALUES (?, ?, ?, ?, ?)
-            """,
+        conn.execute(
+            storage.INSERT_METRIC_SQL,
             (
+                None,
                 target_ip,
+                storage.device_id(conn, target_ip),
                 oid,
                 snmp_result["value"],
-                None,  # si tu as une valeur numérique, tu pourras la parser et la mettre ici
+                snmp_result["value_type"],
+                snmp_result["value_num"],
                 snmp_result["latency_ms"],
             ),
         )
         conn.commit()
-        conn.close()
 
     # Si c'était un TRAP, on pourrait aussi enregistrer dans snmp_traps ici
 
@@ -186,6 +205,7 @@ def send_snmp():
         "response": {
             "value": snmp_result["value"],
             "latency_ms": snmp_result["latency_ms"],
+            "source": snmp_result["source"],
         }
     }
 
@@ -196,55 +216,163 @@ def send_snmp():
 # Endpoint: GET /api/history
 # -------------------------
 
+HISTORY_LIMIT = 200
+HISTORY_MAX_LIMIT = 1000
+
+# Sources de l'historique : type -> (rang, table, colonne OID, colonnes renvoyées)
+# Ordre global : ts décroissant, puis rang décroissant, puis id décroissant
+HISTORY_SOURCES = {
+    "METRIC": (0, "snmp_metrics", "oid",
+               "id, ts, source_ip, oid, value_raw AS valeur, "
+               "CASE WHEN latency_ms IS NULL THEN 'OK' ELSE latency_ms || ' ms' END AS statut"),
+    "TRAP": (1, "snmp_traps", "enterprise_oid",
+             "id, ts, source_ip, enterprise_oid AS oid, varbinds AS valeur, COALESCE(severity, 'info') AS statut"),
+    "ANOMALY": (2, "snmp_anomalies", None,
+                "id, ts, source_ip, type AS oid, description AS valeur, COALESCE(severity, 'warning') AS statut"),
+}
+
+
+def encode_history_cursor(ts, rank: int, row_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([ts, rank, row_id]).encode()).decode().rstrip("=")
+
+
+def decode_history_cursor(cursor: str):
+    ts, rank, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    return ts, int(rank), int(row_id)
+
+
+# Au-delà, le sous-arbre est large : parcours (ts, id) filtré plutôt qu'un parcours par OID
+HISTORY_MAX_OIDS = 256
+
+
+def _subtree_oids(conn, table: str, oid_col: str, oid: str):
+    """
+    OIDs distincts du sous-arbre (l'OID lui-même et ses descendants, aux frontières d'arc),
+    par sauts dans l'index sur la colonne OID : une recherche par OID, pas de parcours des lignes.
+    None si le sous-arbre en compte plus de HISTORY_MAX_OIDS.
+    """
+    oids = []
+    if conn.execute(f"SELECT 1 FROM {table} WHERE {oid_col} = ? LIMIT 1", (oid,)).fetchone():
+        oids.append(oid)
+    # Descendants : [oid + ".", oid + "/") ('/' suit '.' en ASCII)
+    last, end = oid + ".", oid + "/"
+    while True:
+        row = conn.execute(f"SELECT {oid_col} FROM {table} WHERE {oid_col} > ? AND {oid_col} < ? "
+                           f"ORDER BY {oid_col} LIMIT 1", (last, end)).fetchone()
+        if row is None:
+            return oids
+        if len(oids) == HISTORY_MAX_OIDS:
+            return None
+        last = row[0]
+        oids.append(last)
+
+
+def _history_source(conn, kind: str, after, target, oid, limit: int):
+    """
+    Au plus limit lignes d'une table, en (ts, id) décroissant, strictement après le curseur
+    (ts, rang, id) dans l'ordre global. Itérateurs paresseux : seules les lignes consommées
+    par la fusion sont lues.
+    Filtre OID sur le sous-arbre : un parcours de l'index (oid, ts, id) par OID exact, fusionnés
+    (l'index sert l'ORDER BY, sans tri de tout le sous-arbre) ; sous-arbre large : parcours de
+    l'index (ts, id) avec le sous-arbre en filtre.
+    """
+    rank, table, oid_col, columns = HISTORY_SOURCES[kind]
+    where, params = [], []
+    if after is not None:
+        ts, after_rank, after_id = after
+        if rank < after_rank:
+            where.append("ts <= ?")
+            params.append(ts)
+        elif rank == after_rank:
+            where.append("(ts, id) < (?, ?)")
+            params.extend((ts, after_id))
+        else:
+            where.append("ts < ?")
+            params.append(ts)
+    if target:
+        where.append("source_ip = ?")
+        params.append(target)
+
+    def scan(extra_where=(), extra_params=(), indexed_by=""):
+        sql = f"SELECT {columns} FROM {table}{indexed_by}"
+        clauses = where + list(extra_where)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+        cursor = conn.execute(sql, params + list(extra_params) + [limit])
+        return ((row["ts"], rank, row["id"], kind, row) for row in cursor)
+
+    if not oid:
+        return scan()
+    if oid_col is None:
+        return iter(())
+    oids = _subtree_oids(conn, table, oid_col, oid)
+    if oids is None:
+        index = f"ix_{table}_source_ts_id" if target else f"ix_{table}_ts_id"
+        return scan([f"({oid_col} = ? OR ({oid_col} > ? AND {oid_col} < ?))"],
+                    [oid, oid + ".", oid + "/"], f" INDEXED BY {index}")
+    scans = [scan([f"{oid_col} = ?"], [o]) for o in oids]
+    return islice(heapq.merge(*scans, key=lambda r: r[:3], reverse=True), limit)
+
+
+def merge_history(conn, kinds, after=None, target=None, oid_prefix=None, limit: int = HISTORY_LIMIT):
+    """
+    Fusion k-voies (heapq.merge) des sources déjà triées : au plus limit + 1 lignes lues
+    par source, quelle que soit la taille des tables. Renvoie (lignes, curseur suivant).
+    """
+    # OID du sous-arbre sans point final (« 1.3.6.1.2.1.1. » == « 1.3.6.1.2.1.1 »)
+    oid = oid_prefix.rstrip(".") if oid_prefix else None
+    sources = [_history_source(conn, kind, after, target, oid, limit + 1) for kind in kinds]
+    merged = list(islice(heapq.merge(*sources, key=lambda r: r[:3], reverse=True), limit + 1))
+    next_cursor = encode_history_cursor(*merged[limit - 1][:3]) if len(merged) > limit else None
+    return merged[:limit], next_cursor
+
+
 @app.route(f"{API_PREFIX}/history", methods=["GET"])
 def get_history():
     """
     Renvoie une liste de trames pour la GUI, avec les clés:
     - date
-    - type
+    - type (METRIC, TRAP ou ANOMALY)
     - oid
     - cible
     - valeur
     - statut
-    Les données viennent de snmp_metrics + snmp_traps.
+    Les données viennent de snmp_metrics + snmp_traps + snmp_anomalies, du plus récent au plus ancien.
+    Paramètres : limit, cursor (en-tête X-Next-Cursor de la page précédente),
+    type (liste séparée par des virgules), target (IP), oid (sous-arbre : l'OID et ses descendants).
     """
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    # Historique simple basé sur snmp_metrics
-    # On pourrait aussi fusionner avec snmp_traps si tu veux voir les TRAP.
-    cur.execute(
-        """
-        SELECT id, ts, source_ip, oid, value_raw, latency_ms
-        FROM snmp_metrics
-        ORDER BY ts DESC, id DESC
-        LIMIT 200
-        """
-    )
-
-    rows = cur.fetchall()
-    conn.close()
-
-    history = []
-    for row in rows:
-        # ts est une chaîne -> on renvoie telle quelle ou on la formate
-        ts = row["ts"]
-        # Optionnel : joli format
-        # try:
-        #     ts = datetime.fromisoformat(row["ts"]).strftime("%Y-%m-%d %H:%M:%S")
-        # except Exception:
-        #     ts = row["ts"]
-
-        history.append({
+    args = request.args
+    kinds = list(dict.fromkeys(k.strip().upper() for k in args.get("type", "").split(",") if k.strip()))
+    kinds = kinds or list(HISTORY_SOURCES)
+    unknown = [k for k in kinds if k not in HISTORY_SOURCES]
+    try:
+        limit = int(args.get("limit", HISTORY_LIMIT))
+        after = decode_history_cursor(args["cursor"]) if args.get("cursor") else None
+    except (ValueError, TypeError):
+        return jsonify({"status": "error", "error": "limit ou cursor invalide"}), 400
+    if unknown or not 1 <= limit <= HISTORY_MAX_LIMIT:
+        return jsonify({"status": "error", "error": f"Type inconnu: {unknown[0]}" if unknown
+                        else f"limit doit être entre 1 et {HISTORY_MAX_LIMIT}"}), 400
+
+    rows, next_cursor = merge_history(get_db_connection(), kinds, after,
+                                      args.get("target"), args.get("oid"), limit)
+    history = [
+        {
+            "id": f"{kind.lower()}-{row_id}",
             "date": ts,
-            "type": "METRIC",               # ou "GET"/"SET" si tu stockes ce détail ailleurs
+            "type": kind,
             "oid": row["oid"],
             "cible": row["source_ip"],
-            "valeur": row["value_raw"],
-            "statut": f"{row['latency_ms']} ms" if row["latency_ms"] is not None else "OK",
-        })
-
-    return jsonify(history), 200
+            "valeur": row["valeur"],
+            "statut": row["statut"],
+        }
+        for ts, _, row_id, kind, row in rows
+    ]
+    response = jsonify(history)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response, 200
 
 
 # -------------------------
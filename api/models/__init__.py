@@ -8,13 +8,17 @@ from .jobs import Job, JobOid
 from .metrics import Metric
 from .traps import Trap, TrapVarbind
 from .anomalies import Anomaly
+from .alert_counters import AlertCountHourly, AlertCountDevice
+from .cache_versions import CacheVersion
 from .audit_log import AuditLog
+from .frames import CapturedFrame, FrameOid
+from .import_jobs import ImportJob
 
 __all__ = [
     "Base",
     "User",
     "Device",
-    "SnmpProfile",
+    "SnmpProfiles",
     "Mib",
     "Job",
     "JobOid",
@@ -22,5 +26,11 @@ __all__ = [
     "Trap",
     "TrapVarbind",
     "Anomaly",
+    "AlertCountHourly",
+    "AlertCountDevice",
+    "CacheVersion",
     "AuditLog",
+    "CapturedFrame",
+    "FrameOid",
+    "ImportJob",
 ]
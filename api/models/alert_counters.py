@@ -0,0 +1,88 @@
+from datetime import datetime
+from sqlalchemy import Integer, String, DateTime, ForeignKey, DDL, event
+from sqlalchemy.orm import Mapped, mapped_column
+from .base import Base
+
+
+class AlertCountHourly(Base):
+    """Nombre d'anomalies par (heure, sévérité), maintenu par trigger sur 'anomalies'"""
+    __tablename__ = "alert_counts_hourly"
+
+    hour: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    severity: Mapped[str] = mapped_column(String(32), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class AlertCountDevice(Base):
+    """Nombre d'anomalies par (équipement, sévérité), maintenu par trigger sur 'anomalies'"""
+    __tablename__ = "alert_counts_device"
+
+    device_id: Mapped[int] = mapped_column(ForeignKey("devices.id", ondelete="CASCADE"), primary_key=True)
+    severity: Mapped[str] = mapped_column(String(32), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+# Triggers : tout chemin d'insertion/modification/suppression (ORM, Core, SQL brut) tient les compteurs à jour,
+# dans la transaction de l'anomalie. Heures en UTC.
+_PG_FUNCTION = """
+CREATE OR REPLACE FUNCTION anomalies_count_alerts() RETURNS trigger AS $$
+BEGIN
+    -- UPDATE (sévérité, date ou équipement modifiés) : retrait de l'ancienne ligne puis ajout de la nouvelle
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE alert_counts_hourly SET count = count - 1
+        WHERE hour = date_trunc('hour', OLD.detected_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AND severity = OLD.severity;
+        UPDATE alert_counts_device SET count = count - 1
+        WHERE device_id = OLD.device_id AND severity = OLD.severity;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO alert_counts_hourly (hour, severity, count)
+        VALUES (date_trunc('hour', NEW.detected_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC', NEW.severity, 1)
+        ON CONFLICT (hour, severity) DO UPDATE SET count = alert_counts_hourly.count + 1;
+        IF NEW.device_id IS NOT NULL THEN
+            INSERT INTO alert_counts_device (device_id, severity, count) VALUES (NEW.device_id, NEW.severity, 1)
+            ON CONFLICT (device_id, severity) DO UPDATE SET count = alert_counts_device.count + 1;
+        END IF;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+_PG_TRIGGER = """
+CREATE OR REPLACE TRIGGER trg_anomalies_count_alerts
+AFTER INSERT OR DELETE OR UPDATE OF severity, detected_at, device_id ON anomalies
+FOR EACH ROW EXECUTE FUNCTION anomalies_count_alerts()
+"""
+# SQLite (tests) : même format de date que SQLAlchemy pour que les comparaisons restent textuelles
+_SQLITE_HOUR = "strftime('%%Y-%%m-%%d %%H:00:00.000000', {}.detected_at)"  # % doublé (DDL)
+_SQLITE_INCREMENT = f"""
+    INSERT INTO alert_counts_hourly (hour, severity, count) VALUES ({_SQLITE_HOUR.format("NEW")}, NEW.severity, 1)
+    ON CONFLICT (hour, severity) DO UPDATE SET count = count + 1;
+    INSERT INTO alert_counts_device (device_id, severity, count)
+    SELECT NEW.device_id, NEW.severity, 1 WHERE NEW.device_id IS NOT NULL
+    ON CONFLICT (device_id, severity) DO UPDATE SET count = count + 1;
+"""
+_SQLITE_DECREMENT = f"""
+    UPDATE alert_counts_hourly SET count = count - 1
+    WHERE hour = {_SQLITE_HOUR.format("OLD")} AND severity = OLD.severity;
+    UPDATE alert_counts_device SET count = count - 1
+    WHERE device_id = OLD.device_id AND severity = OLD.severity;
+"""
+_SQLITE_INSERT = f"""
+CREATE TRIGGER IF NOT EXISTS trg_anomalies_count_alerts_ins AFTER INSERT ON anomalies
+BEGIN{_SQLITE_INCREMENT}END
+"""
+_SQLITE_DELETE = f"""
+CREATE TRIGGER IF NOT EXISTS trg_anomalies_count_alerts_del AFTER DELETE ON anomalies
+BEGIN{_SQLITE_DECREMENT}END
+"""
+_SQLITE_UPDATE = f"""
+CREATE TRIGGER IF NOT EXISTS trg_anomalies_count_alerts_upd
+AFTER UPDATE OF severity, detected_at, device_id ON anomalies
+BEGIN{_SQLITE_DECREMENT}{_SQLITE_INCREMENT}END
+"""
+
+for _ddl, _dialect in ((_PG_FUNCTION, "postgresql"), (_PG_TRIGGER, "postgresql"),
+                       (_SQLITE_INSERT, "sqlite"), (_SQLITE_DELETE, "sqlite"),
+                       (_SQLITE_UPDATE, "sqlite")):
+    # Niveau metadata : exécuté après la création de toutes les tables
+    event.listen(Base.metadata, "after_create", DDL(_ddl).execute_if(dialect=_dialect))
@@ -13,6 +13,7 @@ class Anomaly(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     device_id: Mapped[int] = mapped_column(ForeignKey("devices.id", ondelete="SET NULL"))
     rule: Mapped[str] = mapped_column(String(128), nullable=False)
+    severity: Mapped[str] = mapped_column(String(32), default="warning", nullable=False)  # info|warning|major|critical
     details: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON)
     detected_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
     acked: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
@@ -0,0 +1,48 @@
+from sqlalchemy import BigInteger, String, DDL, event
+from sqlalchemy.orm import Mapped, mapped_column
+from .base import Base
+
+# Tables dont les réponses GET sont mises en cache (api.http_cache.ResponseCache)
+CACHED_TABLES = ("devices", "snmp_profiles")
+
+
+class CacheVersion(Base):
+    """Version d'une table mise en cache, incrémentée par trigger à chaque écriture (toutes instances)"""
+    __tablename__ = "cache_versions"
+
+    resource: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+
+
+# Triggers : toute écriture (ORM, Core, SQL brut, autre instance) change la version lue par les caches HTTP.
+# PostgreSQL : une incrémentation par instruction (un upsert en masse ne compte qu'une fois)
+_PG_FUNCTION = """
+CREATE OR REPLACE FUNCTION bump_cache_version() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO cache_versions (resource, version) VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (resource) DO UPDATE SET version = cache_versions.version + 1;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+_PG_TRIGGER = """
+CREATE OR REPLACE TRIGGER trg_{table}_cache_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+FOR EACH STATEMENT EXECUTE FUNCTION bump_cache_version()
+"""
+# SQLite (tests) : triggers par ligne seulement
+_SQLITE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS trg_{table}_cache_version_{op} AFTER {event} ON {table}
+BEGIN
+    INSERT INTO cache_versions (resource, version) VALUES ('{table}', 1)
+    ON CONFLICT (resource) DO UPDATE SET version = version + 1;
+END
+"""
+
+event.listen(Base.metadata, "after_create", DDL(_PG_FUNCTION).execute_if(dialect="postgresql"))
+for _table in CACHED_TABLES:
+    event.listen(Base.metadata, "after_create",
+                 DDL(_PG_TRIGGER.format(table=_table)).execute_if(dialect="postgresql"))
+    for _op, _event in (("ins", "INSERT"), ("upd", "UPDATE"), ("del", "DELETE")):
+        event.listen(Base.metadata, "after_create",
+                     DDL(_SQLITE_TRIGGER.format(table=_table, op=_op, event=_event)).execute_if(dialect="sqlite"))
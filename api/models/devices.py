@@ -1,12 +1,12 @@
 from datetime import datetime
 from typing import Optional, List, TYPE_CHECKING
-from sqlalchemy import String, Integer, ForeignKey, Text
+from sqlalchemy import String, Integer, Boolean, ForeignKey, Text, JSON, Index, DDL, event
 from sqlalchemy.dialects.postgresql import ARRAY, TEXT
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .base import Base, TimestampMixin
 
 if TYPE_CHECKING:
-    from .snmp_profiles import SnmpProfile
+    from .snmp_profiles import SnmpProfiles
     from .jobs import Job
     from .metrics import Metric
     from .traps import Trap
@@ -17,16 +17,34 @@ class Device(Base, TimestampMixin):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(128), index=True, nullable=False)
-    hostname: Mapped[str] = mapped_column(String(255), index=True, nullable=False)
-    ip_address: Mapped[Optional[str]] = mapped_column(String(64))
+    hostname: Mapped[Optional[str]] = mapped_column(String(255), index=True)
+    ip_address: Mapped[Optional[str]] = mapped_column(String(64), unique=True)  # clé des upserts en masse
     vendor: Mapped[Optional[str]] = mapped_column(String(64))
     model: Mapped[Optional[str]] = mapped_column(String(64))
-    tags: Mapped[Optional[List[str]]] = mapped_column(ARRAY(TEXT), default=list)
+    location: Mapped[Optional[str]] = mapped_column(String(100))
+    enabled: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    # ARRAY PostgreSQL, JSON sous SQLite (tests)
+    tags: Mapped[Optional[List[str]]] = mapped_column(ARRAY(TEXT).with_variant(JSON, "sqlite"), default=list)
 
-    snmp_profile_id: Mapped[int] = mapped_column(ForeignKey("snmp_profiles.id", ondelete="RESTRICT"), nullable=False)
-    snmp_profile: Mapped["SnmpProfile"] = relationship(back_populates="devices")
+    snmp_profile_id: Mapped[Optional[int]] = mapped_column(ForeignKey("snmp_profiles.id", ondelete="RESTRICT"))
+    snmp_profile: Mapped[Optional["SnmpProfiles"]] = relationship(back_populates="devices")
 
     jobs: Mapped[List["Job"]] = relationship(back_populates="device", cascade="all, delete-orphan")
     metrics: Mapped[List["Metric"]] = relationship(back_populates="device", cascade="all, delete-orphan")
     traps: Mapped[List["Trap"]] = relationship(back_populates="device", cascade="all, delete-orphan")
     anomalies: Mapped[List["Anomaly"]] = relationship(back_populates="device", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Pagination keyset (created_at, id)
+        Index("ix_devices_created_at_id", "created_at", "id"),
+        # Recherche q : sous-chaîne (pg_trgm, ILIKE '%q%') sur nom/hostname, préfixe sur l'IP
+        Index("ix_devices_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_devices_hostname_trgm", "hostname", postgresql_using="gin", postgresql_ops={"hostname": "gin_trgm_ops"}),
+        Index("ix_devices_ip_address_prefix", "ip_address", postgresql_ops={"ip_address": "text_pattern_ops"}),
+    )
+
+
+event.listen(
+    Device.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,60 @@
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+from sqlalchemy import BigInteger, Integer, SmallInteger, String, DateTime, ForeignKey, JSON, Index, DDL, event
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from .base import Base
+
+
+class CapturedFrame(Base):
+    """Trame SNMP archivée depuis le ring buffer de l'analyseur."""
+    __tablename__ = "frames"
+
+    id: Mapped[str] = mapped_column(String(40), primary_key=True)  # identifiant stable du ring buffer
+    captured_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    ip_src: Mapped[str] = mapped_column(String(45), nullable=False)
+    port_src: Mapped[int] = mapped_column(Integer, nullable=False)
+    ip_dst: Mapped[str] = mapped_column(String(45), nullable=False)
+    port_dst: Mapped[int] = mapped_column(Integer, nullable=False)
+    version: Mapped[int] = mapped_column(SmallInteger, nullable=False)
+    pdu_type: Mapped[str] = mapped_column(String(16), nullable=False)
+    request_id: Mapped[Optional[int]] = mapped_column(BigInteger)
+    community: Mapped[Optional[str]] = mapped_column(String(255))
+    security_user: Mapped[Optional[str]] = mapped_column(String(255))
+    length: Mapped[int] = mapped_column(Integer, nullable=False)
+    varbinds: Mapped[List[Dict[str, Any]]] = mapped_column(JSON, nullable=False)
+    tags: Mapped[Optional[List[str]]] = mapped_column(JSON)
+    anomalies: Mapped[Optional[List[str]]] = mapped_column(JSON)
+
+    oids: Mapped[List["FrameOid"]] = relationship(back_populates="frame", cascade="all, delete-orphan")
+
+    # Pagination keyset sur (captured_at, id) : chaque filtre a son index terminé par la clé de tri
+    __table_args__ = (
+        Index("ix_frames_captured_at_id", "captured_at", "id"),
+        Index("ix_frames_ip_src_captured_at_id", "ip_src", "captured_at", "id"),
+        Index("ix_frames_ip_dst_captured_at_id", "ip_dst", "captured_at", "id"),
+        Index("ix_frames_pdu_type_captured_at_id", "pdu_type", "captured_at", "id"),
+    )
+
+
+class FrameOid(Base):
+    """OIDs des varbinds d'une trame (un par ligne) pour la recherche oid_contains."""
+    __tablename__ = "frame_oids"
+
+    frame_id: Mapped[str] = mapped_column(ForeignKey("frames.id", ondelete="CASCADE"), primary_key=True)
+    oid: Mapped[str] = mapped_column(String(255), primary_key=True)
+    captured_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    frame: Mapped["CapturedFrame"] = relationship(back_populates="oids")
+
+    __table_args__ = (
+        # Préfixe (LIKE 'x%') et sous-chaîne (trigrammes pg_trgm, LIKE '%x%') sans parcours complet
+        Index("ix_frame_oids_oid_prefix", "oid", postgresql_ops={"oid": "text_pattern_ops"}),
+        Index("ix_frame_oids_oid_trgm", "oid", postgresql_using="gin", postgresql_ops={"oid": "gin_trgm_ops"}),
+        Index("ix_frame_oids_captured_at_frame_id", "captured_at", "frame_id"),
+    )
+
+
+event.listen(
+    FrameOid.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,19 @@
+from typing import Optional
+from sqlalchemy import BigInteger, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from .base import Base, TimestampMixin
+
+
+class ImportJob(Base, TimestampMixin):
+    """Suivi d'un import de trames (pcap/json/ndjson) : statut et progression."""
+    __tablename__ = "import_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    filename: Mapped[Optional[str]] = mapped_column(String(255))
+    mode: Mapped[str] = mapped_column(String(16), nullable=False)  # json|ndjson|pcap
+    status: Mapped[str] = mapped_column(String(32), default="pending", nullable=False)  # pending|running|done|error
+    bytes_total: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    bytes_done: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    frames_imported: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    frames_rejected: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    error: Mapped[Optional[str]] = mapped_column(Text)
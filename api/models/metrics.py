@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Optional, TYPE_CHECKING
-from sqlalchemy import Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .base import Base
 
@@ -17,3 +17,8 @@ class Metric(Base):
     polled_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
 
     device: Mapped["Device"] = relationship(back_populates="metrics")
+
+    # Lecture d'une fenêtre de série (device, oid) dans l'ordre chronologique
+    __table_args__ = (
+        Index("ix_metrics_device_id_oid_polled_at", "device_id", "oid", "polled_at"),
+    )
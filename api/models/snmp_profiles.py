@@ -1,5 +1,5 @@
 from typing import Optional, List, TYPE_CHECKING
-from sqlalchemy import String, Integer, Boolean
+from sqlalchemy import String, Integer, Boolean, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .base import Base, TimestampMixin
 
@@ -16,15 +16,18 @@ class SnmpProfiles(Base, TimestampMixin):
     community: Mapped[Optional[str]] = mapped_column(String(255))
 
     # v3
+    # attributs nommés comme le schéma API (v3_*), colonnes inchangées
     security_level: Mapped[Optional[str]] = mapped_column(String(16))  # noAuthNoPriv|authNoPriv|authPriv
-    username: Mapped[Optional[str]] = mapped_column(String(128))
-    auth_protocol: Mapped[Optional[str]] = mapped_column(String(16))  # MD5|SHA
-    auth_key: Mapped[Optional[str]] = mapped_column(String(255))
-    priv_protocol: Mapped[Optional[str]] = mapped_column(String(16))  # DES|AES
-    priv_key: Mapped[Optional[str]] = mapped_column(String(255))
+    v3_user: Mapped[Optional[str]] = mapped_column("username", String(128))
+    v3_auth_proto: Mapped[Optional[str]] = mapped_column("auth_protocol", String(16))  # MD5|SHA
+    v3_auth_key: Mapped[Optional[str]] = mapped_column("auth_key", String(255))
+    v3_priv_proto: Mapped[Optional[str]] = mapped_column("priv_protocol", String(16))  # DES|AES
+    v3_priv_key: Mapped[Optional[str]] = mapped_column("priv_key", String(255))
+    engine_id: Mapped[Optional[str]] = mapped_column(String(100))
 
     timeout_ms: Mapped[int] = mapped_column(Integer, default=2000, nullable=False)
     retries: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
     port: Mapped[int] = mapped_column(Integer, default=161, nullable=False)
+    notes: Mapped[Optional[str]] = mapped_column(Text)
 
     devices: Mapped[List["Device"]] = relationship(back_populates="snmp_profile")
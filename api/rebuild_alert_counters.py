@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Recalcul des compteurs d'alertes pré-agrégés (alert_counts_hourly, alert_counts_device)
+Crée tables et triggers si besoin, puis repart de la table anomalies (rattrapage de l'historique)
+Usage: python -m api.rebuild_alert_counters [--url postgresql://…]
+"""
+import argparse
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.models import Base
+from api.repositories.anomaly_repo import AlertCounterRepository, AnomalyRepository
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default=None, help="URL SQLAlchemy synchrone (défaut : DATABASE_URL)")
+    args = parser.parse_args()
+
+    if args.url:
+        engine = create_engine(args.url)
+    else:
+        from api.db.session import engine
+    db = sessionmaker(bind=engine)()
+    try:
+        # Base antérieure à anomalies.severity (voir api.add_anomaly_severity) : colonne ajoutée d'abord
+        AnomalyRepository.add_severity_column(db)
+        # Tables manquantes seulement ; les triggers sont (ré)installés après création
+        Base.metadata.create_all(engine)
+        hourly, devices = AlertCounterRepository.rebuild(db)
+    finally:
+        db.close()
+    print(f"Compteurs recalculés : {hourly} cases (heure, sévérité), {devices} cases (équipement, sévérité)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, delete, func, text, inspect, DateTime
+from api.models.alert_counters import AlertCountDevice, AlertCountHourly
+from api.models.anomalies import Anomaly
+from api.models.devices import Device
+
+
+def hour_bucket(db: Session):
+    """Début d'heure UTC de detected_at, calculé comme dans les triggers des compteurs"""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.strftime("%Y-%m-%d %H:00:00.000000", Anomaly.detected_at, type_=DateTime)
+    return func.timezone("UTC", func.date_trunc("hour", func.timezone("UTC", Anomaly.detected_at)))
+
+
+class AnomalyRepository:
+    """Couche d'accès aux données pour la table 'anomalies' (agrégats calculés à la volée)."""
+
+    @staticmethod
+    def counts_by_hour(db: Session, time_from: datetime, time_to: datetime,
+                       device_id: Optional[int] = None) -> List[Tuple[datetime, str, int]]:
+        """(heure, sévérité, nombre) sur la fenêtre, triés par heure"""
+        hour = hour_bucket(db).label("hour")
+        stmt = (
+            select(hour, Anomaly.severity, func.count())
+            .where(Anomaly.detected_at >= time_from, Anomaly.detected_at < time_to)
+            .group_by(hour, Anomaly.severity)
+            .order_by(hour, Anomaly.severity)
+        )
+        if device_id is not None:
+            stmt = stmt.where(Anomaly.device_id == device_id)
+        return db.execute(stmt).all()
+
+    @staticmethod
+    def top_devices(db: Session, time_from: datetime, time_to: datetime,
+                    limit: int = 10) -> List[Tuple[int, str, Optional[str], int]]:
+        """(device_id, nom, IP, nombre d'alertes) des équipements les plus en alerte"""
+        n = func.count(Anomaly.id).label("n")
+        stmt = (
+            select(Device.id, Device.name, Device.ip_address, n)
+            .join(Anomaly, Anomaly.device_id == Device.id)
+            .where(Anomaly.detected_at >= time_from, Anomaly.detected_at < time_to)
+            .group_by(Device.id, Device.name, Device.ip_address)
+            .order_by(n.desc(), Device.id)
+            .limit(limit)
+        )
+        return db.execute(stmt).all()
+
+
+    @staticmethod
+    def add_severity_column(db: Session) -> bool:
+        """
+        Base antérieure à la colonne 'severity' : ajout NOT NULL avec la valeur par défaut
+        du modèle (les anomalies existantes deviennent 'warning'). Renvoie True si la colonne a été ajoutée.
+        """
+        conn = db.connection()
+        insp = inspect(conn)
+        if not insp.has_table("anomalies"):
+            return False
+        if "severity" in {c["name"] for c in insp.get_columns("anomalies")}:
+            return False
+        db.execute(text("ALTER TABLE anomalies ADD COLUMN severity VARCHAR(32) NOT NULL DEFAULT 'warning'"))
+        db.commit()
+        return True
+
+
+class AlertCounterRepository:
+    """Compteurs pré-agrégés (alert_counts_hourly, alert_counts_device) : lecture en O(nombre de cases)."""
+
+    @staticmethod
+    def counts_by_hour(db: Session, time_from: datetime, time_to: datetime) -> List[Tuple[datetime, str, int]]:
+        """(heure, sévérité, nombre) des heures commencées dans [time_from, time_to[ arrondi à l'heure"""
+        stmt = (
+            select(AlertCountHourly.hour, AlertCountHourly.severity, AlertCountHourly.count)
+            .where(AlertCountHourly.hour >= time_from.replace(minute=0, second=0, microsecond=0),
+                   AlertCountHourly.hour < time_to, AlertCountHourly.count > 0)
+            .order_by(AlertCountHourly.hour, AlertCountHourly.severity)
+        )
+        return db.execute(stmt).all()
+
+    @staticmethod
+    def top_devices(db: Session, limit: int = 10) -> List[Tuple[int, str, Optional[str], int]]:
+        """(device_id, nom, IP, nombre d'alertes) depuis le début, toutes sévérités confondues"""
+        n = func.sum(AlertCountDevice.count).label("n")
+        stmt = (
+            select(Device.id, Device.name, Device.ip_address, n)
+            .join(AlertCountDevice, AlertCountDevice.device_id == Device.id)
+            .group_by(Device.id, Device.name, Device.ip_address)
+            .having(n > 0)
+            .order_by(n.desc(), Device.id)
+            .limit(limit)
+        )
+        return db.execute(stmt).all()
+
+    @staticmethod
+    def rebuild(db: Session) -> Tuple[int, int]:
+        """Recalcule les compteurs depuis 'anomalies' (rattrapage) ; renvoie le nombre de cases écrites"""
+        if db.get_bind().dialect.name == "postgresql":
+            # Bloque les insertions concurrentes (et leurs triggers) le temps du recalcul
+            db.execute(text("LOCK TABLE anomalies IN SHARE MODE"))
+        db.execute(delete(AlertCountHourly))
+        db.execute(delete(AlertCountDevice))
+        hour = hour_bucket(db)
+        hourly = db.execute(insert(AlertCountHourly).from_select(
+            ["hour", "severity", "count"],
+            select(hour, Anomaly.severity, func.count()).group_by(hour, Anomaly.severity),
+        )).rowcount
+        devices = db.execute(insert(AlertCountDevice).from_select(
+            ["device_id", "severity", "count"],
+            select(Anomaly.device_id, Anomaly.severity, func.count())
+            .where(Anomaly.device_id.is_not(None))
+            .group_by(Anomaly.device_id, Anomaly.severity),
+        )).rowcount
+        db.commit()
+        return hourly, devices
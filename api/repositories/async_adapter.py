@@ -0,0 +1,26 @@
+from typing import Any, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class AsyncRepository:
+    """
+    Adaptateur asyncio d'un dépôt synchrone : les méthodes (db, *args) du dépôt sont
+    exécutées par AsyncSession.run_sync sur la session synchrone sous-jacente.
+    Les requêtes sont construites une seule fois, dans le dépôt synchrone ; les E/S
+    passent par le pilote asyncio (asyncpg/aiosqlite) sans occuper de thread.
+    """
+
+    def __init__(self, repository: type):
+        self.repository = repository
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        method = getattr(self.repository, name)
+
+        async def call(db: AsyncSession, *args, **kwargs):
+            return await db.run_sync(method, *args, **kwargs)
+
+        call.__name__ = name
+        # Mis en cache sur l'instance : __getattr__ n'est plus appelé pour ce nom
+        setattr(self, name, call)
+        return call
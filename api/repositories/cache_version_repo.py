@@ -0,0 +1,12 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from api.models.cache_versions import CacheVersion
+
+
+class CacheVersionRepository:
+    """Couche d'accès aux données pour la table 'cache_versions'."""
+
+    @staticmethod
+    def get(db: Session, resource: str) -> int:
+        """Version courante d'une table mise en cache (lecture par clé primaire)"""
+        return db.execute(select(CacheVersion.version).where(CacheVersion.resource == resource)).scalar() or 0
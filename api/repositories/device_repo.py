@@ -1,26 +1,121 @@
+import base64
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from sqlalchemy import select
-from typing import List, Optional
+from sqlalchemy import bindparam, delete, select, func, text, tuple_
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from api.models.alert_counters import AlertCountDevice
+from api.repositories.async_adapter import AsyncRepository
 from api.models.devices import Device
 from api.schemas.device import DeviceCreate, DeviceUpdate
 
+COUNT_CAP = 10000  # au-delà, le total d'une recherche est plafonné (estimation)
+UPSERT_CHUNK = 1000
+INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def encode_cursor(device: Device) -> str:
+    """Curseur opaque = clé keyset (created_at, id) du dernier équipement de la page"""
+    raw = f"{device.created_at.isoformat()}|{device.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """ValueError si le curseur est invalide"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, device_id = raw.split("|", 1)
+        return datetime.fromisoformat(ts), int(device_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def search_filter(q: str):
+    # ILIKE '%q%' sur nom/hostname (servi par les index pg_trgm), préfixe sur l'IP (text_pattern_ops)
+    escaped = q.replace("/", "//").replace("%", "/%").replace("_", "/_")
+    return (
+        Device.name.ilike(f"%{escaped}%", escape="/")
+        | Device.hostname.ilike(f"%{escaped}%", escape="/")
+        | Device.ip_address.like(f"{escaped}%", escape="/")
+    )
+
+
+def list_stmt(q: Optional[str], limit: int, after: Optional[Tuple[datetime, int]]):
+    stmt = select(Device).order_by(Device.created_at.desc(), Device.id.desc()).limit(limit)
+    if q:
+        stmt = stmt.where(search_filter(q))
+    if after is not None:
+        # Pas d'OFFSET : une page profonde coûte autant que la première
+        stmt = stmt.where(tuple_(Device.created_at, Device.id) < tuple_(*after))
+    return stmt
+
+
+def count_stmt(q: Optional[str]):
+    inner = select(Device.id)
+    if q:
+        inner = inner.where(search_filter(q))
+    return select(func.count()).select_from(inner.limit(COUNT_CAP + 1).subquery())
+
+
+RELTUPLES = text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'devices'::regclass")
+
+
 class DeviceRepository:
     """Couche d'accès aux données pour la table 'devices'."""
 
     @staticmethod
-    def list(db: Session, q: Optional[str] = None, limit: int = 100) -> List[Device]:
-        stmt = select(Device).order_by(Device.created_at.desc()).limit(limit)
-        if q:
-            stmt = stmt.where((Device.name.ilike(f"%{q}%")) | (Device.ip_address == q))
-        return db.execute(stmt).scalars().all()
+    def list(db: Session, q: Optional[str] = None, limit: int = 100,
+             after: Optional[Tuple[datetime, int]] = None) -> List[Device]:
+        """Du plus récent au plus ancien ; `after` = clé (created_at, id) du dernier élément de la page précédente"""
+        return db.execute(list_stmt(q, limit, after)).scalars().all()
+
+    @staticmethod
+    def estimate_count(db: Session, q: Optional[str] = None) -> Tuple[int, bool]:
+        """
+        (total, estimation ?) : statistiques PostgreSQL sans filtre (O(1)),
+        sinon comptage plafonné à COUNT_CAP.
+        """
+        if not q and db.get_bind().dialect.name == "postgresql":
+            estimate = db.execute(RELTUPLES).scalar()
+            if estimate is not None and estimate >= 0:
+                return int(estimate), True
+        count = db.execute(count_stmt(q)).scalar_one()
+        return min(count, COUNT_CAP), count > COUNT_CAP
 
     @staticmethod
     def get(db: Session, device_id: int) -> Optional[Device]:
         return db.get(Device, device_id)
 
+    @staticmethod
+    def deduplicate_ip(db: Session) -> int:
+        """
+        Fusionne les équipements de même ip_address (le plus ancien id est conservé, les lignes
+        liées lui sont rattachées) puis crée l'index unique requis par ON CONFLICT (ip_address).
+        Base créée avant la contrainte unique ; renvoie le nombre d'équipements supprimés.
+        """
+        dupes = db.execute(
+            select(Device.ip_address, func.min(Device.id))
+            .where(Device.ip_address.is_not(None))
+            .group_by(Device.ip_address).having(func.count() > 1)
+        ).all()
+        removed = 0
+        for ip, keep in dupes:
+            ids = list(db.execute(select(Device.id).where(Device.ip_address == ip, Device.id != keep)).scalars())
+            for table in ("jobs", "metrics", "traps", "anomalies"):
+                db.execute(text(f"UPDATE {table} SET device_id = :keep WHERE device_id IN :ids")
+                           .bindparams(bindparam("ids", expanding=True)), {"keep": keep, "ids": ids})
+            # Compteurs par équipement : recalculés par l'appelant (AlertCounterRepository.rebuild)
+            db.execute(delete(AlertCountDevice).where(AlertCountDevice.device_id.in_(ids)))
+            db.execute(delete(Device).where(Device.id.in_(ids)))
+            removed += len(ids)
+        db.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_devices_ip_address ON devices (ip_address)"))
+        db.commit()
+        return removed
+
     @staticmethod
     def create(db: Session, data: DeviceCreate) -> Device:
-        # unicité “logique” IP (à toi d’ajouter une contrainte unique si tu veux)
+        # unicité IP vérifiée avant insertion (index unique : python -m api.dedupe_devices sur une base existante)
         existing = db.execute(select(Device).where(Device.ip_address == str(data.ip_address))).scalar_one_or_none()
         if existing:
             raise ValueError("Device with this IP already exists")
@@ -37,6 +132,46 @@ class DeviceRepository:
         db.refresh(obj)
         return obj
 
+    @staticmethod
+    def upsert_many(db: Session, rows: List[Tuple[DeviceCreate, FrozenSet[str]]],
+                    chunk_size: int = UPSERT_CHUNK) -> Dict[str, Tuple[int, bool]]:
+        """
+        INSERT … ON CONFLICT (ip_address) DO UPDATE par lots, dans une seule transaction.
+        rows : (données, champs fournis) — seuls les champs fournis écrasent l'existant.
+        Retourne {ip: (id, créé ?)}.
+        """
+        insert = INSERTS.get(db.get_bind().dialect.name)
+        if insert is None:
+            raise ValueError(f"Bulk upsert not supported on {db.get_bind().dialect.name}")
+        out: Dict[str, Tuple[int, bool]] = {}
+        try:
+            for start in range(0, len(rows), chunk_size):
+                chunk = rows[start:start + chunk_size]
+                ips = [str(data.ip_address) for data, _ in chunk]
+                existing = set(db.execute(select(Device.ip_address).where(Device.ip_address.in_(ips))).scalars())
+                now = datetime.utcnow()
+                groups = defaultdict(list)
+                for data, fields in chunk:
+                    groups[fields].append({
+                        "name": data.name, "ip_address": str(data.ip_address),
+                        "snmp_profile_id": data.snmp_profile_id, "location": data.location,
+                        "tags": data.tags or [], "enabled": data.enabled,
+                        "created_at": now, "updated_at": now,
+                    })
+                # Une instruction par ensemble de champs fournis (en pratique une seule)
+                for fields, values in groups.items():
+                    stmt = insert(Device).values(values)
+                    update = {f: stmt.excluded[f] for f in fields if f != "ip_address"}
+                    update["updated_at"] = stmt.excluded.updated_at
+                    stmt = stmt.on_conflict_do_update(index_elements=[Device.ip_address], set_=update)
+                    for device_id, ip in db.execute(stmt.returning(Device.id, Device.ip_address)):
+                        out[ip] = (device_id, ip not in existing)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return out
+
     @staticmethod
     def update(db: Session, device: Device, data: DeviceUpdate) -> Device:
         for field, value in data.model_dump(exclude_unset=True).items():
@@ -51,3 +186,7 @@ class DeviceRepository:
     def delete(db: Session, device: Device) -> None:
         db.delete(device)
         db.commit()
+
+
+# Variante asyncio (DB_ASYNC=1) : mêmes méthodes et requêtes, via AsyncSession.run_sync
+AsyncDeviceRepository = AsyncRepository(DeviceRepository)
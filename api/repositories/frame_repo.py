@@ -0,0 +1,110 @@
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple, Dict, Any
+from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, tuple_, func
+from api.models.frames import CapturedFrame, FrameOid
+
+
+class FrameRepository:
+    """Couche d'accès aux données pour les tables 'frames' et 'frame_oids'."""
+
+    @staticmethod
+    def _filtered(
+        stmt,
+        pdu: Optional[str] = None,
+        version: Optional[int] = None,
+        ip_src: Optional[str] = None,
+        ip_dst: Optional[str] = None,
+        oid_contains: Optional[str] = None,
+        time_from: Optional[datetime] = None,
+        time_to: Optional[datetime] = None,
+        after: Optional[Tuple[datetime, str]] = None,
+    ):
+        if pdu:
+            stmt = stmt.where(CapturedFrame.pdu_type == pdu)
+        if version is not None:
+            stmt = stmt.where(CapturedFrame.version == version)
+        if ip_src:
+            stmt = stmt.where(CapturedFrame.ip_src == ip_src)
+        if ip_dst:
+            stmt = stmt.where(CapturedFrame.ip_dst == ip_dst)
+        if time_from is not None:
+            stmt = stmt.where(CapturedFrame.captured_at >= time_from)
+        if time_to is not None:
+            stmt = stmt.where(CapturedFrame.captured_at <= time_to)
+        if after is not None:
+            stmt = stmt.where(tuple_(CapturedFrame.captured_at, CapturedFrame.id) < tuple_(*after))
+        if oid_contains:
+            # EXISTS corrélé : le parcours suit l'index (captured_at, id) du tri et s'arrête à `limit`
+            # trames retenues ; chaque candidate est testée par la clé primaire (frame_id, oid) de frame_oids
+            stmt = stmt.where(
+                select(FrameOid.frame_id)
+                .where(FrameOid.frame_id == CapturedFrame.id,
+                       FrameOid.oid.contains(oid_contains, autoescape=True))
+                .exists()
+            )
+        return stmt
+
+    @staticmethod
+    def search(db: Session, limit: int = 100, after: Optional[Tuple[datetime, str]] = None,
+               **filters: Any) -> List[CapturedFrame]:
+        """
+        Du plus récent au plus ancien, pagination keyset sur (captured_at, id) :
+        `after` est la clé de la dernière trame de la page précédente (pas d'OFFSET).
+        Filtres : pdu, version, ip_src, ip_dst, oid_contains, time_from, time_to.
+        """
+        stmt = select(CapturedFrame).order_by(CapturedFrame.captured_at.desc(), CapturedFrame.id.desc()).limit(limit)
+        stmt = FrameRepository._filtered(stmt, after=after, **filters)
+        return db.execute(stmt).scalars().all()
+
+    @staticmethod
+    def count(db: Session, limit: Optional[int] = None, **filters: Any) -> int:
+        """Nombre de trames correspondant aux filtres de search, plafonné à `limit` (arrêt du comptage)"""
+        ids = FrameRepository._filtered(select(CapturedFrame.id), **filters)
+        if limit is not None:
+            ids = ids.limit(limit)
+        return db.execute(select(func.count()).select_from(ids.subquery())).scalar_one()
+
+    @staticmethod
+    def get(db: Session, frame_id: str) -> Optional[CapturedFrame]:
+        return db.get(CapturedFrame, frame_id)
+
+    @staticmethod
+    def last_id(db: Session, prefix: str) -> Optional[str]:
+        """Dernier identifiant archivé pour une époque du ring buffer (identifiants à largeur fixe)"""
+        return db.execute(
+            select(func.max(CapturedFrame.id)).where(CapturedFrame.id.startswith(prefix))
+        ).scalar_one_or_none()
+
+    @staticmethod
+    def insert_many(db: Session, frames: List[Dict[str, Any]]) -> int:
+        """Insertion par lot de trames au format du schéma Frame"""
+        if not frames:
+            return 0
+        rows, oid_rows = [], []
+        for f in frames:
+            captured_at = datetime.fromisoformat(f["timestamp"].replace("Z", "+00:00")).astimezone(timezone.utc)
+            rows.append({
+                "id": f["id"],
+                "captured_at": captured_at,
+                "ip_src": f["src"]["ip"],
+                "port_src": f["src"]["port"],
+                "ip_dst": f["dst"]["ip"],
+                "port_dst": f["dst"]["port"],
+                "version": f["version"],
+                "pdu_type": f["pdu_type"],
+                "request_id": f.get("request_id"),
+                "community": f.get("community"),
+                "security_user": f.get("security_user"),
+                "length": f["length"],
+                "varbinds": f["varbinds"],
+                "tags": f.get("tags") or [],
+                "anomalies": f.get("anomalies") or [],
+            })
+            for oid in {vb["oid"] for vb in f["varbinds"]}:
+                oid_rows.append({"frame_id": f["id"], "oid": oid, "captured_at": captured_at})
+        db.execute(insert(CapturedFrame), rows)
+        if oid_rows:
+            db.execute(insert(FrameOid), oid_rows)
+        db.commit()
+        return len(rows)
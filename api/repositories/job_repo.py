@@ -0,0 +1,14 @@
+from typing import List, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from api.models.jobs import Job
+
+
+class JobRepository:
+    """Couche d'accès aux données pour la table 'jobs' (file du poller)."""
+
+    @staticmethod
+    def counts_by_status(db: Session) -> List[Tuple[str, str, int]]:
+        """(kind, status, nombre) de toutes les tâches"""
+        stmt = select(Job.kind, Job.status, func.count()).group_by(Job.kind, Job.status)
+        return [tuple(row) for row in db.execute(stmt).all()]
@@ -0,0 +1,52 @@
+from datetime import datetime
+from typing import List, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, case, extract, cast, Integer, Float
+from api.models.metrics import Metric
+
+
+def epoch_seconds(db: Session):
+    """polled_at en secondes epoch (float) calculé par la base"""
+    if db.get_bind().dialect.name == "sqlite":
+        # Dates stockées en UTC ; secondes entières + millisecondes (julianday arrondit mal les pas)
+        return (cast(func.strftime("%s", Metric.polled_at), Integer)
+                + func.strftime("%f", Metric.polled_at) - cast(func.strftime("%S", Metric.polled_at), Integer))
+    return cast(extract("epoch", Metric.polled_at), Float)
+
+
+class MetricRepository:
+    """Couche d'accès aux données pour la table 'metrics'."""
+
+    @staticmethod
+    def fetch_buckets(db: Session, device_id: int, oids: List[str], time_from: datetime, time_to: datetime,
+                      start: float, step: int) -> List[Tuple]:
+        """
+        Pas de `step` secondes depuis `start` agrégés par la base, triés par oid puis pas :
+        (oid, pas, nombre, somme, min, max, première date, première valeur, dernière date, dernière valeur),
+        dates en secondes epoch. Une ligne par pas et par oid, quel que soit le nombre de mesures.
+        """
+        epoch = epoch_seconds(db)
+        offset = (epoch - start) / step
+        bucket = cast(offset, Integer) if db.get_bind().dialect.name == "sqlite" else func.floor(offset)
+        window = (Metric.oid, bucket)
+        rows = (
+            select(
+                Metric.oid, bucket.label("b"), epoch.label("e"), Metric.value_num.label("v"),
+                func.row_number().over(partition_by=window, order_by=Metric.polled_at).label("n"),
+                func.count().over(partition_by=window).label("c"),
+            )
+            .where(Metric.device_id == device_id, Metric.oid.in_(oids),
+                   Metric.polled_at >= time_from, Metric.polled_at < time_to,
+                   Metric.value_num.is_not(None))
+            .subquery()
+        )
+        stmt = (
+            select(
+                rows.c.oid, rows.c.b, func.count(), func.sum(rows.c.v), func.min(rows.c.v), func.max(rows.c.v),
+                func.min(rows.c.e), func.max(case((rows.c.n == 1, rows.c.v))),
+                func.max(rows.c.e), func.max(case((rows.c.n == rows.c.c, rows.c.v))),
+            )
+            .group_by(rows.c.oid, rows.c.b)
+            .order_by(rows.c.oid, rows.c.b)
+        )
+        return db.execute(stmt).all()
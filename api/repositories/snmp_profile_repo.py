@@ -1,7 +1,8 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import select
-from typing import List, Optional
+from typing import List, Optional, Set
 from api.models.snmp_profiles import SnmpProfiles
+from api.repositories.async_adapter import AsyncRepository
 from api.schemas.snmp_profile import SnmpProfileCreate, SnmpProfileUpdate
 
 class SnmpProfileRepository:
@@ -12,6 +13,12 @@ class SnmpProfileRepository:
         stmt = select(SnmpProfiles).order_by(SnmpProfiles.id.desc()).limit(limit)
         return db.execute(stmt).scalars().all()
 
+    @staticmethod
+    def existing_ids(db: Session, ids: Set[int]) -> Set[int]:
+        if not ids:
+            return set()
+        return set(db.execute(select(SnmpProfiles.id).where(SnmpProfiles.id.in_(ids))).scalars())
+
     @staticmethod
     def get(db: Session, profile_id: int) -> Optional[SnmpProfiles]:
         return db.get(SnmpProfiles, profile_id)
@@ -36,3 +43,7 @@ class SnmpProfileRepository:
     def delete(db: Session, profile: SnmpProfiles) -> None:
         db.delete(profile)
         db.commit()
+
+
+# Variante asyncio (DB_ASYNC=1) : mêmes méthodes et requêtes, via AsyncSession.run_sync
+AsyncSnmpProfileRepository = AsyncRepository(SnmpProfileRepository)
@@ -1,9 +1,25 @@
 from fastapi import APIRouter
+from api.config import settings
 from .system import router as system_router
-from .v1.devices import router as devices_router
-from .v1.snmp_profiles import router as profiles_router
+from .metrics import router as metrics_router
+from .v1.frames import router as frames_router
+from .v1.dashboard import router as dashboard_router
+
+# Routes asyncio avec DB_ASYNC=1 : /api/v1/devices (sauf /{id}/metrics et /bulk, exécutés par
+# run_sync sur la session asyncio) et /api/v1/snmp-profiles. Les requêtes restent celles des dépôts
+# synchrones (AsyncRepository). Dashboard, frames et /metrics restent synchrones dans les deux modes.
+if settings.DB_ASYNC:
+    # Couche asyncio : les handlers n'occupent pas de thread pendant l'attente de la base
+    from .v1.devices_async import router as devices_router
+    from .v1.snmp_profiles_async import router as profiles_router
+else:
+    from .v1.devices import router as devices_router
+    from .v1.snmp_profiles import router as profiles_router
 
 api_router = APIRouter()
 api_router.include_router(system_router)       # /api/v1/health, /api/v1/version
+api_router.include_router(metrics_router)      # /metrics (Prometheus)
 api_router.include_router(devices_router)      # /api/v1/devices
 api_router.include_router(profiles_router)     # /api/v1/snmp-profiles
+api_router.include_router(dashboard_router)    # /api/v1/dashboard/query
+api_router.include_router(frames_router, prefix="/api/v1")  # /api/v1/frames, /api/v1/frames/live (WebSocket)
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from api.deps import get_db
+from api.repositories.job_repo import JobRepository
+from api.services.capture_service import _shared_ring
+from api.telemetry.metrics import metrics
+
+router = APIRouter(tags=["system"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+metrics.describe("snmp_capture_frames_total", "counter", "Frames published by the capture process to the shared ring")
+metrics.describe("snmp_capture_ring_slots", "gauge", "Capacity of the shared frame ring")
+metrics.describe("snmp_poller_jobs", "gauge", "Poller jobs by kind and status")
+
+
+@metrics.collector
+def capture_samples():
+    # Compteur tenu par l'analyseur dans l'en-tête du ring (lecture mmap, sans verrou)
+    ring = _shared_ring()
+    if ring is None:
+        return
+    yield "snmp_capture_frames_total", {}, ring.bounds()[1]
+    yield "snmp_capture_ring_slots", {}, ring.slot_count
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics(db: Session = Depends(get_db)):
+    try:
+        jobs = JobRepository.counts_by_status(db)
+    except SQLAlchemyError:
+        # Base indisponible : les métriques HTTP/pool restent exposées
+        jobs = []
+    extra = [("snmp_poller_jobs", {"kind": kind, "status": status}, n) for kind, status, n in jobs]
+    return PlainTextResponse(metrics.render(extra), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from api.deps import get_db
+from api.schemas.dashboard import DashboardOut, DashboardRequest
+from api.services.dashboard_service import run_batch
+
+router = APIRouter(prefix="/api/v1/dashboard", tags=["dashboard"])
+
+@router.post("/query", response_model=DashboardOut)
+def dashboard_query(payload: DashboardRequest, db: Session = Depends(get_db)):
+    # Un appel pour tous les widgets du dashboard (séries, compteurs d'alertes, top équipements)
+    return DashboardOut(results=run_batch(db, payload.queries))
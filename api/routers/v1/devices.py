@@ -1,29 +1,84 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import TypeAdapter
+from datetime import datetime
+from typing import Optional, List, Tuple
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from api.deps import get_db
-from api.schemas.device import DeviceCreate, DeviceUpdate, DeviceOut
-from api.repositories.device_repo import DeviceRepository
+from api.http_cache import device_cache
+from api.models.devices import Device
+from api.schemas.metric import MetricsOut
+from api.schemas.device import DeviceBulkResult, DeviceCreate, DeviceUpdate, DeviceOut
+from api.schemas.pagination import Page
+from api.services.device_bulk_service import bulk_upsert, detect_format, parse_items
+from api.services.metrics_service import query_metrics
+from api.repositories.device_repo import DeviceRepository, decode_cursor, encode_cursor
 from api.repositories.snmp_profile_repo import SnmpProfileRepository
 
 router = APIRouter(prefix="/api/v1/devices", tags=["devices"])
+_device_page = TypeAdapter(Page[DeviceOut])
 
-@router.get("/", response_model=List[DeviceOut])
+
+# Mise en forme commune aux handlers synchrones et asyncio (devices_async.py)
+def cursor_key(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    try:
+        return decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def page_json(rows: List[Device], limit: int, total: Optional[Tuple[int, bool]]) -> bytes:
+    """rows : limit + 1 lignes au plus (la dernière signale une page suivante)"""
+    page = Page[DeviceOut](
+        items=[DeviceOut.model_validate(i.__dict__) for i in rows[:limit]],
+        next_cursor=encode_cursor(rows[limit - 1]) if len(rows) > limit else None,
+    )
+    if total is not None:
+        page.total, page.total_is_estimate = total
+    return _device_page.dump_json(page)
+
+
+@router.get("/", response_model=Page[DeviceOut])
 def list_devices(
+    request: Request,
     db: Session = Depends(get_db),
-    q: Optional[str] = Query(default=None, description="search by name or IP"),
-    limit: int = Query(default=100, le=500),
+    q: Optional[str] = Query(default=None, description="search by name, hostname or IP prefix"),
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None, description="next_cursor of the previous page"),
 ):
-    items = DeviceRepository.list(db, q=q, limit=limit)
-    return [DeviceOut.model_validate(i.__dict__) for i in items]
+    # Réponse en cache (ou 304) : au plus une lecture de version de la table, sans sérialisation
+    cached, token = device_cache.lookup(request, db)
+    if cached is not None:
+        return cached
+    after = cursor_key(cursor)
+    rows = DeviceRepository.list(db, q=q, limit=limit + 1, after=after)
+    # Total (estimé) seulement sur la première page
+    total = DeviceRepository.estimate_count(db, q=q) if after is None else None
+    return device_cache.put(request, page_json(rows, limit, total), token)
 
 @router.get("/{device_id}", response_model=DeviceOut)
-def get_device(device_id: int, db: Session = Depends(get_db)):
+def get_device(device_id: int, request: Request, db: Session = Depends(get_db)):
+    cached, token = device_cache.lookup(request, db)
+    if cached is not None:
+        return cached
     d = DeviceRepository.get(db, device_id)
     if not d:
         raise HTTPException(status_code=404, detail="Device not found")
-    return DeviceOut.model_validate(d.__dict__)
+    return device_cache.put(request, DeviceOut.model_validate(d.__dict__).model_dump_json().encode(), token)
+
+@router.get("/{device_id}/metrics", response_model=MetricsOut)
+def get_device_metrics(
+    device_id: int,
+    db: Session = Depends(get_db),
+    oid: List[str] = Query(..., description="repeatable or comma-separated"),
+    time_from: Optional[str] = Query(default=None, description="ISO 8601 (default: time_to - 1h)"),
+    time_to: Optional[str] = Query(default=None, description="ISO 8601 (default: now)"),
+    step: Optional[int] = Query(default=None, ge=1, description="bucket width in seconds"),
+    max_points: int = Query(default=500, ge=1, le=5000),
+    agg: Optional[str] = Query(default=None, description="avg,min,max,last,rate,count"),
+):
+    # Agrégation côté serveur : au plus max_points points par série
+    return query_metrics(db, device_id, oid, time_from, time_to, step, max_points, agg)
 
 @router.post("/", response_model=DeviceOut)
 def create_device(payload: DeviceCreate, db: Session = Depends(get_db)):
@@ -37,8 +92,22 @@ def create_device(payload: DeviceCreate, db: Session = Depends(get_db)):
         d = DeviceRepository.create(db, payload)
     except ValueError as e:
         raise HTTPException(status_code=409, detail=str(e))
+    device_cache.invalidate()
     return DeviceOut.model_validate(d.__dict__)
 
+@router.post("/bulk", response_model=DeviceBulkResult)
+async def bulk_upsert_devices(
+    request: Request,
+    db: Session = Depends(get_db),
+    format: Optional[str] = Query(default=None, description="json|ndjson|csv (default: from Content-Type)"),
+    snmp_profile_id: Optional[int] = Query(default=None, description="profile for rows without one"),
+):
+    # Tableau JSON, NDJSON ou CSV ; une simple liste d'IP (discovery_scan) est acceptée
+    items = parse_items(await request.body(), detect_format(format, request.headers.get("content-type")))
+    result = await run_in_threadpool(bulk_upsert, db, items, snmp_profile_id)
+    device_cache.invalidate()
+    return result
+
 @router.patch("/{device_id}", response_model=DeviceOut)
 def update_device(device_id: int, payload: DeviceUpdate, db: Session = Depends(get_db)):
     d = DeviceRepository.get(db, device_id)
@@ -53,6 +122,7 @@ def update_device(device_id: int, payload: DeviceUpdate, db: Session = Depends(g
             raise HTTPException(status_code=400, detail="snmp_profile_id does not exist")
 
     d = DeviceRepository.update(db, d, payload)
+    device_cache.invalidate()
     return DeviceOut.model_validate(d.__dict__)
 
 @router.delete("/{device_id}", status_code=204)
@@ -61,4 +131,5 @@ def delete_device(device_id: int, db: Session = Depends(get_db)):
     if not d:
         raise HTTPException(status_code=404, detail="Device not found")
     DeviceRepository.delete(db, d)
+    device_cache.invalidate()
     return
@@ -0,0 +1,114 @@
+# Variante asyncio de devices.py (DB_ASYNC=1) : handlers async, AsyncSession ;
+# requêtes (DeviceRepository via AsyncRepository) et mise en forme partagées avec devices.py
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import Optional, List
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.deps import get_async_db
+from api.http_cache import device_cache
+from api.schemas.metric import MetricsOut
+from api.schemas.device import DeviceBulkResult, DeviceCreate, DeviceUpdate, DeviceOut
+from api.schemas.pagination import Page
+from api.services.device_bulk_service import bulk_upsert, detect_format, parse_items
+from api.services.metrics_service import query_metrics
+from api.repositories.device_repo import AsyncDeviceRepository
+from api.repositories.snmp_profile_repo import AsyncSnmpProfileRepository
+from api.routers.v1.devices import cursor_key, page_json
+
+router = APIRouter(prefix="/api/v1/devices", tags=["devices"])
+
+@router.get("/", response_model=Page[DeviceOut])
+async def list_devices(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    q: Optional[str] = Query(default=None, description="search by name, hostname or IP prefix"),
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None, description="next_cursor of the previous page"),
+):
+    # Réponse en cache (ou 304) : au plus une lecture de version de la table, sans sérialisation
+    cached, token = await device_cache.alookup(request, db)
+    if cached is not None:
+        return cached
+    after = cursor_key(cursor)
+    rows = await AsyncDeviceRepository.list(db, q=q, limit=limit + 1, after=after)
+    # Total (estimé) seulement sur la première page
+    total = await AsyncDeviceRepository.estimate_count(db, q=q) if after is None else None
+    return device_cache.put(request, page_json(rows, limit, total), token)
+
+@router.get("/{device_id}", response_model=DeviceOut)
+async def get_device(device_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    cached, token = await device_cache.alookup(request, db)
+    if cached is not None:
+        return cached
+    d = await AsyncDeviceRepository.get(db, device_id)
+    if not d:
+        raise HTTPException(status_code=404, detail="Device not found")
+    return device_cache.put(request, DeviceOut.model_validate(d.__dict__).model_dump_json().encode(), token)
+
+@router.get("/{device_id}/metrics", response_model=MetricsOut)
+async def get_device_metrics(
+    device_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    oid: List[str] = Query(..., description="repeatable or comma-separated"),
+    time_from: Optional[str] = Query(default=None, description="ISO 8601 (default: time_to - 1h)"),
+    time_to: Optional[str] = Query(default=None, description="ISO 8601 (default: now)"),
+    step: Optional[int] = Query(default=None, ge=1, description="bucket width in seconds"),
+    max_points: int = Query(default=500, ge=1, le=5000),
+    agg: Optional[str] = Query(default=None, description="avg,min,max,last,rate,count"),
+):
+    # Agrégation côté serveur : au plus max_points points par série
+    return await db.run_sync(query_metrics, device_id, oid, time_from, time_to, step, max_points, agg)
+
+@router.post("/", response_model=DeviceOut)
+async def create_device(payload: DeviceCreate, db: AsyncSession = Depends(get_async_db)):
+    # Vérifie l'existence du profil si fourni
+    if payload.snmp_profile_id is not None:
+        p = await AsyncSnmpProfileRepository.get(db, payload.snmp_profile_id)
+        if not p:
+            raise HTTPException(status_code=400, detail="snmp_profile_id does not exist")
+
+    try:
+        d = await AsyncDeviceRepository.create(db, payload)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    device_cache.invalidate()
+    return DeviceOut.model_validate(d.__dict__)
+
+@router.post("/bulk", response_model=DeviceBulkResult)
+async def bulk_upsert_devices(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    format: Optional[str] = Query(default=None, description="json|ndjson|csv (default: from Content-Type)"),
+    snmp_profile_id: Optional[int] = Query(default=None, description="profile for rows without one"),
+):
+    # Tableau JSON, NDJSON ou CSV ; une simple liste d'IP (discovery_scan) est acceptée
+    items = parse_items(await request.body(), detect_format(format, request.headers.get("content-type")))
+    result = await db.run_sync(bulk_upsert, items, snmp_profile_id)
+    device_cache.invalidate()
+    return result
+
+@router.patch("/{device_id}", response_model=DeviceOut)
+async def update_device(device_id: int, payload: DeviceUpdate, db: AsyncSession = Depends(get_async_db)):
+    d = await AsyncDeviceRepository.get(db, device_id)
+    if not d:
+        raise HTTPException(status_code=404, detail="Device not found")
+
+    # si on change de profil, valider l'existence
+    changes = payload.model_dump(exclude_unset=True)
+    if "snmp_profile_id" in changes and changes["snmp_profile_id"] is not None:
+        p = await AsyncSnmpProfileRepository.get(db, changes["snmp_profile_id"])
+        if not p:
+            raise HTTPException(status_code=400, detail="snmp_profile_id does not exist")
+
+    d = await AsyncDeviceRepository.update(db, d, payload)
+    device_cache.invalidate()
+    return DeviceOut.model_validate(d.__dict__)
+
+@router.delete("/{device_id}", status_code=204)
+async def delete_device(device_id: int, db: AsyncSession = Depends(get_async_db)):
+    d = await AsyncDeviceRepository.get(db, device_id)
+    if not d:
+        raise HTTPException(status_code=404, detail="Device not found")
+    await AsyncDeviceRepository.delete(db, d)
+    device_cache.invalidate()
+    return
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Query, WebSocket
 from typing import Optional, List
 from ...schemas.frame import Frame
+from ...schemas.import_job import ImportJobOut
 from ...schemas.pagination import Page
 from ...services.capture_service import CaptureService
 from ...services.import_export_service import ImportExportService
-from ...ws.sockets import manager
+from ...ws.sockets import FrameFilter, manager
 
 router = APIRouter(prefix="/frames")
 
@@ -14,7 +15,9 @@ async def list_frames(
     version: Optional[int] = Query(None),
     ip_src: Optional[str] = None,
     ip_dst: Optional[str] = None,
-    oid_contains: Optional[str] = None,
+    oid_contains: Optional[str] = Query(
+        None, description="Sous-chaîne d'OID ; indexée sous PostgreSQL (pg_trgm), parcours de la fenêtre sous SQLite",
+    ),
     time_from: Optional[str] = None,
     time_to: Optional[str] = None,
     limit: int = 100,
@@ -23,23 +26,48 @@ async def list_frames(
 ):
     return await svc.search(pdu, version, ip_src, ip_dst, oid_contains, time_from, time_to, limit, cursor)
 
+@router.websocket("/live")
+async def live_frames(
+    websocket: WebSocket,
+    ip: Optional[str] = None,
+    pdu: Optional[str] = None,
+    oid_prefix: Optional[str] = None,
+):
+    # Filtres évalués côté serveur ; le client peut en envoyer un nouveau en JSON
+    try:
+        flt = FrameFilter.from_params(ip, pdu, oid_prefix)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    await manager.serve(websocket, flt)
+
 @router.get("/{frame_id}", response_model=Frame)
 async def get_frame(frame_id: str, svc: CaptureService = Depends(CaptureService.dep)):
     return await svc.get(frame_id)
 
-@router.post("/import")
+@router.post("/import", status_code=202)
 async def import_frames(
+    background: BackgroundTasks,
     file: UploadFile = File(...),
-    mode: str = Query("json", regex="^(json|ndjson|pcap)$"),
+    mode: str = Query("json", pattern="^(json|ndjson|pcap)$"),
     imp: ImportExportService = Depends(ImportExportService.dep),
 ):
-    # pcap traité côté serveur; json/ndjson parse et renvoie un résumé
-    count = await imp.import_file(file, mode)
-    return {"imported": count}
+    # Upload recopié sur disque, puis décodage/insertion en tâche de fond ; suivi via GET /frames/import/{job_id}
+    job_id, path = await imp.spool_upload(file, mode)
+    background.add_task(imp.run_spooled, job_id, path, mode)
+    return {"job_id": job_id, "status": "pending"}
+
+@router.get("/import/{job_id}", response_model=ImportJobOut)
+async def import_status(job_id: int, imp: ImportExportService = Depends(ImportExportService.dep)):
+    # Progression consultable pendant l'import (bytes_done / bytes_total)
+    job = imp.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return ImportJobOut.model_validate(job.__dict__)
 
 @router.post("/export")
 async def export_frames(
-    fmt: str = Query("ndjson", regex="^(json|ndjson|csv)$"),
+    fmt: str = Query("ndjson", pattern="^(json|ndjson|csv)$"),
     filter: Optional[str] = None,
     imp: ImportExportService = Depends(ImportExportService.dep),
 ):
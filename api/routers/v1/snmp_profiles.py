@@ -1,28 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import TypeAdapter
 from typing import List
 from sqlalchemy.orm import Session
 
 from api.deps import get_db
+from api.http_cache import profile_cache
+from api.models.snmp_profiles import SnmpProfiles
 from api.schemas.snmp_profile import SnmpProfileCreate, SnmpProfileUpdate, SnmpProfileOut
 from api.repositories.snmp_profile_repo import SnmpProfileRepository
 
 router = APIRouter(prefix="/api/v1/snmp-profiles", tags=["snmp_profiles"])
+_profile_list = TypeAdapter(List[SnmpProfileOut])
+
+
+# Mise en forme commune aux handlers synchrones et asyncio (snmp_profiles_async.py)
+def list_json(items: List[SnmpProfiles]) -> bytes:
+    return _profile_list.dump_json([SnmpProfileOut.model_validate(i.__dict__) for i in items])
+
 
 @router.get("/", response_model=List[SnmpProfileOut])
-def list_profiles(db: Session = Depends(get_db), limit: int = Query(default=100, le=500)):
+def list_profiles(request: Request, db: Session = Depends(get_db), limit: int = Query(default=100, le=500)):
+    # Réponse en cache (ou 304) : au plus une lecture de version de la table, sans sérialisation
+    cached, token = profile_cache.lookup(request, db)
+    if cached is not None:
+        return cached
     items = SnmpProfileRepository.list(db, limit=limit)
-    return [SnmpProfileOut.model_validate(i.__dict__) for i in items]
+    return profile_cache.put(request, list_json(items), token)
 
 @router.get("/{profile_id}", response_model=SnmpProfileOut)
-def get_profile(profile_id: int, db: Session = Depends(get_db)):
+def get_profile(profile_id: int, request: Request, db: Session = Depends(get_db)):
+    cached, token = profile_cache.lookup(request, db)
+    if cached is not None:
+        return cached
     p = SnmpProfileRepository.get(db, profile_id)
     if not p:
         raise HTTPException(status_code=404, detail="Profile not found")
-    return SnmpProfileOut.model_validate(p.__dict__)
+    return profile_cache.put(request, SnmpProfileOut.model_validate(p.__dict__).model_dump_json().encode(), token)
 
 @router.post("/", response_model=SnmpProfileOut)
 def create_profile(payload: SnmpProfileCreate, db: Session = Depends(get_db)):
     p = SnmpProfileRepository.create(db, payload)
+    profile_cache.invalidate()
     return SnmpProfileOut.model_validate(p.__dict__)
 
 @router.patch("/{profile_id}", response_model=SnmpProfileOut)
@@ -31,6 +49,7 @@ def update_profile(profile_id: int, payload: SnmpProfileUpdate, db: Session = De
     if not p:
         raise HTTPException(status_code=404, detail="Profile not found")
     p = SnmpProfileRepository.update(db, p, payload)
+    profile_cache.invalidate()
     return SnmpProfileOut.model_validate(p.__dict__)
 
 @router.delete("/{profile_id}", status_code=204)
@@ -39,4 +58,5 @@ def delete_profile(profile_id: int, db: Session = Depends(get_db)):
     if not p:
         raise HTTPException(status_code=404, detail="Profile not found")
     SnmpProfileRepository.delete(db, p)
+    profile_cache.invalidate()
     return
@@ -0,0 +1,56 @@
+# Variante asyncio de snmp_profiles.py (DB_ASYNC=1) : handlers async, AsyncSession ;
+# requêtes (SnmpProfileRepository via AsyncRepository) et mise en forme partagées avec snmp_profiles.py
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.deps import get_async_db
+from api.http_cache import profile_cache
+from api.schemas.snmp_profile import SnmpProfileCreate, SnmpProfileUpdate, SnmpProfileOut
+from api.repositories.snmp_profile_repo import AsyncSnmpProfileRepository
+from api.routers.v1.snmp_profiles import list_json
+
+router = APIRouter(prefix="/api/v1/snmp-profiles", tags=["snmp_profiles"])
+
+@router.get("/", response_model=List[SnmpProfileOut])
+async def list_profiles(request: Request, db: AsyncSession = Depends(get_async_db), limit: int = Query(default=100, le=500)):
+    # Réponse en cache (ou 304) : au plus une lecture de version de la table, sans sérialisation
+    cached, token = await profile_cache.alookup(request, db)
+    if cached is not None:
+        return cached
+    items = await AsyncSnmpProfileRepository.list(db, limit=limit)
+    return profile_cache.put(request, list_json(items), token)
+
+@router.get("/{profile_id}", response_model=SnmpProfileOut)
+async def get_profile(profile_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    cached, token = await profile_cache.alookup(request, db)
+    if cached is not None:
+        return cached
+    p = await AsyncSnmpProfileRepository.get(db, profile_id)
+    if not p:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile_cache.put(request, SnmpProfileOut.model_validate(p.__dict__).model_dump_json().encode(), token)
+
+@router.post("/", response_model=SnmpProfileOut)
+async def create_profile(payload: SnmpProfileCreate, db: AsyncSession = Depends(get_async_db)):
+    p = await AsyncSnmpProfileRepository.create(db, payload)
+    profile_cache.invalidate()
+    return SnmpProfileOut.model_validate(p.__dict__)
+
+@router.patch("/{profile_id}", response_model=SnmpProfileOut)
+async def update_profile(profile_id: int, payload: SnmpProfileUpdate, db: AsyncSession = Depends(get_async_db)):
+    p = await AsyncSnmpProfileRepository.get(db, profile_id)
+    if not p:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    p = await AsyncSnmpProfileRepository.update(db, p, payload)
+    profile_cache.invalidate()
+    return SnmpProfileOut.model_validate(p.__dict__)
+
+@router.delete("/{profile_id}", status_code=204)
+async def delete_profile(profile_id: int, db: AsyncSession = Depends(get_async_db)):
+    p = await AsyncSnmpProfileRepository.get(db, profile_id)
+    if not p:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    await AsyncSnmpProfileRepository.delete(db, p)
+    profile_cache.invalidate()
+    return
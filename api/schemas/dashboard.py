@@ -0,0 +1,50 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional, List, Dict, Any, Literal, Union, Annotated
+
+# --------- Entrées ---------
+class _Query(BaseModel):
+    name: str = Field(min_length=1, max_length=64)  # clé du résultat dans la réponse
+    time_from: Optional[str] = None                 # ISO 8601 ou epoch ; défaut selon le type
+    time_to: Optional[str] = None
+
+class MetricSeriesQuery(_Query):
+    kind: Literal["metric_series"]
+    device_id: int
+    oid: List[str] = Field(min_length=1)
+    step: Optional[int] = Field(default=None, ge=1)
+    max_points: int = Field(default=500, ge=1, le=5000)
+    agg: Optional[str] = None
+
+class AnomalyCountsQuery(_Query):
+    kind: Literal["anomaly_counts"]
+    device_id: Optional[int] = None
+
+class TopDevicesQuery(_Query):
+    kind: Literal["top_devices"]
+    limit: int = Field(default=10, ge=1, le=100)
+    all_time: bool = False         # True : depuis le début via les compteurs (time_from/time_to ignorés)
+
+DashboardQuery = Annotated[
+    Union[MetricSeriesQuery, AnomalyCountsQuery, TopDevicesQuery], Field(discriminator="kind")
+]
+
+class DashboardRequest(BaseModel):
+    queries: List[DashboardQuery] = Field(min_length=1, max_length=20)
+
+    @model_validator(mode="after")
+    def _unique_names(self):
+        names = [q.name for q in self.queries]
+        if len(set(names)) != len(names):
+            raise ValueError("query names must be unique")
+        return self
+
+# --------- Sorties ---------
+class QueryResult(BaseModel):
+    kind: str
+    data: Optional[Any] = None
+    status: int = 200             # code HTTP propre à la requête (404, 500…)
+    error: Optional[str] = None   # erreur propre à la requête, les autres sont servies
+    cached: bool = False
+
+class DashboardOut(BaseModel):
+    results: Dict[str, QueryResult]
@@ -29,3 +29,17 @@ class DeviceOut(BaseModel):
     tags: Optional[list[str]]
     enabled: bool
     created_at: datetime
+
+class DeviceBulkRow(BaseModel):
+    row: int                          # numéro de ligne/élément dans l'entrée (à partir de 1)
+    ip_address: Optional[str] = None
+    status: str                       # created|updated|skipped|error
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class DeviceBulkResult(BaseModel):
+    created: int
+    updated: int
+    skipped: int
+    errors: int
+    results: List[DeviceBulkRow]
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+# --------- Sorties ---------
+class ImportJobOut(BaseModel):
+    id: int
+    filename: Optional[str]
+    mode: str
+    status: str
+    bytes_total: int
+    bytes_done: int
+    frames_imported: int
+    frames_rejected: int
+    error: Optional[str]
+    created_at: datetime
+    updated_at: datetime
@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+
+AGGREGATES = ("avg", "min", "max", "last", "rate", "count")
+
+# --------- Sorties ---------
+class MetricSeries(BaseModel):
+    """Série agrégée en colonnes : t[i] = début du pas i ; seules les agrégations demandées sont remplies"""
+    oid: str
+    t: List[datetime]
+    avg: Optional[List[Optional[float]]] = None
+    min: Optional[List[Optional[float]]] = None
+    max: Optional[List[Optional[float]]] = None
+    last: Optional[List[Optional[float]]] = None
+    rate: Optional[List[Optional[float]]] = None   # variation par seconde (None si compteur réinitialisé)
+    count: Optional[List[int]] = None
+
+class MetricsOut(BaseModel):
+    device_id: int
+    time_from: datetime
+    time_to: datetime
+    step: int          # secondes, éventuellement élargi pour respecter max_points
+    series: List[MetricSeries]
@@ -7,3 +7,4 @@ class Page(BaseModel, Generic[T]):
     items: List[T]
     next_cursor: Optional[str] = None
     total: Optional[int] = None
+    total_is_estimate: bool = False  # estimation (statistiques du planificateur ou comptage plafonné)
@@ -4,6 +4,7 @@ from datetime import datetime
 
 # --------- Entrées ---------
 class SnmpProfileCreate(BaseModel):
+    name: str = Field(min_length=1, max_length=128)
     version: str = Field(pattern="^(v2c|v3)$")
     community: Optional[str] = Field(default=None, max_length=100)
     v3_user: Optional[str] = Field(default=None, max_length=50)
@@ -16,6 +17,7 @@ class SnmpProfileCreate(BaseModel):
     notes: Optional[str] = None
 
 class SnmpProfileUpdate(BaseModel):
+    name: Optional[str] = Field(default=None, min_length=1, max_length=128)
     version: Optional[str] = Field(default=None, pattern="^(v2c|v3)$")
     community: Optional[str] = Field(default=None, max_length=100)
     v3_user: Optional[str] = Field(default=None, max_length=50)
@@ -30,6 +32,7 @@ class SnmpProfileUpdate(BaseModel):
 # --------- Sorties ---------
 class SnmpProfileOut(BaseModel):
     id: int
+    name: str
     version: str
     community: Optional[str]
     v3_user: Optional[str]
@@ -0,0 +1,217 @@
+import base64
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from fastapi import Depends, HTTPException
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from api.deps import get_db
+from api.models.frames import CapturedFrame
+from api.repositories.frame_repo import FrameRepository
+from api.schemas.frame import Frame
+from api.schemas.pagination import Page
+from snmp.frame_ring import FrameRing, PDU_TYPES, default_path, pack_ip
+
+MAX_LIMIT = 1000
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_ring: Optional[FrameRing] = None
+_ring_stat: Optional[Tuple[int, int]] = None
+_ring_lock = threading.Lock()
+
+
+def _shared_ring() -> Optional[FrameRing]:
+    """Ring buffer écrit par l'analyseur, ouvert une fois par processus (rouvert si le fichier est recréé)"""
+    global _ring, _ring_stat
+    path = default_path()
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    with _ring_lock:
+        if _ring is None or _ring_stat != (st.st_ino, st.st_size):
+            if _ring is not None:
+                _ring.close()
+            _ring = FrameRing(path)
+            _ring_stat = (st.st_ino, st.st_size)
+        return _ring
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """ISO 8601 (ex: 2024-05-01T10:00:00Z) ou epoch en secondes → datetime UTC"""
+    if not value:
+        return None
+    try:
+        return datetime.fromtimestamp(float(value), tz=timezone.utc)
+    except ValueError:
+        pass
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid time: {value}")
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+def parse_time(value: Optional[str]) -> Optional[int]:
+    """Même format que parse_datetime → nanosecondes (horodatage du ring buffer)"""
+    dt = parse_datetime(value)
+    return None if dt is None else int(dt.timestamp() * 1_000_000) * 1000
+
+
+def encode_cursor(frame: Frame) -> str:
+    """Curseur opaque = clé keyset (timestamp, id) de la dernière trame de la page"""
+    return base64.urlsafe_b64encode(f"{frame.timestamp}|{frame.id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, frame_id = raw.split("|", 1)
+        return parse_datetime(ts), frame_id
+    except (ValueError, UnicodeDecodeError, HTTPException):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _iso(dt: datetime) -> str:
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def frame_from_row(row: CapturedFrame) -> Frame:
+    return Frame(
+        id=row.id,
+        timestamp=_iso(row.captured_at),
+        src={"ip": row.ip_src, "port": row.port_src},
+        dst={"ip": row.ip_dst, "port": row.port_dst},
+        version=row.version,
+        pdu_type=row.pdu_type,
+        request_id=row.request_id,
+        community=row.community,
+        security_user=row.security_user,
+        varbinds=row.varbinds,
+        length=row.length,
+        tags=row.tags or [],
+        anomalies=row.anomalies or [],
+    )
+
+
+class CaptureService:
+    """
+    Recherche de trames : ring buffer mmap (trames récentes) et archive en base (index + keyset),
+    fusionnés sur la clé keyset (timestamp, id). Une trame déjà archivée garde l'identifiant
+    du ring : les doublons sont écartés. Le détail d'une trame est lu d'abord dans le ring.
+    """
+
+    def __init__(self, ring: Optional[FrameRing], db: Optional[Session] = None):
+        self.ring = ring
+        self.db = db
+
+    @classmethod
+    def dep(cls, db: Session = Depends(get_db)) -> "CaptureService":
+        return cls(_shared_ring(), db)
+
+    async def search(self, pdu: Optional[str] = None, version: Optional[int] = None,
+                     ip_src: Optional[str] = None, ip_dst: Optional[str] = None,
+                     oid_contains: Optional[str] = None, time_from: Optional[str] = None,
+                     time_to: Optional[str] = None, limit: int = 100,
+                     cursor: Optional[str] = None) -> Page[Frame]:
+        return await run_in_threadpool(
+            self._search, pdu, version, ip_src, ip_dst, oid_contains, time_from, time_to, limit, cursor
+        )
+
+    async def get(self, frame_id: str) -> Frame:
+        return await run_in_threadpool(self._get, frame_id)
+
+    def _get(self, frame_id: str) -> Frame:
+        frame = self.ring.get(frame_id) if self.ring is not None else None
+        if frame is not None:
+            return Frame.model_validate(frame)
+        row = FrameRepository.get(self.db, frame_id) if self.db is not None else None
+        if row is None:
+            raise HTTPException(status_code=404, detail="Frame not found")
+        return frame_from_row(row)
+
+    def _search(self, pdu, version, ip_src, ip_dst, oid_contains, time_from, time_to, limit, cursor) -> Page[Frame]:
+        limit = max(1, min(limit, MAX_LIMIT))
+        if pdu is not None and pdu not in PDU_TYPES:
+            raise HTTPException(status_code=400, detail=f"Unknown pdu type: {pdu}")
+        after = decode_cursor(cursor) if cursor else None
+        # limit + 1 par source : la trame en trop indique s'il existe une page suivante
+        items = self._search_ring(pdu, version, ip_src, ip_dst, oid_contains, time_from, time_to, limit + 1, after)
+        if self.db is not None:
+            seen = {f.id for f in items}
+            items += [f for f in self._search_db(pdu, version, ip_src, ip_dst, oid_contains, time_from, time_to,
+                                                 limit + 1, after) if f.id not in seen]
+            # Horodatages ISO à largeur fixe : l'ordre lexicographique est l'ordre chronologique
+            items.sort(key=lambda f: (f.timestamp, f.id), reverse=True)
+        next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
+        return Page[Frame](items=items[:limit], next_cursor=next_cursor)
+
+    def _search_db(self, pdu, version, ip_src, ip_dst, oid_contains, time_from, time_to, limit, after) -> List[Frame]:
+        rows = FrameRepository.search(
+            self.db, pdu=pdu, version=version, ip_src=ip_src, ip_dst=ip_dst, oid_contains=oid_contains,
+            time_from=parse_datetime(time_from), time_to=parse_datetime(time_to), limit=limit, after=after,
+        )
+        return [frame_from_row(r) for r in rows]
+
+    def _search_ring(self, pdu, version, ip_src, ip_dst, oid_contains, time_from, time_to, limit, after) -> List[Frame]:
+        if self.ring is None:
+            return []
+
+        # Filtres évalués sur l'en-tête fixe du slot, sans décoder la charge JSON
+        conds = []
+        if pdu is not None:
+            pdu_code = PDU_TYPES.index(pdu)
+            conds.append(lambda f: f[7] == pdu_code)
+        if version is not None:
+            conds.append(lambda f: f[6] == version)
+        try:
+            src = pack_ip(ip_src) if ip_src else None
+            dst = pack_ip(ip_dst) if ip_dst else None
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid IP address")
+        if src is not None:
+            conds.append(lambda f: f[2] == src)
+        if dst is not None:
+            conds.append(lambda f: f[3] == dst)
+        t_from, t_to = parse_time(time_from), parse_time(time_to)
+        if t_to is not None:
+            conds.append(lambda f: f[1] <= t_to)
+        before = None
+        if after is not None:
+            # Curseur d'une trame du ring : borne directe sur la séquence ; sinon (trame archivée ou
+            # importée) comparaison de la clé keyset, horodatage tronqué à la µs comme dans le curseur
+            before = self.ring.parse_id(after[1])
+            key = ((after[0] - _EPOCH) // timedelta(microseconds=1), after[1])
+            conds.append(lambda f: (f[1] // 1000, self.ring.frame_id(f[0])) < key)
+
+        items = []
+        for seq in self.ring.scan(before, lambda f: all(c(f) for c in conds), since_ns=t_from):
+            frame = self.ring.read(seq)
+            if frame is None:
+                continue
+            if oid_contains and not any(oid_contains in vb["oid"] for vb in frame["varbinds"]):
+                continue
+            items.append(Frame.model_validate(frame))
+            if len(items) >= limit:
+                break
+        return items
+
+
+def archive_frames(db: Session, ring: FrameRing, batch_size: int = 1000) -> int:
+    """Copie en base les trames du ring pas encore archivées (reprise sur le dernier id de l'époque)"""
+    last = FrameRepository.last_id(db, ring.id_prefix)
+    first, newest = ring.bounds()
+    start = max(first, ring.parse_id(last) + 1) if last else first
+    frames = []
+    for seq in range(start, min(newest, start + batch_size - 1) + 1):
+        frame = ring.read(seq)
+        if frame is not None:
+            frames.append(frame)
+    return FrameRepository.insert_many(db, frames)
@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, Callable, List, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from api.repositories.anomaly_repo import AlertCounterRepository, AnomalyRepository
+from api.schemas.dashboard import (
+    AnomalyCountsQuery, DashboardQuery, MetricSeriesQuery, QueryResult, TopDevicesQuery,
+)
+from api.services.capture_service import parse_datetime
+from api.services.metrics_service import query_metrics
+from api.telemetry.logging import log
+
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "5"))   # secondes
+DEFAULT_ALERT_RANGE = timedelta(hours=24)
+
+
+class QueryCache:
+    """
+    Résultats de requêtes de dashboard, clé = type + paramètres (hors nom), durée de vie courte.
+    Les fenêtres relatives (« dernière heure ») sont servies telles quelles pendant le TTL :
+    plusieurs écrans ouverts ne rejouent pas les mêmes agrégations.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 512, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query: DashboardQuery) -> str:
+        return json.dumps(query.model_dump(exclude={"name"}), sort_keys=True, default=str)
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] <= self.clock():
+                del self._entries[key]
+                return False, None
+            return True, entry[1]
+
+    def put(self, key: str, value: Any) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+query_cache = QueryCache(DASHBOARD_CACHE_TTL)
+
+
+def _window(query, default_range: timedelta) -> Tuple[datetime, datetime]:
+    time_to = parse_datetime(query.time_to) or datetime.now(timezone.utc)
+    time_from = parse_datetime(query.time_from) or time_to - default_range
+    if time_from >= time_to:
+        raise HTTPException(status_code=400, detail="time_from must be before time_to")
+    return time_from, time_to
+
+
+def _iso_hour(value: datetime) -> str:
+    # SQLite renvoie des dates naïves (UTC)
+    return (value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
+
+
+def metric_series(db: Session, q: MetricSeriesQuery) -> Dict[str, Any]:
+    out = query_metrics(db, q.device_id, q.oid, q.time_from, q.time_to, q.step, q.max_points, q.agg)
+    return out.model_dump(mode="json")
+
+
+def anomaly_counts(db: Session, q: AnomalyCountsQuery) -> Dict[str, Any]:
+    """
+    Totaux par sévérité et histogramme horaire (widgets « Nombres d'alertes »).
+    Tous équipements : compteurs horaires pré-agrégés (fenêtre arrondie à l'heure) ; sinon GROUP BY.
+    """
+    time_from, time_to = _window(q, DEFAULT_ALERT_RANGE)
+    if q.device_id is None:
+        rows = AlertCounterRepository.counts_by_hour(db, time_from, time_to)
+    else:
+        rows = AnomalyRepository.counts_by_hour(db, time_from, time_to, q.device_id)
+    by_severity: Dict[str, int] = {}
+    by_hour: List[Dict[str, Any]] = []
+    for hour, severity, count in rows:
+        by_severity[severity] = by_severity.get(severity, 0) + count
+        by_hour.append({"hour": _iso_hour(hour), "severity": severity, "count": count})
+    return {"time_from": time_from.isoformat(), "time_to": time_to.isoformat(),
+            "by_severity": by_severity, "by_hour": by_hour}
+
+
+def top_devices(db: Session, q: TopDevicesQuery) -> List[Dict[str, Any]]:
+    """Fenêtre par défaut : 24 h ; all_time : classement depuis le début via les compteurs par équipement"""
+    if q.all_time:
+        rows = AlertCounterRepository.top_devices(db, q.limit)
+    else:
+        time_from, time_to = _window(q, DEFAULT_ALERT_RANGE)
+        rows = AnomalyRepository.top_devices(db, time_from, time_to, q.limit)
+    return [
+        {"device_id": device_id, "name": name, "ip_address": ip, "count": count}
+        for device_id, name, ip, count in rows
+    ]
+
+
+RUNNERS: Dict[str, Callable[[Session, Any], Any]] = {
+    "metric_series": metric_series,
+    "anomaly_counts": anomaly_counts,
+    "top_devices": top_devices,
+}
+
+
+def run_batch(db: Session, queries: List[DashboardQuery],
+              cache: Optional[QueryCache] = None) -> Dict[str, QueryResult]:
+    """
+    Lot de requêtes nommées sur une seule session (une connexion empruntée au pool pour tout le lot).
+    Résultats en cache servis sans base ; requêtes identiques du lot exécutées une fois ;
+    une requête en erreur n'empêche pas les autres : chacune tourne dans un SAVEPOINT,
+    annulé sur erreur SQL (résultat 500 pour cette requête seule, la transaction reste utilisable).
+    """
+    cache = query_cache if cache is None else cache
+    results: Dict[str, QueryResult] = {}
+    pending: "OrderedDict[str, Tuple[DashboardQuery, List[str]]]" = OrderedDict()
+    for q in queries:
+        key = cache.key(q)
+        hit, data = cache.get(key)
+        if hit:
+            results[q.name] = QueryResult(kind=q.kind, data=data, cached=True)
+        else:
+            pending.setdefault(key, (q, []))[1].append(q.name)
+
+    for key, (q, names) in pending.items():
+        try:
+            with db.begin_nested():
+                data = RUNNERS[q.kind](db, q)
+            cache.put(key, data)
+            result = QueryResult(kind=q.kind, data=data)
+        except HTTPException as e:
+            result = QueryResult(kind=q.kind, status=e.status_code, error=str(e.detail))
+        except SQLAlchemyError as e:
+            log.error("dashboard_query_failed", kind=q.kind, names=names, error=str(e))
+            result = QueryResult(kind=q.kind, status=500, error="Database error")
+        for name in names:
+            results[name] = result
+    return {q.name: results[q.name] for q in queries}
@@ -0,0 +1,151 @@
+import csv
+import io
+import json
+from typing import Optional, Dict, Any, List, Tuple
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from api.repositories.device_repo import DeviceRepository
+from api.repositories.snmp_profile_repo import SnmpProfileRepository
+from api.schemas.device import DeviceBulkResult, DeviceBulkRow, DeviceCreate
+
+FORMATS = ("json", "ndjson", "csv")
+CONTENT_TYPES = {"application/json": "json", "application/x-ndjson": "ndjson", "text/csv": "csv"}
+BULK_MAX_ROWS = 50000
+FIELDS = set(DeviceCreate.model_fields)
+
+
+def detect_format(fmt: Optional[str], content_type: Optional[str]) -> str:
+    if fmt:
+        if fmt not in FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+        return fmt
+    return CONTENT_TYPES.get((content_type or "").split(";")[0].strip(), "json")
+
+
+def _csv_item(row: Dict[str, str]) -> Dict[str, Any]:
+    item: Dict[str, Any] = {}
+    for key, value in row.items():
+        if key is None or value is None or value.strip() == "":
+            continue
+        key, value = key.strip(), value.strip()
+        if key == "tags":
+            item["tags"] = json.loads(value) if value.startswith("[") else [t.strip() for t in value.split(";") if t.strip()]
+        elif key == "enabled":
+            item["enabled"] = value.lower() in ("1", "true", "yes", "oui")
+        else:
+            item[key] = value
+    return item
+
+
+def parse_items(body: bytes, fmt: str) -> List[Tuple[int, Any]]:
+    """
+    (numéro de ligne, élément) ; un élément illisible est une exception (résultat "error" pour la ligne).
+    Éléments acceptés : objets DeviceCreate ou simples IP (sortie de SNMPSender.discovery_scan).
+    """
+    text = body.decode("utf-8-sig")
+    if fmt == "json":
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+        if isinstance(data, dict):
+            data = data.get("devices", data.get("hosts", [data]))
+        if not isinstance(data, list):
+            raise HTTPException(status_code=400, detail="JSON array expected")
+        items = list(enumerate(data, 1))
+    elif fmt == "ndjson":
+        items = []
+        for n, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                items.append((n, json.loads(line)))
+            except ValueError as e:
+                items.append((n, e))
+    else:
+        reader = csv.DictReader(io.StringIO(text))
+        if reader.fieldnames and not {"ip_address", "ip"} & {f.strip() for f in reader.fieldnames}:
+            # Pas d'en-tête : une IP par ligne
+            reader = csv.DictReader(io.StringIO(text), fieldnames=["ip_address"])
+        items = []
+        for row in reader:
+            try:
+                items.append((reader.line_num, _csv_item(row)))
+            except ValueError as e:
+                items.append((reader.line_num, e))
+    if len(items) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Too many rows (max {BULK_MAX_ROWS})")
+    return items
+
+
+def referenced_profiles(items: List[Tuple[int, Any]], default_profile_id: Optional[int]) -> set:
+    """snmp_profile_id cités par l'entrée (leur existence est vérifiée en une requête)"""
+    ids = {default_profile_id} | {item.get("snmp_profile_id") for _, item in items if isinstance(item, dict)}
+    return {int(i) for i in ids if isinstance(i, int) or (isinstance(i, str) and i.isdigit())}
+
+
+def validate_items(items: List[Tuple[int, Any]], default_profile_id: Optional[int],
+                   known_profiles: set) -> Tuple[List[Tuple[int, DeviceCreate, frozenset]], Dict[int, DeviceBulkRow]]:
+    """
+    Validation en masse → (lignes valides dédupliquées par IP, résultats d'erreur par ligne).
+    Les champs fournis sont conservés : seuls eux sont mis à jour sur conflit
+    (une simple IP ne renomme pas un équipement existant).
+    """
+    valid: Dict[str, Tuple[int, DeviceCreate, frozenset]] = {}
+    results: Dict[int, DeviceBulkRow] = {}
+    for n, item in items:
+        if isinstance(item, Exception):
+            results[n] = DeviceBulkRow(row=n, status="error", error=str(item))
+            continue
+        if isinstance(item, str):
+            item = {"ip_address": item}
+        if not isinstance(item, dict):
+            results[n] = DeviceBulkRow(row=n, status="error", error="object or IP address expected")
+            continue
+        if "ip" in item and "ip_address" not in item:
+            item["ip_address"] = item.pop("ip")
+        fields = frozenset(FIELDS & item.keys())
+        ip = item.get("ip_address")
+        data = {"name": str(ip) if ip is not None else None, "snmp_profile_id": default_profile_id, **item}
+        try:
+            device = DeviceCreate.model_validate(data)
+        except ValidationError as e:
+            err = e.errors()[0]
+            results[n] = DeviceBulkRow(row=n, ip_address=str(ip) if ip is not None else None, status="error",
+                                       error=f"{'.'.join(map(str, err['loc']))}: {err['msg']}")
+            continue
+        if device.snmp_profile_id is not None and device.snmp_profile_id not in known_profiles:
+            results[n] = DeviceBulkRow(row=n, ip_address=str(device.ip_address), status="error",
+                                       error="snmp_profile_id does not exist")
+            continue
+        key = str(device.ip_address)
+        if key in valid:
+            # Doublon dans l'entrée : la dernière occurrence l'emporte
+            prev = valid[key][0]
+            results[prev] = DeviceBulkRow(row=prev, ip_address=key, status="skipped", error=f"duplicate of row {n}")
+        valid[key] = (n, device, fields)
+    return list(valid.values()), results
+
+
+def summarize(results: Dict[int, DeviceBulkRow]) -> DeviceBulkResult:
+    rows = [results[n] for n in sorted(results)]
+    count = lambda status: sum(1 for r in rows if r.status == status)
+    return DeviceBulkResult(created=count("created"), updated=count("updated"), skipped=count("skipped"),
+                            errors=count("error"), results=rows)
+
+
+def bulk_upsert(db: Session, items: List[Tuple[int, Any]], default_profile_id: Optional[int] = None) -> DeviceBulkResult:
+    """Validation puis upsert en une transaction ; session synchrone (AsyncSession.run_sync côté async)"""
+    known = SnmpProfileRepository.existing_ids(db, referenced_profiles(items, default_profile_id))
+    if default_profile_id is not None and default_profile_id not in known:
+        raise HTTPException(status_code=400, detail="snmp_profile_id does not exist")
+    valid, results = validate_items(items, default_profile_id, known)
+    ids = DeviceRepository.upsert_many(db, [(device, fields) for _, device, fields in valid])
+    for n, device, _ in valid:
+        device_id, created = ids[str(device.ip_address)]
+        results[n] = DeviceBulkRow(row=n, ip_address=str(device.ip_address),
+                                   status="created" if created else "updated", id=device_id)
+    return summarize(results)
@@ -0,0 +1,40 @@
+"""
+Archivage continu du ring buffer de trames vers la base (tables frames / frame_oids)
+Usage: python -m api.services.frame_archiver [--interval 1.0] [--batch 1000]
+"""
+import argparse
+import time
+
+from api.db.session import SessionLocal
+from api.services.capture_service import _shared_ring, archive_frames
+from api.telemetry.logging import log
+
+
+def run(interval: float = 1.0, batch_size: int = 1000):
+    while True:
+        ring = _shared_ring()
+        copied = 0
+        if ring is not None:
+            db = SessionLocal()
+            try:
+                copied = archive_frames(db, ring, batch_size)
+            except Exception as e:
+                db.rollback()
+                log.error("frame_archive_failed", error=str(e))
+            finally:
+                db.close()
+        # Lot plein : il reste du retard, on enchaîne sans attendre
+        if copied < batch_size:
+            time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivage des trames du ring buffer")
+    parser.add_argument("--interval", type=float, default=1.0, help="Pause entre deux lots (secondes)")
+    parser.add_argument("--batch", type=int, default=1000, help="Taille maximale d'un lot")
+    args = parser.parse_args()
+    run(args.interval, args.batch)
+
+
+if __name__ == "__main__":
+    main()
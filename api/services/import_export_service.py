@@ -0,0 +1,344 @@
+import codecs
+import json
+import os
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Optional, Dict, Any, Iterator, Callable, List, Tuple
+from urllib.parse import parse_qsl
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from api.db.session import SessionLocal
+from api.models.import_jobs import ImportJob
+from api.repositories.frame_repo import FrameRepository
+from api.schemas.frame import Frame
+from api.services.capture_service import frame_from_row, parse_datetime
+from api.telemetry.logging import log
+from snmp.config import get_export_config
+from snmp.export_stream import FORMATS, MEDIA_TYPES, ExportSizeExceeded, export_stream
+from snmp.snmp_decoder import DecodeError, decode_records, iter_pcap
+
+EXPORT_CHUNK = 1000
+UPLOAD_CHUNK = 1024 * 1024
+EXPORT_SAMPLE = 1000       # trames encodées pour estimer la taille moyenne d'une trame exportée
+DECODE_BATCH = 4096        # trames pcap par tâche du pool
+INSERT_BATCH = 10000       # lignes par insertion en base
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", os.cpu_count() or 1))
+FILTER_KEYS = ("pdu", "version", "ip_src", "ip_dst", "oid_contains", "time_from", "time_to")
+CSV_FIELDS = [
+    "id", "timestamp", "src_ip", "src_port", "dst_ip", "dst_port", "version", "pdu_type",
+    "request_id", "community", "security_user", "length", "varbinds", "tags", "anomalies",
+]
+
+
+def parse_filter(value: Optional[str]) -> Dict[str, Any]:
+    """Filtre d'export au format query string : "pdu=trap&ip_src=10.0.0.1&oid_contains=1.3.6.1.2.1.2" """
+    filters: Dict[str, Any] = {}
+    for key, val in parse_qsl(value or "", keep_blank_values=False):
+        if key not in FILTER_KEYS:
+            raise HTTPException(status_code=400, detail=f"Unknown filter: {key}")
+        filters[key] = val
+    if "version" in filters:
+        try:
+            filters["version"] = int(filters["version"])
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid version filter")
+    for key in ("time_from", "time_to"):
+        if key in filters:
+            filters[key] = parse_datetime(filters[key])
+    return filters
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _decode_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=IMPORT_WORKERS)
+        return _pool
+
+
+def _chunks(iterable, size: int) -> Iterator[list]:
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _iter_json_array(f, chunk_size: int = UPLOAD_CHUNK) -> Iterator[Any]:
+    """Éléments d'un tableau JSON lus en flux depuis un fichier binaire (sans charger le fichier)"""
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buf, pos, started = "", 0, False
+    while True:
+        raw = f.read(chunk_size)
+        chunk = text.decode(raw, final=not raw)
+        buf = buf[pos:] + chunk
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if not started:
+                if pos >= len(buf):
+                    break
+                if buf[pos] != "[":
+                    raise ValueError("Tableau JSON attendu")
+                started, pos = True, pos + 1
+                continue
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if not raw:
+                    raise ValueError("JSON tronqué")
+                break
+            yield item
+            pos = end
+        if not raw:
+            if started:
+                raise ValueError("JSON tronqué")
+            return
+
+
+def _capped(chunks: Iterator[bytes], max_bytes: Optional[int]) -> Iterator[bytes]:
+    """
+    Dernier garde-fou si l'estimation préalable était trop basse : le flux est interrompu
+    (pas de bloc final chunked), le client voit un transfert incomplet plutôt qu'un fichier tronqué valide
+    """
+    try:
+        yield from chunks
+    except ExportSizeExceeded as e:
+        log.error("export_size_exceeded", max_bytes=max_bytes, error=str(e))
+        raise
+
+
+def _csv_row(frame: Dict[str, Any]) -> Dict[str, Any]:
+    src, dst = frame.pop("src"), frame.pop("dst")
+    frame.update(src_ip=src["ip"], src_port=src["port"], dst_ip=dst["ip"], dst_port=dst["port"])
+    return frame
+
+
+class ImportExportService:
+    """Import/export de trames en flux (mémoire constante quelle que soit la volumétrie)."""
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+        self.job_id: Optional[int] = None     # dernier import lancé par cette instance
+
+    @classmethod
+    def dep(cls) -> "ImportExportService":
+        return cls()
+
+    # ---- Import ----
+
+    async def spool_upload(self, file: UploadFile, mode: str) -> Tuple[int, str]:
+        """Crée le job et recopie l'upload sur disque par blocs ; renvoie (job_id, chemin du fichier temporaire)"""
+        self.job_id = await run_in_threadpool(self._create_job, file.filename, mode)
+        fd, path = tempfile.mkstemp(prefix="import_", suffix=f".{mode}")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = await file.read(UPLOAD_CHUNK)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+        except BaseException as e:
+            os.remove(path)
+            await run_in_threadpool(self._fail_job, self.job_id, f"Upload interrompu: {e}")
+            raise
+        return self.job_id, path
+
+    def run_spooled(self, job_id: int, path: str, mode: str) -> None:
+        """Tâche de fond : import du fichier spoolé ; l'échec est enregistré dans le job, pas propagé"""
+        try:
+            self.run_import(job_id, path, mode)
+        except Exception as e:
+            log.error("frame_import_failed", job_id=job_id, error=str(e))
+        finally:
+            os.remove(path)
+
+    async def import_file(self, file: UploadFile, mode: str) -> int:
+        """Import complet dans la requête (tests, scripts) ; progression dans import_jobs"""
+        job_id, path = await self.spool_upload(file, mode)
+        try:
+            return await run_in_threadpool(self.run_import, job_id, path, mode)
+        except (DecodeError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=f"Import failed: {e}")
+        finally:
+            os.remove(path)
+
+    def _create_job(self, filename: Optional[str], mode: str) -> int:
+        db = self.session_factory()
+        try:
+            job = ImportJob(filename=filename, mode=mode, status="pending")
+            db.add(job)
+            db.commit()
+            return job.id
+        finally:
+            db.close()
+
+    def get_job(self, job_id: int) -> Optional[ImportJob]:
+        db = self.session_factory()
+        try:
+            return db.get(ImportJob, job_id)
+        finally:
+            db.close()
+
+    def run_import(self, job_id: int, path: str, mode: str) -> int:
+        db = self.session_factory()
+        job = db.get(ImportJob, job_id)
+        job.status, job.bytes_total = "running", os.path.getsize(path)
+        db.commit()
+        id_prefix = f"import{job_id:010d}-"
+        try:
+            with open(path, "rb") as f:
+                batches = self._pcap_batches(f, id_prefix) if mode == "pcap" else self._text_batches(f, mode, id_prefix)
+                pending: List[Dict[str, Any]] = []
+                for frames, rejected in batches:
+                    pending.extend(frames)
+                    job.frames_rejected += rejected
+                    if len(pending) >= INSERT_BATCH:
+                        job.frames_imported += FrameRepository.insert_many(db, pending)
+                        pending = []
+                        job.bytes_done = f.tell()
+                        db.commit()
+                job.frames_imported += FrameRepository.insert_many(db, pending)
+            job.bytes_done, job.status = job.bytes_total, "done"
+            db.commit()
+            return job.frames_imported
+        except Exception as e:
+            self._fail(db, job, str(e))
+            raise
+        finally:
+            db.close()
+
+    def _fail_job(self, job_id: int, error: str):
+        db = self.session_factory()
+        try:
+            self._fail(db, db.get(ImportJob, job_id), error)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _fail(db: Session, job: ImportJob, error: str):
+        db.rollback()
+        job.status, job.error = "error", error[:2000]
+        db.commit()
+
+    def _pcap_batches(self, f, id_prefix: str) -> Iterator[Tuple[List[Dict[str, Any]], int]]:
+        """Décodage parallèle ; nombre de lots en vol borné (mémoire constante), ordre préservé"""
+        pool = _decode_pool()
+        in_flight = deque()
+        index = 0
+        for records in _chunks(iter_pcap(f), DECODE_BATCH):
+            in_flight.append(pool.submit(decode_records, records, id_prefix, index))
+            index += len(records)
+            if len(in_flight) >= IMPORT_WORKERS * 2:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+    def _text_batches(self, f, mode: str, id_prefix: str) -> Iterator[Tuple[List[Dict[str, Any]], int]]:
+        items = (line for line in f if line.strip()) if mode == "ndjson" else _iter_json_array(f)
+        index = 0
+        for batch in _chunks(items, DECODE_BATCH):
+            frames, rejected = [], 0
+            for item in batch:
+                try:
+                    if isinstance(item, bytes):
+                        item = json.loads(item)
+                    # Nouvel identifiant : une trame réimportée n'entre pas en conflit avec l'originale
+                    item["id"] = f"{id_prefix}{index:012d}"
+                    frames.append(Frame.model_validate(item).model_dump())
+                except (ValueError, TypeError, ValidationError):
+                    rejected += 1
+                index += 1
+            yield frames, rejected
+
+    # ---- Export ----
+
+    def iter_frames(self, filters: Dict[str, Any], chunk_size: int = EXPORT_CHUNK) -> Iterator[Dict[str, Any]]:
+        """
+        Lecture par lots keyset (captured_at, id) ; session dédiée, ouverte le temps du flux
+        (la réponse est envoyée après la sortie des dépendances de la requête).
+        """
+        db = self.session_factory()
+        try:
+            after: Optional[tuple] = None
+            while True:
+                rows = FrameRepository.search(db, limit=chunk_size, after=after, **filters)
+                for row in rows:
+                    yield frame_from_row(row).model_dump()
+                if len(rows) < chunk_size:
+                    return
+                after = (rows[-1].captured_at, rows[-1].id)
+                # Libère les objets du lot précédent
+                db.expunge_all()
+        finally:
+            db.close()
+
+    def estimate_size(self, filters: Dict[str, Any], fmt: str, compress: bool, max_bytes: int) -> int:
+        """
+        Taille estimée de l'export : octets moyens par trame sur les EXPORT_SAMPLE premières trames
+        (encodées et compressées comme l'export), multipliés par le nombre de trames. Le comptage
+        s'arrête dès que l'estimation dépasse max_bytes.
+        """
+        sample = list(islice(self.iter_frames(filters, chunk_size=EXPORT_SAMPLE), EXPORT_SAMPLE))
+        rows = [_csv_row(f) for f in sample] if fmt == "csv" else sample
+        size = sum(map(len, export_stream(rows, fmt, fields=CSV_FIELDS if fmt == "csv" else None, compress=compress)))
+        if len(sample) < EXPORT_SAMPLE:
+            # Export entier déjà encodé : taille exacte
+            return size
+        per_frame = size / len(sample)
+        db = self.session_factory()
+        try:
+            count = FrameRepository.count(db, limit=int(max_bytes / per_frame) + 1, **filters)
+        finally:
+            db.close()
+        return int(count * per_frame)
+
+    async def export_stream(self, fmt: str = "ndjson", filter: Optional[str] = None) -> StreamingResponse:
+        if fmt not in FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+        filters = parse_filter(filter)
+        export = get_export_config()
+        # Plafond max_export_size vérifié avant le premier octet envoyé sur une estimation
+        # (taille moyenne d'un échantillon × nombre de trames), sans matérialiser l'export
+        if export.max_export_size:
+            estimate = await run_in_threadpool(self.estimate_size, filters, fmt, export.compress_exports,
+                                               export.max_export_size)
+            if estimate > export.max_export_size:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Export estimé à {estimate} octets, supérieur à {export.max_export_size} octets",
+                )
+        frames = self.iter_frames(filters)
+        if fmt == "csv":
+            frames = (_csv_row(f) for f in frames)
+        body = export_stream(
+            frames, fmt, fields=CSV_FIELDS if fmt == "csv" else None,
+            compress=export.compress_exports, max_bytes=export.max_export_size,
+        )
+        filename = f"frames_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+        if export.compress_exports:
+            filename += ".gz"
+        media_type = "application/gzip" if export.compress_exports else MEDIA_TYPES[fmt]
+        # Itérateur synchrone : Starlette le consomme dans le threadpool, bloc par bloc
+        return StreamingResponse(
+            _capped(body, export.max_export_size), media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
@@ -0,0 +1,135 @@
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, List, Sequence
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from api.repositories.device_repo import DeviceRepository
+from api.repositories.metric_repo import MetricRepository
+from api.schemas.metric import AGGREGATES, MetricSeries, MetricsOut
+from api.services.capture_service import parse_datetime
+
+DEFAULT_RANGE = timedelta(hours=1)
+DEFAULT_AGGREGATES = ("avg", "min", "max", "last", "rate")
+MAX_OIDS = 50
+
+
+def _bucket_count(start: float, end: float, step: int) -> int:
+    return math.ceil((end - start) / step)
+
+
+def aligned_start(time_from: datetime, step: int) -> float:
+    """Début aligné sur un multiple du pas : des requêtes successives retombent sur les mêmes pas"""
+    return math.floor(time_from.timestamp() / step) * step
+
+
+def effective_step(time_from: datetime, time_to: datetime, step: Optional[int], max_points: int) -> int:
+    """
+    Pas demandé, élargi pour ne jamais dépasser max_points par série.
+    Le premier pas aligné peut commencer jusqu'à un pas avant time_from : s'il en résulte
+    un pas de trop, le pas est recalculé sur max_points - 1 pas.
+    """
+    span = (time_to - time_from).total_seconds()
+    step = max(int(step or 0), math.ceil(span / max_points), 1)
+    if max_points > 1 and _bucket_count(aligned_start(time_from, step), time_to.timestamp(), step) > max_points:
+        step = max(step, math.ceil(span / (max_points - 1)))
+    return step
+
+
+def combine(start: float, step: int, buckets: np.ndarray, counts: np.ndarray, sums: np.ndarray,
+            mins: np.ndarray, maxs: np.ndarray, first_t: np.ndarray, first_v: np.ndarray,
+            last_t: np.ndarray, last_v: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Agrégats d'une série à partir de ses pas (un élément par pas non vide, triés).
+    rate : variation/s entre les dernières valeurs de pas consécutifs (premier pas : au sein du pas),
+    NaN si négative (compteur réinitialisé ou rebouclé).
+    """
+    delta = last_v - np.r_[first_v[:1], last_v[:-1]]
+    dt = last_t - np.r_[first_t[:1], last_t[:-1]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.where((dt > 0) & (delta >= 0), delta / dt, np.nan)
+    return {
+        "t": start + buckets * float(step),
+        "avg": sums / counts,
+        "min": mins,
+        "max": maxs,
+        "last": last_v,
+        "rate": rate,
+        "count": counts,
+    }
+
+
+def aggregate(ts: np.ndarray, values: np.ndarray, start: float, step: int) -> Dict[str, np.ndarray]:
+    """
+    Agrégation vectorisée par pas de `step` secondes d'une série brute triée par date
+    (ts en secondes epoch) : un reduceat par agrégat, aucune boucle Python.
+    """
+    buckets = ((ts - start) // step).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(ts)]
+    return combine(
+        start, step, buckets[starts], ends - starts, np.add.reduceat(values, starts),
+        np.minimum.reduceat(values, starts), np.maximum.reduceat(values, starts),
+        ts[starts], values[starts], ts[ends - 1], values[ends - 1],
+    )
+
+
+def _floats(arr: np.ndarray) -> List[Optional[float]]:
+    return [None if v != v else v for v in arr.tolist()]
+
+
+def parse_aggregates(agg: Optional[str]) -> Sequence[str]:
+    if not agg:
+        return DEFAULT_AGGREGATES
+    names = [a.strip() for a in agg.split(",") if a.strip()]
+    unknown = [a for a in names if a not in AGGREGATES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown aggregate: {unknown[0]}")
+    return names
+
+
+def query_metrics(db: Session, device_id: int, oids: List[str], time_from: Optional[str] = None,
+                  time_to: Optional[str] = None, step: Optional[int] = None, max_points: int = 500,
+                  agg: Optional[str] = None) -> MetricsOut:
+    """Séries agrégées (≤ max_points points) d'un équipement ; oids répétés ou séparés par des virgules"""
+    if not DeviceRepository.get(db, device_id):
+        raise HTTPException(status_code=404, detail="Device not found")
+    oids = list(dict.fromkeys(o.strip() for value in oids for o in value.split(",") if o.strip()))
+    if not oids:
+        raise HTTPException(status_code=400, detail="At least one oid is required")
+    if len(oids) > MAX_OIDS:
+        raise HTTPException(status_code=400, detail=f"Too many oids (max {MAX_OIDS})")
+    aggregates = parse_aggregates(agg)
+    t_to = parse_datetime(time_to) or datetime.now(timezone.utc)
+    t_from = parse_datetime(time_from) or t_to - DEFAULT_RANGE
+    if t_from >= t_to:
+        raise HTTPException(status_code=400, detail="time_from must be before time_to")
+    step = effective_step(t_from, t_to, step, max_points)
+
+    start = aligned_start(t_from, step)
+    if _bucket_count(start, t_to.timestamp(), step) > max_points:
+        # max_points = 1 : un seul pas, commençant à time_from
+        start = t_from.timestamp()
+
+    by_oid: Dict[str, MetricSeries] = {oid: MetricSeries(oid=oid, t=[]) for oid in oids}
+    # Pas agrégés par la base : une ligne par (oid, pas), dates déjà en secondes epoch
+    rows = MetricRepository.fetch_buckets(db, device_id, oids, t_from, t_to, start, step)
+    if rows:
+        oid_col = np.array([r[0] for r in rows], dtype=object)
+        block = np.array([r[1:] for r in rows], dtype=np.float64)
+        bounds = np.flatnonzero(np.r_[True, oid_col[1:] != oid_col[:-1], True]).tolist()
+        for i, j in zip(bounds[:-1], bounds[1:]):
+            b, counts, sums, mins, maxs, first_t, first_v, last_t, last_v = block[i:j].T
+            result = combine(start, step, b, counts.astype(np.int64), sums, mins, maxs,
+                             first_t, first_v, last_t, last_v)
+            series = by_oid[oid_col[i]]
+            series.t = [datetime.fromtimestamp(t, tz=timezone.utc) for t in result["t"].tolist()]
+            for name in aggregates:
+                setattr(series, name, result[name].tolist() if name == "count" else _floats(result[name]))
+    for series in by_oid.values():
+        for name in aggregates:
+            if getattr(series, name) is None:
+                setattr(series, name, [])
+    return MetricsOut(device_id=device_id, time_from=t_from, time_to=t_to, step=step, series=list(by_oid.values()))
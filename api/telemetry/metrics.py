@@ -0,0 +1,222 @@
+from __future__ import annotations
+import math
+import threading
+import time
+from bisect import bisect_left
+from itertools import chain
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+
+# Bornes (secondes) des histogrammes de latence, format Prometheus (le="…")
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _Shard:
+    """Valeurs écrites par un seul thread : aucune synchronisation sur le chemin chaud"""
+
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], list] = {}   # [compte par bucket…, +Inf], somme
+
+
+class MetricsRegistry:
+    """
+    Compteurs et histogrammes au format d'exposition Prometheus.
+    Chaque thread (boucle asyncio, threads du pool de handlers synchrones) écrit dans sa
+    propre partition ; le verrou n'est pris qu'à la création d'une partition et à la collecte,
+    qui additionne les partitions. Les jauges sont calculées à la collecte (collecteurs).
+    """
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._families: Dict[str, Tuple[str, str]] = {}      # nom -> (type, aide)
+        self._collectors: List[Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]] = []
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        self._families[name] = (kind, help_text)
+
+    def collector(self, fn: Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]):
+        """Enregistre une fonction renvoyant des échantillons (nom, labels, valeur) ; utilisable en décorateur"""
+        self._collectors.append(fn)
+        return fn
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name: str, labels: Labels = (), value: float = 1) -> None:
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        histograms = self._shard().histograms
+        key = (name, labels)
+        h = histograms.get(key)
+        if h is None:
+            h = histograms[key] = [0] * (len(self.buckets) + 2)
+        h[bisect_left(self.buckets, value)] += 1
+        h[-1] += value
+
+    def reset(self) -> None:
+        with self._lock:
+            for shard in self._shards:
+                shard.counters.clear()
+                shard.histograms.clear()
+
+    def _merged(self):
+        with self._lock:
+            shards = list(self._shards)
+        counters: Dict[Tuple[str, Labels], float] = {}
+        histograms: Dict[Tuple[str, Labels], list] = {}
+        for shard in shards:
+            # Copie atomique (GIL) : le thread propriétaire peut écrire pendant la collecte
+            for key, v in list(shard.counters.items()):
+                counters[key] = counters.get(key, 0) + v
+            for key, h in list(shard.histograms.items()):
+                h = list(h)
+                acc = histograms.get(key)
+                histograms[key] = h if acc is None else [a + b for a, b in zip(acc, h)]
+        return counters, histograms
+
+    def render(self, extra: Iterable[Tuple[str, Dict[str, str], float]] = ()) -> str:
+        """Texte d'exposition ; `extra` : échantillons supplémentaires calculés par l'appelant"""
+        counters, histograms = self._merged()
+        samples: Dict[str, List[str]] = {}
+        for (name, labels), v in counters.items():
+            samples.setdefault(name, []).append(f"{name}{_fmt(labels)} {_num(v)}")
+        for (name, labels), h in histograms.items():
+            lines = samples.setdefault(name, [])
+            cumulative = 0
+            for bound, c in zip(self.buckets + (math.inf,), h):
+                cumulative += c
+                lines.append(f"{name}_bucket{_fmt(labels + (('le', _num(bound)),))} {cumulative}")
+            lines.append(f"{name}_sum{_fmt(labels)} {_num(h[-1])}")
+            lines.append(f"{name}_count{_fmt(labels)} {cumulative}")
+        for name, labels, v in chain(extra, *(fn() for fn in self._collectors)):
+            samples.setdefault(name, []).append(f"{name}{_fmt(tuple(labels.items()))} {_num(v)}")
+
+        out = []
+        for name in sorted(samples):
+            if name in self._families:
+                kind, help_text = self._families[name]
+                out += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            out += samples[name]
+        return "\n".join(out) + "\n"
+
+
+def _fmt(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+metrics = MetricsRegistry()
+
+metrics.describe("http_requests_total", "counter", "HTTP requests by method, route template and status")
+metrics.describe("http_request_duration_seconds", "histogram", "HTTP request latency by method, route template and status")
+metrics.describe("db_pool_checkouts_total", "counter", "Connections checked out of the SQLAlchemy pool")
+metrics.describe("db_pool_checkout_seconds", "histogram", "Time spent obtaining a pooled connection (waits included)")
+metrics.describe("db_pool_timeouts_total", "counter", "Pool checkouts that timed out (pool exhausted)")
+metrics.describe("db_pool_connections_total", "counter", "New DBAPI connections opened by the pool")
+metrics.describe("db_pool_checked_out", "gauge", "Connections currently checked out")
+metrics.describe("db_pool_size", "gauge", "Configured pool size")
+metrics.describe("db_pool_overflow", "gauge", "Connections currently open beyond pool_size")
+
+
+class _TimedCheckout:
+    """
+    Mixin de pool (QueuePool, AsyncAdaptedQueuePool) : durée d'obtention d'une connexion,
+    attente comprise, et délais dépassés (pool épuisé). Aucun événement de pool ne précède
+    l'attente : elle se mesure dans _do_get, point d'extension des sous-classes de Pool.
+    """
+
+    metrics_labels: Labels = ()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            metrics.inc("db_pool_timeouts_total", self.metrics_labels)
+            raise
+        metrics.observe("db_pool_checkout_seconds", self.metrics_labels, time.perf_counter() - start)
+        return record
+
+    def recreate(self):
+        # engine.dispose() remplace le pool : les labels suivent (les écouteurs aussi, via dispatch)
+        pool = super().recreate()
+        pool.metrics_labels = self.metrics_labels
+        return pool
+
+
+_timed_classes: Dict[type, type] = {}
+
+
+def timed_pool(poolclass: type) -> type:
+    """Sous-classe instrumentée de poolclass, à passer en poolclass= à create_engine / create_async_engine"""
+    cls = _timed_classes.get(poolclass)
+    if cls is None:
+        cls = _timed_classes[poolclass] = type(f"Timed{poolclass.__name__}", (_TimedCheckout, poolclass), {})
+    return cls
+
+
+# Moteurs instrumentés par nom de pool : un seul collecteur pour tous (jauges lues à la collecte)
+_engines: Dict[str, Engine] = {}
+
+
+def _count(name: str, labels: Labels):
+    return lambda *args: metrics.inc(name, labels)
+
+
+def instrument_pool(engine: Engine, name: str) -> Engine:
+    """
+    Compte checkouts et nouvelles connexions (événements du pool) ; attente et délais dépassés
+    si le pool est un timed_pool ; jauges à la collecte. Idempotent pour un même nom.
+    """
+    if _engines.get(name) is engine:
+        return engine
+    labels = (("pool", name),)
+    pool = engine.pool
+    if isinstance(pool, _TimedCheckout):
+        pool.metrics_labels = labels
+    event.listen(pool, "checkout", _count("db_pool_checkouts_total", labels))
+    event.listen(pool, "connect", _count("db_pool_connections_total", labels))
+    _engines[name] = engine
+    return engine
+
+
+@metrics.collector
+def _pool_gauges():
+    for name, engine in list(_engines.items()):
+        pool = engine.pool   # pool courant (recréé par engine.dispose())
+        # Méthodes de QueuePool ; SingletonThreadPool / StaticPool (SQLite en mémoire) n'en ont pas
+        for metric, attr in (("db_pool_checked_out", "checkedout"), ("db_pool_size", "size"),
+                             ("db_pool_overflow", "overflow")):
+            fn = getattr(pool, attr, None)
+            if callable(fn):
+                # overflow() vaut -pool_size tant que le pool n'est pas rempli
+                yield metric, {"pool": name}, max(fn(), 0)
@@ -3,10 +3,21 @@ import time, uuid
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
 from .logging import log
+from .metrics import metrics
 
 def _rid() -> str:
     return uuid.uuid4().hex
 
+def _route(request: Request) -> str:
+    # Gabarit de la route (/api/v1/devices/{device_id}) et non le chemin : cardinalité bornée
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+def _record(request: Request, status: int, seconds: float) -> None:
+    labels = (("method", request.method), ("route", _route(request)), ("status", str(status)))
+    metrics.inc("http_requests_total", labels)
+    metrics.observe("http_request_duration_seconds", labels, seconds)
+
 class RequestContextMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         rid = request.headers.get("X-Request-ID") or _rid()
@@ -14,11 +25,13 @@ class RequestContextMiddleware(BaseHTTPMiddleware):
         logger = log.bind(req_id=rid, path=request.url.path, method=request.method)
         try:
             response = await call_next(request)
-            ms = round((time.perf_counter() - start) * 1000, 1)
-            logger.info("request.done", status=response.status_code, ms=ms)
+            elapsed = time.perf_counter() - start
+            _record(request, response.status_code, elapsed)
+            logger.info("request.done", status=response.status_code, ms=round(elapsed * 1000, 1))
             response.headers["X-Request-ID"] = rid
             return response
         except Exception as exc:
-            ms = round((time.perf_counter() - start) * 1000, 1)
-            logger.error("request.error", ms=ms, error=str(exc))
+            elapsed = time.perf_counter() - start
+            _record(request, 500, elapsed)
+            logger.error("request.error", ms=round(elapsed * 1000, 1), error=str(exc))
             raise
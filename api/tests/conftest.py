@@ -0,0 +1,48 @@
+import os
+
+# api.config exige ces variables à l'import (base SQLite en mémoire pour les tests)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("CORS_ORIGINS", "")
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+@pytest.fixture
+def client():
+    """Routes devices/profils/dashboard sur une base SQLite en mémoire ; client.queries = SQL exécuté, client.session_factory"""
+    from api.deps import get_db
+    from api.http_cache import device_cache, profile_cache
+    from api.models import Base
+    from api.routers.v1 import dashboard, devices, snmp_profiles
+    from api.services.dashboard_service import query_cache
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    queries = []
+    event.listen(engine, "before_cursor_execute", lambda *a: queries.append(a[2]))
+
+    def db():
+        s = factory()
+        try:
+            yield s
+        finally:
+            s.close()
+
+    app = FastAPI()
+    app.include_router(devices.router)
+    app.include_router(snmp_profiles.router)
+    app.include_router(dashboard.router)
+    app.dependency_overrides[get_db] = db
+    device_cache.invalidate()
+    profile_cache.invalidate()
+    query_cache.clear()
+    with TestClient(app) as c:
+        c.queries = queries
+        c.session_factory = factory
+        yield c
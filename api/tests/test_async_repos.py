@@ -0,0 +1,90 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from api.db.session import async_url, pool_options
+from api.models import Base
+from api.repositories.device_repo import AsyncDeviceRepository
+from api.repositories.snmp_profile_repo import AsyncSnmpProfileRepository
+from api.schemas.device import DeviceCreate, DeviceUpdate
+from api.schemas.snmp_profile import SnmpProfileCreate, SnmpProfileOut
+
+
+def test_async_url():
+    assert async_url("postgresql://u:p@db:5432/snmp") == "postgresql+asyncpg://u:p@db:5432/snmp"
+    assert async_url("postgresql+psycopg2://db/snmp") == "postgresql+asyncpg://db/snmp"
+    assert async_url("sqlite:///snmp.db") == "sqlite+aiosqlite:///snmp.db"
+    assert pool_options("sqlite://") == {}
+    assert pool_options("postgresql://db/snmp")["pool_size"] > 0
+
+
+async def _crud():
+    engine = create_async_engine("sqlite+aiosqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with factory() as db:
+        p = await AsyncSnmpProfileRepository.create(db, SnmpProfileCreate(name="core", version="v2c", community="public"))
+        out = SnmpProfileOut.model_validate(p.__dict__)
+        assert (out.name, out.community) == ("core", "public")
+
+        d = await AsyncDeviceRepository.create(db, DeviceCreate(name="r1", ip_address="10.0.0.1", snmp_profile_id=p.id, tags=["core"]))
+        await AsyncDeviceRepository.create(db, DeviceCreate(name="sw1", ip_address="10.0.0.2"))
+        try:
+            await AsyncDeviceRepository.create(db, DeviceCreate(name="dup", ip_address="10.0.0.1"))
+            raise AssertionError("IP dupliquée acceptée")
+        except ValueError:
+            pass
+        assert [x.name for x in await AsyncDeviceRepository.list(db, q="r1")] == ["r1"]
+        d = await AsyncDeviceRepository.update(db, d, DeviceUpdate(location="DC1"))
+        assert (await AsyncDeviceRepository.get(db, d.id)).location == "DC1"
+        await AsyncDeviceRepository.delete(db, d)
+        assert len(await AsyncDeviceRepository.list(db)) == 1
+        assert [x.id for x in await AsyncSnmpProfileRepository.list(db)] == [p.id]
+    await engine.dispose()
+
+
+def test_async_repositories_crud():
+    asyncio.run(_crud())
+
+
+def test_async_routes_share_sync_queries(tmp_path):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from api.deps import get_async_db
+    from api.http_cache import device_cache, profile_cache
+    from api.routers.v1 import devices_async, snmp_profiles_async
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}")
+    factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def db():
+        async with factory() as s:
+            yield s
+
+    app = FastAPI()
+    app.include_router(devices_async.router)
+    app.include_router(snmp_profiles_async.router)
+    app.dependency_overrides[get_async_db] = db
+    device_cache.invalidate()
+    profile_cache.invalidate()
+    with TestClient(app) as c:
+        c.portal.call(_create_all, engine)
+        profile = c.post("/api/v1/snmp-profiles/", json={"name": "core", "version": "v2c", "community": "public"})
+        assert profile.status_code == 200
+        for i in range(3):
+            payload = {"name": f"sw{i}", "ip_address": f"10.0.0.{i + 1}", "snmp_profile_id": profile.json()["id"]}
+            assert c.post("/api/v1/devices/", json=payload).status_code == 200
+        first = c.get("/api/v1/devices/", params={"limit": 2}).json()
+        assert [d["name"] for d in first["items"]] == ["sw2", "sw1"] and first["total"] == 3
+        rest = c.get("/api/v1/devices/", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+        assert [d["name"] for d in rest["items"]] == ["sw0"] and rest["next_cursor"] is None
+        assert c.get("/api/v1/devices/", params={"cursor": "!!"}).status_code == 400
+        assert [p["name"] for p in c.get("/api/v1/snmp-profiles/").json()] == ["core"]
+        c.portal.call(engine.dispose)
+
+
+async def _create_all(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from api.models.frames import CapturedFrame, FrameOid
+from api.repositories.frame_repo import FrameRepository
+from api.services.capture_service import CaptureService, archive_frames
+from snmp.frame_ring import FrameRing
+
+T0 = 1_700_000_000_000_000_000
+
+
+@pytest.fixture
+def ring(tmp_path):
+    r = FrameRing(str(tmp_path / "frames.ring"), slot_count=64, slot_size=512, writable=True)
+    for i in range(20):
+        r.append(
+            T0 + i * 1_000_000_000, f"10.0.0.{i % 4}", 161, "10.0.1.1", 40000, 2,
+            "trap" if i % 5 == 0 else "response", 100,
+            {"request_id": i, "varbinds": [{"oid": f"1.3.6.1.2.1.1.{i}.0", "type": "Integer", "value": i}]},
+        )
+    yield r
+    r.close()
+
+
+def test_search_pages_with_cursor(ring):
+    svc = CaptureService(ring)
+    page = asyncio.run(svc.search(limit=8))
+    assert [f.request_id for f in page.items] == list(range(19, 11, -1))
+    assert page.next_cursor is not None
+    page2 = asyncio.run(svc.search(limit=8, cursor=page.next_cursor))
+    assert [f.request_id for f in page2.items] == list(range(11, 3, -1))
+    page3 = asyncio.run(svc.search(limit=8, cursor=page2.next_cursor))
+    assert [f.request_id for f in page3.items] == [3, 2, 1, 0]
+    assert page3.next_cursor is None
+
+
+def test_search_filters(ring):
+    svc = CaptureService(ring)
+    page = asyncio.run(svc.search(pdu="trap", ip_src="10.0.0.0"))
+    assert [f.request_id for f in page.items] == [0]
+    page = asyncio.run(svc.search(pdu="trap"))
+    assert [f.request_id for f in page.items] == [15, 10, 5, 0]
+    page = asyncio.run(svc.search(oid_contains="1.1.7.", time_from=str((T0 + 5_000_000_000) / 1e9)))
+    assert [f.request_id for f in page.items] == [7]
+
+
+def test_get_and_errors(ring):
+    svc = CaptureService(ring)
+    first = asyncio.run(svc.search(limit=1)).items[0]
+    assert asyncio.run(svc.get(first.id)).request_id == 19
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(svc.get("0-1"))
+    assert exc.value.status_code == 404
+    with pytest.raises(HTTPException):
+        asyncio.run(svc.search(cursor="bogus"))
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    CapturedFrame.__table__.create(engine)
+    FrameOid.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def test_archive_is_incremental(ring, db):
+    assert archive_frames(db, ring, batch_size=15) == 15
+    assert archive_frames(db, ring, batch_size=15) == 5
+    assert archive_frames(db, ring) == 0
+    ring.append(T0 + 30_000_000_000, "10.0.0.9", 161, "10.0.1.1", 40000, 2, "response", 100,
+                {"request_id": 30, "varbinds": []})
+    assert archive_frames(db, ring) == 1
+
+
+def test_db_search_keyset(ring, db):
+    archive_frames(db, ring)
+    svc = CaptureService(None, db)
+    seen, cursor = [], None
+    while True:
+        page = asyncio.run(svc.search(limit=6, cursor=cursor))
+        seen += [f.request_id for f in page.items]
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == list(range(19, -1, -1))
+    page = asyncio.run(svc.search(pdu="response", ip_src="10.0.0.1", limit=2))
+    assert [f.request_id for f in page.items] == [17, 13]
+    page2 = asyncio.run(svc.search(pdu="response", ip_src="10.0.0.1", limit=2, cursor=page.next_cursor))
+    assert [f.request_id for f in page2.items] == [9, 1]
+    page = asyncio.run(svc.search(oid_contains="1.1.1"))
+    assert [f.request_id for f in page.items] == [19, 18, 17, 16, 15, 14, 13, 12, 11, 10, 1]
+    first = page.items[0]
+    assert asyncio.run(svc.get(first.id)).varbinds[0].oid == "1.3.6.1.2.1.1.19.0"
+
+
+def test_db_oid_search_follows_sort_index(db):
+    # oid_contains en EXISTS corrélé : parcours dans l'ordre (captured_at, id), sans tri ni liste d'ids
+    stmt = FrameRepository._filtered(
+        select(CapturedFrame).order_by(CapturedFrame.captured_at.desc(), CapturedFrame.id.desc()).limit(10),
+        oid_contains="1.1.1",
+    )
+    sql = str(stmt.compile(db.get_bind(), compile_kwargs={"literal_binds": True}))
+    plan = " | ".join(row[-1] for row in db.execute(text("EXPLAIN QUERY PLAN " + sql)))
+    assert "USING INDEX ix_frames_captured_at_id" in plan and "TEMP B-TREE" not in plan
+    assert "frame_oids USING COVERING INDEX" in plan
+
+
+def test_missing_ring_returns_empty_page():
+    page = asyncio.run(CaptureService(None).search())
+    assert page.items == [] and page.next_cursor is None
+
+
+def test_route_merges_ring_and_archive(ring, db, monkeypatch):
+    """Dépendance réelle (CaptureService.dep) : ring + base, trames archivées non dupliquées"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from api.deps import get_db
+    from api.repositories.frame_repo import FrameRepository
+    from api.routers.v1 import frames
+
+    archive_frames(db, ring, batch_size=15)
+    imported = {"id": "import0000000001-000000000000", "timestamp": "2023-11-14T22:13:30.500000Z",
+                "src": {"ip": "10.0.0.9", "port": 161}, "dst": {"ip": "10.0.1.1", "port": 40000},
+                "version": 2, "pdu_type": "response", "request_id": 100, "length": 80,
+                "varbinds": [{"oid": "1.3.6.1.2.1.1.3.0", "type": "TimeTicks", "value": 1}]}
+    FrameRepository.insert_many(db, [imported])
+    monkeypatch.setenv("FRAME_RING_PATH", ring.path)
+    app = FastAPI()
+    app.include_router(frames.router)
+    app.dependency_overrides[get_db] = lambda: db
+    seen, cursor = [], None
+    with TestClient(app) as client:
+        while True:
+            page = client.get("/frames", params={"limit": 7, **({"cursor": cursor} if cursor else {})}).json()
+            seen += [f["request_id"] for f in page["items"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+    assert seen == list(range(19, 10, -1)) + [100] + list(range(10, -1, -1))
@@ -0,0 +1,162 @@
+from datetime import datetime, timedelta, timezone
+
+from api.models.anomalies import Anomaly
+from api.models.metrics import Metric
+from api.services.dashboard_service import QueryCache
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+WINDOW = {"time_from": T0.isoformat(), "time_to": (T0 + timedelta(hours=3)).isoformat()}
+
+
+def _seed(client):
+    ids = [client.post("/api/v1/devices/", json={"name": f"sw{i}", "ip_address": f"10.0.0.{i}"}).json()["id"]
+           for i in (1, 2)]
+    db = client.session_factory()
+    alerts = [(ids[0], "critical", 5), (ids[0], "critical", 70), (ids[0], "minor", 75), (ids[1], "critical", 130)]
+    db.add_all([Anomaly(device_id=d, rule="cpu", severity=s, detected_at=T0 + timedelta(minutes=m))
+                for d, s, m in alerts])
+    db.add_all([Metric(device_id=ids[0], oid="1.3.6.1.2.1.1.3.0", value_num=float(m),
+                       polled_at=T0 + timedelta(minutes=m)) for m in range(0, 60, 5)])
+    db.commit()
+    db.close()
+    return ids
+
+
+def test_batch_queries_in_one_call(client):
+    ids = _seed(client)
+    queries = [
+        {"name": "alerts", "kind": "anomaly_counts", **WINDOW},
+        {"name": "top", "kind": "top_devices", "limit": 1, **WINDOW},
+        {"name": "uptime", "kind": "metric_series", "device_id": ids[0], "oid": ["1.3.6.1.2.1.1.3.0"],
+         "step": 1800, "agg": "max", **WINDOW},
+        {"name": "missing", "kind": "metric_series", "device_id": 999, "oid": ["1.3"], **WINDOW},
+    ]
+    resp = client.post("/api/v1/dashboard/query", json={"queries": queries})
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert list(results) == ["alerts", "top", "uptime", "missing"]
+    assert results["alerts"]["data"]["by_severity"] == {"critical": 3, "minor": 1}
+    hours = [(h["hour"][:13], h["severity"], h["count"]) for h in results["alerts"]["data"]["by_hour"]]
+    assert hours == [("2026-01-01T00", "critical", 1), ("2026-01-01T01", "critical", 1),
+                     ("2026-01-01T01", "minor", 1), ("2026-01-01T02", "critical", 1)]
+    assert [(d["name"], d["count"]) for d in results["top"]["data"]] == [("sw1", 3)]
+    assert results["uptime"]["data"]["series"][0]["max"] == [25.0, 55.0]
+    # Erreur isolée : les autres requêtes du lot sont servies
+    assert results["missing"]["error"] == "Device not found" and results["missing"]["data"] is None
+    assert results["missing"]["status"] == 404 and results["alerts"]["status"] == 200
+
+    # Deuxième appel : servi par le cache, sans requête SQL
+    client.queries.clear()
+    again = client.post("/api/v1/dashboard/query", json={"queries": queries[:3]}).json()["results"]
+    assert all(r["cached"] for r in again.values()) and client.queries == []
+    assert again["alerts"]["data"] == results["alerts"]["data"]
+
+
+def test_batch_isolates_database_errors(client, monkeypatch):
+    from sqlalchemy import text
+    from api.schemas.dashboard import DashboardRequest
+    from api.services import dashboard_service
+
+    def broken(db, q):
+        db.execute(text("SELECT missing_column FROM anomalies"))
+
+    ids = _seed(client)
+    monkeypatch.setitem(dashboard_service.RUNNERS, "anomaly_counts", broken)
+    queries = DashboardRequest(queries=[
+        {"name": "alerts", "kind": "anomaly_counts", **WINDOW},
+        {"name": "top", "kind": "top_devices", **WINDOW},
+    ]).queries
+    db = client.session_factory()
+    results = dashboard_service.run_batch(db, queries, QueryCache(ttl=0))
+    # Requête en échec annulée seule : la suivante s'exécute sur la même transaction
+    assert (results["alerts"].status, results["alerts"].error) == (500, "Database error")
+    assert results["top"].status == 200 and [d["device_id"] for d in results["top"].data] == ids
+    db.close()
+
+
+def test_batch_validation(client):
+    dup = [{"name": "a", "kind": "top_devices"}, {"name": "a", "kind": "anomaly_counts"}]
+    assert client.post("/api/v1/dashboard/query", json={"queries": dup}).status_code == 422
+    unknown = [{"name": "a", "kind": "bogus"}]
+    assert client.post("/api/v1/dashboard/query", json={"queries": unknown}).status_code == 422
+
+
+def test_query_cache_expires():
+    now = [0.0]
+    cache = QueryCache(ttl=5, clock=lambda: now[0])
+    cache.put("k", {"v": 1})
+    assert cache.get("k") == (True, {"v": 1})
+    now[0] = 5.0
+    assert cache.get("k") == (False, None)
+
+
+def test_alert_counters_follow_inserts_and_rebuild(client):
+    from sqlalchemy import delete, select
+    from api.models.alert_counters import AlertCountDevice, AlertCountHourly
+    from api.repositories.anomaly_repo import AlertCounterRepository
+
+    ids = _seed(client)
+    db = client.session_factory()
+    hourly = lambda: sorted((h.hour.hour, h.severity, h.count) for h in db.scalars(select(AlertCountHourly)))
+    assert hourly() == [(0, "critical", 1), (1, "critical", 1), (1, "minor", 1), (2, "critical", 1)]
+    # Suppression : décrément par trigger
+    db.execute(delete(Anomaly).where(Anomaly.severity == "minor"))
+    db.commit()
+    assert (1, "minor", 0) in hourly()
+    devices = {(c.device_id, c.severity): c.count for c in db.scalars(select(AlertCountDevice))}
+    assert devices[(ids[0], "critical")] == 2 and devices[(ids[1], "critical")] == 1
+
+    # Compteurs perdus (base antérieure) : reconstruits depuis les anomalies
+    db.execute(delete(AlertCountHourly))
+    db.commit()
+    assert AlertCounterRepository.rebuild(db) == (3, 2)
+    assert hourly() == [(0, "critical", 1), (1, "critical", 1), (2, "critical", 1)]
+    db.close()
+
+    top = client.post("/api/v1/dashboard/query", json={"queries": [
+        {"name": "top", "kind": "top_devices", "all_time": True},
+        {"name": "recent", "kind": "top_devices"},
+    ]}).json()["results"]
+    assert [(d["name"], d["count"]) for d in top["top"]["data"]] == [("sw1", 2), ("sw2", 1)]
+    # Sans fenêtre ni all_time : dernières 24 h (alertes de 2026 hors fenêtre)
+    assert top["recent"]["data"] == []
+
+
+def test_alert_counters_follow_updates(client):
+    from sqlalchemy import select, update
+    from api.models.alert_counters import AlertCountDevice, AlertCountHourly
+
+    ids = _seed(client)
+    db = client.session_factory()
+    hourly = lambda: sorted((h.hour.hour, h.severity, h.count) for h in db.scalars(select(AlertCountHourly))
+                            if h.count)
+    devices = lambda: {(c.device_id, c.severity): c.count for c in db.scalars(select(AlertCountDevice)) if c.count}
+    # Requalification, déplacement dans le temps et réaffectation : -1 sur l'ancienne ligne, +1 sur la nouvelle
+    db.execute(update(Anomaly).where(Anomaly.severity == "minor").values(severity="critical"))
+    db.execute(update(Anomaly).where(Anomaly.device_id == ids[1])
+               .values(detected_at=T0 + timedelta(minutes=10), device_id=ids[0]))
+    db.commit()
+    assert hourly() == [(0, "critical", 2), (1, "critical", 2)]
+    assert devices() == {(ids[0], "critical"): 4}
+    db.close()
+
+
+def test_legacy_anomalies_gain_severity_before_rebuild(client):
+    """Base antérieure à anomalies.severity : colonne ajoutée (défaut 'warning'), puis compteurs recalculés"""
+    from sqlalchemy import select, text
+    from api.models.alert_counters import AlertCountHourly
+    from api.repositories.anomaly_repo import AlertCounterRepository, AnomalyRepository
+
+    db = client.session_factory()
+    db.execute(text("DROP TABLE anomalies"))
+    db.execute(text("CREATE TABLE anomalies (id INTEGER PRIMARY KEY, device_id INTEGER, rule VARCHAR(128) NOT NULL,"
+                    " details JSON, detected_at DATETIME NOT NULL, acked BOOLEAN NOT NULL DEFAULT 0)"))
+    db.execute(text("INSERT INTO anomalies (rule, detected_at) VALUES ('r', '2026-01-01 00:10:00.000000')"))
+    db.commit()
+
+    assert AnomalyRepository.add_severity_column(db) is True
+    assert AnomalyRepository.add_severity_column(db) is False
+    assert db.execute(select(Anomaly.severity)).scalar_one() == "warning"
+    AlertCounterRepository.rebuild(db)
+    assert [(h.severity, h.count) for h in db.scalars(select(AlertCountHourly))] == [("warning", 1)]
+    db.close()
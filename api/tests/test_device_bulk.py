@@ -0,0 +1,67 @@
+import json
+
+
+def test_bulk_json_upsert(client):
+    profile = client.post("/api/v1/snmp-profiles/", json={"name": "core", "version": "v2c"}).json()
+    client.post("/api/v1/devices/", json={"name": "core-rtr", "ip_address": "10.0.0.1", "location": "DC1"})
+    # Sortie de SNMPSender.discovery_scan : liste d'IP
+    resp = client.post(f"/api/v1/devices/bulk?snmp_profile_id={profile['id']}",
+                       json=["10.0.0.1", "10.0.0.2", "10.0.0.3", "not-an-ip", "10.0.0.2"])
+    body = resp.json()
+    assert (body["created"], body["updated"], body["skipped"], body["errors"]) == (2, 1, 1, 1)
+    statuses = [(r["row"], r["status"]) for r in body["results"]]
+    assert statuses == [(1, "updated"), (2, "skipped"), (3, "created"), (4, "error"), (5, "created")]
+    # Une simple IP ne renomme pas l'équipement existant
+    existing = client.get(f"/api/v1/devices/{body['results'][0]['id']}").json()
+    assert (existing["name"], existing["location"]) == ("core-rtr", "DC1")
+    new = client.get(f"/api/v1/devices/{body['results'][2]['id']}").json()
+    assert (new["name"], new["snmp_profile_id"]) == ("10.0.0.3", profile["id"])
+
+
+def test_bulk_csv_and_ndjson(client):
+    csv_body = "name,ip_address,tags,enabled\nsw1,10.1.0.1,access;floor2,true\nsw2,10.1.0.2,,no\n"
+    resp = client.post("/api/v1/devices/bulk", content=csv_body, headers={"Content-Type": "text/csv"}).json()
+    assert resp["created"] == 2
+    sw1 = client.get(f"/api/v1/devices/{resp['results'][0]['id']}").json()
+    assert sw1["tags"] == ["access", "floor2"] and sw1["enabled"] is True
+
+    lines = [json.dumps({"ip": "10.1.0.2", "name": "sw2-renamed"}), "{broken", json.dumps({"name": "x"})]
+    resp = client.post("/api/v1/devices/bulk?format=ndjson", content="\n".join(lines)).json()
+    assert (resp["updated"], resp["errors"]) == (1, 2)
+    assert resp["results"][2]["error"].startswith("ip_address")
+    sw2 = client.get(f"/api/v1/devices/{resp['results'][0]['id']}").json()
+    assert (sw2["name"], sw2["enabled"]) == ("sw2-renamed", False)
+
+
+def test_bulk_unknown_profile(client):
+    assert client.post("/api/v1/devices/bulk?snmp_profile_id=99", json=["10.0.0.1"]).status_code == 400
+    resp = client.post("/api/v1/devices/bulk", json=[{"ip_address": "10.0.0.9", "snmp_profile_id": 42}]).json()
+    assert resp["results"][0]["error"] == "snmp_profile_id does not exist"
+
+
+def test_dedupe_legacy_devices_then_bulk(client):
+    """Base antérieure à la contrainte unique : doublons fusionnés, puis ON CONFLICT (ip_address) utilisable"""
+    from datetime import datetime
+    from sqlalchemy import select, text
+    from sqlalchemy.schema import CreateTable
+    from api.models.anomalies import Anomaly
+    from api.models.devices import Device
+    from api.repositories.device_repo import DeviceRepository
+
+    db = client.session_factory()
+    ddl = str(CreateTable(Device.__table__).compile(db.get_bind())).replace("UNIQUE (ip_address), ", "")
+    db.execute(text("DROP TABLE devices"))
+    db.execute(text(ddl))
+    db.add_all([Device(name=n, ip_address=ip) for n, ip in (("a", "10.0.0.1"), ("b", "10.0.0.1"), ("c", "10.0.0.2"))])
+    db.flush()
+    db.add(Anomaly(device_id=2, rule="r", severity="major", detected_at=datetime(2024, 1, 1)))
+    db.commit()
+
+    assert DeviceRepository.deduplicate_ip(db) == 1
+    assert DeviceRepository.deduplicate_ip(db) == 0
+    assert list(db.execute(select(Device.id, Device.name).order_by(Device.id))) == [(1, "a"), (3, "c")]
+    assert db.execute(select(Anomaly.device_id)).scalar_one() == 1
+    db.close()
+
+    body = client.post("/api/v1/devices/bulk", json=[{"ip_address": "10.0.0.1", "name": "a2"}]).json()
+    assert (body["updated"], body["results"][0]["id"]) == (1, 1)
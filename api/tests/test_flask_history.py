@@ -0,0 +1,100 @@
+import pytest
+
+pytest.importorskip("flask")
+
+from api import main as flask_app
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    pool = flask_app.ConnectionPool(str(tmp_path / "snmp.db"))
+    monkeypatch.setattr(flask_app, "db_pool", pool)
+    flask_app.init_db()
+    conn = pool.connection()
+    # Même horodatage sur les trois tables : départage par type puis id
+    conn.executemany("INSERT INTO snmp_metrics (ts, source_ip, oid, value_raw, latency_ms) VALUES (?, ?, ?, ?, ?)", [
+        ("2026-01-01 10:00:00", "10.0.0.1", "1.3.6.1.2.1.1.3.0", "100", 12),
+        ("2026-01-01 10:02:00", "10.0.0.2", "1.3.6.1.2.1.2.2.1.10.1", "5", None),
+        ("2026-01-01 10:04:00", "10.0.0.1", "1.3.6.1.2.1.1.3.0", "200", 8),
+    ])
+    conn.executemany("INSERT INTO snmp_traps (ts, source_ip, enterprise_oid, severity, varbinds) VALUES (?, ?, ?, ?, ?)", [
+        ("2026-01-01 10:01:00", "10.0.0.1", "1.3.6.1.6.3.1.1.5.3", "critical", "ifIndex:1"),
+        ("2026-01-01 10:04:00", "10.0.0.2", "1.3.6.1.6.3.1.1.5.4", None, "ifIndex:2"),
+    ])
+    conn.executemany("INSERT INTO snmp_anomalies (ts, source_ip, description, severity, type) VALUES (?, ?, ?, ?, ?)", [
+        ("2026-01-01 10:03:00", "10.0.0.1", "flood", "major", "rate"),
+        ("2026-01-01 10:04:00", "10.0.0.1", "community", None, "auth"),
+    ])
+    conn.commit()
+    yield flask_app.app.test_client()
+    pool.close_all()
+
+
+def _pages(client, **params):
+    pages, cursor = [], None
+    while True:
+        resp = client.get("/api/history", query_string={**params, **({"cursor": cursor} if cursor else {})})
+        assert resp.status_code == 200
+        pages.append([h["id"] for h in resp.get_json()])
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+
+def test_history_merges_sources_chronologically(client):
+    history = client.get("/api/history").get_json()
+    assert [h["id"] for h in history] == [
+        "anomaly-2", "trap-2", "metric-3", "anomaly-1", "metric-2", "trap-1", "metric-1",
+    ]
+    assert history[1] == {"id": "trap-2", "date": "2026-01-01 10:04:00", "type": "TRAP",
+                          "oid": "1.3.6.1.6.3.1.1.5.4", "cible": "10.0.0.2", "valeur": "ifIndex:2", "statut": "info"}
+    assert history[-1]["statut"] == "12 ms"
+
+
+def test_history_keyset_pages(client):
+    # Pages disjointes et complètes, y compris à égalité d'horodatage
+    assert _pages(client, limit=2) == [
+        ["anomaly-2", "trap-2"], ["metric-3", "anomaly-1"], ["metric-2", "trap-1"], ["metric-1"],
+    ]
+
+
+def test_history_filters(client):
+    assert _pages(client, type="metric,trap", target="10.0.0.1") == [["metric-3", "trap-1", "metric-1"]]
+    # Filtre OID : les anomalies (sans OID) sont exclues
+    assert _pages(client, oid="1.3.6.1.2.1.1.") == [["metric-3", "metric-1"]]
+    assert _pages(client, oid="1.3.6.1.6.3.1.1.5.3") == [["trap-1"]]
+    assert client.get("/api/history?type=bogus").status_code == 400
+    assert client.get("/api/history?cursor=!!").status_code == 400
+    assert client.get("/api/history?limit=0").status_code == 400
+
+
+def test_history_oid_subtree(client):
+    conn = flask_app.db_pool.connection()
+    conn.executemany("INSERT INTO snmp_metrics (ts, source_ip, oid, value_raw) VALUES (?, ?, ?, ?)", [
+        ("2026-01-01 10:05:00", "10.0.0.1", "1.3.6.1.2.1.25.3.3.1.2.1", "12"),
+        ("2026-01-01 10:06:00", "10.0.0.1", "1.3.6.1.2.1.2.2.1.16.1", "7"),
+    ])
+    conn.commit()
+    # Frontières d'arc : 1.3.6.1.2.1.2 n'inclut pas 1.3.6.1.2.1.25…
+    assert _pages(client, oid="1.3.6.1.2.1.2", limit=1) == [["metric-5"], ["metric-2"]]
+    assert _pages(client, oid="1.3.6.1.2.1.25") == [["metric-4"]]
+    # Sous-arbre large (au-delà de HISTORY_MAX_OIDS) : même résultat par le parcours (ts, id)
+    flask_app.HISTORY_MAX_OIDS, saved = 1, flask_app.HISTORY_MAX_OIDS
+    try:
+        assert _pages(client, oid="1.3.6.1.2.1", limit=2) == [["metric-5", "metric-4"], ["metric-3", "metric-2"],
+                                                               ["metric-1"]]
+    finally:
+        flask_app.HISTORY_MAX_OIDS = saved
+    # Types répétés : pas de doublons
+    assert _pages(client, type="trap,TRAP") == [["trap-2", "trap-1"]]
+
+
+def test_history_oid_scan_needs_no_sort(client):
+    # Parcours par OID exact : l'index (oid, ts, id) sert l'ORDER BY (ni scan ni tri du sous-arbre)
+    conn = flask_app.db_pool.connection()
+    for kind in ("METRIC", "TRAP"):
+        _, table, oid_col, _ = flask_app.HISTORY_SOURCES[kind]
+        plan = " ".join(row[3] for row in conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT id FROM {table} WHERE (ts, id) < (?, ?) AND {oid_col} = ? "
+            "ORDER BY ts DESC, id DESC LIMIT 51", ("2026-01-01 10:04:00", 9, "1.3.6.1.2.1.1.3.0")))
+        assert f"INDEX ix_{table}_{oid_col}_ts_id" in plan and "TEMP B-TREE" not in plan, plan
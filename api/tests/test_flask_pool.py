@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+pytest.importorskip("flask")
+
+from api import main as flask_app
+
+
+@pytest.fixture
+def device_calls(monkeypatch):
+    """Équipement simulé : GET renvoie le nombre d'appels reçus"""
+    calls = []
+
+    def fetch(target, community, oid):
+        calls.append((target, community, oid))
+        return {"success": True, "values": {oid: len(calls)}}
+
+    monkeypatch.setattr(flask_app, "snmp_gets", flask_app.RequestCoalescer(fetch, ttl=60))
+    return calls
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch, device_calls):
+    p = flask_app.ConnectionPool(str(tmp_path / "snmp.db"))
+    monkeypatch.setattr(flask_app, "db_pool", p)
+    flask_app.init_db()
+    yield p
+    p.close_all()
+
+
+def test_connection_per_thread_with_pragmas(pool):
+    conn = pool.connection()
+    assert pool.connection() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1          # NORMAL
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    other = []
+    t = threading.Thread(target=lambda: other.append(pool.connection()))
+    t.start()
+    t.join()
+    assert other[0] is not conn
+
+
+def test_requests_reuse_connection(pool):
+    client = flask_app.app.test_client()
+    payload = {"type": "GET", "community": "public", "target": "10.0.0.1", "oid": "1.3.6.1.2.1.1.3.0"}
+    assert client.post("/api/snmp", json=payload).status_code == 200
+    conn = pool.connection()
+    assert client.post("/api/snmp", json=payload).status_code == 200
+    assert pool.connection() is conn
+    history = client.get("/api/history").get_json()
+    assert [h["cible"] for h in history] == ["10.0.0.1"]
+
+
+def test_snmp_get_served_from_cache(pool, device_calls):
+    client = flask_app.app.test_client()
+    payload = {"type": "GET", "community": "public", "target": "10.0.0.1", "oid": "1.3.6.1.2.1.1.3.0"}
+    first = client.post("/api/snmp", json=payload).get_json()
+    second = client.post("/api/snmp", json=payload).get_json()
+    assert (first["response"]["source"], second["response"]["source"]) == ("device", "cache")
+    assert first["response"]["value"] == second["response"]["value"] == "1"
+    assert len(device_calls) == 1
+    # Seul l'appel à l'équipement est une nouvelle mesure
+    rows = pool.connection().execute("SELECT value_num FROM snmp_metrics").fetchall()
+    assert [r[0] for r in rows] == [1.0]
+    other = client.post("/api/snmp", json={**payload, "community": "private"}).get_json()
+    assert other["response"]["source"] == "device"
+
+
+def test_release_rolls_back_open_transaction(pool):
+    conn = pool.connection()
+    conn.execute("INSERT INTO snmp_metrics (source_ip, oid) VALUES ('10.0.0.9', '1.3')")
+    pool.release()
+    assert not conn.in_transaction
+    assert conn.execute("SELECT COUNT(*) FROM snmp_metrics").fetchone()[0] == 0
@@ -0,0 +1,93 @@
+def test_list_etag_and_304(client):
+    client.post("/api/v1/devices/", json={"name": "r1", "ip_address": "10.0.0.1"})
+    first = client.get("/api/v1/devices/")
+    assert first.status_code == 200 and first.json()["items"][0]["name"] == "r1"
+    etag = first.headers["etag"]
+
+    client.queries.clear()
+    again = client.get("/api/v1/devices/", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["etag"] == etag
+    # Poll inchangé : aucune requête SQL
+    assert client.queries == []
+    assert client.get("/api/v1/devices/").content == first.content
+    assert client.queries == []
+
+
+def test_write_invalidates(client):
+    created = client.post("/api/v1/devices/", json={"name": "r1", "ip_address": "10.0.0.1"}).json()
+    etag = client.get(f"/api/v1/devices/{created['id']}").headers["etag"]
+    client.patch(f"/api/v1/devices/{created['id']}", json={"location": "DC2"})
+    resp = client.get(f"/api/v1/devices/{created['id']}", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and resp.json()["location"] == "DC2"
+    assert resp.headers["etag"] != etag
+    client.delete(f"/api/v1/devices/{created['id']}")
+    assert client.get(f"/api/v1/devices/{created['id']}").status_code == 404
+
+
+def test_write_from_other_instance_visible_after_ttl(client, monkeypatch):
+    """Écriture faite par une autre instance (pas d'invalidate() ici) : visible après ttl secondes"""
+    from api.http_cache import device_cache
+    from api.models.devices import Device
+
+    now = [1000.0]
+    monkeypatch.setattr(device_cache, "clock", lambda: now[0])
+    device_id = client.post("/api/v1/devices/", json={"name": "r1", "ip_address": "10.0.0.1"}).json()["id"]
+    etag = client.get(f"/api/v1/devices/{device_id}").headers["etag"]
+
+    db = client.session_factory()
+    db.get(Device, device_id).location = "DC3"
+    db.commit()
+    db.close()
+    assert client.get(f"/api/v1/devices/{device_id}", headers={"If-None-Match": etag}).status_code == 304
+    now[0] += device_cache.ttl
+    resp = client.get(f"/api/v1/devices/{device_id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and resp.json()["location"] == "DC3"
+    assert resp.headers["etag"] != etag
+
+
+def test_unchanged_entry_revalidated_by_table_version(client, monkeypatch):
+    """Après ttl sans écriture : une lecture de cache_versions, l'entrée est reconduite (304, pas de relecture)"""
+    from api.http_cache import device_cache
+
+    now = [1000.0]
+    monkeypatch.setattr(device_cache, "clock", lambda: now[0])
+    client.post("/api/v1/devices/", json={"name": "r1", "ip_address": "10.0.0.1"})
+    etag = client.get("/api/v1/devices/").headers["etag"]
+    now[0] += device_cache.ttl
+    client.queries.clear()
+    assert client.get("/api/v1/devices/", headers={"If-None-Match": etag}).status_code == 304
+    assert len(client.queries) == 1 and "cache_versions" in client.queries[0]
+    # Reconduite pour un nouveau ttl : plus aucune requête
+    client.queries.clear()
+    assert client.get("/api/v1/devices/", headers={"If-None-Match": etag}).status_code == 304
+    assert client.queries == []
+
+
+def test_profiles_cached_per_query(client):
+    client.post("/api/v1/snmp-profiles/", json={"name": "core", "version": "v2c", "community": "public"})
+    a = client.get("/api/v1/snmp-profiles/?limit=10")
+    b = client.get("/api/v1/snmp-profiles/?limit=1")
+    assert a.json() == b.json()
+    assert client.get("/api/v1/snmp-profiles/?limit=10", headers={"If-None-Match": f'W/{a.headers["etag"]}'}).status_code == 304
+    client.post("/api/v1/snmp-profiles/", json={"name": "edge", "version": "v2c"})
+    assert len(client.get("/api/v1/snmp-profiles/?limit=10").json()) == 2
+
+
+def test_device_keyset_pages(client):
+    for i in range(25):
+        client.post("/api/v1/devices/", json={"name": f"sw-{i:02d}", "ip_address": f"10.0.{i // 10}.{i}"})
+    page = client.get("/api/v1/devices/?limit=10").json()
+    assert page["total"] == 25 and not page["total_is_estimate"]
+    names = [d["name"] for d in page["items"]]
+    while page["next_cursor"]:
+        page = client.get(f"/api/v1/devices/?limit=10&cursor={page['next_cursor']}").json()
+        assert page["total"] is None
+        names += [d["name"] for d in page["items"]]
+    assert names == [f"sw-{i:02d}" for i in range(24, -1, -1)]
+
+    found = client.get("/api/v1/devices/?q=10.0.2.").json()
+    assert sorted(d["name"] for d in found["items"]) == ["sw-20", "sw-21", "sw-22", "sw-23", "sw-24"]
+    assert client.get("/api/v1/devices/?q=W-1").json()["total"] == 10
+    assert client.get("/api/v1/devices/?q=%25").json()["total"] == 0
+    assert client.get("/api/v1/devices/?cursor=bogus").status_code == 400
@@ -0,0 +1,164 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from api.models.frames import CapturedFrame, FrameOid
+from api.models.import_jobs import ImportJob
+from api.services.capture_service import archive_frames
+from api.services.import_export_service import ImportExportService, parse_filter
+from snmp.config import get_export_config
+from snmp.export_stream import ExportSizeExceeded, export_stream
+from snmp.frame_ring import FrameRing
+
+T0 = 1_700_000_000_000_000_000
+
+
+@pytest.fixture
+def factory(tmp_path):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    CapturedFrame.__table__.create(engine)
+    FrameOid.__table__.create(engine)
+    ImportJob.__table__.create(engine)
+    factory = sessionmaker(bind=engine)
+    ring = FrameRing(str(tmp_path / "frames.ring"), slot_count=4096, slot_size=512, writable=True)
+    for i in range(2500):
+        ring.append(T0 + i * 1_000_000, f"10.0.0.{i % 3}", 161, "10.0.1.1", 40000, 2,
+                    "trap" if i % 10 == 0 else "response", 100,
+                    {"request_id": i, "varbinds": [{"oid": f"1.3.6.1.2.1.1.{i % 7}.0", "type": "Integer", "value": i}]})
+    db = factory()
+    while archive_frames(db, ring, batch_size=1000):
+        pass
+    db.close()
+    ring.close()
+    return factory
+
+
+@pytest.fixture
+def plain_export(monkeypatch):
+    monkeypatch.setattr(get_export_config(), "compress_exports", False)
+
+
+async def _collect(resp):
+    return b"".join([chunk async for chunk in resp.body_iterator])
+
+
+def test_ndjson_export_all_frames(factory, plain_export):
+    resp = asyncio.run(ImportExportService(factory).export_stream(fmt="ndjson"))
+    lines = asyncio.run(_collect(resp)).decode().splitlines()
+    assert len(lines) == 2500
+    assert json.loads(lines[0])["request_id"] == 2499
+    assert json.loads(lines[-1])["request_id"] == 0
+    assert resp.media_type == "application/x-ndjson"
+
+
+def test_csv_export_with_filter(factory, plain_export):
+    resp = asyncio.run(ImportExportService(factory).export_stream(fmt="csv", filter="pdu=trap&ip_src=10.0.0.0"))
+    rows = list(csv.DictReader(io.StringIO(asyncio.run(_collect(resp)).decode())))
+    assert [int(r["request_id"]) for r in rows[:3]] == [2490, 2460, 2430]
+    assert all(r["pdu_type"] == "trap" and r["src_ip"] == "10.0.0.0" for r in rows)
+    assert json.loads(rows[0]["varbinds"])[0]["value"] == 2490
+
+
+def test_gzip_json_export(factory, monkeypatch):
+    monkeypatch.setattr(get_export_config(), "compress_exports", True)
+    resp = asyncio.run(ImportExportService(factory).export_stream(fmt="json", filter="oid_contains=1.1.3."))
+    frames = json.loads(gzip.decompress(asyncio.run(_collect(resp))))
+    assert len(frames) == len([i for i in range(2500) if i % 7 == 3])
+    assert resp.headers["content-disposition"].endswith('.json.gz"')
+
+
+def test_export_over_limit_is_rejected_before_streaming(factory, plain_export, monkeypatch):
+    monkeypatch.setattr(get_export_config(), "max_export_size", 60_000)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(ImportExportService(factory).export_stream(fmt="ndjson"))
+    assert exc.value.status_code == 413
+    resp = asyncio.run(ImportExportService(factory).export_stream(fmt="ndjson", filter="ip_src=10.0.0.0&pdu=trap"))
+    assert "content-length" not in resp.headers
+    assert len(asyncio.run(_collect(resp))) < 60_000
+
+
+def test_export_stream_is_cut_past_limit(factory, plain_export, monkeypatch):
+    # Estimation trop basse : le flux est interrompu au plafond, pas livré tronqué
+    monkeypatch.setattr(get_export_config(), "max_export_size", 60_000)
+    monkeypatch.setattr(ImportExportService, "estimate_size", lambda *a: 0)
+    resp = asyncio.run(ImportExportService(factory).export_stream(fmt="ndjson"))
+    with pytest.raises(ExportSizeExceeded):
+        asyncio.run(_collect(resp))
+
+
+def test_export_size_estimate(factory):
+    svc = ImportExportService(factory)
+    exact = len(b"".join(export_stream(svc.iter_frames({}), "ndjson")))
+    estimate = svc.estimate_size({}, "ndjson", False, 10 * exact)
+    assert 0.9 * exact < estimate < 1.1 * exact
+    # Comptage arrêté dès que le plafond est franchi
+    assert svc.estimate_size({}, "ndjson", False, exact // 10) < exact
+
+
+def test_invalid_filter():
+    with pytest.raises(HTTPException):
+        parse_filter("bogus=1")
+    assert parse_filter("version=2&pdu=get") == {"version": 2, "pdu": "get"}
+
+
+def _import(factory, data: bytes, mode: str):
+    svc = ImportExportService(factory)
+    count = asyncio.run(svc.import_file(UploadFile(file=io.BytesIO(data), filename=f"frames.{mode}"), mode))
+    return count, svc.get_job(svc.job_id)
+
+
+def test_ndjson_export_reimport(factory, plain_export):
+    resp = asyncio.run(ImportExportService(factory).export_stream(fmt="ndjson", filter="pdu=trap"))
+    data = asyncio.run(_collect(resp)) + b"not json\n"
+    count, job = _import(factory, data, "ndjson")
+    assert count == 250
+    assert (job.status, job.frames_imported, job.frames_rejected) == ("done", 250, 1)
+    assert job.bytes_done == job.bytes_total == len(data)
+    db = factory()
+    assert db.query(CapturedFrame).filter(CapturedFrame.id.startswith(f"import{job.id:010d}-")).count() == 250
+    db.close()
+
+
+def test_json_array_import(factory):
+    frame = {
+        "id": "x", "timestamp": "2024-01-01T00:00:00Z", "src": {"ip": "10.0.0.9", "port": 161},
+        "dst": {"ip": "10.0.1.1", "port": 40000}, "version": 2, "pdu_type": "response", "request_id": 3,
+        "varbinds": [{"oid": "1.3.6.1.2.1.1.3.0", "type": "TimeTicks", "value": 5}], "length": 80,
+    }
+    count, job = _import(factory, json.dumps([frame, {"id": "bad"}, frame]).encode(), "json")
+    assert count == 2 and job.frames_rejected == 1
+
+
+def test_invalid_pcap_import(factory):
+    with pytest.raises(HTTPException):
+        _import(factory, b"garbage" * 10, "pcap")
+    db = factory()
+    job = db.query(ImportJob).one()
+    assert job.status == "error" and "pcap" in job.error
+    db.close()
+
+
+def test_import_route_returns_job_immediately(factory, plain_export):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from api.routers.v1 import frames
+
+    app = FastAPI()
+    app.include_router(frames.router)
+    app.dependency_overrides[ImportExportService.dep] = lambda: ImportExportService(factory)
+    data = asyncio.run(_collect(asyncio.run(ImportExportService(factory).export_stream(fmt="ndjson", filter="pdu=trap"))))
+    with TestClient(app) as client:
+        r = client.post("/frames/import?mode=ndjson", files={"file": ("frames.ndjson", data)})
+        assert r.status_code == 202
+        assert r.json() == {"job_id": r.json()["job_id"], "status": "pending"}
+        # TestClient exécute les tâches de fond avant de rendre la main
+        job = client.get(f"/frames/import/{r.json()['job_id']}").json()
+    assert (job["status"], job["frames_imported"]) == ("done", 250)
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from api.models.metrics import Metric
+from api.services.metrics_service import aggregate
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+IF_IN = "1.3.6.1.2.1.2.2.1.10.1"
+CPU = "1.3.6.1.4.1.9.2.1.57.0"
+
+
+def _device(client):
+    return client.post("/api/v1/devices/", json={"name": "rtr", "ip_address": "10.0.0.1"}).json()["id"]
+
+
+def _insert(client, device_id, oid, points):
+    db = client.session_factory()
+    db.add_all([Metric(device_id=device_id, oid=oid, value_num=v, polled_at=T0 + timedelta(seconds=s))
+                for s, v in points])
+    db.commit()
+    db.close()
+
+
+def test_aggregate_buckets_and_rate():
+    ts = np.array([0, 10, 70, 80, 130], dtype=float)
+    values = np.array([100, 200, 300, 900, 50], dtype=float)
+    r = aggregate(ts, values, 0, 60)
+    assert r["t"].tolist() == [0, 60, 120]
+    assert r["avg"].tolist() == [150, 600, 50]
+    assert (r["min"].tolist(), r["max"].tolist(), r["last"].tolist()) == ([100, 300, 50], [200, 900, 50], [200, 900, 50])
+    assert r["count"].tolist() == [2, 2, 1]
+    # 200→900 en 70 s ; 900→50 : compteur réinitialisé
+    assert r["rate"][0] == 10 and r["rate"][1] == 10 and np.isnan(r["rate"][2])
+
+
+def test_device_metrics_endpoint(client):
+    device_id = _device(client)
+    _insert(client, device_id, IF_IN, [(s, s * 2.0) for s in range(0, 600, 10)])
+    _insert(client, device_id, CPU, [(0, 5.0), (300, 15.0)])
+    resp = client.get(f"/api/v1/devices/{device_id}/metrics", params={
+        "oid": [f"{IF_IN},{CPU}", "1.3.6.1.9.9"], "time_from": T0.isoformat(),
+        "time_to": (T0 + timedelta(minutes=10)).isoformat(), "step": 60, "agg": "avg,rate,count",
+    })
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["step"] == 60
+    series = {s["oid"]: s for s in body["series"]}
+    assert len(series[IF_IN]["t"]) == 10 and series[IF_IN]["count"] == [6] * 10
+    assert series[IF_IN]["rate"] == [2.0] * 10 and series[IF_IN]["avg"][0] == 50.0
+    assert series[IF_IN]["min"] is None
+    assert series[CPU]["avg"] == [5.0, 15.0]
+    # OID sans données : série vide
+    assert series["1.3.6.1.9.9"]["t"] == [] and series["1.3.6.1.9.9"]["avg"] == []
+
+
+def test_device_metrics_buckets_match_raw_aggregation(client):
+    # Pas calculés par la base : dates fractionnaires et limites de pas exactes
+    device_id = _device(client)
+    points = [(s + frac, float(s * s % 97)) for s in range(0, 600, 7) for frac in (0.0, 0.25)] + [(59.5, 1.0), (60, 2.0)]
+    points.sort()
+    _insert(client, device_id, IF_IN, points)
+    body = client.get(f"/api/v1/devices/{device_id}/metrics", params={
+        "oid": IF_IN, "time_from": T0.isoformat(), "time_to": (T0 + timedelta(minutes=10)).isoformat(),
+        "step": 60, "agg": "avg,min,max,last,rate,count",
+    }).json()
+    ts = np.array([T0.timestamp() + s for s, _ in points])
+    expected = aggregate(ts, np.array([v for _, v in points]), T0.timestamp(), 60)
+    series = body["series"][0]
+    assert series["count"] == expected["count"].tolist()
+    for name in ("avg", "min", "max", "last", "rate"):
+        got = np.array([np.nan if v is None else v for v in series[name]])
+        assert np.allclose(got, expected[name], equal_nan=True)
+
+
+def test_device_metrics_max_points_and_errors(client):
+    device_id = _device(client)
+    _insert(client, device_id, IF_IN, [(s, 1.0) for s in range(0, 3600, 10)])
+    params = {"oid": IF_IN, "time_from": T0.isoformat(), "time_to": (T0 + timedelta(hours=1)).isoformat()}
+    body = client.get(f"/api/v1/devices/{device_id}/metrics", params={**params, "step": 10, "max_points": 12}).json()
+    assert body["step"] == 300 and len(body["series"][0]["t"]) == 12
+    # Fenêtre non alignée : le premier pas aligné déborde avant time_from, le pas est élargi
+    shifted = {**params, "time_from": (T0 + timedelta(seconds=7)).isoformat(),
+               "time_to": (T0 + timedelta(seconds=3607)).isoformat(), "max_points": 12}
+    body = client.get(f"/api/v1/devices/{device_id}/metrics", params=shifted).json()
+    assert body["step"] == 328 and len(body["series"][0]["t"]) <= 12
+    one = client.get(f"/api/v1/devices/{device_id}/metrics", params={**shifted, "max_points": 1, "agg": "count"}).json()
+    assert len(one["series"][0]["t"]) == 1 and one["series"][0]["count"] == [359]
+    assert client.get(f"/api/v1/devices/{device_id}/metrics", params={**params, "agg": "p99"}).status_code == 400
+    assert client.get("/api/v1/devices/999/metrics", params=params).status_code == 404
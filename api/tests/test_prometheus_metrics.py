@@ -0,0 +1,127 @@
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from api.models import Base
+from api.models.devices import Device
+from api.models.jobs import Job
+from api.telemetry.metrics import MetricsRegistry, instrument_pool, metrics, timed_pool
+
+
+@pytest.fixture
+def app_client():
+    """Routes devices + /metrics derrière RequestContextMiddleware, base SQLite en mémoire"""
+    from api.deps import get_db
+    from api.http_cache import device_cache
+    from api.routers import metrics as metrics_router
+    from api.routers.v1 import devices
+    from api.telemetry.middleware import RequestContextMiddleware
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+
+    def db():
+        s = factory()
+        try:
+            yield s
+        finally:
+            s.close()
+
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+    app.include_router(devices.router)
+    app.include_router(metrics_router.router)
+    app.dependency_overrides[get_db] = db
+    device_cache.invalidate()
+    metrics.reset()
+    with TestClient(app) as c:
+        c.session_factory = factory
+        yield c
+
+
+def test_requests_by_route_template_and_status(app_client):
+    device_id = app_client.post("/api/v1/devices/", json={"name": "sw1", "ip_address": "10.0.0.1"}).json()["id"]
+    app_client.get(f"/api/v1/devices/{device_id}")
+    app_client.get(f"/api/v1/devices/{device_id}")
+    app_client.get("/api/v1/devices/999")
+    app_client.get("/nowhere")
+
+    r = app_client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = r.text
+    assert "# TYPE http_requests_total counter" in body
+    # Gabarit de route, pas l'identifiant : une seule série pour tous les équipements
+    assert 'http_requests_total{method="GET",route="/api/v1/devices/{device_id}",status="200"} 2' in body
+    assert 'http_requests_total{method="GET",route="/api/v1/devices/{device_id}",status="404"} 1' in body
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"} 1' in body
+    assert ('http_request_duration_seconds_bucket{method="GET",route="/api/v1/devices/{device_id}",'
+            'status="200",le="+Inf"} 2') in body
+    assert 'http_request_duration_seconds_count{method="POST",route="/api/v1/devices/",status="200"} 1' in body
+
+
+def test_poller_jobs(app_client):
+    db = app_client.session_factory()
+    device = Device(name="sw1", ip_address="10.0.0.1")
+    db.add(device)
+    db.flush()
+    db.add_all([Job(device_id=device.id, kind="poll", status=s) for s in ("done", "done", "error")])
+    db.commit()
+    db.close()
+
+    body = app_client.get("/metrics").text
+    assert "# TYPE snmp_poller_jobs gauge" in body
+    assert 'snmp_poller_jobs{kind="poll",status="done"} 2' in body
+    assert 'snmp_poller_jobs{kind="poll",status="error"} 1' in body
+
+
+def test_registry_merges_thread_shards():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+
+    def work():
+        for _ in range(1000):
+            registry.inc("jobs_total", (("kind", "poll"),))
+            registry.observe("wait_seconds", (), 0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    body = registry.render()
+    assert 'jobs_total{kind="poll"} 8000' in body
+    assert 'wait_seconds_bucket{le="0.1"} 0' in body
+    assert 'wait_seconds_bucket{le="1"} 8000' in body
+    assert "wait_seconds_sum 4000" in body
+
+
+def test_pool_checkouts_and_timeouts(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=timed_pool(QueuePool),
+                           pool_size=1, max_overflow=0, pool_timeout=0.05)
+    instrument_pool(engine, "test-pool")
+    instrument_pool(engine, "test-pool")   # idempotent : ni écouteurs ni collecteur en double
+    metrics.reset()
+    held = engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    body = metrics.render()
+    assert 'db_pool_checkouts_total{pool="test-pool"} 1' in body
+    assert 'db_pool_timeouts_total{pool="test-pool"} 1' in body
+    assert 'db_pool_checked_out{pool="test-pool"} 1' in body
+    assert 'db_pool_checkout_seconds_count{pool="test-pool"} 1' in body
+    assert 'db_pool_connections_total{pool="test-pool"} 1' in body
+    assert body.count('db_pool_checked_out{pool="test-pool"}') == 1
+    held.close()
+    assert 'db_pool_checked_out{pool="test-pool"} 0' in metrics.render()
+    # Pool recréé par dispose() : mêmes labels et écouteurs
+    engine.dispose()
+    engine.connect().close()
+    assert 'db_pool_checkouts_total{pool="test-pool"} 2' in metrics.render()
+    assert 'db_pool_checkout_seconds_count{pool="test-pool"} 2' in metrics.render()
+    engine.dispose()
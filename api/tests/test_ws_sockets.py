@@ -0,0 +1,144 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from api.routers.v1.frames import router
+from api.routers.v1 import frames
+from api.ws import sockets
+from api.ws.sockets import Client, ConnectionManager, FrameFilter, _message
+from snmp.frame_ring import FrameRing
+
+T0 = 1_700_000_000_000_000_000
+
+
+def frame(i, pdu="response", ip="10.0.0.1", oid="1.3.6.1.2.1.1.1.0"):
+    return {
+        "id": f"f{i}", "timestamp": "2024-01-01T00:00:00.000000Z", "src": {"ip": ip, "port": 161},
+        "dst": {"ip": "10.0.1.1", "port": 40000}, "version": 2, "pdu_type": pdu, "request_id": i,
+        "varbinds": [{"oid": oid, "type": "Integer", "value": i}], "length": 80,
+    }
+
+
+class FakeSocket:
+    pass
+
+
+def test_filter_matching():
+    assert FrameFilter.from_params(pdu="trap").matches(frame(1, pdu="trap"))
+    assert not FrameFilter.from_params(ip="10.0.0.2").matches(frame(1))
+    assert FrameFilter.from_params(ip="10.0.1.1").matches(frame(1))
+    assert FrameFilter.from_params(oid_prefix=".1.3.6.1.2.1.1").matches(frame(1))
+    assert not FrameFilter.from_params(oid_prefix="1.3.6.1.4").matches(frame(1))
+    with pytest.raises(ValueError):
+        FrameFilter.from_params(ip="not-an-ip")
+    with pytest.raises(ValueError):
+        FrameFilter.from_params(pdu="bogus")
+
+
+def test_publish_shares_message_per_filter():
+    mgr = ConnectionManager()
+    traps = [Client(FakeSocket(), FrameFilter(pdu="trap")) for _ in range(3)]
+    everything = Client(FakeSocket(), FrameFilter())
+    for c in traps + [everything]:
+        mgr.groups.setdefault(c.filter, set()).add(c)
+    mgr.publish([frame(1), frame(2, pdu="trap"), frame(3)])
+    # Même objet message pour tous les clients du filtre : construit une seule fois
+    assert len({id(c.queue[0][1]) for c in traps}) == 1
+    assert [f["request_id"] for f in json.loads(traps[0].take())["frames"]] == [2]
+    assert len(json.loads(everything.take())["frames"]) == 3
+
+
+def test_slow_client_drops_and_coalesces():
+    client = Client(FakeSocket(), FrameFilter(), max_queue=2)
+    for i in range(4):
+        client.push([json.dumps(frame(i))], "")
+    msg = json.loads(client.take())
+    assert msg["dropped"] == 2
+    assert [f["request_id"] for f in msg["frames"]] == [2, 3]
+    assert not client.queue and client.dropped == 0
+
+
+def test_pump_survives_read_errors(monkeypatch):
+    monkeypatch.setattr(sockets, "WS_BATCH_INTERVAL", 0.001)
+    mgr = ConnectionManager()
+    client = Client(FakeSocket(), FrameFilter())
+    mgr.groups[client.filter] = {client}
+    calls = []
+
+    def read_new():
+        calls.append(1)
+        if len(calls) <= 2:
+            raise OSError("ring unreadable")
+        mgr.groups.clear()  # dernier tour : plus de client, la boucle s'arrête
+        return [frame(1)]
+
+    monkeypatch.setattr(mgr, "_read_new", read_new)
+    asyncio.run(mgr._run())
+    assert len(calls) == 3
+
+
+def test_send_failure_drops_only_that_client():
+    class BrokenSocket:
+        closed = None
+
+        async def send_text(self, text):
+            raise ValueError("encoding failed")
+
+        async def close(self, code=1000):
+            self.closed = code
+
+    async def scenario():
+        mgr = ConnectionManager()
+        broken, healthy = Client(BrokenSocket(), FrameFilter()), Client(FakeSocket(), FrameFilter())
+        mgr.groups[FrameFilter()] = {broken, healthy}
+        broken.push(["{}"], _message(["{}"]))
+        await asyncio.wait_for(mgr._send(broken), 1)
+        return mgr, broken, healthy
+
+    mgr, broken, healthy = asyncio.run(scenario())
+    assert mgr.groups[FrameFilter()] == {healthy}
+    assert broken.websocket.closed == 1011
+
+
+def test_live_websocket(tmp_path, monkeypatch):
+    path = str(tmp_path / "frames.ring")
+    ring = FrameRing(path, slot_count=64, slot_size=512, writable=True)
+    ring.append(T0, "10.0.0.1", 161, "10.0.1.1", 40000, 2, "response", 100, {"request_id": 0, "varbinds": []})
+    monkeypatch.setenv("FRAME_RING_PATH", path)
+    monkeypatch.setattr(sockets, "WS_BATCH_INTERVAL", 0.01)
+    monkeypatch.setattr(frames, "manager", ConnectionManager())
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as tc:
+        with tc.websocket_connect("/frames/live?pdu=trap") as ws:
+            for i in range(1, 6):
+                ring.append(T0 + i, "10.0.0.1", 162, "10.0.1.1", 162, 2,
+                            "trap" if i % 2 else "response", 100, {"request_id": i, "varbinds": []})
+            received = []
+            while len(received) < 3:
+                received += [f["request_id"] for f in ws.receive_json()["frames"]]
+            # Trames antérieures à la connexion non rediffusées, filtre PDU appliqué
+            assert received == [1, 3, 5]
+    ring.close()
+
+
+def test_live_websocket_rejects_bad_frames(tmp_path, monkeypatch):
+    monkeypatch.setenv("FRAME_RING_PATH", str(tmp_path / "missing.ring"))
+    monkeypatch.setattr(frames, "manager", ConnectionManager())
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as tc:
+        with tc.websocket_connect("/frames/live") as ws:
+            ws.send_text("not json")
+            with pytest.raises(WebSocketDisconnect) as exc:
+                ws.receive_json()
+            assert exc.value.code == 1008
+        with tc.websocket_connect("/frames/live") as ws:
+            ws.send_bytes(b"\x00")
+            with pytest.raises(WebSocketDisconnect) as exc:
+                ws.receive_json()
+            assert exc.value.code == 1003
@@ -0,0 +1,229 @@
+import asyncio
+import ipaddress
+import json
+import os
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Set
+
+from fastapi import WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+
+from api.services.capture_service import _shared_ring
+from api.telemetry.logging import log
+from snmp.frame_ring import FrameRing, PDU_TYPES
+
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", 64))             # messages en attente par client
+WS_BATCH_INTERVAL = float(os.getenv("WS_BATCH_INTERVAL", 0.1))  # secondes entre deux lots
+WS_BATCH_MAX = int(os.getenv("WS_BATCH_MAX", 1000))             # trames lues par lot
+WS_ERROR_BACKOFF_MAX = float(os.getenv("WS_ERROR_BACKOFF_MAX", 5.0))  # attente max après une erreur de lecture
+
+
+@dataclass(frozen=True)
+class FrameFilter:
+    """Filtre serveur d'un client ; hashable pour regrouper les clients au filtre identique"""
+    ip: Optional[str] = None
+    pdu: Optional[str] = None
+    oid_prefix: Optional[str] = None
+
+    @classmethod
+    def from_params(cls, ip: Optional[str] = None, pdu: Optional[str] = None,
+                    oid_prefix: Optional[str] = None) -> "FrameFilter":
+        if ip:
+            ip = str(ipaddress.ip_address(ip))  # ValueError si invalide
+        if pdu and pdu not in PDU_TYPES:
+            raise ValueError(f"Unknown pdu type: {pdu}")
+        return cls(ip or None, pdu or None, oid_prefix.lstrip(".") if oid_prefix else None)
+
+    def matches(self, frame: Dict[str, Any]) -> bool:
+        if self.pdu is not None and frame["pdu_type"] != self.pdu:
+            return False
+        if self.ip is not None and self.ip not in (frame["src"]["ip"], frame["dst"]["ip"]):
+            return False
+        if self.oid_prefix is not None:
+            return any(vb["oid"].startswith(self.oid_prefix) for vb in frame["varbinds"])
+        return True
+
+
+def _message(frames: List[str], dropped: int = 0) -> str:
+    """Un message WebSocket par lot : trames déjà encodées, concaténées sans ré-encodage"""
+    return f'{{"type":"frames","dropped":{dropped},"frames":[{",".join(frames)}]}}'
+
+
+class Client:
+    """
+    File d'envoi bornée d'un client. Client lent : les lots les plus anciens sont abandonnés
+    (comptés dans `dropped`), les lots en attente sont fusionnés en un seul message.
+    """
+
+    def __init__(self, websocket: WebSocket, flt: FrameFilter, max_queue: int = WS_QUEUE_SIZE):
+        self.websocket = websocket
+        self.filter = flt
+        self.max_queue = max_queue
+        self.queue: deque = deque()
+        self.dropped = 0
+        self.ready = asyncio.Event()
+
+    def push(self, frames: List[str], message: str):
+        if len(self.queue) >= self.max_queue:
+            old, _ = self.queue.popleft()
+            self.dropped += len(old)
+        self.queue.append((frames, message))
+        self.ready.set()
+
+    def take(self) -> str:
+        # Cas nominal : message pré-construit, partagé par tous les clients du même filtre
+        if len(self.queue) == 1 and not self.dropped:
+            return self.queue.popleft()[1]
+        frames = [f for batch, _ in self.queue for f in batch]
+        self.queue.clear()
+        dropped, self.dropped = self.dropped, 0
+        return _message(frames, dropped)
+
+
+class ConnectionManager:
+    """
+    Diffusion des trames du ring buffer aux clients WebSocket.
+    Chaque trame est encodée une fois ; chaque filtre distinct est évalué une fois par trame
+    et son message construit une fois pour tous les clients qui le partagent.
+    """
+
+    def __init__(self):
+        self.groups: Dict[FrameFilter, Set[Client]] = {}
+        self._pump: Optional[asyncio.Task] = None
+        self._ring: Optional[FrameRing] = None
+        self._last_seq = 0
+
+    @property
+    def client_count(self) -> int:
+        return sum(len(clients) for clients in self.groups.values())
+
+    def connect(self, websocket: WebSocket, flt: FrameFilter) -> Client:
+        client = Client(websocket, flt)
+        self.groups.setdefault(flt, set()).add(client)
+        if self._pump is None or self._pump.done():
+            # Position de départ fixée avant le retour : seules les trames à venir sont diffusées
+            self._ring = _shared_ring()
+            self._last_seq = self._ring.bounds()[1] if self._ring is not None else 0
+            self._pump = asyncio.create_task(self._run())
+        return client
+
+    def disconnect(self, client: Client):
+        clients = self.groups.get(client.filter)
+        if clients is not None:
+            clients.discard(client)
+            if not clients:
+                del self.groups[client.filter]
+
+    def set_filter(self, client: Client, flt: FrameFilter):
+        self.disconnect(client)
+        client.filter = flt
+        self.groups.setdefault(flt, set()).add(client)
+
+    def publish(self, frames: List[Dict[str, Any]]):
+        """Répartit un lot de trames (format du schéma Frame) entre les files des clients"""
+        if not frames or not self.groups:
+            return
+        encoded = [json.dumps(f, separators=(",", ":")) for f in frames]
+        for flt, clients in self.groups.items():
+            if flt == FrameFilter():
+                matched = encoded
+            else:
+                matched = [e for f, e in zip(frames, encoded) if flt.matches(f)]
+            if not matched:
+                continue
+            message = _message(matched)
+            for client in clients:
+                client.push(matched, message)
+
+    async def serve(self, websocket: WebSocket, flt: FrameFilter):
+        """
+        Boucle d'une connexion : l'envoi se fait dans une tâche dédiée (un client lent ne bloque
+        pas les autres), la réception accepte un nouveau filtre {"ip", "pdu", "oid_prefix"}.
+        """
+        client = self.connect(websocket, flt)
+        await websocket.accept()
+        sender = asyncio.create_task(self._send(client))
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                if message.get("text") is None:
+                    # Trame binaire : seul le JSON texte est accepté (1003 : type de données non supporté)
+                    await websocket.close(code=1003, reason="JSON text frames only")
+                    return
+                try:
+                    params = json.loads(message["text"])
+                    self.set_filter(client, FrameFilter.from_params(
+                        params.get("ip"), params.get("pdu"), params.get("oid_prefix")))
+                except (ValueError, AttributeError) as e:
+                    # JSON invalide (JSONDecodeError est une ValueError) ou filtre refusé
+                    await websocket.close(code=1008, reason=str(e)[:120])
+                    return
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            sender.cancel()
+            self.disconnect(client)
+
+    async def _send(self, client: Client):
+        try:
+            while True:
+                await client.ready.wait()
+                client.ready.clear()
+                while client.queue:
+                    await client.websocket.send_text(client.take())
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        except Exception as e:
+            # Échec d'envoi propre à ce client (transport, encodage) : seul ce client est retiré
+            log.warning("ws_send_failed", error=str(e))
+            self.disconnect(client)
+            try:
+                await client.websocket.close(code=1011)
+            except Exception:
+                pass
+
+    async def _run(self):
+        """
+        Lecture périodique des nouvelles trames du ring ; s'arrête quand il n'y a plus de client.
+        Une erreur de lecture ou de diffusion est journalisée et la boucle reprend après une attente
+        doublée à chaque échec consécutif (plafonnée à WS_ERROR_BACKOFF_MAX)
+        """
+        backoff = WS_BATCH_INTERVAL
+        while self.groups:
+            try:
+                frames = await run_in_threadpool(self._read_new)
+                self.publish(frames)
+            except Exception as e:
+                log.error("ws_pump_error", error=str(e), retry_in=backoff)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, WS_ERROR_BACKOFF_MAX)
+                continue
+            backoff = WS_BATCH_INTERVAL
+            if len(frames) < WS_BATCH_MAX:
+                await asyncio.sleep(WS_BATCH_INTERVAL)
+
+    def _read_new(self) -> List[Dict[str, Any]]:
+        ring = _shared_ring()
+        if ring is None:
+            return []
+        first, last = ring.bounds()
+        if ring is not self._ring:
+            # Ring recréé par l'analyseur : reprise sur les trames à venir
+            self._ring, self._last_seq = ring, last
+            return []
+        start = max(first, self._last_seq + 1)
+        end = min(last, start + WS_BATCH_MAX - 1)
+        frames = []
+        for seq in range(start, end + 1):
+            frame = ring.read(seq)
+            if frame is not None:
+                frames.append(frame)
+        self._last_seq = max(self._last_seq, end)
+        return frames
+
+
+# Instance unique partagée par les routes
+manager = ConnectionManager()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark mémoire/allocations de la représentation des paquets SNMP
+Compare l'ancienne dataclass (varbinds en dicts, datetime) et SNMPPacketInfo compact
+Usage: python bench_packet_info.py [-n 100000]
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Dict, List, Any
+
+from snmp_analyzer import SNMPPacketInfo
+
+
+@dataclass
+class LegacySNMPPacketInfo:
+    """Ancienne représentation (référence 'avant')"""
+    timestamp: datetime
+    source_ip: str
+    dest_ip: str
+    source_port: int
+    dest_port: int
+    version: str
+    community_or_user: str
+    request_type: str
+    oids: List[Dict[str, Any]]
+    enterprise_oid: Optional[str] = None
+    packet_size: int = 0
+    response_time: Optional[float] = None
+    error_status: Optional[str] = None
+
+
+OIDS = ["1.3.6.1.2.1.1.3.0", "1.3.6.1.2.1.2.2.1.10.1", "1.3.6.1.2.1.2.2.1.16.1"]
+
+
+def make_legacy(i: int):
+    # Chaînes reconstruites à chaque paquet, comme lors du décodage scapy
+    return LegacySNMPPacketInfo(
+        timestamp=datetime.now(),
+        source_ip="10.0.0.%d" % (i % 50),
+        dest_ip="10.0.1.1",
+        source_port=161,
+        dest_port=40000 + i % 1000,
+        version="".join(["v2", "c"]),
+        community_or_user="".join(["pub", "lic"]),
+        request_type="".join(["RESP", "ONSE"]),
+        oids=[{"oid": "".join([o, ""]), "value": i} for o in OIDS],
+        packet_size=120,
+    )
+
+
+def make_compact(i: int):
+    return SNMPPacketInfo(
+        ts_ns=time.monotonic_ns(),
+        source_ip="10.0.0.%d" % (i % 50),
+        dest_ip="10.0.1.1",
+        source_port=161,
+        dest_port=40000 + i % 1000,
+        version="".join(["v2", "c"]),
+        community_or_user="".join(["pub", "lic"]),
+        request_type="".join(["RESP", "ONSE"]),
+        oid_list=tuple("".join([o, ""]) for o in OIDS),
+        values=(i, i, i),
+        packet_size=120,
+    )
+
+
+def measure(factory, n: int):
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    start = time.perf_counter()
+    packets = [factory(i) for i in range(n)]
+    elapsed = time.perf_counter() - start
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sys.getallocatedblocks() - blocks_before
+    del packets
+    return current / n, blocks / n, elapsed / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SNMPPacketInfo")
+    parser.add_argument("-n", type=int, default=100000, help="Nombre de paquets")
+    args = parser.parse_args()
+
+    print(f"{'représentation':<12} {'octets/paquet':>14} {'blocs/paquet':>13} {'µs/paquet':>10}")
+    for label, factory in (("avant", make_legacy), ("compact", make_compact)):
+        size, blocks, us = measure(factory, args.n)
+        print(f"{label:<12} {size:>14.0f} {blocks:>13.1f} {us:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -41,6 +41,9 @@ class SNMPConfig:
     default_retries: int = 1
     default_port: int = 161
     trap_port: int = 162
+
+    # Index de MIBs compilé par mib_compiler.py (ignoré s'il n'existe pas)
+    mib_index_path: str = "mibs.idx"
     
     # Versions SNMP supportées
     supported_versions: List[str] = None
@@ -128,7 +131,8 @@ class SNMPConfig:
             default_timeout=float(os.getenv("SNMP_TIMEOUT", cls.default_timeout)),
             default_retries=int(os.getenv("SNMP_RETRIES", cls.default_retries)),
             default_port=int(os.getenv("SNMP_PORT", cls.default_port)),
-            trap_port=int(os.getenv("SNMP_TRAP_PORT", cls.trap_port))
+            trap_port=int(os.getenv("SNMP_TRAP_PORT", cls.trap_port)),
+            mib_index_path=os.getenv("MIB_INDEX", cls.mib_index_path)
         )
 
 @dataclass
@@ -139,6 +143,12 @@ class CaptureConfig:
     promiscuous_mode: bool = False
     capture_timeout: int = 1000  # millisecondes
     max_packets_in_memory: int = 10000
+
+    # Ring buffer mmap des dernières trames, partagé avec l'API ("" pour désactiver) ;
+    # None : frame_ring.default_path() (FRAME_RING_PATH, relatif à snmp/), le même que l'API
+    frame_ring_path: Optional[str] = None
+    frame_ring_slots: int = 65536
+    frame_ring_slot_size: int = 1024  # octets par trame
     
     # Filtres BPF pour différents types de capture
     snmp_filter: str = "udp port 161 or udp port 162"
@@ -154,7 +164,9 @@ class CaptureConfig:
             buffer_size=int(os.getenv("CAPTURE_BUFFER_SIZE", cls.buffer_size)),
             promiscuous_mode=os.getenv("CAPTURE_PROMISCUOUS", "false").lower() == "true",
             capture_timeout=int(os.getenv("CAPTURE_TIMEOUT", cls.capture_timeout)),
-            max_packets_in_memory=int(os.getenv("MAX_PACKETS_MEMORY", cls.max_packets_in_memory))
+            max_packets_in_memory=int(os.getenv("MAX_PACKETS_MEMORY", cls.max_packets_in_memory)),
+            frame_ring_slots=int(os.getenv("FRAME_RING_SLOTS", cls.frame_ring_slots)),
+            frame_ring_slot_size=int(os.getenv("FRAME_RING_SLOT_SIZE", cls.frame_ring_slot_size))
         )
 
 @dataclass
@@ -164,6 +176,9 @@ class AnalysisConfig:
     max_requests_per_minute: int = 100
     suspicious_communities: List[str] = None
     alert_response_time_threshold: float = 5.0  # secondes
+    latency_window: int = 60  # secondes, fenêtre de calcul du p95
+    latency_ewma_alpha: float = 0.3
+    latency_zscore_threshold: float = 3.0
     
     # Cache et nettoyage
     request_cache_ttl: int = 30  # secondes
@@ -172,6 +187,16 @@ class AnalysisConfig:
     # Statistiques
     stats_update_interval: int = 10  # paquets
     stats_export_interval: int = 300  # secondes
+
+    # Affichage console : silent | summary | packet
+    output_verbosity: str = "summary"
+    summary_interval: int = 10  # secondes
+
+    # Profilage du pipeline de capture (histogrammes par étape, SIGUSR1)
+    profile_enabled: bool = False
+    profile_log_interval: int = 60  # secondes, ligne JSON périodique (0 = désactivée)
+    profile_prometheus_port: int = 0  # texte Prometheus sur /metrics (0 = désactivé)
+    profile_prometheus_host: str = "127.0.0.1"  # local par défaut ; 0.0.0.0 pour un scrape distant
     
     def __post_init__(self):
         if self.suspicious_communities is None:
@@ -186,8 +211,17 @@ class AnalysisConfig:
         return cls(
             max_requests_per_minute=int(os.getenv("MAX_REQUESTS_PER_MIN", cls.max_requests_per_minute)),
             alert_response_time_threshold=float(os.getenv("ALERT_RESPONSE_TIME", cls.alert_response_time_threshold)),
+            latency_window=int(os.getenv("LATENCY_WINDOW", cls.latency_window)),
+            latency_ewma_alpha=float(os.getenv("LATENCY_EWMA_ALPHA", cls.latency_ewma_alpha)),
+            latency_zscore_threshold=float(os.getenv("LATENCY_ZSCORE", cls.latency_zscore_threshold)),
             request_cache_ttl=int(os.getenv("CACHE_TTL", cls.request_cache_ttl)),
-            cache_cleanup_interval=int(os.getenv("CACHE_CLEANUP", cls.cache_cleanup_interval))
+            cache_cleanup_interval=int(os.getenv("CACHE_CLEANUP", cls.cache_cleanup_interval)),
+            output_verbosity=os.getenv("OUTPUT_VERBOSITY", cls.output_verbosity),
+            summary_interval=int(os.getenv("SUMMARY_INTERVAL", cls.summary_interval)),
+            profile_enabled=os.getenv("PROFILE_PIPELINE", "false").lower() == "true",
+            profile_log_interval=int(os.getenv("PROFILE_LOG_INTERVAL", cls.profile_log_interval)),
+            profile_prometheus_port=int(os.getenv("PROFILE_PROMETHEUS_PORT", cls.profile_prometheus_port)),
+            profile_prometheus_host=os.getenv("PROFILE_PROMETHEUS_HOST", cls.profile_prometheus_host)
         )
 
 @dataclass
@@ -219,7 +253,7 @@ class ExportConfig:
     default_export_format: str = "json"
     export_directory: str = "exports"
     include_raw_packets: bool = False
-    compress_exports: bool = True
+    compress_exports: bool = True   # gzip (nom de fichier suffixé .gz) ; un chemin en .gz compresse toujours
     max_export_size: int = 100 * 1024 * 1024  # 100 MB
     
     # Formats supportés
@@ -0,0 +1,111 @@
+"""
+Encodage en flux des exports (NDJSON, CSV, JSON) avec compression gzip optionnelle
+Les enregistrements sont consommés un par un : la mémoire reste constante quelle que soit la taille
+Dépend uniquement de la bibliothèque standard : importable en `export_stream` ou `snmp.export_stream`
+"""
+import csv
+import io
+import json
+import zlib
+from typing import Iterable, Iterator, Optional, Dict, Any, List
+
+FORMATS = ("ndjson", "csv", "json")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv", "json": "application/json"}
+CHUNK_SIZE = 64 * 1024
+
+
+class ExportSizeExceeded(Exception):
+    """Levée quand le flux dépasse max_export_size (octets produits, après compression)"""
+
+
+def _json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.hex()
+    return str(value)
+
+
+def _dumps(record: Dict[str, Any], indent: Optional[int] = None) -> str:
+    return json.dumps(record, ensure_ascii=False, default=_json_default, indent=indent,
+                      separators=None if indent else (",", ":"))
+
+
+def encode(records: Iterable[Dict[str, Any]], fmt: str, fields: Optional[List[str]] = None,
+           prefix: str = "", suffix: str = "", indent: Optional[int] = None) -> Iterator[str]:
+    """
+    Texte encodé, enregistrement par enregistrement.
+    CSV : colonnes `fields` (ou clés du premier enregistrement), valeurs imbriquées en JSON.
+    JSON : tableau, entouré de `prefix`/`suffix` pour l'inclure dans un objet englobant.
+    """
+    if fmt == "ndjson":
+        for record in records:
+            yield _dumps(record) + "\n"
+    elif fmt == "csv":
+        buf = io.StringIO()
+        writer = None
+        for record in records:
+            if writer is None:
+                writer = csv.DictWriter(buf, fieldnames=fields or list(record), extrasaction="ignore")
+                writer.writeheader()
+            writer.writerow({
+                k: _dumps(v) if isinstance(v, (dict, list, tuple)) else v
+                for k, v in record.items()
+            })
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        if writer is None and fields:
+            yield ",".join(fields) + "\r\n"
+    elif fmt == "json":
+        yield prefix + "["
+        sep = "\n"
+        for record in records:
+            yield sep + _dumps(record, indent)
+            sep = ",\n"
+        yield "\n]" + suffix
+    else:
+        raise ValueError(f"Format d'export inconnu: {fmt}")
+
+
+def to_bytes(chunks: Iterable[str], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Regroupe les fragments en blocs d'environ chunk_size octets (moins d'écritures réseau/disque)"""
+    buf, size = [], 0
+    for chunk in chunks:
+        data = chunk.encode("utf-8")
+        buf.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            yield b"".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield b"".join(buf)
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compression gzip en flux (format fichier .gz)"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def limit_size(chunks: Iterable[bytes], max_bytes: Optional[int]) -> Iterator[bytes]:
+    total = 0
+    for chunk in chunks:
+        total += len(chunk)
+        if max_bytes and total > max_bytes:
+            raise ExportSizeExceeded(f"Export supérieur à {max_bytes} octets")
+        yield chunk
+
+
+def export_stream(records: Iterable[Dict[str, Any]], fmt: str, fields: Optional[List[str]] = None,
+                  compress: bool = False, max_bytes: Optional[int] = None,
+                  prefix: str = "", suffix: str = "", indent: Optional[int] = None) -> Iterator[bytes]:
+    """Pipeline complet : encodage → blocs → gzip éventuel → plafond de taille"""
+    chunks = to_bytes(encode(records, fmt, fields, prefix, suffix, indent))
+    if compress:
+        chunks = gzip_chunks(chunks)
+    return limit_size(chunks, max_bytes)
@@ -0,0 +1,245 @@
+"""
+Ring buffer des dernières trames décodées, dans un fichier projeté en mémoire (mmap)
+Écrit par l'analyseur (un seul écrivain), lu sans copie par l'API (autres processus)
+Dépend uniquement de la bibliothèque standard : importable en `frame_ring` ou `snmp.frame_ring`
+"""
+import ipaddress
+import json
+import mmap
+import os
+import struct
+import time
+from typing import Optional, Dict, Any, Iterator, Tuple, Callable
+
+MAGIC = b"SNMPRNG1"
+FORMAT_VERSION = 1
+# magic, version, taille de slot, nombre de slots, époque (ns), prochaine séquence
+HEADER = struct.Struct("<8sIIIxxxxQQ")
+HEADER_SIZE = 64
+_NEXT_SEQ = struct.Struct("<Q")
+
+# Répertoire de référence des chemins relatifs (snmp/, comme storage.BASE_DIR)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+_NEXT_SEQ_OFFSET = HEADER.size - _NEXT_SEQ.size
+
+# séquence, horodatage mural (ns), IP src/dst (16 octets, IPv4 mappée), ports, version, PDU, longueur trame, longueur charge
+SLOT_HEADER = struct.Struct("<QQ16s16sHHBBxxII")
+_SEQ = struct.Struct("<Q")
+
+PDU_TYPES = ("get", "getnext", "getbulk", "response", "set", "trap")
+# Types de l'analyseur (SNMPPacketInfo.request_type) → pdu_type du schéma Frame
+REQUEST_TYPES = {
+    "GET": "get", "GETNEXT": "getnext", "GETBULK": "getbulk", "RESPONSE": "response",
+    "SET": "set", "TRAPv1": "trap", "TRAPv2": "trap", "INFORM": "trap",
+}
+VERSIONS = {"v1": 1, "v2c": 2, "v3": 3}
+
+DEFAULT_SLOTS = 65536
+DEFAULT_SLOT_SIZE = 1024
+
+
+def pack_ip(ip: str) -> bytes:
+    addr = ipaddress.ip_address(ip)
+    if addr.version == 4:
+        return b"\x00" * 10 + b"\xff\xff" + addr.packed
+    return addr.packed
+
+
+def unpack_ip(raw: bytes) -> str:
+    addr = ipaddress.IPv6Address(raw)
+    return str(addr.ipv4_mapped or addr)
+
+
+class FrameRing:
+    """
+    Fichier = en-tête (64 octets) + slot_count slots de taille fixe.
+    Chaque slot : en-tête fixe (champs filtrables sans décodage) + charge JSON (varbinds, etc.).
+    Identifiant stable d'une trame : "<époque hex>-<séquence>" ; la séquence ne repart pas
+    à zéro tant que le fichier est conservé, une trame écrasée n'est plus trouvée.
+    Protocole seqlock : le slot est marqué vide (séquence 0) pendant l'écriture.
+    """
+
+    def __init__(self, path: str, slot_count: int = DEFAULT_SLOTS, slot_size: int = DEFAULT_SLOT_SIZE,
+                 writable: bool = False):
+        self.path = path
+        self.writable = writable
+        if writable:
+            self._open_writer(slot_count, slot_size)
+        else:
+            self._file = open(path, "rb")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.slot_size, self.slot_count, self.epoch, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Ring buffer de trames invalide: {path}")
+        self.max_payload = self.slot_size - SLOT_HEADER.size
+
+    def _open_writer(self, slot_count: int, slot_size: int):
+        if slot_size < SLOT_HEADER.size + 64:
+            raise ValueError(f"Taille de slot trop petite: {slot_size}")
+        size = HEADER_SIZE + slot_count * slot_size
+        existing = None
+        if os.path.exists(self.path) and os.path.getsize(self.path) == size:
+            with open(self.path, "rb") as f:
+                existing = HEADER.unpack(f.read(HEADER.size))
+        self._file = open(self.path, "r+b" if existing else "w+b")
+        if not existing:
+            self._file.truncate(size)
+        self._mm = mmap.mmap(self._file.fileno(), size)
+        # Géométrie identique : on reprend la séquence (identifiants stables entre redémarrages)
+        if not (existing and existing[0] == MAGIC and existing[1] == FORMAT_VERSION
+                and existing[2] == slot_size and existing[3] == slot_count):
+            HEADER.pack_into(self._mm, 0, MAGIC, FORMAT_VERSION, slot_size, slot_count, time.time_ns(), 1)
+
+    # ---- Écriture ----
+
+    @property
+    def next_seq(self) -> int:
+        return _NEXT_SEQ.unpack_from(self._mm, _NEXT_SEQ_OFFSET)[0]
+
+    def append(self, ts_ns: int, src: str, sport: int, dst: str, dport: int, version: int,
+               pdu_type: str, length: int, payload: Dict[str, Any]) -> str:
+        """Écrit une trame (ts_ns en horloge murale) ; retourne son identifiant"""
+        data = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+        if len(data) > self.max_payload:
+            data = self._truncate(payload)
+        seq = self.next_seq
+        off = HEADER_SIZE + (seq % self.slot_count) * self.slot_size
+        mm = self._mm
+        _SEQ.pack_into(mm, off, 0)
+        SLOT_HEADER.pack_into(
+            mm, off, 0, ts_ns, pack_ip(src), pack_ip(dst), sport, dport, version,
+            PDU_TYPES.index(pdu_type), length, len(data),
+        )
+        mm[off + SLOT_HEADER.size:off + SLOT_HEADER.size + len(data)] = data
+        _SEQ.pack_into(mm, off, seq)
+        _NEXT_SEQ.pack_into(mm, _NEXT_SEQ_OFFSET, seq + 1)
+        return self.frame_id(seq)
+
+    def _truncate(self, payload: Dict[str, Any]) -> bytes:
+        """Réduit les varbinds jusqu'à tenir dans un slot (tag 'truncated')"""
+        payload = dict(payload)
+        varbinds = list(payload.get("varbinds") or [])
+        payload["tags"] = list(payload.get("tags") or []) + ["truncated"]
+        while True:
+            payload["varbinds"] = varbinds
+            data = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+            if len(data) <= self.max_payload:
+                return data
+            if not varbinds:
+                return b'{"tags":["truncated"]}'
+            varbinds = varbinds[:len(varbinds) // 2]
+
+    # ---- Lecture ----
+
+    def frame_id(self, seq: int) -> str:
+        # Largeur fixe : l'ordre lexicographique des identifiants suit l'ordre d'écriture
+        return f"{self.epoch:016x}-{seq:012d}"
+
+    @property
+    def id_prefix(self) -> str:
+        return f"{self.epoch:016x}-"
+
+    def parse_id(self, frame_id: str) -> Optional[int]:
+        epoch, sep, seq = frame_id.partition("-")
+        if not sep or epoch != f"{self.epoch:016x}" or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def bounds(self) -> Tuple[int, int]:
+        """Intervalle [première, dernière] des séquences potentiellement présentes"""
+        last = self.next_seq - 1
+        return max(1, last - self.slot_count + 1), last
+
+    def header(self, seq: int) -> Optional[tuple]:
+        """En-tête fixe du slot (sans copier la charge) ou None si écrasé/en cours d'écriture"""
+        off = HEADER_SIZE + (seq % self.slot_count) * self.slot_size
+        fields = SLOT_HEADER.unpack_from(self._mm, off)
+        if fields[0] != seq:
+            return None
+        # Relecture de la séquence, comme read() : en-tête réécrit pendant la lecture ?
+        if _SEQ.unpack_from(self._mm, off)[0] != seq:
+            return None
+        return fields
+
+    def read(self, seq: int) -> Optional[Dict[str, Any]]:
+        """Trame complète au format du schéma Frame de l'API"""
+        off = HEADER_SIZE + (seq % self.slot_count) * self.slot_size
+        fields = SLOT_HEADER.unpack_from(self._mm, off)
+        if fields[0] != seq:
+            return None
+        start = off + SLOT_HEADER.size
+        data = self._mm[start:start + fields[9]]
+        # Relecture de la séquence : le slot a-t-il été réécrit pendant la copie ?
+        if _SEQ.unpack_from(self._mm, off)[0] != seq:
+            return None
+        return self._to_frame(fields, json.loads(data))
+
+    def _to_frame(self, fields: tuple, payload: Dict[str, Any]) -> Dict[str, Any]:
+        seq, ts_ns, src, dst, sport, dport, version, pdu, length, _ = fields
+        return {
+            "id": self.frame_id(seq),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(ts_ns // 1_000_000_000))
+                         + f".{ts_ns % 1_000_000_000 // 1000:06d}Z",
+            "src": {"ip": unpack_ip(src), "port": sport},
+            "dst": {"ip": unpack_ip(dst), "port": dport},
+            "version": version,
+            "pdu_type": PDU_TYPES[pdu],
+            "request_id": payload.get("request_id"),
+            "community": payload.get("community"),
+            "security_user": payload.get("security_user"),
+            "varbinds": payload.get("varbinds") or [],
+            "length": length,
+            "tags": payload.get("tags") or [],
+            "anomalies": payload.get("anomalies") or [],
+        }
+
+    def get(self, frame_id: str) -> Optional[Dict[str, Any]]:
+        seq = self.parse_id(frame_id)
+        if seq is None:
+            return None
+        first, last = self.bounds()
+        if not first <= seq <= last:
+            return None
+        return self.read(seq)
+
+    def scan(self, before: Optional[int] = None, match: Optional[Callable[[tuple], bool]] = None,
+             since_ns: Optional[int] = None) -> Iterator[int]:
+        """
+        Séquences du plus récent au plus ancien (strictement avant `before`) dont
+        l'en-tête fixe satisfait `match` ; la charge JSON n'est pas lue.
+        Les trames étant écrites dans l'ordre, le parcours s'arrête avant `since_ns`.
+        """
+        first, last = self.bounds()
+        if before is not None:
+            last = min(last, before - 1)
+        for seq in range(last, first - 1, -1):
+            fields = self.header(seq)
+            if fields is None:
+                continue
+            if since_ns is not None and fields[1] < since_ns:
+                return
+            if match is None or match(fields):
+                yield seq
+
+    def close(self):
+        try:
+            self._mm.close()
+        finally:
+            self._file.close()
+
+
+def default_path() -> str:
+    """Ring partagé analyseur/API : FRAME_RING_PATH (relatif : depuis snmp/, comme la base commune) ; "" désactive"""
+    path = os.getenv("FRAME_RING_PATH", "frames.ring")
+    return os.path.join(BASE_DIR, path) if path else ""
+
+
+def open_frame_ring(path: Optional[str] = None) -> Optional[FrameRing]:
+    """Ouverture en lecture (None si l'analyseur n'a pas encore créé le fichier)"""
+    path = path or default_path()
+    if not path:
+        return None
+    if not os.path.exists(path):
+        return None
+    return FrameRing(path)
@@ -0,0 +1,218 @@
+"""
+Quantiles de latence SNMP en flux continu et détection de dégradation
+Histogrammes logarithmiques à mémoire constante + EWMA / z-score
+"""
+import math
+import time
+from array import array
+from collections import OrderedDict
+from typing import Optional, Dict, List, Tuple, Any, Iterable, Callable
+
+
+class LatencyHistogram:
+    """
+    Histogramme logarithmique à mémoire constante (style HDR).
+    Chaque bucket couvre [min * g^i, min * g^(i+1)) avec g = 1 + precision,
+    ce qui garantit une erreur relative bornée sur les quantiles.
+    """
+
+    __slots__ = ("min_value", "max_value", "_inv_log_base", "_log_base", "counts", "count", "max_seen")
+
+    def __init__(self, min_value: float = 1e-5, max_value: float = 60.0, precision: float = 0.02):
+        self.min_value = min_value
+        self.max_value = max_value
+        self._log_base = math.log1p(precision)
+        self._inv_log_base = 1.0 / self._log_base
+        nbuckets = int(math.ceil(math.log(max_value / min_value) * self._inv_log_base)) + 1
+        self.counts = array("Q", bytes(8 * nbuckets))
+        self.count = 0
+        self.max_seen = 0.0
+
+    def record(self, value: float):
+        """Ajoute une mesure (secondes) - O(1)"""
+        if value <= self.min_value:
+            idx = 0
+        else:
+            idx = int(math.log(value / self.min_value) * self._inv_log_base)
+            if idx >= len(self.counts):
+                idx = len(self.counts) - 1
+        self.counts[idx] += 1
+        self.count += 1
+        if value > self.max_seen:
+            self.max_seen = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantile approché (milieu géométrique du bucket)"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for idx, c in enumerate(self.counts):
+            if not c:
+                continue
+            seen += c
+            if seen >= rank:
+                value = self.min_value * math.exp((idx + 0.5) * self._log_base)
+                return min(value, self.max_seen)
+        return self.max_seen
+
+    def quantiles(self, qs: Iterable[float] = (0.5, 0.95, 0.99)) -> List[Optional[float]]:
+        """Plusieurs quantiles en un seul parcours des buckets"""
+        qs = list(qs)
+        if self.count == 0:
+            return [None] * len(qs)
+        order = sorted(range(len(qs)), key=lambda i: qs[i])
+        results: List[Optional[float]] = [self.max_seen] * len(qs)
+        pos = 0
+        seen = 0
+        for idx, c in enumerate(self.counts):
+            if not c:
+                continue
+            seen += c
+            while pos < len(order) and seen >= qs[order[pos]] * self.count:
+                value = self.min_value * math.exp((idx + 0.5) * self._log_base)
+                results[order[pos]] = min(value, self.max_seen)
+                pos += 1
+            if pos == len(order):
+                break
+        return results
+
+    def reset(self):
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.max_seen = 0.0
+
+
+class _LatencySeries:
+    """État d'une série (un équipement ou un OID)"""
+
+    __slots__ = ("total", "window", "window_start", "ewma", "ewm_var", "windows_seen", "last_seen", "last_alert")
+
+    def __init__(self, now: float):
+        self.total = LatencyHistogram()
+        self.window = LatencyHistogram()
+        self.window_start = now
+        self.ewma: Optional[float] = None
+        self.ewm_var = 0.0
+        self.windows_seen = 0
+        self.last_seen = now
+        self.last_alert: Optional[float] = None
+
+
+class LatencyTracker:
+    """
+    Suivi des latences par équipement et par OID.
+    Chaque mesure alimente un histogramme cumulé et un histogramme de fenêtre ;
+    à la clôture d'une fenêtre, son p95 alimente une moyenne/variance EWMA
+    et un z-score trop élevé déclenche une alerte de dégradation.
+    Les séries sont bornées (LRU, max_series) et oubliées après idle_seconds sans mesure ;
+    le seuil absolu alerte au plus une fois par équipement et par alert_cooldown secondes.
+    Une série coûte deux histogrammes denses (~6 Ko chacun) : max_series=2000 borne le suivi
+    vers 25 Mo. series_key regroupe les OIDs d'instance (ifInOctets.12 → ifInOctets) pour que
+    le nombre de séries OID suive le nombre de colonnes interrogées, pas d'instances.
+    """
+
+    def __init__(self, window_seconds: float = 60.0, alpha: float = 0.3,
+                 z_threshold: float = 3.0, absolute_threshold: Optional[float] = None,
+                 min_window_samples: int = 20, warmup_windows: int = 5,
+                 max_series: int = 2_000, idle_seconds: float = 3600.0,
+                 alert_cooldown: Optional[float] = None,
+                 series_key: Optional[Callable[[str], str]] = None, clock=time.monotonic):
+        self.window_seconds = window_seconds
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.absolute_threshold = absolute_threshold
+        self.min_window_samples = min_window_samples
+        self.warmup_windows = warmup_windows
+        self.max_series = max_series
+        self.idle_seconds = idle_seconds
+        self.alert_cooldown = window_seconds if alert_cooldown is None else alert_cooldown
+        self.series_key = series_key
+        self.clock = clock
+        # Ordre d'accès : la série la moins récemment mesurée en tête
+        self.series: "OrderedDict[Tuple[str, str], _LatencySeries]" = OrderedDict()
+
+    def observe(self, device: str, oids: Iterable[str], latency: float) -> List[str]:
+        """
+        Enregistre la latence d'une réponse pour l'équipement et chacun de ses OIDs
+        (une seule mesure par série quand plusieurs OIDs partagent la même clé).
+        Retourne la liste (souvent vide) des anomalies détectées.
+        """
+        now = self.clock()
+        alerts: List[str] = []
+        dev = self._record(("device", device), latency, now, alerts)
+        if self.series_key is not None:
+            oids = dict.fromkeys(map(self.series_key, oids))
+        for oid in oids:
+            self._record(("oid", oid), latency, now, alerts)
+
+        # Seuil absolu (AnalysisConfig.alert_response_time_threshold) : une alerte par équipement
+        # et par période alert_cooldown, quel que soit le nombre de réponses lentes ou d'OIDs
+        if (self.absolute_threshold is not None and latency > self.absolute_threshold
+                and (dev.last_alert is None or now - dev.last_alert >= self.alert_cooldown)):
+            dev.last_alert = now
+            alerts.append(
+                f"Temps de réponse élevé device={device}: "
+                f"{latency*1000:.1f}ms > {self.absolute_threshold*1000:.0f}ms"
+            )
+        self._evict(now)
+        return alerts
+
+    def _record(self, key: Tuple[str, str], latency: float, now: float, alerts: List[str]) -> _LatencySeries:
+        s = self.series.get(key)
+        if s is None:
+            s = self.series[key] = _LatencySeries(now)
+        else:
+            self.series.move_to_end(key)
+            if now - s.window_start >= self.window_seconds:
+                self._close_window(key, s, now, alerts)
+
+        s.total.record(latency)
+        s.window.record(latency)
+        s.last_seen = now
+        return s
+
+    def _evict(self, now: float):
+        """Oublie les séries inactives depuis idle_seconds et, au-delà de max_series, les moins récentes"""
+        while self.series:
+            key, s = next(iter(self.series.items()))
+            if len(self.series) <= self.max_series and now - s.last_seen < self.idle_seconds:
+                return
+            del self.series[key]
+
+    def _close_window(self, key: Tuple[str, str], s: _LatencySeries, now: float, alerts: List[str]):
+        if s.window.count >= self.min_window_samples:
+            p95 = s.window.quantile(0.95)
+            if s.ewma is None:
+                s.ewma = p95
+            else:
+                std = math.sqrt(s.ewm_var)
+                if s.windows_seen >= self.warmup_windows and std > 0:
+                    z = (p95 - s.ewma) / std
+                    if z > self.z_threshold:
+                        alerts.append(
+                            f"Dégradation de latence {key[0]}={key[1]}: p95 {p95*1000:.1f}ms "
+                            f"(moyenne {s.ewma*1000:.1f}ms, z={z:.1f})"
+                        )
+                diff = p95 - s.ewma
+                s.ewma += self.alpha * diff
+                s.ewm_var = (1 - self.alpha) * (s.ewm_var + self.alpha * diff * diff)
+            s.windows_seen += 1
+        s.window.reset()
+        s.window_start = now
+
+    def quantiles(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        """p50/p95/p99 cumulés d'une série ('device' ou 'oid')"""
+        s = self.series.get((kind, key))
+        if s is None:
+            return None
+        p50, p95, p99 = s.total.quantiles((0.5, 0.95, 0.99))
+        return {"count": s.total.count, "p50": p50, "p95": p95, "p99": p99, "max": s.total.max_seen}
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Vue complète des quantiles, regroupée par type de série"""
+        out: Dict[str, Dict[str, Dict[str, Any]]] = {"device": {}, "oid": {}}
+        for kind, key in self.series:
+            out[kind][key] = self.quantiles(kind, key)
+        return out
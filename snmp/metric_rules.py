@@ -0,0 +1,299 @@
+"""
+Moteur de règles sur les valeurs des métriques SNMP
+Seuils statiques, taux de variation et lignes de base saisonnières (heure de la semaine),
+évalués de façon vectorisée sur le lot d'échantillons d'un cycle de polling
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from oid_registry import registry
+
+HOURS_PER_WEEK = 168
+
+
+@dataclass
+class MetricRule:
+    """Règle appliquée à une colonne d'OID (ex: ifInErrors → toutes ses instances)"""
+    name: str
+    oid_prefix: str
+    kind: str  # threshold | rate | change | seasonal
+    max_value: Optional[float] = None
+    min_value: Optional[float] = None
+    use_rate: bool = False          # seuil/ligne de base appliqués au taux (/s) plutôt qu'à la valeur
+    counter: bool = True            # taux : série de type compteur (rebouclage 32/64 bits, remise à zéro)
+    z_threshold: float = 3.0        # seasonal
+    alpha: float = 0.1              # seasonal : poids EWMA de la ligne de base
+    min_samples: int = 4            # seasonal : échantillons requis par créneau horaire
+    severity: str = "warning"
+    description: str = ""
+
+    def matches(self, oid: str) -> bool:
+        return registry.in_subtree(oid, self.oid_prefix)
+
+
+@dataclass
+class RuleViolation:
+    """Résultat d'une règle déclenchée"""
+    rule: MetricRule
+    source_ip: str
+    oid: str
+    value: float
+    observed: float  # valeur testée (valeur brute, taux ou z-score)
+
+    def message(self) -> str:
+        label = self.rule.description or self.rule.name
+        oid = registry.name_of(self.oid, self.oid)
+        if self.rule.kind == "seasonal":
+            return f"{label} sur {oid} ({self.source_ip}): {self.value:g} (z={self.observed:.1f})"
+        if self.rule.kind == "change":
+            return f"{label} sur {oid} ({self.source_ip}): nouvelle valeur {self.value:g}"
+        unit = "/s" if self.rule.use_rate or self.rule.kind == "rate" else ""
+        return f"{label} sur {oid} ({self.source_ip}): {self.observed:g}{unit}"
+
+
+DEFAULT_RULES = [
+    MetricRule("if_in_errors_spike", registry.resolve("ifInErrors"), "rate", max_value=10.0,
+               description="Pic d'erreurs en entrée"),
+    MetricRule("if_out_errors_spike", registry.resolve("ifOutErrors"), "rate", max_value=10.0,
+               description="Pic d'erreurs en sortie"),
+    MetricRule("cpu_saturation", registry.resolve("hrProcessorLoad"), "threshold", max_value=90.0,
+               severity="critical", description="Saturation processeur"),
+    MetricRule("if_oper_status_change", registry.resolve("ifOperStatus"), "change",
+               description="Changement d'état d'interface"),
+    MetricRule("if_in_octets_baseline", registry.resolve("ifInOctets"), "seasonal", use_rate=True,
+               z_threshold=4.0, description="Trafic entrant inhabituel"),
+]
+
+
+class MetricRulesEngine:
+    """
+    Évalue les règles sur les séries (équipement, OID).
+    L'état de chaque série (dernière valeur, dernier horodatage) est stocké dans des
+    tableaux NumPy indexés par série ; les lignes de base par heure de la semaine ne sont
+    allouées que pour les séries visées par une règle saisonnière. Séries et masques de
+    règles par OID sont bornés (LRU) : la série la moins récemment vue est recyclée.
+    """
+
+    COUNTER_WRAP = {"Counter32": float(2 ** 32), "Counter64": float(2 ** 64)}
+    # Différence négative = rebouclage seulement si la valeur précédente était dans la moitié
+    # haute de la plage du compteur ; sinon remise à zéro (redémarrage de l'agent)
+    WRAP_THRESHOLD = 0.5
+
+    def __init__(self, rules: Optional[List[MetricRule]] = None, initial_capacity: int = 256,
+                 max_series: int = 100_000, max_oids: int = 10_000):
+        self.rules = list(DEFAULT_RULES if rules is None else rules)
+        self.max_series = max_series
+        self.max_oids = max_oids
+        self._series: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._rule_mask_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # Un plan de lignes de base (séries saisonnières x 168 créneaux) par règle saisonnière
+        self._planes = {r: k for k, r in enumerate(
+            i for i, rule in enumerate(self.rules) if rule.kind == "seasonal")}
+        self._seasonal_cols = np.array(list(self._planes), dtype=np.intp)
+        self._alloc(initial_capacity)
+
+    def _alloc(self, capacity: int):
+        self.prev_value = np.full(capacity, np.nan)
+        self.prev_ts = np.full(capacity, np.nan)
+        # Ligne des plans saisonniers de chaque série (-1 : aucune)
+        self.seasonal_row = np.full(capacity, -1, dtype=np.intp)
+        self._seasonal_free: List[int] = []
+        self._seasonal_used = 0
+        shape = (len(self._planes), 16 if self._planes else 0, HOURS_PER_WEEK)
+        self.base_mean = np.zeros(shape)
+        self.base_var = np.zeros(shape)
+        self.base_n = np.zeros(shape, dtype=np.int32)
+
+    def _grow(self):
+        old = len(self.prev_value)
+        self.prev_value = np.concatenate([self.prev_value, np.full(old, np.nan)])
+        self.prev_ts = np.concatenate([self.prev_ts, np.full(old, np.nan)])
+        self.seasonal_row = np.concatenate([self.seasonal_row, np.full(old, -1, dtype=np.intp)])
+
+    def _grow_planes(self):
+        pad = ((0, 0), (0, self.base_mean.shape[1]), (0, 0))
+        self.base_mean = np.pad(self.base_mean, pad)
+        self.base_var = np.pad(self.base_var, pad)
+        self.base_n = np.pad(self.base_n, pad)
+
+    def _series_index(self, source_ip: str, oid: str) -> int:
+        key = (source_ip, oid)
+        idx = self._series.get(key)
+        if idx is not None:
+            self._series.move_to_end(key)
+            return idx
+        if len(self._series) >= self.max_series:
+            _, idx = self._series.popitem(last=False)
+            self._release(idx)
+        else:
+            idx = len(self._series)
+            if idx >= len(self.prev_value):
+                self._grow()
+        self._series[key] = idx
+        return idx
+
+    def _series_indices(self, source_ip: str, oids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Emplacements des séries du lot : une résolution par OID distinct, redistribuée par l'inverse.
+        Renvoie (emplacement par échantillon, OIDs distincts, inverse)
+        """
+        uniq, inverse = np.unique(oids, return_inverse=True)
+        idx = np.fromiter((self._series_index(source_ip, o) for o in uniq.tolist()), dtype=np.intp, count=len(uniq))
+        return idx[inverse], uniq, inverse
+
+    def _release(self, idx: int):
+        """Recycle l'emplacement d'une série évincée (état et ligne de base saisonnière)"""
+        self.prev_value[idx] = np.nan
+        self.prev_ts[idx] = np.nan
+        row = self.seasonal_row[idx]
+        if row >= 0:
+            self.base_mean[:, row] = 0
+            self.base_var[:, row] = 0
+            self.base_n[:, row] = 0
+            self._seasonal_free.append(int(row))
+            self.seasonal_row[idx] = -1
+
+    def _seasonal_rows(self, idx: np.ndarray) -> np.ndarray:
+        """Lignes des plans saisonniers des séries idx, allouées au premier échantillon"""
+        for i in idx[self.seasonal_row[idx] < 0]:
+            if self._seasonal_free:
+                row = self._seasonal_free.pop()
+            else:
+                row = self._seasonal_used
+                self._seasonal_used += 1
+                if row >= self.base_mean.shape[1]:
+                    self._grow_planes()
+            self.seasonal_row[i] = row
+        return self.seasonal_row[idx]
+
+    def _rule_mask(self, oid: str) -> np.ndarray:
+        mask = self._rule_mask_cache.get(oid)
+        if mask is None:
+            mask = np.array([r.matches(oid) for r in self.rules], dtype=bool)
+            self._rule_mask_cache[oid] = mask
+            if len(self._rule_mask_cache) > self.max_oids:
+                self._rule_mask_cache.popitem(last=False)
+        else:
+            self._rule_mask_cache.move_to_end(oid)
+        return mask
+
+    def _wrap_widths(self, value_types: Optional[Sequence[Optional[str]]], n: int) -> np.ndarray:
+        """Plage de rebouclage par échantillon selon le type SMI (Counter32 si inconnu)"""
+        widths = np.full(n, self.COUNTER_WRAP["Counter32"])
+        if value_types is not None:
+            types = np.asarray(value_types, dtype=object)
+            for name, width in self.COUNTER_WRAP.items():
+                widths[types == name] = width
+        return widths
+
+    def evaluate_batch(self, source_ip: str, oids: Sequence[str],
+                       values: Sequence[Optional[float]],
+                       ts: Optional[float] = None,
+                       value_types: Optional[Sequence[Optional[str]]] = None) -> List[RuleViolation]:
+        """
+        Évalue toutes les règles sur un lot d'échantillons (un cycle de polling d'un équipement).
+        :param values: valeurs numériques (None si non numérique), alignées avec oids
+        :param ts: horodatage epoch du cycle (secondes)
+        :param value_types: types SMI alignés avec oids (Counter64 : rebouclage sur 64 bits)
+        """
+        if not oids or not self.rules:
+            return []
+        ts = time.time() if ts is None else ts
+
+        vals = np.array(values, dtype=float)  # None → NaN
+        # Séries et masques de règles résolus une fois par OID distinct du lot
+        idx, uniq, inverse = self._series_indices(source_ip, np.asarray(oids, dtype=object))
+        rule_mask = np.stack([self._rule_mask(o) for o in uniq.tolist()])[inverse]  # (n_samples, n_rules)
+        valid = ~np.isnan(vals)
+
+        prev = self.prev_value[idx]
+        dt = ts - self.prev_ts[idx]
+        delta = vals - prev
+        # Différence négative : rebouclage si la valeur précédente était proche du maximum du
+        # compteur, sinon remise à zéro (taux inconnu pour cet échantillon)
+        wrap = self._wrap_widths(value_types, len(vals))
+        with np.errstate(invalid="ignore"):
+            wrapped = (delta < 0) & (prev >= wrap * self.WRAP_THRESHOLD)
+            counter_delta = np.where(wrapped, delta + wrap, np.where(delta < 0, np.nan, delta))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            gauge_rate = np.where(dt > 0, delta / dt, np.nan)
+            counter_rate = np.where(dt > 0, counter_delta / dt, np.nan)
+
+        lt = time.localtime(ts)
+        slot = lt.tm_wday * 24 + lt.tm_hour
+
+        rows = None
+        if len(self._seasonal_cols):
+            seasonal = rule_mask[:, self._seasonal_cols].any(axis=1) & valid
+            if seasonal.any():
+                rows = np.full(len(vals), -1, dtype=np.intp)
+                rows[seasonal] = self._seasonal_rows(idx[seasonal])
+
+        violations: List[RuleViolation] = []
+        for r, rule in enumerate(self.rules):
+            applies = rule_mask[:, r] & valid
+            if not applies.any():
+                continue
+            if rule.use_rate or rule.kind == "rate":
+                subject = counter_rate if rule.counter else gauge_rate
+            else:
+                subject = vals
+            observed = subject
+
+            if rule.kind in ("threshold", "rate"):
+                hits = np.zeros(len(vals), dtype=bool)
+                with np.errstate(invalid="ignore"):
+                    if rule.max_value is not None:
+                        hits |= subject > rule.max_value
+                    if rule.min_value is not None:
+                        hits |= subject < rule.min_value
+            elif rule.kind == "change":
+                hits = ~np.isnan(prev) & (vals != prev)
+            elif rule.kind == "seasonal":
+                hits, observed = self._seasonal(self._planes[r], rule, rows, subject, applies, slot)
+            else:
+                continue
+
+            hits &= applies
+            for i in np.flatnonzero(hits):
+                violations.append(RuleViolation(rule, source_ip, oids[i], float(vals[i]), float(observed[i])))
+
+        self.prev_value[idx[valid]] = vals[valid]
+        self.prev_ts[idx[valid]] = ts
+        return violations
+
+    def _seasonal(self, p: int, rule: MetricRule, rows: np.ndarray, subject: np.ndarray,
+                  applies: np.ndarray, slot: int) -> Tuple[np.ndarray, np.ndarray]:
+        """z-score par rapport à la ligne de base EWMA du créneau heure-de-semaine, puis mise à jour"""
+        usable = applies & ~np.isnan(subject)
+        hits = np.zeros(len(subject), dtype=bool)
+        z = np.zeros(len(subject))
+        if not usable.any():
+            return hits, z
+        sel = rows[usable]
+        x = subject[usable]
+        mean = self.base_mean[p, sel, slot]
+        var = self.base_var[p, sel, slot]
+        n = self.base_n[p, sel, slot]
+        std = np.sqrt(var)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            zu = np.where(std > 0, (x - mean) / std, 0.0)
+        z[usable] = zu
+        hits[usable] = (n >= rule.min_samples) & (np.abs(zu) > rule.z_threshold)
+
+        first = n == 0
+        diff = x - mean
+        a = rule.alpha
+        self.base_mean[p, sel, slot] = np.where(first, x, mean + a * diff)
+        self.base_var[p, sel, slot] = np.where(first, 0.0, (1 - a) * (var + a * diff * diff))
+        self.base_n[p, sel, slot] = n + 1
+        return hits, z
+
+    def reset(self):
+        self._series.clear()
+        self._rule_mask_cache.clear()
+        self._alloc(len(self.prev_value))
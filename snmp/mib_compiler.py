@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Compilateur de MIBs (SMIv1/SMIv2) vers un index binaire compact
+Les modules sont parsés une seule fois ; l'index est ensuite lu par mmap (mib_index.py)
+Usage: python mib_compiler.py IF-MIB.txt HOST-RESOURCES-MIB.txt ... -o mibs.idx
+"""
+import argparse
+import logging
+import os
+import re
+import struct
+import sys
+from typing import Optional, Dict, List, Tuple, Iterable
+
+from mib_index import MAGIC, HEADER, RECORD, ENUM, FORMAT_VERSION, KINDS
+
+logger = logging.getLogger(__name__)
+
+# Racines définies par SNMPv2-SMI / RFC1155-SMI
+SMI_ROOTS = {
+    'iso': (1,),
+    'org': (1, 3),
+    'dod': (1, 3, 6),
+    'internet': (1, 3, 6, 1),
+    'directory': (1, 3, 6, 1, 1),
+    'mgmt': (1, 3, 6, 1, 2),
+    'mib-2': (1, 3, 6, 1, 2, 1),
+    'transmission': (1, 3, 6, 1, 2, 1, 10),
+    'experimental': (1, 3, 6, 1, 3),
+    'private': (1, 3, 6, 1, 4),
+    'enterprises': (1, 3, 6, 1, 4, 1),
+    'security': (1, 3, 6, 1, 5),
+    'snmpV2': (1, 3, 6, 1, 6),
+    'snmpDomains': (1, 3, 6, 1, 6, 1),
+    'snmpProxys': (1, 3, 6, 1, 6, 2),
+    'snmpModules': (1, 3, 6, 1, 6, 3),
+    'zeroDotZero': (0, 0),
+}
+
+OID_MACROS = {
+    "OBJECT-TYPE", "OBJECT-IDENTITY", "MODULE-IDENTITY", "NOTIFICATION-TYPE",
+    "OBJECT-GROUP", "NOTIFICATION-GROUP", "MODULE-COMPLIANCE", "AGENT-CAPABILITIES",
+}
+
+TOKEN_RE = re.compile(r'"[^"]*"|--[^\n]*?(?:--|(?=\n)|$)|::=|\.\.|[{}(),;|\[\]]|[A-Za-z0-9_-]+|\S', re.M)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text) if not t.startswith("--")]
+
+
+class MibDefinition:
+    __slots__ = ("name", "macro", "parent", "components", "syntax", "enums", "units", "index")
+
+    def __init__(self, name: str, macro: str):
+        self.name = name
+        self.macro = macro
+        self.components: List[Tuple[Optional[str], Optional[int]]] = []
+        self.syntax = ""
+        self.enums: Dict[int, str] = {}
+        self.units = ""
+        self.index: List[str] = []
+
+
+class MibCompiler:
+    """Parse un ou plusieurs modules MIB puis écrit l'index binaire"""
+
+    def __init__(self):
+        self.definitions: Dict[str, MibDefinition] = {}
+        self.types: Dict[str, Tuple[str, Dict[int, str]]] = {}  # conventions textuelles
+
+    # ---- Parsing ----
+
+    def parse_file(self, path: str):
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            self.parse_text(f.read())
+
+    def parse_text(self, text: str):
+        toks = tokenize(text)
+        n = len(toks)
+        i = 0
+        while i < n:
+            t = toks[i]
+            nxt = toks[i + 1] if i + 1 < n else ""
+            if t == "IMPORTS":
+                while i < n and toks[i] != ";":
+                    i += 1
+                i += 1
+            elif nxt == "MACRO":
+                while i < n and toks[i] != "END":
+                    i += 1
+                i += 1
+            elif nxt in OID_MACROS and t[:1].islower():
+                i = self._parse_macro(toks, i)
+            elif toks[i + 1:i + 4] == ["OBJECT", "IDENTIFIER", "::="] and t[:1].islower():
+                d = MibDefinition(t, "OBJECT IDENTIFIER")
+                d.components, i = self._parse_oid_value(toks, i + 4)
+                self.definitions[t] = d
+            elif nxt == "::=" and t[:1].isupper():
+                i = self._parse_type_assignment(toks, i)
+            else:
+                i += 1
+
+    def _parse_macro(self, toks: List[str], i: int) -> int:
+        d = MibDefinition(toks[i], toks[i + 1])
+        i += 2
+        n = len(toks)
+        while i < n and toks[i] != "::=":
+            t = toks[i]
+            if t == "SYNTAX" and d.macro == "OBJECT-TYPE" and not d.syntax:
+                d.syntax, d.enums, i = self._parse_syntax(toks, i + 1)
+            elif t == "UNITS" and i + 1 < n and toks[i + 1].startswith('"'):
+                d.units = toks[i + 1].strip('"')
+                i += 2
+            elif t in ("INDEX", "AUGMENTS") and i + 1 < n and toks[i + 1] == "{":
+                i += 2
+                while i < n and toks[i] != "}":
+                    if toks[i] not in (",", "IMPLIED"):
+                        d.index.append(toks[i])
+                    i += 1
+                i += 1
+            else:
+                i += 1
+        if i + 1 < n and toks[i + 1] == "{":
+            d.components, i = self._parse_oid_value(toks, i + 1)
+            self.definitions[d.name] = d
+        else:
+            i += 1  # TRAP-TYPE SMIv1 (::= n) : pas d'OID à indexer
+        return i
+
+    def _parse_type_assignment(self, toks: List[str], i: int) -> int:
+        name = toks[i]
+        i += 2
+        n = len(toks)
+        if i < n and toks[i] == "TEXTUAL-CONVENTION":
+            while i < n and toks[i] != "SYNTAX":
+                i += 1
+            i += 1
+        if i < n and toks[i] == "SEQUENCE" and i + 1 < n and toks[i + 1] == "{":
+            return self._skip_balanced(toks, i + 1, "{", "}")
+        if i < n and toks[i] == "[":  # [APPLICATION n] IMPLICIT ...
+            while i < n and toks[i] != "]":
+                i += 1
+            i += 1
+            if i < n and toks[i] == "IMPLICIT":
+                i += 1
+        syntax, enums, i = self._parse_syntax(toks, i)
+        self.types[name] = (syntax, enums)
+        return i
+
+    def _parse_syntax(self, toks: List[str], i: int) -> Tuple[str, Dict[int, str], int]:
+        n = len(toks)
+        if i >= n:
+            return "", {}, i
+        if toks[i] == "SEQUENCE" and i + 1 < n and toks[i + 1] == "OF":
+            return f"SEQUENCE OF {toks[i + 2]}", {}, i + 3
+        if toks[i] in ("OCTET", "OBJECT") and i + 1 < n:
+            syntax, i = f"{toks[i]} {toks[i + 1]}", i + 2
+        else:
+            syntax, i = toks[i], i + 1
+        enums: Dict[int, str] = {}
+        if i < n and toks[i] == "{":
+            i += 1
+            while i < n and toks[i] != "}":
+                if i + 3 < n and toks[i + 1] == "(" and toks[i + 3] == ")":
+                    try:
+                        enums[int(toks[i + 2])] = toks[i]
+                    except ValueError:
+                        pass
+                    i += 4
+                else:
+                    i += 1
+            i += 1
+        if i < n and toks[i] == "(":
+            i = self._skip_balanced(toks, i, "(", ")")
+        return syntax, enums, i
+
+    @staticmethod
+    def _skip_balanced(toks: List[str], i: int, open_: str, close: str) -> int:
+        depth = 0
+        n = len(toks)
+        while i < n:
+            if toks[i] == open_:
+                depth += 1
+            elif toks[i] == close:
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+            i += 1
+        return i
+
+    @staticmethod
+    def _parse_oid_value(toks: List[str], i: int) -> Tuple[List[Tuple[Optional[str], Optional[int]]], int]:
+        """{ parent 3 } ou { iso org(3) dod(6) 1 }"""
+        comps: List[Tuple[Optional[str], Optional[int]]] = []
+        i += 1  # '{'
+        n = len(toks)
+        while i < n and toks[i] != "}":
+            t = toks[i]
+            if t.isdigit():
+                comps.append((None, int(t)))
+                i += 1
+            elif i + 3 < n and toks[i + 1] == "(" and toks[i + 3] == ")":
+                comps.append((t, int(toks[i + 2])))
+                i += 4
+            else:
+                comps.append((t, None))
+                i += 1
+        return comps, i + 1
+
+    # ---- Résolution ----
+
+    def resolve(self) -> Dict[str, Tuple[int, ...]]:
+        """Résout les OIDs symboliques (plusieurs passes pour les références entre modules)"""
+        resolved: Dict[str, Tuple[int, ...]] = dict(SMI_ROOTS)
+        pending = dict(self.definitions)
+        while pending:
+            progress = False
+            for name, d in list(pending.items()):
+                arcs = self._resolve_components(d.components, resolved)
+                if arcs is not None:
+                    resolved[name] = arcs
+                    del pending[name]
+                    progress = True
+            if not progress:
+                for name in pending:
+                    logger.warning(f"OID non résolu pour {name}")
+                break
+        return resolved
+
+    @staticmethod
+    def _resolve_components(comps, resolved) -> Optional[Tuple[int, ...]]:
+        if not comps:
+            return None
+        arcs: List[int] = []
+        first_name, first_num = comps[0]
+        if first_num is not None and (first_name is None or first_name not in resolved):
+            arcs.append(first_num)
+        elif first_name in resolved:
+            arcs.extend(resolved[first_name])
+        else:
+            return None
+        for _name, num in comps[1:]:
+            if num is None:
+                return None
+            arcs.append(num)
+        return tuple(arcs)
+
+    def _kind(self, d: MibDefinition) -> int:
+        if d.macro == "NOTIFICATION-TYPE":
+            return KINDS.index("notification")
+        if d.macro != "OBJECT-TYPE":
+            return KINDS.index("node")
+        if d.syntax.startswith("SEQUENCE OF"):
+            return KINDS.index("table")
+        if d.index:
+            return KINDS.index("entry")
+        parent = self.definitions.get(d.components[0][0] or "") if d.components else None
+        if parent is not None and parent.index:
+            return KINDS.index("column")
+        return KINDS.index("scalar")
+
+    # ---- Écriture ----
+
+    def write_index(self, path: str) -> int:
+        """Écrit l'index binaire trié par OID ; retourne le nombre d'objets"""
+        resolved = self.resolve()
+        strings = bytearray()
+        string_refs: Dict[str, Tuple[int, int]] = {}
+
+        def sref(s: str) -> Tuple[int, int]:
+            ref = string_refs.get(s)
+            if ref is None:
+                data = s.encode("utf-8")[:0xFFFF]
+                ref = string_refs[s] = (len(strings), len(data))
+                strings.extend(data)
+            return ref
+
+        entries = []
+        for name, arcs in resolved.items():
+            d = self.definitions.get(name)
+            if d is None:
+                d = MibDefinition(name, "OBJECT IDENTIFIER")
+            syntax, enums = d.syntax, dict(d.enums)
+            if syntax in self.types:
+                enums = enums or dict(self.types[syntax][1])
+            entries.append((arcs, name, syntax, d.units, enums, ",".join(d.index), self._kind(d)))
+        entries.sort(key=lambda e: e[0])
+
+        arcs_blob = bytearray()
+        enums_blob = bytearray()
+        records = bytearray()
+        for arcs, name, syntax, units, enums, index, kind in entries:
+            arcs_off = len(arcs_blob) // 4
+            arcs_blob.extend(struct.pack(f"<{len(arcs)}I", *arcs))
+            enum_off = len(enums_blob) // ENUM.size
+            for value, label in sorted(enums.items()):
+                enums_blob.extend(ENUM.pack(value, *sref(label)))
+            records.extend(RECORD.pack(
+                arcs_off, len(arcs), *sref(name), *sref(syntax), *sref(units),
+                enum_off, len(enums), *sref(index), kind,
+            ))
+
+        records_off = HEADER.size
+        arcs_off = records_off + len(records)
+        enums_off = arcs_off + len(arcs_blob)
+        strings_off = enums_off + len(enums_blob)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(entries), records_off, arcs_off, enums_off, strings_off))
+            f.write(records)
+            f.write(arcs_blob)
+            f.write(enums_blob)
+            f.write(strings)
+        # Remplacement atomique : les lecteurs déjà mappés gardent l'ancien fichier
+        os.replace(tmp, path)
+        return len(entries)
+
+
+def iter_mib_files(paths: Iterable[str]):
+    for p in paths:
+        if os.path.isdir(p):
+            for name in sorted(os.listdir(p)):
+                full = os.path.join(p, name)
+                if os.path.isfile(full):
+                    yield full
+        else:
+            yield p
+
+
+def compile_mibs(paths: Iterable[str], output: str) -> int:
+    compiler = MibCompiler()
+    for path in iter_mib_files(paths):
+        compiler.parse_file(path)
+    return compiler.write_index(output)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Compilation de MIBs vers un index binaire")
+    parser.add_argument('paths', nargs='+', help="Fichiers MIB ou répertoires")
+    parser.add_argument('-o', '--output', default=os.getenv("MIB_INDEX", "mibs.idx"), help="Fichier index de sortie")
+    args = parser.parse_args()
+
+    try:
+        count = compile_mibs(args.paths, args.output)
+    except OSError as e:
+        logger.error(f"Erreur compilation MIB: {e}")
+        return 1
+    logger.info(f"{count} objets écrits dans {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
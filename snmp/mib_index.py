@@ -0,0 +1,158 @@
+"""
+Index binaire de MIBs compilées (voir mib_compiler.py), lu par mmap
+Résolution OID → nom, syntaxe, énumérations, unités et structure de table sans parsing
+"""
+import mmap
+import os
+import struct
+import threading
+from typing import Optional, Dict, Any, NamedTuple, Tuple
+
+MAGIC = b"SNMPMIB1"
+HEADER = struct.Struct("<8sIIIIII")      # magic, version, count, records, arcs, enums, strings
+RECORD = struct.Struct("<IHIHIHIHIHIHB")  # arcs, name, syntax, units, enums, index, kind
+ENUM = struct.Struct("<iIH")              # valeur, libellé
+FORMAT_VERSION = 1
+
+KINDS = ("node", "scalar", "table", "entry", "column", "notification")
+
+
+class MibObject(NamedTuple):
+    oid: str
+    name: str
+    syntax: str
+    units: str
+    kind: str
+    index: Tuple[str, ...]
+    enums: Dict[int, str]
+
+
+class MibIndex:
+    """
+    Lecteur de l'index compilé. Le fichier est projeté en mémoire (mmap en lecture seule) :
+    les pages sont partagées entre tous les processus qui l'ouvrent.
+    """
+
+    CACHE_SIZE = 65536
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        magic, version, self.count, self._records, self._arcs, self._enums, self._strings = \
+            HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Index MIB invalide: {path}")
+        self._cache: Dict[str, Optional[Tuple[MibObject, str]]] = {}
+
+    # ---- Accès bas niveau ----
+
+    def _record(self, i: int):
+        return RECORD.unpack_from(self._mm, self._records + i * RECORD.size)
+
+    def _record_arcs(self, i: int) -> Tuple[int, ...]:
+        off, count = struct.unpack_from("<IH", self._mm, self._records + i * RECORD.size)
+        return struct.unpack_from(f"<{count}I", self._mm, self._arcs + off * 4)
+
+    def _str(self, off: int, length: int) -> str:
+        start = self._strings + off
+        return self._mm[start:start + length].decode("utf-8")
+
+    def _find(self, arcs: Tuple[int, ...]) -> Optional[int]:
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            cur = self._record_arcs(mid)
+            if cur < arcs:
+                lo = mid + 1
+            elif cur > arcs:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def _object(self, i: int) -> MibObject:
+        (arcs_off, arcs_n, name_off, name_n, syn_off, syn_n, units_off, units_n,
+         enum_off, enum_n, idx_off, idx_n, kind) = self._record(i)
+        enums = {}
+        for k in range(enum_n):
+            value, s_off, s_n = ENUM.unpack_from(self._mm, self._enums + (enum_off + k) * ENUM.size)
+            enums[value] = self._str(s_off, s_n)
+        index = self._str(idx_off, idx_n)
+        return MibObject(
+            oid=".".join(map(str, self._record_arcs(i))),
+            name=self._str(name_off, name_n),
+            syntax=self._str(syn_off, syn_n),
+            units=self._str(units_off, units_n),
+            kind=KINDS[kind] if kind < len(KINDS) else "node",
+            index=tuple(index.split(",")) if index else (),
+            enums=enums,
+        )
+
+    # ---- API ----
+
+    def lookup(self, oid: str) -> Optional[Tuple[MibObject, str]]:
+        """Plus long préfixe défini : (objet, suffixe d'instance), ex: (ifOperStatus, "3")"""
+        if oid in self._cache:
+            return self._cache[oid]
+        try:
+            arcs = tuple(int(a) for a in oid.strip(".").split("."))
+        except ValueError:
+            return None
+        result = None
+        for depth in range(len(arcs), 0, -1):
+            i = self._find(arcs[:depth])
+            if i is not None:
+                result = (self._object(i), ".".join(map(str, arcs[depth:])))
+                break
+        if len(self._cache) >= self.CACHE_SIZE:
+            self._cache.clear()
+        self._cache[oid] = result
+        return result
+
+    def name_of(self, oid: str) -> Optional[str]:
+        found = self.lookup(oid)
+        if found is None:
+            return None
+        obj, suffix = found
+        return f"{obj.name}.{suffix}" if suffix else obj.name
+
+    def decorate(self, oid: str, value: Any = None) -> Dict[str, Any]:
+        """Nom, syntaxe, unités et libellé d'énumération d'un varbind (champs vides si inconnu)"""
+        found = self.lookup(oid)
+        if found is None:
+            return {"name": None, "syntax": None, "units": None, "enum": None}
+        obj, suffix = found
+        enum = None
+        if obj.enums and isinstance(value, int):
+            enum = obj.enums.get(value)
+        return {
+            "name": f"{obj.name}.{suffix}" if suffix else obj.name,
+            "syntax": obj.syntax or None,
+            "units": obj.units or None,
+            "enum": enum,
+        }
+
+    def close(self):
+        try:
+            self._mm.close()
+        finally:
+            self._file.close()
+
+
+_loaded: Dict[str, Optional[MibIndex]] = {}
+_load_lock = threading.Lock()
+
+
+def load_mib_index(path: Optional[str] = None) -> Optional[MibIndex]:
+    """Index partagé du processus (None si le fichier n'existe pas)"""
+    path = path or os.getenv("MIB_INDEX", "mibs.idx")
+    with _load_lock:
+        if path not in _loaded:
+            _loaded[path] = MibIndex(path) if os.path.exists(path) else None
+        return _loaded[path]
@@ -0,0 +1,204 @@
+"""
+Registre d'OIDs partagé : internement en identifiants entiers et résolution nom ↔ OID
+Arbre préfixe (trie) par arcs pour l'appartenance à un sous-arbre et le plus long préfixe nommé
+"""
+import threading
+from typing import Optional, Dict, List, Tuple
+
+from config import get_snmp_config
+
+# Racines usuelles (en plus des OIDs de SNMPConfig.system_oids) pour nommer les OIDs inconnus
+TREE_ROOTS = {
+    'iso': '1',
+    'org': '1.3',
+    'dod': '1.3.6',
+    'internet': '1.3.6.1',
+    'mgmt': '1.3.6.1.2',
+    'mib-2': '1.3.6.1.2.1',
+    'system': '1.3.6.1.2.1.1',
+    'interfaces': '1.3.6.1.2.1.2',
+    'ifTable': '1.3.6.1.2.1.2.2',
+    'ifEntry': '1.3.6.1.2.1.2.2.1',
+    'ip': '1.3.6.1.2.1.4',
+    'tcp': '1.3.6.1.2.1.6',
+    'udp': '1.3.6.1.2.1.7',
+    'host': '1.3.6.1.2.1.25',
+    'private': '1.3.6.1.4',
+    'enterprises': '1.3.6.1.4.1',
+    'snmpV2': '1.3.6.1.6',
+    'snmpTrapOID': '1.3.6.1.6.3.1.1.4.1',
+}
+
+
+# Plafond de la table d'internement : au-delà, les OIDs ne sont plus internés (table jamais purgée,
+# les identifiants restent stables)
+MAX_INTERNED = 1_000_000
+
+
+def _parse_arcs(oid: str) -> Optional[Tuple[int, ...]]:
+    """Arcs numériques de l'OID ou None si l'OID est invalide ('1.3.6.x', 'None')"""
+    try:
+        return tuple(int(a) for a in oid.split(".")) if oid else ()
+    except ValueError:
+        return None
+
+
+class _Node:
+    __slots__ = ("children", "name")
+
+    def __init__(self):
+        self.children: Dict[int, "_Node"] = {}
+        self.name: Optional[str] = None
+
+
+class OidRegistry:
+    """
+    Registre d'OIDs :
+    - intern(oid) → identifiant entier stable (et chaîne canonique partagée), borné à max_interned
+    - noms ↔ OIDs, y compris colonne de table + index (ex: ifInOctets.12)
+    - appartenance à un sous-arbre et plus long préfixe nommé via un trie
+    """
+
+    def __init__(self, names: Optional[Dict[str, str]] = None, max_interned: int = MAX_INTERNED):
+        self.max_interned = max_interned
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {}
+        self._oids: List[str] = []
+        self._arcs: List[Tuple[int, ...]] = []
+        self._root = _Node()
+        self._name_to_oid: Dict[str, str] = {}
+        self._decomposed: Dict[int, Tuple[Optional[str], str]] = {}
+        if names:
+            self.register_names(names)
+
+    # ---- Internement ----
+
+    @staticmethod
+    def normalize(oid: str) -> str:
+        return oid[1:] if oid.startswith(".") else oid
+
+    def intern(self, oid: str) -> Optional[int]:
+        """
+        Identifiant entier de l'OID (attribué à la première rencontre) ;
+        None si l'OID est invalide ou si la table est pleine
+        """
+        oid_id = self._ids.get(oid)
+        if oid_id is not None:
+            return oid_id
+        oid = self.normalize(oid)
+        arcs = _parse_arcs(oid)
+        if arcs is None:
+            return None
+        with self._lock:
+            oid_id = self._ids.get(oid)
+            if oid_id is None:
+                if len(self._oids) >= self.max_interned:
+                    return None
+                oid_id = len(self._oids)
+                self._arcs.append(arcs)
+                self._oids.append(oid)
+                self._ids[oid] = oid_id
+        return oid_id
+
+    def canonical(self, oid: str) -> str:
+        """Chaîne partagée de l'OID : évite de garder une copie par paquet (inchangée si non internée)"""
+        oid_id = self.intern(oid)
+        return self._oids[oid_id] if oid_id is not None else oid
+
+    def oid(self, oid_id: int) -> str:
+        return self._oids[oid_id]
+
+    def arcs(self, oid: str) -> Optional[Tuple[int, ...]]:
+        """Arcs numériques ; None si l'OID est invalide"""
+        oid_id = self.intern(oid)
+        return self._arcs[oid_id] if oid_id is not None else _parse_arcs(self.normalize(oid))
+
+    def __len__(self):
+        return len(self._oids)
+
+    # ---- Noms ----
+
+    def register_name(self, name: str, oid: str):
+        oid = self.normalize(oid)
+        arcs = self.arcs(oid)
+        if arcs is None:
+            raise ValueError(f"OID invalide pour {name}: {oid}")
+        node = self._root
+        for arc in arcs:
+            node = node.children.setdefault(arc, _Node())
+        node.name = name
+        self._name_to_oid[name] = oid
+        self._decomposed.clear()
+
+    def register_names(self, names: Dict[str, str]):
+        for name, oid in names.items():
+            self.register_name(name, oid)
+
+    def name_to_oid(self, name: str) -> Optional[str]:
+        """sysName, sysName.0 → 1.3.6.1.2.1.1.5.0 ; ifInOctets.12 → 1.3.6.1.2.1.2.2.1.10.12"""
+        oid = self._name_to_oid.get(name)
+        if oid is not None:
+            return oid
+        base, sep, index = name.partition(".")
+        if sep:
+            base_oid = self._name_to_oid.get(base)
+            if base_oid is not None:
+                # Scalaire déjà enregistré avec son instance (sysName = ….5.0) : .0 ne s'ajoute pas
+                if index == "0" and base_oid.endswith(".0"):
+                    return base_oid
+                return f"{base_oid}.{index}"
+        return None
+
+    def resolve(self, name_or_oid: str) -> str:
+        """Nom, nom.index ou OID numérique → OID numérique (inchangé si inconnu ou invalide)"""
+        if name_or_oid[:1].isdigit() or name_or_oid.startswith("."):
+            return self.canonical(name_or_oid)
+        oid = self.name_to_oid(name_or_oid)
+        return self.canonical(oid) if oid is not None else name_or_oid
+
+    def decompose(self, oid: str) -> Tuple[Optional[str], str]:
+        """
+        Plus long préfixe nommé : (nom, suffixe d'index).
+        Ex: 1.3.6.1.2.1.2.2.1.10.12 → ("ifInOctets", "12") ; OID invalide → (None, oid)
+        """
+        oid_id = self.intern(oid)
+        if oid_id is None:
+            arcs = _parse_arcs(self.normalize(oid))
+            if arcs is None:
+                return None, oid
+        else:
+            cached = self._decomposed.get(oid_id)
+            if cached is not None:
+                return cached
+            arcs = self._arcs[oid_id]
+        node, best_name, best_depth = self._root, None, 0
+        for depth, arc in enumerate(arcs, 1):
+            node = node.children.get(arc)
+            if node is None:
+                break
+            if node.name is not None:
+                best_name, best_depth = node.name, depth
+        index = ".".join(str(a) for a in arcs[best_depth:])
+        result = (best_name, index)
+        if oid_id is not None:
+            self._decomposed[oid_id] = result
+        return result
+
+    def name_of(self, oid: str, default: Optional[str] = None) -> Optional[str]:
+        """Nom lisible (ifInOctets.12, sysName) ou default si aucun préfixe connu"""
+        name, index = self.decompose(oid)
+        if name is None:
+            return default
+        return f"{name}.{index}" if index else name
+
+    # ---- Sous-arbres ----
+
+    def in_subtree(self, oid: str, root: str) -> bool:
+        """Vrai si oid est root ou un descendant de root (faux si l'un des deux est invalide)"""
+        a = self.arcs(oid)
+        r = self.arcs(root)
+        return a is not None and r is not None and a[:len(r)] == r
+
+
+# Instance partagée par l'analyseur, l'envoyeur, le moteur de règles et l'API
+registry = OidRegistry({**TREE_ROOTS, **get_snmp_config().system_oids})
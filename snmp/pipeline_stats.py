@@ -0,0 +1,186 @@
+"""
+Profilage du pipeline de capture : durée de chaque étape dans un histogramme logarithmique
+et compteurs de paquets. Exposé par un dump texte (SIGUSR1), une ligne de log JSON périodique
+et, en option, le format texte Prometheus sur http://<hôte>:<port>/metrics
+Dépend uniquement de la bibliothèque standard et de latency.py (histogrammes)
+"""
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any, Callable, Iterable
+
+from latency import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Étapes de process_packet, dans l'ordre d'exécution
+STAGES = ("parse", "track", "print", "device_lookup", "db_write", "stats", "anomaly", "publish")
+COUNTERS = {
+    "packets": "Paquets reçus de la capture",
+    "snmp_packets": "Paquets SNMP décodés",
+    "dropped": "Paquets écartés (non SNMP ou indécodables)",
+    "errors": "Paquets abandonnés sur erreur de traitement",
+}
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class PipelineProfiler:
+    """
+    Temps passé par étape (horloge monotone en ns) : histogramme à mémoire constante
+    et total cumulé par étape, plus compteurs de paquets. Un enregistrement coûte
+    un appel d'horloge et un incrément de bucket (O(1), sans allocation).
+    Écrit par le seul thread de capture ; les lectures depuis d'autres threads sont
+    approchées (pas de verrou sur le chemin chaud).
+    """
+
+    def __init__(self, stages: Iterable[str] = STAGES, clock=time.perf_counter_ns):
+        self.clock = clock
+        self.histograms = {s: LatencyHistogram(min_value=1e-7, max_value=10.0, precision=0.05) for s in stages}
+        self.totals_ns = dict.fromkeys(self.histograms, 0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.started = time.time()
+
+    def record(self, stage: str, start_ns: int) -> int:
+        """Enregistre la durée de `stage` depuis start_ns ; renvoie l'instant de fin (début de l'étape suivante)"""
+        now = self.clock()
+        elapsed = now - start_ns
+        self.histograms[stage].record(elapsed * 1e-9)
+        self.totals_ns[stage] += elapsed
+        return now
+
+    def wrap(self, stage: str, fn: Callable) -> Callable:
+        """`fn` chronométrée comme étape `stage` (durée enregistrée aussi si fn lève)"""
+        clock, record = self.clock, self.record
+
+        def timed(*args):
+            start = clock()
+            try:
+                return fn(*args)
+            finally:
+                record(stage, start)
+
+        timed.__name__ = getattr(fn, "__name__", stage)
+        return timed
+
+    def snapshot(self) -> Dict[str, Any]:
+        stages = {}
+        for name, hist in self.histograms.items():
+            p50, p95, p99 = hist.quantiles(QUANTILES)
+            stages[name] = {
+                "count": hist.count,
+                "total_s": self.totals_ns[name] / 1e9,
+                "p50_s": p50, "p95_s": p95, "p99_s": p99,
+                "max_s": hist.max_seen if hist.count else None,
+            }
+        return {"uptime_s": round(time.time() - self.started, 3), "counters": dict(self.counters), "stages": stages}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), separators=(",", ":"))
+
+    def format_table(self) -> str:
+        """Tableau lisible (µs) pour le dump SIGUSR1"""
+        snap = self.snapshot()
+        us = lambda v: "-" if v is None else f"{v * 1e6:.1f}"
+        lines = [
+            f"\n--- Profil du pipeline ({snap['uptime_s']:.0f}s) ---",
+            "  ".join(f"{k}={v}" for k, v in snap["counters"].items()),
+            f"{'étape':<14}{'n':>10}{'total s':>10}{'p50 µs':>10}{'p95 µs':>10}{'p99 µs':>10}{'max µs':>10}",
+        ]
+        for name, s in snap["stages"].items():
+            lines.append(f"{name:<14}{s['count']:>10}{s['total_s']:>10.3f}"
+                         f"{us(s['p50_s']):>10}{us(s['p95_s']):>10}{us(s['p99_s']):>10}{us(s['max_s']):>10}")
+        return "\n".join(lines)
+
+    def prometheus_text(self, prefix: str = "snmp_capture") -> str:
+        """Format d'exposition texte Prometheus : compteurs + résumé (quantiles) par étape"""
+        lines = []
+        for name, help_text in COUNTERS.items():
+            metric = f"{prefix}_{name}_total"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter", f"{metric} {self.counters[name]}"]
+        metric = f"{prefix}_stage_seconds"
+        lines += [f"# HELP {metric} Durée de traitement par étape du pipeline", f"# TYPE {metric} summary"]
+        for name, hist in self.histograms.items():
+            for q, v in zip(QUANTILES, hist.quantiles(QUANTILES)):
+                lines.append(f'{metric}{{stage="{name}",quantile="{q}"}} {"NaN" if v is None else repr(v)}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {self.totals_ns[name] / 1e9!r}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {hist.count}')
+        return "\n".join(lines) + "\n"
+
+
+class NullProfiler:
+    """Profilage désactivé : étapes non chronométrées (wrap renvoie la fonction), compteurs non exposés"""
+
+    def __init__(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def wrap(self, stage: str, fn: Callable) -> Callable:
+        return fn
+
+
+class ProfileReporter:
+    """Ligne de log JSON toutes les log_interval secondes et serveur /metrics optionnel (port > 0)"""
+
+    def __init__(self, profiler: PipelineProfiler, log_interval: int = 60, prometheus_port: int = 0,
+                 host: str = "127.0.0.1"):
+        self.profiler = profiler
+        self.log_interval = log_interval
+        self.prometheus_port = prometheus_port
+        self.host = host
+        self.server: Optional[ThreadingHTTPServer] = None
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        self._stop.clear()
+        if self.log_interval > 0:
+            self._spawn(self._log_loop)
+        if self.prometheus_port > 0:
+            try:
+                self.server = ThreadingHTTPServer((self.host, self.prometheus_port), self._handler())
+            except OSError as e:
+                logger.error(f"Endpoint Prometheus indisponible (port {self.prometheus_port}): {e}")
+            else:
+                self._spawn(self.server.serve_forever)
+                logger.info(f"Métriques Prometheus sur http://{self.host}:{self.server.server_port}/metrics")
+
+    def stop(self):
+        self._stop.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        for t in self._threads:
+            t.join(timeout=1)
+        self._threads = []
+        logger.info(f"pipeline_stats {self.profiler.to_json()}")
+
+    def _spawn(self, target):
+        t = threading.Thread(target=target, daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def _log_loop(self):
+        while not self._stop.wait(self.log_interval):
+            logger.info(f"pipeline_stats {self.profiler.to_json()}")
+
+    def _handler(self):
+        profiler = self.profiler
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = profiler.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return MetricsHandler
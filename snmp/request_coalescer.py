@@ -0,0 +1,83 @@
+"""
+Dédoublonnage des requêtes SNMP en vol et cache à durée de vie courte par (cible, community, OID)
+Plusieurs appelants demandant la même valeur pendant un aller-retour attendent une seule requête
+Dépend uniquement de la bibliothèque standard : importable en `request_coalescer` ou `snmp.request_coalescer`
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Hashable, Tuple
+
+
+class RequestCoalescer:
+    """
+    Appelle `fetch(*key)` au plus une fois par clé en vol : les appelants concurrents
+    partagent le résultat (ou l'exception) du premier. Avec ttl > 0, un résultat réussi
+    (`is_cacheable` : success sans champ error) est resservi pendant ttl secondes sans requête vers l'équipement.
+    Sûr entre threads (serveur WSGI multi-threads).
+    """
+
+    def __init__(self, fetch: Callable[..., Dict[str, Any]], ttl: float = 0.0, max_entries: int = 10000,
+                 is_cacheable: Callable[[Dict[str, Any]], bool] = lambda r: bool(r.get("success")) and not r.get("error"),
+                 clock: Callable[[], float] = time.monotonic):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.is_cacheable = is_cacheable
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._stale = set()           # clés invalidées pendant leur requête : résultat non mis en cache
+        self._cache: "OrderedDict[Hashable, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.stats = {"fetches": 0, "coalesced": 0, "cache_hits": 0}
+
+    def get(self, *key) -> Tuple[Dict[str, Any], str]:
+        """(résultat, source) ; source : "device", "coalesced" (requête en vol partagée) ou "cache" """
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                if entry[0] > self.clock():
+                    self.stats["cache_hits"] += 1
+                    return entry[1], "cache"
+                del self._cache[key]
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+                self.stats["fetches"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            return future.result(), "coalesced"
+
+        try:
+            result = self.fetch(*key)
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+                self._stale.discard(key)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._in_flight[key]
+            stale = key in self._stale
+            self._stale.discard(key)
+            if self.ttl > 0 and not stale and self.is_cacheable(result):
+                self._cache[key] = (self.clock() + self.ttl, result)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        future.set_result(result)
+        return result, "device"
+
+    def invalidate(self, match: Callable[[tuple], bool]) -> None:
+        """Oublie les valeurs dont la clé vérifie `match` (ex. après un SET), y compris celles en vol"""
+        with self._lock:
+            for key in [k for k in self._cache if match(k)]:
+                del self._cache[key]
+            self._stale.update(k for k in self._in_flight if match(k))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
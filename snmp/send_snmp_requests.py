@@ -13,13 +13,19 @@ import logging
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
 import concurrent.futures
-import re
 import threading
 import ipaddress
 import json
 from scapy.all import *
 from scapy.layers.snmp import *
 
+from config import get_export_config
+from export_stream import FORMATS, ExportSizeExceeded, export_stream
+from metric_rules import MetricRulesEngine
+from oid_registry import registry
+import storage
+from snmp_decoder import typed_value
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -68,8 +74,16 @@ class SNMPSender:
         ],
     }
     
+    @staticmethod
+    def _oid_str(vb) -> str:
+        """OID pointé d'un varbind scapy (chaîne canonique du registre partagé)"""
+        return registry.canonical(str(getattr(vb.oid, "val", vb.oid)))
+
     def __init__(self, db_config: Optional[Dict] = None):
         self.db_config = db_config
+        self.writer: Optional[storage.BatchWriter] = None
+        # Règles sur les valeurs pollées (seuils, taux, lignes de base), évaluées à chaque poll
+        self.metric_rules = MetricRulesEngine()
         self.results = []
         self.stats = {
             'sent': 0,
@@ -96,13 +110,10 @@ class SNMPSender:
             else:
                 logger.warning(f"Preset inconnu: {preset}")
 
-        # OIDs passés directement
+        # OIDs passés directement (noms, nom.index ou OIDs numériques)
         if oids:
             for oid in oids:
-                if oid in self.COMMON_OIDS:
-                    resolved.append(self.COMMON_OIDS[oid])
-                else:
-                    resolved.append(oid)
+                resolved.append(registry.resolve(oid))
 
         # Évite les doublons
         return list(dict.fromkeys(resolved))
@@ -167,7 +178,7 @@ class SNMPSender:
                 snmp_layer = response[SNMP]
                 if hasattr(snmp_layer, 'PDU') and hasattr(snmp_layer.PDU, 'varbindlist'):
                     for vb in snmp_layer.PDU.varbindlist:
-                        oid = str(vb.oid)
+                        oid = self._oid_str(vb)
                         value = vb.value
                         result['values'][oid] = value
                 
@@ -285,6 +296,7 @@ class SNMPSender:
             'error': None
         }
         
+        start_oid = registry.resolve(start_oid)
         current_oid = start_oid
         start_time = time.time()
         
@@ -313,11 +325,11 @@ class SNMPSender:
                     break
                 
                 vb = snmp_layer.PDU.varbindlist[0]
-                next_oid = str(vb.oid)
+                next_oid = self._oid_str(vb)
                 value = vb.value
                 
                 # Vérification si on a dépassé la table
-                if not next_oid.startswith(start_oid.rsplit('.', 1)[0]):
+                if not registry.in_subtree(next_oid, start_oid.rsplit('.', 1)[0]):
                     break
                 
                 result['values'][next_oid] = value
@@ -359,9 +371,7 @@ class SNMPSender:
         # Construction des varbinds
         vb_list = []
         for oid, value in varbinds.items():
-            if oid in self.COMMON_OIDS:
-                oid = self.COMMON_OIDS[oid]
-            vb_list.append(SNMPvarbind(oid=oid, value=value))
+            vb_list.append(SNMPvarbind(oid=registry.resolve(oid), value=value))
 
         # PDU Trap v2
         pdu = SNMPtrapv2(
@@ -441,12 +451,7 @@ class SNMPSender:
         elif req_type == "SET":
             values = params.get("values") or {}
             # On mappe les éventuels noms vers leurs vrais OIDs
-            oid_values = {}
-            for key, val in values.items():
-                if key in self.COMMON_OIDS:
-                    oid_values[self.COMMON_OIDS[key]] = val
-                else:
-                    oid_values[key] = val
+            oid_values = {registry.resolve(key): val for key, val in values.items()}
             return self.send_set_request(
                 target_ip=target,
                 oid_values=oid_values,
@@ -547,7 +552,7 @@ class SNMPSender:
                 snmp_layer = response[SNMP]
                 if hasattr(snmp_layer, 'PDU') and hasattr(snmp_layer.PDU, 'varbindlist'):
                     for vb in snmp_layer.PDU.varbindlist:
-                        oid = str(vb.oid)
+                        oid = self._oid_str(vb)
                         value = vb.value
                         result['values'][oid] = value
                 
@@ -651,54 +656,68 @@ class SNMPSender:
         except KeyboardInterrupt:
             logger.info("Polling interrompu par l'utilisateur")
         
+        if self.writer is not None:
+            self.writer.flush()
         logger.info(f"Polling terminé - {poll_count} polls effectués")
     
+    def _metrics_writer(self) -> Optional[storage.BatchWriter]:
+        """Écrivain par lots sur la base commune, ouvert au premier enregistrement"""
+        if self.writer is None:
+            conn = self.db_config.get('conn')
+            if conn is None:
+                conn = storage.connect(storage.resolve_path(self.db_config.get('db_path', storage.DEFAULT_DB)),
+                                       check_same_thread=False)
+                storage.init_schema(conn)
+            self.writer = storage.BatchWriter(conn, batch_size=self.db_config.get('batch_size', 500),
+                                              flush_interval=self.db_config.get('flush_interval', 1.0))
+        return self.writer
+
     def _save_metrics_to_db(self, target_ip: str, result: Dict) -> None:
-        """Sauvegarde les métriques en base SQLite"""
+        """
+        Ajoute les métriques d'un poll au lot en cours (table snmp_metrics commune) après
+        évaluation des règles sur ce même lot ; les violations sont écrites dans snmp_anomalies
+        """
         if not self.db_config:
             return
 
         try:
-            conn = self.db_config.get('conn')  
-            if conn is None:
-                logger.error("Connexion SQLite manquante pour sauvegarde")
-                return
-
-            cur = conn.cursor()
-
-            # Récupération de l'id device
-            cur.execute("SELECT id FROM devices WHERE ip_address = ?", (target_ip,))
-            device_row = cur.fetchone()
-            device_id = device_row[0] if device_row else None
-
+            writer = self._metrics_writer()
+            with writer.lock:
+                device_id = storage.device_id(writer.conn, target_ip)
+            ts = storage.utc_ts(result['timestamp'])
+            latency_ms = int(result['response_time'] * 1000) if result['response_time'] else None
+            rows, oids, nums, vtypes = [], [], [], []
             for oid, value in result['values'].items():
-                value_num = None
-                try:
-                    if isinstance(value, (int, float)):
-                        value_num = float(value)
-                    elif isinstance(value, str):
-                        numbers = re.findall(r'-?\d+\.?\d*', str(value))
-                        if numbers:
-                            value_num = float(numbers[0])
-                except:
-                    pass
-
-                cur.execute("""
-                    INSERT INTO metrics (device_id, ts, oid, value_raw, value_num, latency_ms)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    device_id,
-                    result['timestamp'],
-                    oid,
-                    str(value),
-                    value_num,
-                    int(result['response_time'] * 1000) if result['response_time'] else None
-                ))
-            conn.commit()
+                # Valeur ASN.1 scapy : type SMI conservé, entiers convertis directement
+                vtype, value = typed_value(value)
+                num = storage.numeric_value(value, vtype)
+                rows.append((ts, target_ip, device_id, oid, storage.value_text(value), vtype, num, latency_ms))
+                oids.append(oid)
+                nums.append(num)
+                vtypes.append(vtype)
+            violations = self.metric_rules.evaluate_batch(
+                target_ip, oids, nums, result['timestamp'].timestamp(), vtypes)
+            writer.add_many(storage.INSERT_METRIC_SQL, rows)
+            if violations:
+                writer.add_many(storage.INSERT_ANOMALY_SQL, [
+                    (ts, target_ip, v.message(), v.rule.severity, v.rule.name) for v in violations
+                ])
+                # Alertes visibles sans attendre le prochain lot (comme DatabaseManager.insert_anomaly)
+                writer.flush()
+                for v in violations:
+                    logger.warning(v.message())
         except Exception as e:
             logger.error(f"Erreur sauvegarde métriques SQLite: {e}")
 
-    
+    def close(self) -> None:
+        """Écrit les métriques en attente et ferme la base ouverte par le sender"""
+        if self.writer is None:
+            return
+        self.writer.close()
+        if self.db_config.get('conn') is None:
+            self.writer.conn.close()
+        self.writer = None
+
     def print_statistics(self):
         """Affiche les statistiques globales"""
         print(f"\n{'='*50}")
@@ -726,31 +745,40 @@ class SNMPSender:
                 print(f"Temps de réponse moyen: {avg_time*1000:.1f}ms")
                 print(f"Temps de réponse min/max: {min_time*1000:.1f}ms / {max_time*1000:.1f}ms")
     
-    def export_results(self, filename: str = None):
-        """Exporte les résultats en JSON"""
+    def export_results(self, filename: str = None, fmt: Optional[str] = None) -> Optional[str]:
+        """
+        Exporte les résultats en flux (json, ndjson ou csv selon l'extension) ;
+        gzip et taille maximale selon ExportConfig. Retourne le fichier écrit.
+        """
+        export = get_export_config()
         if not filename:
-            filename = f"snmp_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        
-        
-        # Préparation des données pour JSON
-        export_data = {
-            'statistics': self.stats,
-            'results': []
-        }
-        
-        for result in self.results:
-            # Conversion datetime en string
-            result_copy = result.copy()
-            if 'timestamp' in result_copy:
-                result_copy['timestamp'] = result_copy['timestamp'].isoformat()
-            export_data['results'].append(result_copy)
-        
+            filename = f"snmp_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt or 'json'}"
+        if fmt is None:
+            ext = filename[:-3] if filename.endswith(".gz") else filename
+            ext = os.path.splitext(ext)[1].lstrip(".").lower()
+            fmt = ext if ext in FORMATS else "json"
+        compress = export.compress_exports or filename.endswith(".gz")
+        if compress and not filename.endswith(".gz"):
+            filename += ".gz"
+
+        # JSON : même structure qu'avant ({"statistics": ..., "results": [...]}), écrite au fil de l'eau
+        prefix = f'{{\n  "statistics": {json.dumps(self.stats)},\n  "results": ' if fmt == "json" else ""
+        chunks = export_stream(
+            iter(self.results), fmt, compress=compress, max_bytes=export.max_export_size,
+            prefix=prefix, suffix="\n}" if fmt == "json" else "", indent=2,
+        )
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, indent=2, ensure_ascii=False)
+            with open(filename, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
             logger.info(f"Résultats exportés vers {filename}")
+            return filename
+        except ExportSizeExceeded as e:
+            os.remove(filename)
+            logger.error(f"Export annulé: {e}")
         except Exception as e:
             logger.error(f"Erreur lors de l'export: {e}")
+        return None
 
 logger = logging.getLogger(__name__)
 
@@ -766,7 +794,7 @@ def main():
     parser.add_argument('-c', '--community', default='public', help="Community string SNMP")
     parser.add_argument('-t', '--timeout', type=float, default=2.0, help="Timeout en secondes")
     parser.add_argument('-r', '--retries', type=int, default=1, help="Nombre de retries")
-    parser.add_argument('--db-path', default='snmp_local.db', help="Chemin vers fichier SQLite")
+    parser.add_argument('--db-path', default=storage.DEFAULT_DB, help="Chemin vers fichier SQLite (relatif à snmp/)")
     parser.add_argument('--no-db', action='store_true', help="Désactive la sauvegarde en base de données")
 
     # Modes exclusifs : soit une requête SNMP standard, soit discovery/poll/sysinfo
@@ -816,7 +844,7 @@ def main():
     parser.add_argument('--threads', type=int, default=10, help="Threads pour discovery")
 
     # Export
-    parser.add_argument('--export', help="Fichier d'export des résultats (JSON)")
+    parser.add_argument('--export', help="Fichier d'export des résultats (.json, .ndjson ou .csv, gzip selon EXPORT_COMPRESS)")
 
     args = parser.parse_args()
 
@@ -943,11 +971,9 @@ def main():
 
             if result.get("values"):
                 print(f"\nInformations système de {args.target} :")
-                # mapping inverse OID -> nom si possible
-                oid_names = {v: k for k, v in sender.COMMON_OIDS.items()}
+                # mapping inverse OID -> nom via le registre partagé
                 for oid, value in result["values"].items():
-                    name = oid_names.get(oid, oid)
-                    print(f"  {name}: {value}")
+                    print(f"  {registry.name_of(oid, oid)}: {value}")
             else:
                 print("\nAucune donnée reçue pour sysinfo.")
 
@@ -960,6 +986,7 @@ def main():
     except Exception as e:
         logger.error(f"Erreur: {e}")
     finally:
+        sender.close()
         sender.print_statistics()
 
 
@@ -6,7 +6,8 @@ import os
 import argparse            # Analyse des arguments en ligne de commande
 import sys                 # Fonctions système (ex: exit, arguments, stdout)
 import logging             # Journalisation des erreurs et informations
-from collections import defaultdict  # Dictionnaire avec valeur par défaut, utile pour stats/anomalies
+import signal              # Signaux de dump : derniers paquets (SIGUSR2), profil du pipeline (SIGUSR1)
+from collections import defaultdict, deque  # Dictionnaire avec valeur par défaut, utile pour stats/anomalies
 from datetime import datetime, timedelta  # Gestion des dates et durées
 from typing import Optional, Dict, List, Any  # Annotations de type pour meilleure lisibilité/IDE
 from dotenv import load_dotenv  # Chargement des variables d'environnement depuis fichier .env
@@ -15,16 +16,23 @@ import threading           # Gestion de threads (ex: nettoyage cache asynchrone)
 import time                # Gestion de temporisations et délais
 
 import json                # Sérialisation/désérialisation JSON (ex: logs ou config)
-from dataclasses import dataclass, asdict  # Simplifie la définition de classes de données
 
 import statistics          # Calculs statistiques (moyennes, médianes, etc.)
 
-import sqlite3             # Module SQLite pour base locale fichier .db
 
 # Import réseau et SNMP - capture et parsing paquet
 from scapy.all import sniff, SNMP, IP, UDP, Packet  
 from scapy.layers.snmp import *  # Protocol SNMP spécifique à scapy
 
+from config import get_analysis_config, get_capture_config, get_snmp_config
+from frame_ring import FrameRing, REQUEST_TYPES, VERSIONS, default_path as default_frame_ring_path
+from latency import LatencyTracker
+from mib_index import load_mib_index
+from metric_rules import MetricRulesEngine
+from oid_registry import registry
+from pipeline_stats import NullProfiler, PipelineProfiler, ProfileReporter
+from snmp_decoder import typed_value
+
 # Configuration logging
 logging.basicConfig(
     level=logging.INFO,
@@ -37,60 +45,160 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 load_dotenv()
 
-@dataclass
+# Décalage horloge monotone → horloge murale, figé au démarrage
+_EPOCH_OFFSET_NS = time.time_ns() - time.monotonic_ns()
+# epoch_ns plausible : après 2001-09-09 (10**18 ns) ; écarte secondes et millisecondes
+_MIN_EPOCH_NS = 10 ** 18
+
+
 class SNMPPacketInfo:
-    """Classe pour stocker les informations d'un paquet SNMP"""
-    timestamp: datetime
-    source_ip: str
-    dest_ip: str
-    source_port: int
-    dest_port: int
-    version: str
-    community_or_user: str
-    request_type: str
-    oids: List[Dict[str, Any]]
-    enterprise_oid: Optional[str] = None
-    packet_size: int = 0
-    response_time: Optional[float] = None
-    error_status: Optional[str] = None
+    """
+    Représentation compacte d'un paquet SNMP.
+    Slots, chaînes internées (IP, version, community, type) et varbinds en tuples
+    parallèles (oid_list, values, value_types : type SMI ou None si inconnu) ;
+    horodatage en nanosecondes d'horloge monotone.
+    """
+    __slots__ = (
+        "ts_ns", "source_ip", "dest_ip", "source_port", "dest_port", "version",
+        "community_or_user", "request_type", "oid_list", "values", "value_types",
+        "enterprise_oid", "packet_size", "response_time", "error_status", "request_id",
+    )
+
+    def __init__(self, ts_ns: int, source_ip: str, dest_ip: str, source_port: int, dest_port: int,
+                 version: str, community_or_user: str, request_type: str,
+                 oid_list: tuple = (), values: tuple = (), value_types: tuple = (),
+                 enterprise_oid: Optional[str] = None, packet_size: int = 0,
+                 response_time: Optional[float] = None, error_status: Optional[str] = None,
+                 request_id: Optional[int] = None):
+        intern = sys.intern
+        self.ts_ns = ts_ns
+        self.source_ip = intern(source_ip)
+        self.dest_ip = intern(dest_ip)
+        self.source_port = source_port
+        self.dest_port = dest_port
+        self.version = intern(version)
+        self.community_or_user = intern(community_or_user)
+        self.request_type = intern(request_type)
+        self.oid_list = oid_list
+        self.values = values
+        self.value_types = value_types or (None,) * len(values)
+        self.enterprise_oid = enterprise_oid
+        self.packet_size = packet_size
+        self.response_time = response_time
+        self.error_status = error_status
+        self.request_id = request_id
+
+    @property
+    def timestamp(self) -> datetime:
+        """Horodatage mural (datetime), calculé à la demande"""
+        return datetime.fromtimestamp((self.ts_ns + _EPOCH_OFFSET_NS) / 1e9)
+
+    @property
+    def oids(self) -> List[Dict[str, Any]]:
+        """Varbinds sous l'ancienne forme [{"oid": ..., "value": ...}] (+ "type" si connu)"""
+        return [{"oid": o, "value": v} if t is None else {"oid": o, "value": v, "type": t}
+                for o, v, t in zip(self.oid_list, self.values, self.value_types)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Conversion vers l'ancienne forme dict (timestamp datetime, oids en liste de dicts) + epoch_ns"""
+        return {
+            "timestamp": self.timestamp,
+            "epoch_ns": self.ts_ns + _EPOCH_OFFSET_NS,
+            "source_ip": self.source_ip,
+            "dest_ip": self.dest_ip,
+            "source_port": self.source_port,
+            "dest_port": self.dest_port,
+            "version": self.version,
+            "community_or_user": self.community_or_user,
+            "request_type": self.request_type,
+            "oids": self.oids,
+            "enterprise_oid": self.enterprise_oid,
+            "packet_size": self.packet_size,
+            "response_time": self.response_time,
+            "error_status": self.error_status,
+            "request_id": self.request_id,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SNMPPacketInfo":
+        """
+        Construction depuis l'ancienne forme dict. Horodatage : epoch_ns (entier, nanosecondes
+        depuis l'epoch) prioritaire, sinon timestamp (datetime), sinon l'instant présent ;
+        ValueError si l'un ou l'autre est d'un autre type ou hors plage.
+        """
+        epoch_ns, ts = data.get("epoch_ns"), data.get("timestamp")
+        if epoch_ns is not None:
+            if isinstance(epoch_ns, bool) or not isinstance(epoch_ns, int) or epoch_ns < _MIN_EPOCH_NS:
+                raise ValueError(f"epoch_ns must be an integer count of nanoseconds since the epoch: {epoch_ns!r}")
+            ts_ns = epoch_ns - _EPOCH_OFFSET_NS
+        elif isinstance(ts, datetime):
+            ts_ns = int(ts.timestamp() * 1e9) - _EPOCH_OFFSET_NS
+        elif ts is None:
+            ts_ns = time.monotonic_ns()
+        else:
+            raise ValueError(f"timestamp must be a datetime (use epoch_ns for nanoseconds since the epoch): {ts!r}")
+        varbinds = data.get("oids") or []
+        return cls(
+            ts_ns=ts_ns,
+            source_ip=data.get("source_ip", ""),
+            dest_ip=data.get("dest_ip", ""),
+            source_port=data.get("source_port", 0),
+            dest_port=data.get("dest_port", 0),
+            version=data.get("version", ""),
+            community_or_user=data.get("community_or_user", ""),
+            request_type=data.get("request_type", "unknown"),
+            oid_list=tuple(vb.get("oid") for vb in varbinds),
+            values=tuple(vb.get("value") for vb in varbinds),
+            value_types=tuple(vb.get("type") for vb in varbinds),
+            enterprise_oid=data.get("enterprise_oid"),
+            packet_size=data.get("packet_size", 0),
+            response_time=data.get("response_time"),
+            error_status=data.get("error_status"),
+            request_id=data.get("request_id"),
+        )
+
+    def __repr__(self):
+        return (f"SNMPPacketInfo({self.request_type} {self.source_ip}:{self.source_port} → "
+                f"{self.dest_ip}:{self.dest_port}, {len(self.oid_list)} varbinds)")
 
 logger = logging.getLogger(__name__)
 
-import os
-import sqlite3
-from typing import Optional, Dict
 import logging
 
+import storage
+
 logger = logging.getLogger(__name__)
 
 class DatabaseManager:
-    """Gestionnaire SQLite avec création/nettoyage base locale (fichier .db)"""
+    """
+    Base locale de l'analyseur sur le moteur de stockage commun (storage.py) :
+    même schéma et mêmes index que le polling et l'API Flask. Métriques et traps
+    écrites par lots (BatchWriter), anomalies écrites immédiatement.
+    """
     RETENTION_DAYS = 30
-    def __init__(self, db_path: str = "snmp_local.db"):
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        self.db_path = os.path.join(base_dir, db_path)
+    def __init__(self, db_path: str = storage.DEFAULT_DB, batch_size: int = 500, flush_interval: float = 1.0):
+        self.db_path = storage.resolve_path(db_path)
         self.conn = None
-        self.init_database()
+        self.writer = None
+        self.init_database(batch_size, flush_interval)
 
-    def init_database(self):
+    def init_database(self, batch_size: int = 500, flush_interval: float = 1.0):
         new_db = not os.path.exists(self.db_path)
         try:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row
+            self.conn = storage.connect(self.db_path, check_same_thread=False)
 
             # Sécuriser accès fichier sqlite
             os.chmod(self.db_path, 0o600)
 
-            # pragmas  pour sécurité et intégrité
-            self.conn.execute("PRAGMA foreign_keys=ON;")
-            self.conn.execute("PRAGMA journal_mode=WAL;")
-            self.conn.execute("PRAGMA synchronous=NORMAL;")
-
             if new_db:
                 logger.info(f"Création d'une nouvelle base SQLite {self.db_path}")
-                self._create_or_reset_tables()
             else:
                 logger.info(f"Connexion à la base SQLite existante {self.db_path}")
+            backfill = storage.init_schema(self.conn)
+            self.writer = storage.BatchWriter(self.conn, batch_size=batch_size, flush_interval=flush_interval)
+            if backfill:
+                # Base antérieure aux compteurs d'alertes : rattrapage
+                self.rebuild_alert_counters()
 
             # ⚠️ Nettoyage automatique des données de plus de 30 jours
             self._cleanup_old_records()
@@ -102,8 +210,10 @@ class DatabaseManager:
     def _cleanup_old_records(self):
             """Supprime les enregistrements de plus de RETENTION_DAYS jours"""
             try:
+                self.writer.flush()
                 cur = self.conn.cursor()
-                cur.executescript(f"""
+                with self.writer.lock:
+                    cur.executescript(f"""
                     DELETE FROM snmp_metrics
                     WHERE ts < datetime('now', '-{self.RETENTION_DAYS} days');
 
@@ -112,160 +222,106 @@ class DatabaseManager:
 
                     DELETE FROM snmp_anomalies
                     WHERE ts < datetime('now', '-{self.RETENTION_DAYS} days');
-                """)
-                self.conn.commit()
+
+                    DELETE FROM snmp_alert_counts_hourly WHERE count <= 0;
+                    DELETE FROM snmp_alert_counts_source WHERE count <= 0;
+                    """)
+                    self.conn.commit()
                 logger.info(f"Nettoyage des données > {self.RETENTION_DAYS} jours effectué.")
             except Exception as e:
                 logger.error(f"Erreur lors du nettoyage des anciennes données : {e}")
                 self.conn.rollback()
 
-    def _create_or_reset_tables(self):
-        schema_sql = """
-        CREATE TABLE IF NOT EXISTS snmp_metrics (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            source_ip TEXT NOT NULL,
-            device_id INTEGER,
-            oid TEXT NOT NULL,
-            value_raw TEXT,
-            value_num REAL,
-            latency_ms INTEGER,
-            FOREIGN KEY(device_id) REFERENCES devices(id) ON DELETE SET NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS snmp_traps (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            source_ip TEXT,
-            device_id INTEGER,
-            version TEXT,
-            community_or_user TEXT,
-            enterprise_oid TEXT,
-            severity TEXT,
-            varbinds TEXT,
-            FOREIGN KEY(device_id) REFERENCES devices(id) ON DELETE SET NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS snmp_anomalies (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            source_ip TEXT,
-            description TEXT,
-            severity TEXT,
-            type TEXT
-        );
-
-        CREATE TABLE IF NOT EXISTS devices (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            ip_address TEXT NOT NULL UNIQUE,
-            location TEXT,
-            tags TEXT,
-            enabled INTEGER DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        """
-        cur = self.conn.cursor()
-        cur.executescript(schema_sql)
-        self.conn.commit()
-        logger.info("Tables SNMP SQLite créées ou vérifiées.")
+    def rebuild_alert_counters(self) -> int:
+        """Recalcule les compteurs depuis snmp_anomalies ; renvoie le nombre d'anomalies comptées"""
+        self.writer.flush()
+        try:
+            self.writer.lock.acquire()
+            cur = self.conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")   # verrou d'écriture : pas d'insertion pendant le recalcul
+            cur.execute("DELETE FROM snmp_alert_counts_hourly")
+            cur.execute("DELETE FROM snmp_alert_counts_source")
+            cur.execute("""
+                INSERT INTO snmp_alert_counts_hourly (hour, severity, count)
+                SELECT strftime('%Y-%m-%d %H:00:00', ts), COALESCE(severity, 'warning'), COUNT(*)
+                FROM snmp_anomalies GROUP BY 1, 2
+            """)
+            cur.execute("""
+                INSERT INTO snmp_alert_counts_source (source_ip, severity, count)
+                SELECT source_ip, COALESCE(severity, 'warning'), COUNT(*)
+                FROM snmp_anomalies WHERE source_ip IS NOT NULL GROUP BY 1, 2
+            """)
+            self.conn.commit()
+            cur.execute("SELECT COALESCE(SUM(count), 0) FROM snmp_alert_counts_hourly")
+            return cur.fetchone()[0]
+        except Exception as e:
+            logger.error(f"Erreur recalcul des compteurs d'alertes : {e}")
+            self.conn.rollback()
+            raise
+        finally:
+            self.writer.lock.release()
 
+    def alert_counts_by_hour(self, hours: int = 24) -> List[Dict]:
+        """[{hour, severity, count}] des `hours` dernières heures (lecture des compteurs, sans GROUP BY)"""
+        cur = self.conn.cursor()
+        cur.execute("""
+            SELECT hour, severity, count FROM snmp_alert_counts_hourly
+            WHERE hour >= strftime('%Y-%m-%d %H:00:00', 'now', ?) AND count > 0
+            ORDER BY hour, severity
+        """, (f"-{hours - 1} hours",))
+        return [dict(row) for row in cur.fetchall()]
+
+    def alert_counts_by_source(self, limit: int = 10) -> List[Dict]:
+        """[{source_ip, count, by_severity}] des équipements les plus en alerte"""
+        cur = self.conn.cursor()
+        cur.execute("""
+            SELECT source_ip, severity, count FROM snmp_alert_counts_source
+            WHERE source_ip IN (
+                SELECT source_ip FROM snmp_alert_counts_source
+                GROUP BY source_ip HAVING SUM(count) > 0 ORDER BY SUM(count) DESC, source_ip LIMIT ?
+            ) AND count > 0
+        """, (limit,))
+        sources: Dict[str, Dict] = {}
+        for row in cur.fetchall():
+            entry = sources.setdefault(row["source_ip"], {"source_ip": row["source_ip"], "count": 0, "by_severity": {}})
+            entry["count"] += row["count"]
+            entry["by_severity"][row["severity"]] = row["count"]
+        return sorted(sources.values(), key=lambda e: (-e["count"], e["source_ip"]))
 
     def insert_metric(self, packet_info, device_id: Optional[int] = None):
-        cur = self.conn.cursor()
-        if not packet_info.oids:
+        """Une ligne par varbind, mise en file du BatchWriter (pas de commit par paquet)"""
+        if not packet_info.oid_list:
             logger.warning("No OIDs found in packet_info, skipping insertion.")
             return
 
-        for oid_info in packet_info.oids:
-            oid = oid_info.get("oid")
-            val = oid_info.get("value")
-
-            # 🔹 Décoder les bytes proprement
-            if isinstance(val, (bytes, bytearray)):
-                try:
-                    val_str = val.decode("utf-8", errors="ignore")
-                except Exception:
-                    val_str = str(val)
-            else:
-                val_str = str(val)
-
-            val_num = self._extract_numeric_value(val_str)
-            latency_ms = (
-                int(packet_info.response_time * 1000)
-                if packet_info.response_time
-                else None
-            )
-
-            logger.debug(
-                f"Inserting metric: source_ip={packet_info.source_ip}, "
-                f"device_id={device_id}, oid={oid}, value_raw={val_str}, value_num={val_num}"
-            )
-
-            try:
-                cur.execute(
-                    """
-                    INSERT INTO snmp_metrics
-                        (ts, source_ip, device_id, oid, value_raw, value_num, latency_ms)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        packet_info.timestamp,
-                        packet_info.source_ip,
-                        device_id,
-                        oid,
-                        val_str,   # ⬅️ on stocke la version texte
-                        val_num,
-                        latency_ms,
-                    ),
-                )
-            except Exception as e:
-                logger.error(f"Erreur insertion métrique SQLite : {e}")
-
-        self.conn.commit()
-
-
-
+        latency_ms = int(packet_info.response_time * 1000) if packet_info.response_time else None
+        ts = storage.utc_ts((packet_info.ts_ns + _EPOCH_OFFSET_NS) / 1e9)
+        rows = [(ts, packet_info.source_ip, device_id, oid, storage.value_text(val), vtype,
+                 storage.numeric_value(val, vtype), latency_ms)
+                for oid, val, vtype in zip(packet_info.oid_list, packet_info.values, packet_info.value_types)]
+        self.writer.add_many(storage.INSERT_METRIC_SQL, rows)
 
     def insert_trap(self, packet_info, device_id: Optional[int] = None):
-        cur = self.conn.cursor()
-        try:
-            varbinds_str = ";".join([f"{o.get('oid')}:{o.get('value')}" for o in packet_info.oids])
-            cur.execute(
-                """
-                INSERT INTO snmp_traps
-                    (ts, source_ip, device_id, version, community_or_user,
-                     enterprise_oid, severity, varbinds)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    packet_info.timestamp,
-                    packet_info.source_ip,
-                    device_id,
-                    packet_info.version,
-                    packet_info.community_or_user,
-                    packet_info.enterprise_oid,
-                    "info",
-                    varbinds_str
-                ),
-            )
-            self.conn.commit()
-        except Exception as e:
-            logger.error(f"Erreur insertion trap SQLite : {e}")
-            self.conn.rollback()
-
+        varbinds_str = ";".join([f"{o}:{v}" for o, v in zip(packet_info.oid_list, packet_info.values)])
+        self.writer.add(storage.INSERT_TRAP_SQL, (
+            storage.utc_ts((packet_info.ts_ns + _EPOCH_OFFSET_NS) / 1e9),
+            packet_info.source_ip,
+            device_id,
+            packet_info.version,
+            packet_info.community_or_user,
+            packet_info.enterprise_oid,
+            "info",
+            varbinds_str,
+        ))
 
     def insert_anomaly(self, source_ip: str, description: str, severity: str = "warning", type_: str = "generic"):
-        cur = self.conn.cursor()
-        try:
-            cur.execute("""
-                INSERT INTO snmp_anomalies (ts, source_ip, description, severity, type)
-                VALUES (CURRENT_TIMESTAMP, ?, ?, ?, ?)
-            """, (source_ip, description, severity, type_))
-            self.conn.commit()
-        except Exception as e:
-            logger.error(f"Erreur insertion anomalie SQLite : {e}")
-            self.conn.rollback()
+        # Écrite tout de suite (avec les lignes en attente) : alerte visible sans délai
+        self.writer.add(storage.INSERT_ANOMALY_SQL, (None, source_ip, description, severity, type_))
+        self.writer.flush()
+
+    def flush(self):
+        """Écrit les lignes en attente (avant une lecture qui doit les voir)"""
+        self.writer.flush()
 
     def get_device_by_ip(self, ip_address: str) -> Optional[Dict]:
         cur = self.conn.cursor()
@@ -278,25 +334,52 @@ class DatabaseManager:
             return None
 
     @staticmethod
-    def _extract_numeric_value(value) -> Optional[float]:
-        if value is None:
-            return None
-        try:
-            return float(value)
-        except Exception:
-            return None
+    def _extract_numeric_value(value, value_type: Optional[str] = None) -> Optional[float]:
+        return storage.numeric_value(value, value_type)
 
     def close(self):
+        if self.writer:
+            self.writer.close()
         if self.conn:
             self.conn.close()
 
-
 class SNMPAnalyzer:
     """Analyseur principal de trames SNMP avec intégration automatique en base locale"""
 
-    def __init__(self, interface: str = None, db_manager: DatabaseManager = None):
+    VERBOSITY_LEVELS = ("silent", "summary", "packet")
+
+    def __init__(self, interface: str = None, db_manager: DatabaseManager = None,
+                 verbosity: Optional[str] = None, summary_interval: Optional[int] = None,
+                 recent_size: Optional[int] = None, frame_ring_path: Optional[str] = None,
+                 profile: Optional[bool] = None):
         self.interface = interface
         self.db_manager = db_manager
+
+        analysis = get_analysis_config()
+        self.verbosity = verbosity or analysis.output_verbosity
+        if self.verbosity not in self.VERBOSITY_LEVELS:
+            raise ValueError(f"Verbosité inconnue: {self.verbosity}")
+        self.summary_interval = summary_interval or analysis.summary_interval
+        self.stats_update_interval = analysis.stats_update_interval
+        self._summary_stop = threading.Event()
+        self._summary_thread = None
+
+        # Profilage par étape (désactivé : étapes du callback de capture appelées sans chronométrage)
+        enabled = analysis.profile_enabled if profile is None else profile
+        self.profiler: Optional[PipelineProfiler] = PipelineProfiler() if enabled else None
+        self.profile_log_interval = analysis.profile_log_interval
+        self.profile_prometheus_port = analysis.profile_prometheus_port
+        self.profile_prometheus_host = analysis.profile_prometheus_host
+
+        # Derniers paquets décodés, consultables à la demande (API ou SIGUSR2)
+        capture = get_capture_config()
+        self.recent_packets = deque(maxlen=recent_size or capture.max_packets_in_memory)
+
+        # Ring buffer mmap partagé avec l'API (ouvert au démarrage de la capture)
+        if frame_ring_path is None:
+            frame_ring_path = capture.frame_ring_path
+        self.frame_ring_path = default_frame_ring_path() if frame_ring_path is None else frame_ring_path
+        self.frame_ring: Optional[FrameRing] = None
         
         self.stats = {
             "total_packets": 0,
@@ -315,27 +398,28 @@ class SNMPAnalyzer:
         self.cleanup_thread.start()
 
 
-        self.anomaly_detector = AnomalyDetector(db_manager)
+        # Index MIB compilé (mmap partagé) pour nommer et décoder les varbinds à l'affichage
+        # et regrouper les séries de latence par colonne
+        self.mib_index = load_mib_index(get_snmp_config().mib_index_path)
+
+        self.anomaly_detector = AnomalyDetector(db_manager, self.mib_index)
 
     def start_capture(self, count: int = 0, duration: int = 0, save_to_db: bool = True):
         """Démarre la capture SNMP avec enregistrement automatique en base"""
         logger.info(f"Démarrage de la capture SNMP - Count: {count}, Duration: {duration}s")
 
-        def process_packet(packet):
-            try:
-                packet_info = self._parse_snmp_packet(packet)
-                if packet_info:
-                    self._handle_packet(packet_info, save_to_db)
-                    self._update_stats(packet_info)
-                    if self.anomaly_detector:
-                        anomaly = self.anomaly_detector.analyze_packet(packet_info)
-                        if anomaly:
-                            logger.warning(f"Anomalie détectée: {anomaly}")
-            except Exception as e:
-                logger.error(f"Erreur dans le traitement du paquet: {e}")
-
+        process_packet = self._packet_processor(save_to_db)
         snmp_filter = "udp port 161 or udp port 162"
 
+        self._install_signal_handlers()
+        self._start_summary_timer()
+        self.open_frame_ring()
+        reporter = None
+        if self.profiler is not None:
+            reporter = ProfileReporter(self.profiler, self.profile_log_interval, self.profile_prometheus_port,
+                                       self.profile_prometheus_host)
+            reporter.start()
+
         try:
             if duration > 0:
                 timer = threading.Timer(
@@ -356,7 +440,158 @@ class SNMPAnalyzer:
         except Exception as e:
             logger.error(f"Erreur durant la capture: {e}")
         finally:
-            self._print_final_stats()
+            if reporter is not None:
+                reporter.stop()
+            self._stop_summary_timer()
+            self.close_frame_ring()
+            if self.verbosity != "silent":
+                self._print_final_stats()
+
+    def _packet_processor(self, save_to_db: bool):
+        """Callback sniff() ; avec le profilage, chaque étape est chronométrée (sinon appel direct)"""
+        prof = self.profiler or NullProfiler()
+        counters = prof.counters
+        parse = prof.wrap("parse", self._parse_snmp_packet)
+        track = prof.wrap("track", self._track_packet)
+        show = prof.wrap("print", self._print_packet_info)
+        lookup = prof.wrap("device_lookup", self._device_id)
+        store = prof.wrap("db_write", self._store_packet)
+        update_stats = prof.wrap("stats", self._update_stats)
+        analyze = prof.wrap("anomaly", self.anomaly_detector.analyze_packet) if self.anomaly_detector else None
+        publish = prof.wrap("publish", self.publish_frame)
+        save = save_to_db and self.db_manager is not None
+
+        # Mêmes étapes que _handle_packet, appelées une à une pour être chronométrées
+        def process_packet(packet):
+            counters["packets"] += 1
+            try:
+                packet_info = parse(packet)
+                if not packet_info:
+                    counters["dropped"] += 1
+                    return
+                counters["snmp_packets"] += 1
+                track(packet_info)
+                if self.verbosity == "packet":
+                    show(packet_info)
+                if save:
+                    store(packet_info, lookup(packet_info))
+                update_stats(packet_info)
+                anomaly = None
+                if analyze is not None:
+                    anomaly = analyze(packet_info)
+                    if anomaly:
+                        logger.warning(f"Anomalie détectée: {anomaly}")
+                publish(packet_info, anomaly)
+            except Exception as e:
+                counters["errors"] += 1
+                logger.error(f"Erreur dans le traitement du paquet: {e}")
+
+        return process_packet
+
+    def _start_summary_timer(self):
+        """Affichage périodique des statistiques, hors du chemin de traitement des paquets"""
+        if self.verbosity != "summary" or self.summary_interval <= 0:
+            return
+        self._summary_stop.clear()
+
+        def run():
+            while not self._summary_stop.wait(self.summary_interval):
+                self._print_live_stats()
+
+        self._summary_thread = threading.Thread(target=run, daemon=True)
+        self._summary_thread.start()
+
+    def _stop_summary_timer(self):
+        self._summary_stop.set()
+        if self._summary_thread:
+            self._summary_thread.join(timeout=1)
+            self._summary_thread = None
+
+    def _install_signal_handlers(self):
+        """SIGUSR2 : affiche les derniers paquets capturés ; SIGUSR1 : profil du pipeline (Unix uniquement)"""
+        if not hasattr(signal, "SIGUSR2") or threading.current_thread() is not threading.main_thread():
+            return
+        signal.signal(signal.SIGUSR2, lambda signum, frame: self.dump_recent_packets())
+        if self.profiler is not None:
+            signal.signal(signal.SIGUSR1, lambda signum, frame: print(self.profiler.format_table()))
+
+    def get_recent_packets(self, n: Optional[int] = None) -> List[SNMPPacketInfo]:
+        """Retourne les n derniers paquets (tous si n est None), du plus ancien au plus récent"""
+        packets = list(self.recent_packets)
+        return packets if n is None else packets[-n:]
+
+    def dump_recent_packets(self, n: int = 20):
+        """Affiche les n derniers paquets du ring buffer"""
+        packets = self.get_recent_packets(n)
+        print(f"\n--- {len(packets)} derniers paquets ---")
+        for packet_info in packets:
+            self._print_packet_info(packet_info)
+
+    def open_frame_ring(self):
+        if not self.frame_ring_path or self.frame_ring is not None:
+            return
+        capture = get_capture_config()
+        try:
+            self.frame_ring = FrameRing(self.frame_ring_path, capture.frame_ring_slots,
+                                        capture.frame_ring_slot_size, writable=True)
+        except (OSError, ValueError) as e:
+            logger.error(f"Ring buffer de trames indisponible ({self.frame_ring_path}): {e}")
+
+    def close_frame_ring(self):
+        if self.frame_ring is not None:
+            self.frame_ring.close()
+            self.frame_ring = None
+
+    def publish_frame(self, packet_info: SNMPPacketInfo, anomaly: Optional[str] = None) -> Optional[str]:
+        """Écrit la trame dans le ring buffer partagé ; retourne son identifiant stable"""
+        pdu_type = REQUEST_TYPES.get(packet_info.request_type)
+        if self.frame_ring is None or pdu_type is None:
+            return None
+        v3 = packet_info.version == "v3"
+        payload = {
+            "request_id": packet_info.request_id,
+            "community": None if v3 else packet_info.community_or_user,
+            "security_user": packet_info.community_or_user if v3 else None,
+            "varbinds": [self._frame_varbind(o, v, t) for o, v, t in
+                         zip(packet_info.oid_list, packet_info.values, packet_info.value_types)],
+            "tags": [packet_info.request_type] if pdu_type == "trap" else [],
+            "anomalies": anomaly.split(" | ") if anomaly else [],
+        }
+        try:
+            return self.frame_ring.append(
+                packet_info.ts_ns + _EPOCH_OFFSET_NS,
+                packet_info.source_ip, packet_info.source_port,
+                packet_info.dest_ip, packet_info.dest_port,
+                VERSIONS.get(packet_info.version, 2), pdu_type, packet_info.packet_size, payload,
+            )
+        except ValueError as e:
+            logger.error(f"Trame non écrite dans le ring buffer: {e}")
+            return None
+
+    def _frame_varbind(self, oid: str, value, value_type: Optional[str] = None) -> Dict[str, Any]:
+        if isinstance(value, bytes):
+            try:
+                value = value.decode("utf-8")
+            except UnicodeDecodeError:
+                value = value.hex()
+            vtype = "OctetString"
+        elif isinstance(value, bool) or value is None:
+            vtype = "Null" if value is None else "Boolean"
+        elif isinstance(value, int):
+            vtype = "Integer"
+        elif isinstance(value, float):
+            vtype = "Float"
+        elif isinstance(value, str):
+            vtype = "OctetString"
+        else:
+            vtype, value = type(value).__name__, str(value)
+        vtype = value_type or vtype
+        if self.mib_index is not None:
+            info = self.mib_index.decorate(oid, value)
+            name, enum = info["name"], info["enum"]
+        else:
+            name, enum = registry.name_of(oid), None
+        return {"oid": oid, "name": name, "type": vtype, "value": value, "enum": enum}
 
     def _parse_snmp_packet(self, packet: Packet) -> Optional[SNMPPacketInfo]:
         try:
@@ -383,10 +618,12 @@ class SNMPAnalyzer:
             elif version_value == 3 and hasattr(snmp_layer, "msgUserName"):
                 community_or_user = str(snmp_layer.msgUserName)
 
-            request_type, oids, enterprise_oid, error_status = self._parse_pdu(snmp_layer)
+            request_type, oid_list, values, value_types, enterprise_oid, error_status = self._parse_pdu(snmp_layer)
+            request_id = getattr(getattr(snmp_layer, "PDU", None), "id", None)
+            request_id = getattr(request_id, "val", request_id)
 
             return SNMPPacketInfo(
-                timestamp=datetime.now(),
+                ts_ns=time.monotonic_ns(),
                 source_ip=str(ip_layer.src),
                 dest_ip=str(ip_layer.dst),
                 source_port=udp_layer.sport,
@@ -394,35 +631,39 @@ class SNMPAnalyzer:
                 version=version_str,
                 community_or_user=community_or_user,
                 request_type=request_type,
-                oids=oids,
+                oid_list=oid_list,
+                values=values,
+                value_types=value_types,
                 enterprise_oid=enterprise_oid,
                 packet_size=len(packet),
-                error_status=error_status
+                error_status=error_status,
+                request_id=request_id if isinstance(request_id, int) else None
             )
         except Exception as e:
             logger.error(f"Erreur parsing SNMP: {e}")
             return None
 
+    PDU_TYPES = {
+        "SNMPget": "GET",
+        "SNMPset": "SET",
+        "SNMPresponse": "RESPONSE",
+        "SNMPnext": "GETNEXT",
+        "SNMPbulk": "GETBULK",
+        "SNMPtrapv1": "TRAPv1",
+        "SNMPtrapv2": "TRAPv2"
+    }
+
     def _parse_pdu(self, snmp_layer):
-        """Analyse le PDU SNMP"""
+        """Analyse le PDU SNMP ; les varbinds sont retournés en tuples parallèles (OIDs, valeurs, types SMI)"""
         request_type = "unknown"
-        oids, enterprise_oid, error_status = [], None, None
+        enterprise_oid, error_status = None, None
 
         if not hasattr(snmp_layer, "PDU") or not snmp_layer.PDU:
-            return request_type, oids, enterprise_oid, error_status
+            return request_type, (), (), (), enterprise_oid, error_status
 
         pdu = snmp_layer.PDU
         pdu_type = pdu.__class__.__name__
-        mapping = {
-            "SNMPget": "GET",
-            "SNMPset": "SET",
-            "SNMPresponse": "RESPONSE",
-            "SNMPnext": "GETNEXT",
-            "SNMPbulk": "GETBULK",
-            "SNMPtrapv1": "TRAPv1",
-            "SNMPtrapv2": "TRAPv2"
-        }
-        request_type = mapping.get(pdu_type, pdu_type)
+        request_type = self.PDU_TYPES.get(pdu_type, pdu_type)
 
         if request_type == "TRAPv1" and hasattr(pdu, "enterprise"):
             enterprise_oid = str(pdu.enterprise)
@@ -430,24 +671,21 @@ class SNMPAnalyzer:
         if hasattr(pdu, "error_status"):
             error_status = str(pdu.error_status)
 
+        oid_list, values, value_types = [], [], []
         if hasattr(pdu, "varbindlist") and pdu.varbindlist:
             for vb in pdu.varbindlist:
                 oid_obj = getattr(vb, "oid", None)
                 val_obj = getattr(vb, "value", None)
 
-                # OID lisible
-                oid_str = str(getattr(oid_obj, "val", oid_obj))
+                # OID lisible, chaîne canonique partagée via le registre
+                oid_list.append(registry.canonical(str(getattr(oid_obj, "val", oid_obj))))
 
-                # 🔹 On NE convertit PAS en str ici
-                # On essaie de prendre .val si présent
-                if hasattr(val_obj, "val"):
-                    real_val = val_obj.val
-                else:
-                    real_val = val_obj
+                # 🔹 On NE convertit PAS en str ici : valeur python + type SMI (tag ASN.1)
+                vtype, value = typed_value(val_obj)
+                value_types.append(vtype)
+                values.append(value)
 
-                oids.append({"oid": oid_str, "value": real_val})
-
-        return request_type, oids, enterprise_oid, error_status
+        return request_type, tuple(oid_list), tuple(values), tuple(value_types), enterprise_oid, error_status
 
 
 
@@ -456,22 +694,30 @@ class SNMPAnalyzer:
 
     def _handle_packet(self, packet_info: SNMPPacketInfo, save_to_db: bool):
         """Traite le paquet SNMP et l’enregistre si demandé"""
-        self._print_packet_info(packet_info)
+        self._track_packet(packet_info)
+        if self.verbosity == "packet":
+            self._print_packet_info(packet_info)
         if not save_to_db or not self.db_manager:
             return
+        self._store_packet(packet_info, self._device_id(packet_info))
 
-        device = self.db_manager.get_device_by_ip(packet_info.source_ip)
-        device_id = device["id"] if device else None
-
+    def _track_packet(self, packet_info: SNMPPacketInfo):
+        """Corrélation requête/réponse (même sans base, pour le suivi de latence) et derniers paquets"""
         if packet_info.request_type == "RESPONSE":
             req_key = self._make_key(packet_info.dest_ip, packet_info.source_ip)
-            if req_key in self.request_cache:
-                req_time = self.request_cache[req_key]
-                packet_info.response_time = (packet_info.timestamp - req_time).total_seconds()
-                del self.request_cache[req_key]
+            req_ns = self.request_cache.pop(req_key, None)
+            if req_ns is not None:
+                packet_info.response_time = (packet_info.ts_ns - req_ns) / 1e9
         elif packet_info.request_type in ["GET", "SET", "GETNEXT", "GETBULK"]:
-            self.request_cache[self._make_key(packet_info.source_ip, packet_info.dest_ip)] = packet_info.timestamp
+            self.request_cache[self._make_key(packet_info.source_ip, packet_info.dest_ip)] = packet_info.ts_ns
 
+        self.recent_packets.append(packet_info)
+
+    def _device_id(self, packet_info: SNMPPacketInfo) -> Optional[int]:
+        device = self.db_manager.get_device_by_ip(packet_info.source_ip)
+        return device["id"] if device else None
+
+    def _store_packet(self, packet_info: SNMPPacketInfo, device_id: Optional[int]):
         try:
             if "TRAP" in packet_info.request_type:
                 # On stocke les traps dans la table snmp_traps
@@ -497,12 +743,22 @@ class SNMPAnalyzer:
             print(f"Temps de réponse: {packet_info.response_time*1000:.1f}ms")
         if packet_info.error_status:
             print(f"Erreur: {packet_info.error_status}")
-        if packet_info.oids:
+        if packet_info.oid_list:
             print("OIDs:")
-            for oid_info in packet_info.oids[:5]:
-                print(f"  {oid_info['oid']} = {oid_info['value']}")
+            for oid, value in zip(packet_info.oid_list[:5], packet_info.values[:5]):
+                print(f"  {self._describe_varbind(oid, value)}")
         print(f"Taille: {packet_info.packet_size} bytes")
 
+    def _describe_varbind(self, oid: str, value) -> str:
+        if self.mib_index is None:
+            name = registry.name_of(oid)
+            return f"{oid} ({name}) = {value}" if name else f"{oid} = {value}"
+        info = self.mib_index.decorate(oid, value)
+        label = f"{oid} ({info['name']})" if info["name"] else oid
+        shown = f"{info['enum']}({value})" if info["enum"] else value
+        units = f" {info['units']}" if info["units"] else ""
+        return f"{label} = {shown}{units}"
+
     def _update_stats(self, packet_info: SNMPPacketInfo):
         stats = self.stats
         stats["total_packets"] += 1
@@ -519,7 +775,7 @@ class SNMPAnalyzer:
             stats["traps"] += 1
         if packet_info.error_status:
             stats["errors"] += 1
-        if stats["total_packets"] % 10 == 0:
+        if self.verbosity == "packet" and stats["total_packets"] % self.stats_update_interval == 0:
             self._print_live_stats()
 
     def _print_live_stats(self):
@@ -543,17 +799,39 @@ class SNMPAnalyzer:
         """Nettoyage des requêtes expirées"""
         while True:
             time.sleep(60)
-            cutoff = datetime.now() - timedelta(seconds=30)
+            cutoff = time.monotonic_ns() - 30 * 1_000_000_000
             self.request_cache = {k: v for k, v in self.request_cache.items() if v > cutoff}
 
 class AnomalyDetector:
     """Détecteur d'anomalies SNMP simple"""
 
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager, mib_index=None):
         self.db_manager = db_manager
+        self.mib_index = mib_index
         self.request_counts = defaultdict(int)
         self.last_reset = datetime.now()
 
+        analysis = get_analysis_config()
+        self.latency = LatencyTracker(
+            window_seconds=analysis.latency_window,
+            alpha=analysis.latency_ewma_alpha,
+            z_threshold=analysis.latency_zscore_threshold,
+            absolute_threshold=analysis.alert_response_time_threshold,
+            series_key=self._latency_key,
+        )
+        self.metric_rules = MetricRulesEngine()
+
+    def _latency_key(self, oid: str) -> str:
+        """Série de latence par objet MIB (ifInOctets plutôt que ifInOctets.12, sysUpTime plutôt que .0)"""
+        if self.mib_index is not None:
+            found = self.mib_index.lookup(oid)
+            if found is not None and found[0].kind in ("scalar", "column"):
+                return found[0].name
+        name, index = registry.decompose(oid)
+        if name is not None and not index:
+            return name
+        return oid[:-2] if oid.endswith(".0") else oid
+
     def analyze_packet(self, packet_info: SNMPPacketInfo) -> Optional[str]:
         """Analyse un paquet pour détecter des anomalies"""
 
@@ -579,6 +857,34 @@ class AnomalyDetector:
         if 'TRAP' in packet_info.request_type and packet_info.source_ip not in ['127.0.0.1', '::1']:
             anomalies.append("Trap depuis source externe")
 
+        # Latence des réponses : quantiles par équipement/OID + détection de dégradation
+        if packet_info.response_time is not None:
+            latency_alerts = self.latency.observe(
+                packet_info.source_ip,
+                packet_info.oid_list,
+                packet_info.response_time,
+            )
+            if latency_alerts:
+                anomalies.extend(latency_alerts)
+                if self.db_manager:
+                    for alert in latency_alerts:
+                        self.db_manager.insert_anomaly(packet_info.source_ip, alert, "warning", "latency")
+
+        # Règles sur les valeurs (seuils, taux, lignes de base) : un lot par réponse
+        if packet_info.request_type == "RESPONSE" and packet_info.oid_list:
+            violations = self.metric_rules.evaluate_batch(
+                packet_info.source_ip,
+                packet_info.oid_list,
+                [storage.numeric_value(v, t) for v, t in zip(packet_info.values, packet_info.value_types)],
+                (packet_info.ts_ns + _EPOCH_OFFSET_NS) / 1e9,
+                packet_info.value_types,
+            )
+            for v in violations:
+                msg = v.message()
+                anomalies.append(msg)
+                if self.db_manager:
+                    self.db_manager.insert_anomaly(packet_info.source_ip, msg, v.rule.severity, v.rule.name)
+
         if anomalies:
             # Optionnel : tu peux ici enregistrer en base les anomalies détectées via self.db_manager
             return " | ".join(anomalies)
@@ -596,10 +902,25 @@ def main():
     parser.add_argument('-c', '--count', type=int, default=0, help="Nombre de paquets à capturer (0=illimité)")
     parser.add_argument('-d', '--duration', type=int, default=0, help="Durée en secondes (0=illimité)")
     parser.add_argument('--no-db', action='store_true', help="Ne pas sauvegarder en base")
-    parser.add_argument('--db-path', default="snmp_local.db", help="Chemin vers le fichier SQLite")
+    parser.add_argument('--db-path', default=storage.DEFAULT_DB, help="Chemin vers le fichier SQLite")
+    parser.add_argument('-v', '--verbosity', choices=SNMPAnalyzer.VERBOSITY_LEVELS,
+                        help="Affichage : silent, summary (stats périodiques) ou packet (chaque paquet)")
+    parser.add_argument('--summary-interval', type=int, help="Intervalle d'affichage des stats en mode summary (secondes)")
+    parser.add_argument('--profile', action='store_true', default=None,
+                        help="Profilage par étape du pipeline (dump SIGUSR1, log JSON, PROFILE_PROMETHEUS_PORT)")
+    parser.add_argument('--rebuild-alert-counters', action='store_true',
+                        help="Recalcule les compteurs d'alertes depuis snmp_anomalies puis quitte")
 
     args = parser.parse_args()
 
+    if args.rebuild_alert_counters:
+        db_manager = DatabaseManager(db_path=args.db_path)
+        try:
+            print(f"Compteurs d'alertes recalculés : {db_manager.rebuild_alert_counters()} anomalies")
+        finally:
+            db_manager.close()
+        return
+
     try:
         db_manager = None
         if not args.no_db:
@@ -607,7 +928,10 @@ def main():
 
         analyzer = SNMPAnalyzer(
             interface=args.interface,
-            db_manager=db_manager
+            db_manager=db_manager,
+            verbosity=args.verbosity,
+            summary_interval=args.summary_interval,
+            profile=args.profile
         )
 
         analyzer.start_capture(
@@ -0,0 +1,355 @@
+"""
+Moteur de stockage SQLite commun : schéma unique, pragmas, index et écritures par lots
+Utilisé par l'analyseur (DatabaseManager), le polling (SNMPSender) et l'API Flask (api/main.py)
+Dépend uniquement de la bibliothèque standard : importable en `storage` ou `snmp.storage`
+"""
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Base partagée par l'analyseur, le polling et l'API (chemin relatif : depuis snmp/)
+DEFAULT_DB = os.getenv("SNMP_DB_PATH", "snmp_local.db")
+
+# Réglages appliqués une fois par connexion
+PRAGMAS = (
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA journal_mode=WAL",        # lecteurs non bloqués par l'écrivain
+    "PRAGMA synchronous=NORMAL",      # sûr en WAL, un fsync par checkpoint et non par commit
+    "PRAGMA busy_timeout=5000",       # attend le verrou d'écriture au lieu d'échouer (database is locked)
+    "PRAGMA mmap_size=268435456",     # lectures en mémoire projetée (256 Mo)
+    "PRAGMA cache_size=-65536",       # cache de pages de 64 Mo par connexion
+    "PRAGMA temp_store=MEMORY",
+)
+STATEMENT_CACHE = 256                 # requêtes préparées conservées par connexion (sqlite3)
+
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS devices (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        ip_address TEXT NOT NULL UNIQUE,
+        location TEXT,
+        tags TEXT,
+        enabled INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS snmp_metrics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        source_ip TEXT NOT NULL,
+        device_id INTEGER,
+        oid TEXT NOT NULL,
+        value_raw TEXT,
+        value_type TEXT,
+        value_num REAL,
+        latency_ms INTEGER,
+        FOREIGN KEY(device_id) REFERENCES devices(id) ON DELETE SET NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS snmp_traps (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        source_ip TEXT,
+        device_id INTEGER,
+        version TEXT,
+        community_or_user TEXT,
+        enterprise_oid TEXT,
+        severity TEXT,
+        varbinds TEXT,
+        FOREIGN KEY(device_id) REFERENCES devices(id) ON DELETE SET NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS snmp_anomalies (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        source_ip TEXT,
+        description TEXT,
+        severity TEXT,
+        type TEXT
+    );
+"""
+
+# Créés après les migrations (les colonnes indexées peuvent manquer dans une base ancienne)
+INDEXES_SQL = """
+    -- Historique : parcours (ts, id) décroissant, global ou par cible ; purge de rétention
+    CREATE INDEX IF NOT EXISTS ix_snmp_metrics_ts_id ON snmp_metrics (ts, id);
+    CREATE INDEX IF NOT EXISTS ix_snmp_metrics_source_ts_id ON snmp_metrics (source_ip, ts, id);
+    CREATE INDEX IF NOT EXISTS ix_snmp_traps_ts_id ON snmp_traps (ts, id);
+    CREATE INDEX IF NOT EXISTS ix_snmp_traps_source_ts_id ON snmp_traps (source_ip, ts, id);
+    CREATE INDEX IF NOT EXISTS ix_snmp_anomalies_ts_id ON snmp_anomalies (ts, id);
+    CREATE INDEX IF NOT EXISTS ix_snmp_anomalies_source_ts_id ON snmp_anomalies (source_ip, ts, id);
+    -- Historique filtré par préfixe d'OID (intervalle sur oid)
+    CREATE INDEX IF NOT EXISTS ix_snmp_metrics_oid_ts_id ON snmp_metrics (oid, ts, id);
+    CREATE INDEX IF NOT EXISTS ix_snmp_traps_enterprise_oid_ts_id ON snmp_traps (enterprise_oid, ts, id);
+    -- Série d'un OID pour un équipement (polling)
+    CREATE INDEX IF NOT EXISTS ix_snmp_metrics_device_oid_ts ON snmp_metrics (device_id, oid, ts);
+"""
+
+# Compteurs d'alertes pré-agrégés (dashboard), tenus à jour par triggers sur snmp_anomalies :
+# insertion +1, suppression (dont la purge de rétention) -1, modification -1 sur l'ancienne ligne et +1 sur la nouvelle
+ALERT_COUNTERS_SQL = """
+    CREATE TABLE IF NOT EXISTS snmp_alert_counts_hourly (
+        hour TEXT NOT NULL,
+        severity TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (hour, severity)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS snmp_alert_counts_source (
+        source_ip TEXT NOT NULL,
+        severity TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (source_ip, severity)
+    ) WITHOUT ROWID;
+
+    CREATE TRIGGER IF NOT EXISTS trg_snmp_anomalies_count_ins AFTER INSERT ON snmp_anomalies
+    BEGIN
+        INSERT INTO snmp_alert_counts_hourly (hour, severity, count)
+        VALUES (strftime('%Y-%m-%d %H:00:00', NEW.ts), COALESCE(NEW.severity, 'warning'), 1)
+        ON CONFLICT (hour, severity) DO UPDATE SET count = count + 1;
+        INSERT INTO snmp_alert_counts_source (source_ip, severity, count)
+        SELECT NEW.source_ip, COALESCE(NEW.severity, 'warning'), 1 WHERE NEW.source_ip IS NOT NULL
+        ON CONFLICT (source_ip, severity) DO UPDATE SET count = count + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_snmp_anomalies_count_del AFTER DELETE ON snmp_anomalies
+    BEGIN
+        UPDATE snmp_alert_counts_hourly SET count = count - 1
+        WHERE hour = strftime('%Y-%m-%d %H:00:00', OLD.ts) AND severity = COALESCE(OLD.severity, 'warning');
+        UPDATE snmp_alert_counts_source SET count = count - 1
+        WHERE source_ip = OLD.source_ip AND severity = COALESCE(OLD.severity, 'warning');
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_snmp_anomalies_count_upd AFTER UPDATE OF ts, source_ip, severity ON snmp_anomalies
+    BEGIN
+        UPDATE snmp_alert_counts_hourly SET count = count - 1
+        WHERE hour = strftime('%Y-%m-%d %H:00:00', OLD.ts) AND severity = COALESCE(OLD.severity, 'warning');
+        UPDATE snmp_alert_counts_source SET count = count - 1
+        WHERE source_ip = OLD.source_ip AND severity = COALESCE(OLD.severity, 'warning');
+        INSERT INTO snmp_alert_counts_hourly (hour, severity, count)
+        VALUES (strftime('%Y-%m-%d %H:00:00', NEW.ts), COALESCE(NEW.severity, 'warning'), 1)
+        ON CONFLICT (hour, severity) DO UPDATE SET count = count + 1;
+        INSERT INTO snmp_alert_counts_source (source_ip, severity, count)
+        SELECT NEW.source_ip, COALESCE(NEW.severity, 'warning'), 1 WHERE NEW.source_ip IS NOT NULL
+        ON CONFLICT (source_ip, severity) DO UPDATE SET count = count + 1;
+    END;
+"""
+
+# Colonnes absentes des schémas antérieurs (ex. snmp_metrics sans device_id de l'ancienne API Flask)
+MIGRATIONS: Dict[str, List[Tuple[str, str]]] = {
+    "snmp_metrics": [("device_id", "INTEGER REFERENCES devices(id) ON DELETE SET NULL"),
+                     ("value_type", "TEXT"), ("value_num", "REAL"), ("latency_ms", "INTEGER")],
+    "snmp_traps": [("device_id", "INTEGER REFERENCES devices(id) ON DELETE SET NULL")],
+}
+
+# Texte SQL constant : une seule préparation par connexion (cache de requêtes sqlite3)
+INSERT_METRIC_SQL = """
+    INSERT INTO snmp_metrics (ts, source_ip, device_id, oid, value_raw, value_type, value_num, latency_ms)
+    VALUES (COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?, ?, ?, ?, ?)
+"""
+INSERT_TRAP_SQL = """
+    INSERT INTO snmp_traps (ts, source_ip, device_id, version, community_or_user, enterprise_oid, severity, varbinds)
+    VALUES (COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?, ?, ?, ?, ?)
+"""
+INSERT_ANOMALY_SQL = """
+    INSERT INTO snmp_anomalies (ts, source_ip, description, severity, type)
+    VALUES (COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?, ?)
+"""
+DEVICE_ID_SQL = "SELECT id FROM devices WHERE ip_address = ?"
+
+
+def utc_ts(value) -> Optional[str]:
+    """
+    Horodatage stocké : texte UTC au format de CURRENT_TIMESTAMP ('YYYY-MM-DD HH:MM:SS').
+    datetime naïf = heure locale ; nombre = epoch en secondes ; None = CURRENT_TIMESTAMP à l'insertion
+    """
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        value = datetime.fromtimestamp(value, tz=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def resolve_path(db_path: str = DEFAULT_DB) -> str:
+    """Chemin relatif : depuis snmp/ (comportement historique de DatabaseManager)"""
+    return os.path.join(BASE_DIR, db_path)
+
+
+DEFAULT_DB_PATH = resolve_path()
+
+
+def connect(path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, cached_statements=STATEMENT_CACHE, check_same_thread=check_same_thread)
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def init_schema(conn: sqlite3.Connection) -> bool:
+    """
+    Crée ou met à niveau le schéma commun (tables, colonnes manquantes, index, compteurs).
+    Renvoie True si les compteurs d'alertes viennent d'être créés sur une base existante
+    (à reconstruire depuis snmp_anomalies).
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    existing = {row[0] for row in cur.fetchall()}
+    cur.executescript(SCHEMA_SQL)
+    for table, columns in MIGRATIONS.items():
+        present = {row[1] for row in cur.execute(f"PRAGMA table_info({table})")}
+        for name, decl in columns:
+            if name not in present:
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+                logger.info(f"Migration SQLite : {table}.{name} ajoutée")
+    cur.executescript(INDEXES_SQL + ALERT_COUNTERS_SQL)
+    conn.commit()
+    return "snmp_anomalies" in existing and "snmp_alert_counts_hourly" not in existing
+
+
+# Types SMI (noms de snmp_decoder.VALUE_TYPES) : entiers, convertis sans passer par le texte,
+# et types sans valeur numérique
+INTEGER_TYPES = frozenset({"Integer32", "Counter32", "Gauge32", "TimeTicks", "Counter64"})
+NON_NUMERIC_TYPES = frozenset({"IpAddress", "ObjectIdentifier", "Null",
+                               "noSuchObject", "noSuchInstance", "endOfMibView"})
+_NUMBER_START = frozenset("+-.0123456789 ")
+
+
+def value_text(value) -> str:
+    """Texte stocké dans value_raw (octets décodés en UTF-8)"""
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", errors="ignore")
+    return str(value)
+
+
+def numeric_value(value, value_type: Optional[str] = None) -> Optional[float]:
+    """
+    Valeur numérique d'une valeur SNMP, None sinon. Types entiers : conversion directe ;
+    texte (OctetString, ex. charge système "0.15") : float() seulement s'il commence comme un nombre
+    """
+    if value_type in INTEGER_TYPES:
+        return float(value)
+    if value is None or isinstance(value, bool) or value_type in NON_NUMERIC_TYPES:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8", errors="ignore")
+    if not isinstance(value, str) or not value or value[0] not in _NUMBER_START:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def device_id(conn: sqlite3.Connection, ip_address: str) -> Optional[int]:
+    row = conn.execute(DEVICE_ID_SQL, (ip_address,)).fetchone()
+    return row[0] if row else None
+
+
+class ConnectionPool:
+    """
+    Une connexion SQLite par thread, ouverte à la première utilisation puis réutilisée.
+    Sûr avec un serveur WSGI multi-threads : chaque thread a sa connexion (pas de partage),
+    WAL + busy_timeout gèrent la concurrence entre threads. Les requêtes SQL identiques
+    réutilisent la requête préparée du cache de la connexion.
+    Après un fork (workers gunicorn), le processus enfant rouvre ses propres connexions.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}        # ident du thread -> connexion (fermeture globale)
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            # check_same_thread=False pour close_all() seulement : la connexion reste propre à son thread
+            conn = self._local.conn = connect(self.path, check_same_thread=False)
+            self._local.pid = os.getpid()
+            with self._lock:
+                # Oublie les connexions des threads terminés (fermées avec leur thread-local)
+                alive = {t.ident for t in threading.enumerate()}
+                self._connections = {i: c for i, c in self._connections.items() if i in alive}
+                self._connections[threading.get_ident()] = conn
+        return conn
+
+    def release(self):
+        """Fin de requête : annule une transaction laissée ouverte (la connexion reste ouverte)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and conn.in_transaction:
+            conn.rollback()
+
+    def close_all(self):
+        with self._lock:
+            connections, self._connections = self._connections, {}
+        for conn in connections.values():
+            conn.close()
+        self._local = threading.local()
+
+
+class BatchWriter:
+    """
+    Écritures groupées sur une connexion : les lignes s'accumulent en mémoire et partent
+    en une transaction (executemany par requête) tous les batch_size lignes ou toutes les
+    flush_interval secondes (thread de fond). flush() avant toute lecture qui doit les voir.
+    `lock` sérialise tous les accès en écriture à la connexion.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, batch_size: int = 500, flush_interval: float = 1.0):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lock = threading.RLock()
+        self._pending: Dict[str, List[tuple]] = {}
+        self._count = 0
+        self._stop = threading.Event()
+        self._thread = None
+        if flush_interval > 0:
+            self._thread = threading.Thread(target=self._run, name="storage-flush", daemon=True)
+            self._thread.start()
+
+    def add(self, sql: str, row: tuple):
+        self.add_many(sql, [row])
+
+    def add_many(self, sql: str, rows: List[tuple]):
+        with self.lock:
+            self._pending.setdefault(sql, []).extend(rows)
+            self._count += len(rows)
+            if self._count >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._count:
+            return
+        pending, count = self._pending, self._count
+        self._pending, self._count = {}, 0
+        try:
+            for sql, rows in pending.items():
+                self.conn.executemany(sql, rows)
+            self.conn.commit()
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            logger.error(f"Erreur écriture par lot SQLite ({count} lignes perdues) : {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
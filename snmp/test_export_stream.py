@@ -0,0 +1,62 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from export_stream import ExportSizeExceeded, export_stream
+from send_snmp_requests import SNMPSender
+
+"""
+- Vérifie les formats NDJSON, CSV (valeurs imbriquées en JSON) et JSON (objet englobant).
+- Vérifie la compression gzip en flux.
+- Vérifie le plafond de taille d'export.
+- Vérifie l'export des résultats de SNMPSender.
+"""
+
+RECORDS = [{"ip": "10.0.0.%d" % i, "values": {"sysName": "r%d" % i}, "ts": datetime(2024, 1, 1)} for i in range(3)]
+
+
+def collect(chunks) -> bytes:
+    return b"".join(chunks)
+
+
+class TestExportStream(unittest.TestCase):
+    def test_ndjson(self):
+        lines = collect(export_stream(iter(RECORDS), "ndjson")).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[2])["values"], {"sysName": "r2"})
+        self.assertEqual(json.loads(lines[0])["ts"], "2024-01-01T00:00:00")
+
+    def test_csv(self):
+        text = collect(export_stream(iter(RECORDS), "csv", fields=["ip", "values"])).decode()
+        rows = text.splitlines()
+        self.assertEqual(rows[0], "ip,values")
+        self.assertEqual(rows[1], '10.0.0.0,"{""sysName"":""r0""}"')
+
+    def test_json_wrapped_and_gzip(self):
+        data = collect(export_stream(iter(RECORDS), "json", compress=True, prefix='{"results": ', suffix="}"))
+        doc = json.loads(gzip.decompress(data))
+        self.assertEqual([r["ip"] for r in doc["results"]], ["10.0.0.0", "10.0.0.1", "10.0.0.2"])
+        self.assertEqual(json.loads(collect(export_stream(iter([]), "json"))), [])
+
+    def test_size_limit(self):
+        records = ({"i": i, "pad": "x" * 100} for i in range(100000))
+        with self.assertRaises(ExportSizeExceeded):
+            collect(export_stream(records, "ndjson", max_bytes=200000))
+
+    def test_sender_export(self):
+        sender = SNMPSender()
+        sender.results = [{"target": "10.0.0.1", "timestamp": datetime(2024, 1, 1), "values": {"1.3.6.1.2.1.1.5.0": "r1"}}]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = sender.export_results(os.path.join(tmp, "out.json"))
+            opener = gzip.open if path.endswith(".gz") else open
+            with opener(path, "rt", encoding="utf-8") as f:
+                doc = json.load(f)
+        self.assertEqual(doc["statistics"], sender.stats)
+        self.assertEqual(doc["results"][0]["timestamp"], "2024-01-01T00:00:00")
+
+
+if __name__ == '__main__':
+    unittest.main()
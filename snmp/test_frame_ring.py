@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import frame_ring
+from frame_ring import FrameRing, SLOT_HEADER, default_path, open_frame_ring
+
+"""
+- Vérifie l'écriture puis la relecture d'une trame par un lecteur séparé (mmap).
+- Vérifie l'écrasement des plus anciennes trames quand le ring est plein.
+- Vérifie la stabilité des identifiants après réouverture par l'écrivain.
+- Vérifie le parcours filtré sur l'en-tête fixe et la troncature des grosses trames.
+- Vérifie que le parcours ignore un slot réécrit pendant la lecture de son en-tête.
+- Vérifie le chemin par défaut (absolu, sous snmp/) partagé avec l'API.
+"""
+
+T0 = 1_700_000_000_000_000_000
+
+
+def payload(i: int):
+    return {
+        "request_id": i,
+        "community": "public",
+        "varbinds": [{"oid": f"1.3.6.1.2.1.2.2.1.10.{i}", "name": None, "type": "Integer", "value": i, "enum": None}],
+    }
+
+
+class TestFrameRing(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".ring")
+        os.close(fd)
+        self.writer = FrameRing(self.path, slot_count=8, slot_size=256, writable=True)
+
+    def tearDown(self):
+        self.writer.close()
+        os.remove(self.path)
+
+    def append(self, i: int, src: str = "10.0.0.1", pdu: str = "response"):
+        return self.writer.append(T0 + i * 1000, src, 161, "10.0.0.254", 40000, 2, pdu, 120, payload(i))
+
+    def test_write_and_read(self):
+        frame_id = self.append(1)
+        reader = open_frame_ring(self.path)
+        try:
+            frame = reader.get(frame_id)
+        finally:
+            reader.close()
+        self.assertEqual(frame["id"], frame_id)
+        self.assertEqual(frame["src"], {"ip": "10.0.0.1", "port": 161})
+        self.assertEqual(frame["pdu_type"], "response")
+        self.assertEqual(frame["request_id"], 1)
+        self.assertEqual(frame["varbinds"][0]["value"], 1)
+        self.assertTrue(frame["timestamp"].endswith("Z"))
+
+    def test_wrap_around(self):
+        ids = [self.append(i) for i in range(12)]
+        self.assertIsNone(self.writer.get(ids[0]))
+        self.assertIsNone(self.writer.get(ids[3]))
+        self.assertEqual(self.writer.get(ids[4])["request_id"], 4)
+        self.assertEqual(len(list(self.writer.scan())), 8)
+
+    def test_stable_ids_after_reopen(self):
+        first = self.append(1)
+        self.writer.close()
+        self.writer = FrameRing(self.path, slot_count=8, slot_size=256, writable=True)
+        second = self.append(2)
+        self.assertEqual(self.writer.get(first)["request_id"], 1)
+        self.assertNotEqual(first, second)
+        self.assertIsNone(self.writer.get("0-1"))
+
+    def test_scan_filter_and_cursor(self):
+        for i in range(6):
+            self.append(i, src="10.0.0.%d" % (i % 2 + 1), pdu="get" if i % 3 == 0 else "response")
+        seqs = list(self.writer.scan(match=lambda f: f[7] == 0))
+        self.assertEqual([self.writer.read(s)["request_id"] for s in seqs], [3, 0])
+        older = list(self.writer.scan(before=seqs[0]))
+        self.assertEqual(self.writer.read(older[0])["request_id"], 2)
+        recent = list(self.writer.scan(since_ns=T0 + 4000))
+        self.assertEqual(len(recent), 2)
+
+    def test_scan_skips_slot_rewritten_during_read(self):
+        for i in range(3):
+            self.append(i)
+        # L'écrivain remet la séquence du slot à 0 juste après la lecture de l'en-tête
+        rewritten = mock.Mock(unpack_from=lambda buf, off: (0,))
+        with mock.patch.object(frame_ring, "_SEQ", rewritten):
+            self.assertEqual(list(self.writer.scan()), [])
+            self.assertIsNone(self.writer.header(1))
+        self.assertEqual(len(list(self.writer.scan())), 3)
+
+    def test_default_path(self):
+        with mock.patch.dict(os.environ, {"FRAME_RING_PATH": "frames.ring"}):
+            path = default_path()
+            self.assertTrue(os.path.isabs(path))
+            self.assertEqual(os.path.dirname(path), frame_ring.BASE_DIR)
+        with mock.patch.dict(os.environ, {"FRAME_RING_PATH": self.path}):
+            self.assertEqual(default_path(), self.path)
+        with mock.patch.dict(os.environ, {"FRAME_RING_PATH": ""}):
+            self.assertEqual(default_path(), "")
+            self.assertIsNone(open_frame_ring())
+
+    def test_truncation(self):
+        big = payload(1)
+        big["varbinds"] = big["varbinds"] * 50
+        frame_id = self.writer.append(T0, "::1", 161, "::1", 40000, 3, "trap", 4000, big)
+        frame = self.writer.get(frame_id)
+        self.assertIn("truncated", frame["tags"])
+        self.assertLess(len(frame["varbinds"]), 50)
+        self.assertEqual(frame["src"]["ip"], "::1")
+        self.assertLessEqual(SLOT_HEADER.size, self.writer.slot_size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import random
+
+from latency import LatencyHistogram, LatencyTracker
+
+"""
+- Vérifie la précision des quantiles de l'histogramme logarithmique.
+- Vérifie que la mémoire de l'histogramme reste constante.
+- Contrôle la détection de dégradation par z-score sur le p95 par fenêtre.
+- Contrôle l'alerte sur seuil absolu de temps de réponse (une par équipement et par période).
+- Vérifie l'éviction des séries inactives ou en surnombre.
+- Vérifie le regroupement des OIDs d'instance en une série par colonne (series_key).
+"""
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLatency(unittest.TestCase):
+    def test_histogram_quantiles(self):
+        rnd = random.Random(42)
+        values = [rnd.uniform(0.001, 0.100) for _ in range(10000)]
+        hist = LatencyHistogram()
+        for v in values:
+            hist.record(v)
+        values.sort()
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * len(values)) - 1]
+            self.assertAlmostEqual(hist.quantile(q), exact, delta=exact * 0.03)
+        p50, p95, p99 = hist.quantiles((0.5, 0.95, 0.99))
+        self.assertEqual(p95, hist.quantile(0.95))
+        self.assertLessEqual(p50, p95)
+        self.assertLessEqual(p95, p99)
+
+    def test_histogram_constant_memory(self):
+        hist = LatencyHistogram()
+        size = len(hist.counts)
+        for v in (0.0, 1e-9, 0.5, 1000.0):
+            hist.record(v)
+        self.assertEqual(len(hist.counts), size)
+        self.assertEqual(hist.count, 4)
+
+    def test_degradation_detected(self):
+        clock = FakeClock()
+        tracker = LatencyTracker(window_seconds=60, min_window_samples=10, warmup_windows=3, clock=clock)
+        rnd = random.Random(1)
+        alerts = []
+        for window in range(10):
+            for _ in range(50):
+                alerts += tracker.observe("10.0.0.1", ["1.3.6.1.2.1.1.3.0"], rnd.uniform(0.010, 0.012))
+            clock.now += 60
+        self.assertEqual(alerts, [])
+
+        for _ in range(50):
+            tracker.observe("10.0.0.1", ["1.3.6.1.2.1.1.3.0"], 0.200)
+        clock.now += 60
+        alerts = tracker.observe("10.0.0.1", ["1.3.6.1.2.1.1.3.0"], 0.011)
+        self.assertTrue(any("device=10.0.0.1" in a for a in alerts))
+        self.assertTrue(any("oid=1.3.6.1.2.1.1.3.0" in a for a in alerts))
+
+        q = tracker.quantiles("device", "10.0.0.1")
+        self.assertEqual(q["count"], 551)
+        self.assertIn("10.0.0.1", tracker.snapshot()["device"])
+
+    def test_absolute_threshold(self):
+        tracker = LatencyTracker(absolute_threshold=1.0, clock=FakeClock())
+        alerts = tracker.observe("10.0.0.2", ["1.3.6.1.2.1.1.3.0", "1.3.6.1.2.1.1.5.0"], 2.5)
+        self.assertEqual(len(alerts), 1)
+        self.assertIn("Temps de réponse élevé device=10.0.0.2", alerts[0])
+        # Réponses lentes suivantes : pas de nouvelle alerte avant alert_cooldown
+        tracker.clock.now = 59.0
+        self.assertEqual(tracker.observe("10.0.0.2", ["1.3.6.1.2.1.1.7.0"], 3.0), [])
+        tracker.clock.now = 60.0
+        self.assertEqual(len(tracker.observe("10.0.0.2", [], 3.0)), 1)
+
+    def test_series_eviction(self):
+        clock = FakeClock()
+        tracker = LatencyTracker(max_series=3, idle_seconds=100, clock=clock)
+        tracker.observe("10.0.0.1", ["1.3.6.1.2.1.1.3.0"], 0.01)
+        tracker.observe("10.0.0.2", ["1.3.6.1.2.1.1.3.0"], 0.01)
+        clock.now = 50.0
+        tracker.observe("10.0.0.3", [], 0.01)
+        # Au-delà de 3 séries : 10.0.0.1, la moins récemment mesurée, est évincée
+        self.assertEqual(set(tracker.series), {("device", "10.0.0.2"), ("oid", "1.3.6.1.2.1.1.3.0"),
+                                               ("device", "10.0.0.3")})
+        clock.now = 120.0
+        tracker.observe("10.0.0.4", [], 0.01)
+        # 10.0.0.2 et l'OID inactifs depuis plus de 100 s
+        self.assertEqual(set(tracker.series), {("device", "10.0.0.3"), ("device", "10.0.0.4")})
+
+    def test_series_key_groups_instances(self):
+        column = lambda oid: oid.rsplit(".", 1)[0]
+        tracker = LatencyTracker(series_key=column, clock=FakeClock())
+        ifin = [f"1.3.6.1.2.1.2.2.1.10.{i}" for i in range(1, 49)]
+        tracker.observe("10.0.0.1", ifin + ["1.3.6.1.2.1.2.2.1.16.1"], 0.01)
+        tracker.observe("10.0.0.2", ifin, 0.02)
+        self.assertEqual(len(tracker.series), 4)
+        # Une mesure par réponse et par colonne, pas une par instance
+        self.assertEqual(tracker.quantiles("oid", "1.3.6.1.2.1.2.2.1.10")["count"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+
+from metric_rules import MetricRule, MetricRulesEngine
+
+"""
+- Vérifie les seuils statiques (saturation CPU).
+- Vérifie le taux de variation des compteurs, y compris le rebouclage 32 bits.
+- Vérifie la remise à zéro d'un compteur et le rebouclage Counter64.
+- Vérifie l'éviction LRU des séries et l'allocation paresseuse des lignes de base.
+- Vérifie la détection de changement d'état (ifOperStatus).
+- Vérifie la ligne de base saisonnière par heure de la semaine.
+- Vérifie un lot contenant plusieurs fois le même OID.
+- Vérifie que les polls de l'envoyeur passent par les règles avant écriture.
+"""
+
+IF_IN_ERRORS = "1.3.6.1.2.1.2.2.1.14"
+IF_OPER_STATUS = "1.3.6.1.2.1.2.2.1.8"
+HR_PROCESSOR_LOAD = "1.3.6.1.2.1.25.3.3.1.2"
+IF_IN_OCTETS = "1.3.6.1.2.1.2.2.1.10"
+
+
+class TestMetricRules(unittest.TestCase):
+    def setUp(self):
+        self.engine = MetricRulesEngine()
+
+    def test_threshold(self):
+        violations = self.engine.evaluate_batch(
+            "10.0.0.1",
+            [f"{HR_PROCESSOR_LOAD}.1", f"{HR_PROCESSOR_LOAD}.2", "1.3.6.1.2.1.1.5.0"],
+            [95.0, 20.0, None],
+            ts=1_000_000.0,
+        )
+        self.assertEqual([v.oid for v in violations], [f"{HR_PROCESSOR_LOAD}.1"])
+        self.assertEqual(violations[0].rule.severity, "critical")
+
+    def test_counter_rate_and_wrap(self):
+        oid = f"{IF_IN_ERRORS}.3"
+        self.assertEqual(self.engine.evaluate_batch("10.0.0.1", [oid], [100.0], ts=0.0), [])
+        self.assertEqual(self.engine.evaluate_batch("10.0.0.1", [oid], [200.0], ts=60.0), [])
+        violations = self.engine.evaluate_batch("10.0.0.1", [oid], [2200.0], ts=120.0)
+        self.assertEqual(len(violations), 1)
+        self.assertAlmostEqual(violations[0].observed, 2000.0 / 60)
+        # Rebouclage : 2^32 - 100 → 50 représente +150, pas de pic
+        self.engine.evaluate_batch("10.0.0.1", [oid], [2.0 ** 32 - 100], ts=180.0)
+        self.assertEqual(self.engine.evaluate_batch("10.0.0.1", [oid], [50.0], ts=240.0), [])
+
+    def test_counter_reset_and_counter64(self):
+        oid = f"{IF_IN_ERRORS}.4"
+        self.engine.evaluate_batch("10.0.0.1", [oid], [100000.0], ts=0.0)
+        # Loin du maximum : redémarrage de l'agent, pas un rebouclage de +4 milliards
+        self.assertEqual(self.engine.evaluate_batch("10.0.0.1", [oid], [10.0], ts=60.0), [])
+        violations = self.engine.evaluate_batch("10.0.0.1", [oid], [1210.0], ts=120.0)
+        self.assertAlmostEqual(violations[0].observed, 1200.0 / 60)
+
+        oid = f"{IF_IN_ERRORS}.5"
+        self.engine.evaluate_batch("10.0.0.1", [oid], [2.0 ** 64 - 2 ** 20], ts=0.0, value_types=["Counter64"])
+        violations = self.engine.evaluate_batch("10.0.0.1", [oid], [2.0 ** 20], ts=60.0, value_types=["Counter64"])
+        self.assertAlmostEqual(violations[0].observed, 2.0 ** 21 / 60)
+
+    def test_oper_status_change(self):
+        oid = f"{IF_OPER_STATUS}.1"
+        self.assertEqual(self.engine.evaluate_batch("10.0.0.2", [oid], [1.0], ts=0.0), [])
+        self.assertEqual(self.engine.evaluate_batch("10.0.0.2", [oid], [1.0], ts=60.0), [])
+        violations = self.engine.evaluate_batch("10.0.0.2", [oid], [2.0], ts=120.0)
+        self.assertEqual(len(violations), 1)
+        self.assertIn("Changement d'état", violations[0].message())
+        # Séries indépendantes par équipement
+        self.assertEqual(self.engine.evaluate_batch("10.0.0.3", [oid], [2.0], ts=120.0), [])
+
+    def test_seasonal_baseline(self):
+        engine = MetricRulesEngine(rules=[
+            MetricRule("octets", IF_IN_OCTETS, "seasonal", use_rate=False, z_threshold=3.0, min_samples=4),
+        ])
+        oid = f"{IF_IN_OCTETS}.1"
+        week = 7 * 24 * 3600
+        base = 1_700_000_000.0
+        for i, value in enumerate([100.0, 104.0, 98.0, 102.0, 101.0, 99.0]):
+            self.assertEqual(engine.evaluate_batch("10.0.0.4", [oid], [value], ts=base + i * week), [])
+        # Même créneau horaire la semaine suivante : valeur aberrante
+        violations = engine.evaluate_batch("10.0.0.4", [oid], [500.0], ts=base + 6 * week)
+        self.assertEqual(len(violations), 1)
+        self.assertGreater(violations[0].observed, 3.0)
+        # Un autre créneau n'a pas encore de ligne de base
+        self.assertEqual(engine.evaluate_batch("10.0.0.4", [oid], [500.0], ts=base + 6 * week + 3 * 3600), [])
+
+    def test_series_growth(self):
+        engine = MetricRulesEngine(initial_capacity=2)
+        oids = [f"{HR_PROCESSOR_LOAD}.{i}" for i in range(10)]
+        violations = engine.evaluate_batch("10.0.0.5", oids, [99.0] * 10, ts=0.0)
+        self.assertEqual(len(violations), 10)
+
+    def test_series_eviction_and_seasonal_rows(self):
+        engine = MetricRulesEngine(max_series=2, max_oids=2)
+        engine.evaluate_batch("10.0.0.6", [f"{HR_PROCESSOR_LOAD}.1"], [10.0], ts=0.0)
+        self.assertEqual(engine._seasonal_used, 0)
+        engine.evaluate_batch("10.0.0.6", [f"{IF_IN_OCTETS}.1"], [10.0], ts=0.0)
+        self.assertEqual(engine._seasonal_used, 1)
+        engine.evaluate_batch("10.0.0.6", [f"{IF_OPER_STATUS}.1"], [1.0], ts=0.0)
+        self.assertEqual(len(engine._series), 2)
+        self.assertEqual(len(engine._rule_mask_cache), 2)
+        self.assertNotIn(("10.0.0.6", f"{HR_PROCESSOR_LOAD}.1"), engine._series)
+        # La série évincée suivante libère sa ligne saisonnière, réutilisée par la suivante
+        engine.evaluate_batch("10.0.0.6", [f"{IF_IN_OCTETS}.2"], [10.0], ts=0.0)
+        engine.evaluate_batch("10.0.0.7", [f"{IF_IN_OCTETS}.1"], [10.0], ts=0.0)
+        self.assertEqual(engine._seasonal_used, 2)
+        self.assertEqual(len(engine.prev_value), 256)
+
+    def test_duplicate_oids_share_series(self):
+        oid = f"{HR_PROCESSOR_LOAD}.1"
+        violations = self.engine.evaluate_batch("10.0.0.1", [oid, "1.3.6.1.2.1.1.5.0", oid], [10.0, None, 95.0], ts=0.0)
+        self.assertEqual([v.value for v in violations], [95.0])
+        self.assertEqual(len(self.engine._series), 2)
+
+    def test_sender_polls_are_evaluated(self):
+        import sqlite3
+        from datetime import datetime, timedelta
+
+        import storage
+        from send_snmp_requests import SNMPSender
+
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        storage.init_schema(conn)
+        sender = SNMPSender({"conn": conn})
+        t0 = datetime(2026, 1, 5, 10, 0)
+        for i, load in enumerate((20.0, 97.0)):
+            sender._save_metrics_to_db("10.0.0.9", {
+                "timestamp": t0 + timedelta(minutes=i), "response_time": 0.01,
+                "values": {f"{HR_PROCESSOR_LOAD}.1": int(load), "1.3.6.1.2.1.1.5.0": "rtr"},
+            })
+        rows = conn.execute("SELECT source_ip, severity, type FROM snmp_anomalies").fetchall()
+        self.assertEqual(rows, [("10.0.0.9", "critical", "cpu_saturation")])
+        sender.close()
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM snmp_metrics").fetchone()[0], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
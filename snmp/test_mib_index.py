@@ -0,0 +1,141 @@
+import os
+import tempfile
+import unittest
+
+from mib_compiler import MibCompiler
+from mib_index import MibIndex
+
+"""
+- Vérifie la compilation d'un sous-ensemble d'IF-MIB vers l'index binaire.
+- Vérifie la résolution du plus long préfixe (colonne + index d'instance).
+- Vérifie les énumérations (directes et héritées d'une convention textuelle), unités et structure de table.
+"""
+
+IF_MIB = '''
+IF-MIB DEFINITIONS ::= BEGIN
+IMPORTS
+    MODULE-IDENTITY, OBJECT-TYPE, Counter32, Integer32, mib-2 FROM SNMPv2-SMI
+    TEXTUAL-CONVENTION FROM SNMPv2-TC;
+
+ifMIB MODULE-IDENTITY
+    LAST-UPDATED "200006140000Z"
+    ORGANIZATION "IETF"
+    DESCRIPTION "Sous-ensemble de test -- avec tirets"
+    ::= { mib-2 31 }
+
+AdminState ::= TEXTUAL-CONVENTION
+    STATUS current
+    DESCRIPTION "etat"
+    SYNTAX INTEGER { up(1), down(2), testing(3) }
+
+interfaces OBJECT IDENTIFIER ::= { mib-2 2 }
+
+ifNumber OBJECT-TYPE
+    SYNTAX Integer32
+    MAX-ACCESS read-only
+    STATUS current
+    DESCRIPTION "nombre d'interfaces"
+    ::= { interfaces 1 }
+
+ifTable OBJECT-TYPE
+    SYNTAX SEQUENCE OF IfEntry
+    MAX-ACCESS not-accessible
+    STATUS current
+    DESCRIPTION "table"
+    ::= { interfaces 2 }
+
+ifEntry OBJECT-TYPE
+    SYNTAX IfEntry
+    MAX-ACCESS not-accessible
+    STATUS current
+    DESCRIPTION "ligne"
+    INDEX { ifIndex }
+    ::= { ifTable 1 }
+
+IfEntry ::= SEQUENCE {
+    ifIndex Integer32,
+    ifAdminStatus AdminState,
+    ifOperStatus INTEGER,
+    ifInOctets Counter32
+}
+
+ifIndex OBJECT-TYPE
+    SYNTAX Integer32 (1..2147483647)
+    MAX-ACCESS read-only
+    STATUS current
+    DESCRIPTION "index"
+    ::= { ifEntry 1 }
+
+ifAdminStatus OBJECT-TYPE
+    SYNTAX AdminState
+    MAX-ACCESS read-write
+    STATUS current
+    DESCRIPTION "admin"
+    ::= { ifEntry 7 }
+
+ifOperStatus OBJECT-TYPE
+    SYNTAX INTEGER { up(1), down(2), testing(3), unknown(4),
+                     dormant(5), notPresent(6), lowerLayerDown(7) }
+    MAX-ACCESS read-only
+    STATUS current
+    DESCRIPTION "oper"
+    ::= { ifEntry 8 }
+
+ifInOctets OBJECT-TYPE
+    SYNTAX Counter32
+    UNITS "octets"
+    MAX-ACCESS read-only
+    STATUS current
+    DESCRIPTION "octets recus"
+    ::= { ifEntry 10 }
+
+END
+'''
+
+
+class TestMibIndex(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".idx")
+        os.close(fd)
+        compiler = MibCompiler()
+        compiler.parse_text(IF_MIB)
+        self.count = compiler.write_index(self.path)
+        self.index = MibIndex(self.path)
+
+    def tearDown(self):
+        self.index.close()
+        os.remove(self.path)
+
+    def test_lookup_column_instance(self):
+        obj, suffix = self.index.lookup("1.3.6.1.2.1.2.2.1.10.3")
+        self.assertEqual(obj.name, "ifInOctets")
+        self.assertEqual(obj.kind, "column")
+        self.assertEqual(obj.units, "octets")
+        self.assertEqual(suffix, "3")
+        self.assertEqual(self.index.name_of(".1.3.6.1.2.1.2.2.1.10.3"), "ifInOctets.3")
+
+    def test_table_structure(self):
+        self.assertEqual(self.index.lookup("1.3.6.1.2.1.2.2")[0].kind, "table")
+        entry = self.index.lookup("1.3.6.1.2.1.2.2.1")[0]
+        self.assertEqual(entry.kind, "entry")
+        self.assertEqual(entry.index, ("ifIndex",))
+        self.assertEqual(self.index.lookup("1.3.6.1.2.1.2.1.0")[0].kind, "scalar")
+        self.assertEqual(self.index.lookup("1.3.6.1.2.1.31")[0].name, "ifMIB")
+
+    def test_enums(self):
+        info = self.index.decorate("1.3.6.1.2.1.2.2.1.8.3", 1)
+        self.assertEqual(info["name"], "ifOperStatus.3")
+        self.assertEqual(info["enum"], "up")
+        self.assertEqual(self.index.decorate("1.3.6.1.2.1.2.2.1.8.3", 7)["enum"], "lowerLayerDown")
+        # Énumération héritée de la convention textuelle
+        self.assertEqual(self.index.decorate("1.3.6.1.2.1.2.2.1.7.1", 2)["enum"], "down")
+
+    def test_unknown_oid(self):
+        self.assertIsNone(self.index.lookup("2.99.1"))
+        self.assertIsNone(self.index.decorate("2.99.1", 1)["name"])
+        # Préfixe SMI connu même sans définition du module
+        self.assertEqual(self.index.name_of("1.3.6.1.4.1.9.1"), "enterprises.9.1")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+
+from oid_registry import OidRegistry, registry
+
+"""
+- Vérifie l'internement des OIDs en identifiants entiers stables.
+- Vérifie la résolution nom → OID, y compris colonne de table + index.
+- Vérifie le plus long préfixe nommé (OID → nom lisible).
+- Vérifie l'appartenance à un sous-arbre.
+- Vérifie les OIDs invalides, le plafond d'internement et les scalaires suffixés .0.
+"""
+
+
+class TestOidRegistry(unittest.TestCase):
+    def setUp(self):
+        self.reg = OidRegistry({
+            'mib-2': '1.3.6.1.2.1',
+            'sysName': '1.3.6.1.2.1.1.5.0',
+            'ifInOctets': '1.3.6.1.2.1.2.2.1.10',
+        })
+
+    def test_intern(self):
+        a = self.reg.intern("1.3.6.1.2.1.1.3.0")
+        b = self.reg.intern(".1.3.6.1.2.1.1.3.0")
+        self.assertEqual(a, b)
+        self.assertEqual(self.reg.oid(a), "1.3.6.1.2.1.1.3.0")
+        self.assertIs(self.reg.canonical("".join(["1.3.6.1.2.1.1.3", ".0"])), self.reg.oid(a))
+
+    def test_name_to_oid(self):
+        self.assertEqual(self.reg.resolve("sysName"), "1.3.6.1.2.1.1.5.0")
+        self.assertEqual(self.reg.resolve("ifInOctets.12"), "1.3.6.1.2.1.2.2.1.10.12")
+        self.assertEqual(self.reg.resolve("1.3.6.1.4.1.9"), "1.3.6.1.4.1.9")
+        self.assertEqual(self.reg.resolve("inconnu"), "inconnu")
+
+    def test_longest_prefix_name(self):
+        self.assertEqual(self.reg.decompose("1.3.6.1.2.1.2.2.1.10.12"), ("ifInOctets", "12"))
+        self.assertEqual(self.reg.name_of("1.3.6.1.2.1.1.5.0"), "sysName")
+        self.assertEqual(self.reg.name_of("1.3.6.1.2.1.99.1"), "mib-2.99.1")
+        self.assertIsNone(self.reg.name_of("1.3.6.1.4.1.9"))
+        # Un nom enregistré plus tard invalide le cache de décomposition
+        self.reg.register_name("enterprises", "1.3.6.1.4.1")
+        self.assertEqual(self.reg.name_of("1.3.6.1.4.1.9"), "enterprises.9")
+
+    def test_in_subtree(self):
+        self.assertTrue(self.reg.in_subtree("1.3.6.1.2.1.2.2.1.10.3", "1.3.6.1.2.1.2.2.1.10"))
+        self.assertTrue(self.reg.in_subtree("1.3.6.1.2.1.2.2.1.10", "1.3.6.1.2.1.2.2.1.10"))
+        self.assertFalse(self.reg.in_subtree("1.3.6.1.2.1.2.2.1.100", "1.3.6.1.2.1.2.2.1.10"))
+        self.assertFalse(self.reg.in_subtree("1.3.6.1.2.1", "1.3.6.1.2.1.2"))
+
+    def test_invalid_oids(self):
+        self.assertIsNone(self.reg.intern("1.3.6.x"))
+        self.assertEqual(self.reg.resolve("1.3.6.x"), "1.3.6.x")
+        self.assertEqual(self.reg.canonical("None"), "None")
+        self.assertIsNone(self.reg.name_of("1.3.6.x"))
+        self.assertFalse(self.reg.in_subtree("1.3.6.x", "1.3.6"))
+        with self.assertRaises(ValueError):
+            self.reg.register_name("bad", "1.3.x")
+
+    def test_intern_cap(self):
+        reg = OidRegistry({'mib-2': '1.3.6.1.2.1'}, max_interned=1)
+        self.assertEqual(len(reg), 1)
+        self.assertIsNone(reg.intern("1.3.6.1.2.1.1.3.0"))
+        self.assertEqual(len(reg), reg.max_interned)
+        # Hors table : résolution et noms restent corrects, sans internement
+        self.assertEqual(reg.canonical("1.3.6.1.2.1.1.3.0"), "1.3.6.1.2.1.1.3.0")
+        self.assertEqual(reg.name_of("1.3.6.1.2.1.1.3.0"), "mib-2.1.3.0")
+        self.assertTrue(reg.in_subtree("1.3.6.1.2.1.1.3.0", "1.3.6.1.2.1"))
+
+    def test_scalar_instance_suffix(self):
+        self.assertEqual(self.reg.resolve("sysName.0"), "1.3.6.1.2.1.1.5.0")
+        self.assertEqual(self.reg.resolve("ifInOctets.0"), "1.3.6.1.2.1.2.2.1.10.0")
+
+    def test_shared_registry_seeded(self):
+        self.assertEqual(registry.resolve("sysDescr"), "1.3.6.1.2.1.1.1.0")
+        self.assertEqual(registry.name_of("1.3.6.1.2.1.25.3.3.1.2.196608"), "hrProcessorLoad.196608")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+
+from scapy.all import IP, UDP, Raw
+from scapy.layers.snmp import SNMP, SNMPget, SNMPvarbind
+from scapy.asn1.asn1 import ASN1_NULL, ASN1_OID
+
+from pipeline_stats import PipelineProfiler, ProfileReporter, STAGES
+from snmp_analyzer import SNMPAnalyzer
+
+"""
+- Vérifie l'enregistrement des durées par étape et l'instantané JSON.
+- Vérifie le format texte Prometheus (compteurs, quantiles, somme, nombre).
+- Vérifie l'instrumentation du callback de capture (paquets, écartés, étapes).
+- Vérifie le chronométrage d'une étape enveloppée, y compris en cas d'exception.
+- Vérifie qu'aucun profileur n'est créé quand le profilage est désactivé.
+"""
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        self.now += 1000      # 1 µs par lecture
+        return self.now
+
+
+class TestPipelineStats(unittest.TestCase):
+    def test_record_and_snapshot(self):
+        prof = PipelineProfiler(clock=FakeClock())
+        t = prof.clock()
+        t = prof.record("parse", t)
+        prof.record("db_write", t)
+        prof.counters["packets"] += 1
+        snap = prof.snapshot()
+        self.assertEqual(snap["counters"]["packets"], 1)
+        self.assertEqual(snap["stages"]["parse"]["count"], 1)
+        self.assertAlmostEqual(snap["stages"]["parse"]["total_s"], 1e-6)
+        self.assertAlmostEqual(snap["stages"]["parse"]["p50_s"], 1e-6, delta=1e-7)
+        self.assertIsNone(snap["stages"]["anomaly"]["p99_s"])
+        self.assertIn('"db_write"', prof.to_json())
+        self.assertIn("parse", prof.format_table())
+
+    def test_prometheus_text(self):
+        prof = PipelineProfiler(clock=FakeClock())
+        prof.record("parse", prof.clock())
+        prof.counters["dropped"] = 3
+        text = prof.prometheus_text()
+        self.assertIn("# TYPE snmp_capture_dropped_total counter\nsnmp_capture_dropped_total 3\n", text)
+        self.assertIn('snmp_capture_stage_seconds_count{stage="parse"} 1\n', text)
+        self.assertIn('snmp_capture_stage_seconds{stage="anomaly",quantile="0.99"} NaN\n', text)
+        self.assertTrue(text.endswith("\n"))
+
+    def test_wrap_records_stage(self):
+        prof = PipelineProfiler(clock=FakeClock())
+
+        def fail(x):
+            raise ValueError(x)
+
+        self.assertEqual(prof.wrap("parse", lambda x: x + 1)(1), 2)
+        with self.assertRaises(ValueError):
+            prof.wrap("track", fail)(1)
+        self.assertEqual(prof.histograms["parse"].count, 1)
+        self.assertEqual(prof.histograms["track"].count, 1)
+        self.assertEqual(ProfileReporter(prof).host, "127.0.0.1")
+
+    def test_profiled_packet_processor(self):
+        analyzer = SNMPAnalyzer(interface=None, db_manager=None, verbosity="silent", frame_ring_path="", profile=True)
+        process = analyzer._packet_processor(save_to_db=False)
+        get = IP(src="10.0.0.1", dst="10.0.0.2") / UDP(sport=50000, dport=161) / SNMP(
+            community="public", PDU=SNMPget(varbindlist=[SNMPvarbind(oid=ASN1_OID("1.3.6.1.2.1.1.3.0"),
+                                                                     value=ASN1_NULL(0))]))
+        process(IP(bytes(get)))
+        process(IP(src="10.0.0.1", dst="10.0.0.2") / UDP(sport=5000, dport=53) / Raw(b"dns"))
+        snap = analyzer.profiler.snapshot()
+        self.assertEqual(snap["counters"], {"packets": 2, "snmp_packets": 1, "dropped": 1, "errors": 0})
+        self.assertEqual(snap["stages"]["parse"]["count"], 2)
+        for stage in ("track", "stats", "anomaly", "publish"):
+            self.assertEqual(snap["stages"][stage]["count"], 1, stage)
+        # Sans base ni affichage par paquet : étapes non exécutées
+        for stage in ("print", "device_lookup", "db_write"):
+            self.assertEqual(snap["stages"][stage]["count"], 0, stage)
+        self.assertEqual(set(snap["stages"]), set(STAGES))
+        self.assertEqual(analyzer.stats["get_requests"], 1)
+
+    def test_disabled_by_default(self):
+        analyzer = SNMPAnalyzer(interface=None, db_manager=None, frame_ring_path="", profile=False)
+        self.assertIsNone(analyzer.profiler)
+        self.assertEqual(analyzer._packet_processor(save_to_db=False).__name__, "process_packet")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import threading
+import unittest
+
+from request_coalescer import RequestCoalescer
+
+"""
+- Vérifie que les requêtes identiques en vol partagent un seul appel.
+- Vérifie la propagation d'une erreur à tous les appelants en attente.
+- Vérifie le cache TTL (succès seulement) et son invalidation après un SET.
+"""
+
+
+class TestRequestCoalescer(unittest.TestCase):
+    def test_concurrent_identical_requests_share_one_fetch(self):
+        release = threading.Event()
+        calls = []
+
+        def fetch(target, community, oid):
+            calls.append((target, oid))
+            release.wait(2)
+            return {"success": True, "values": {oid: 42}}
+
+        coalescer = RequestCoalescer(fetch)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(coalescer.get("10.0.0.1", "public", "1.3.6.1.2.1.1.3.0")))
+                   for _ in range(5)]
+        for t in threads:
+            t.start()
+        # Tous les appelants attendent la requête du premier
+        while coalescer.stats["fetches"] + coalescer.stats["coalesced"] < 5:
+            threading.Event().wait(0.01)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(source for _, source in results), ["coalesced"] * 4 + ["device"])
+        self.assertTrue(all(r["values"]["1.3.6.1.2.1.1.3.0"] == 42 for r, _ in results))
+        # Sans TTL : pas de cache, nouvelle requête
+        coalescer.get("10.0.0.1", "public", "1.3.6.1.2.1.1.3.0")
+        self.assertEqual(len(calls), 2)
+
+    def test_error_is_shared_and_not_cached(self):
+        def fetch(*key):
+            raise OSError("réseau injoignable")
+
+        coalescer = RequestCoalescer(fetch, ttl=60)
+        with self.assertRaises(OSError):
+            coalescer.get("10.0.0.1", "public", "1.3")
+        with self.assertRaises(OSError):
+            coalescer.get("10.0.0.1", "public", "1.3")
+        self.assertEqual(coalescer.stats["fetches"], 2)
+
+    def test_ttl_cache_and_invalidate(self):
+        now = [0.0]
+        calls = []
+
+        def fetch(target, community, oid):
+            calls.append(oid)
+            return {"success": oid != "1.3.9", "values": {oid: len(calls)}}
+
+        coalescer = RequestCoalescer(fetch, ttl=5, clock=lambda: now[0])
+        self.assertEqual(coalescer.get("10.0.0.1", "public", "1.3.1")[1], "device")
+        self.assertEqual(coalescer.get("10.0.0.1", "public", "1.3.1")[1], "cache")
+        # Échec SNMP (timeout) : non mis en cache
+        coalescer.get("10.0.0.1", "public", "1.3.9")
+        self.assertEqual(coalescer.get("10.0.0.1", "public", "1.3.9")[1], "device")
+        # Réponse partielle (success avec erreur, ex. noSuchName) : non mise en cache
+        partial = RequestCoalescer(lambda *key: {"success": True, "error": "noSuchName", "values": {}}, ttl=5,
+                                   clock=lambda: now[0])
+        partial.get("10.0.0.1", "public", "1.3.2")
+        self.assertEqual(partial.get("10.0.0.1", "public", "1.3.2")[1], "device")
+        now[0] = 5.0
+        self.assertEqual(coalescer.get("10.0.0.1", "public", "1.3.1")[1], "device")
+        coalescer.invalidate(lambda key: key[0] == "10.0.0.1" and key[2] == "1.3.1")
+        self.assertEqual(coalescer.get("10.0.0.1", "public", "1.3.1")[1], "device")
+        self.assertEqual(len(calls), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
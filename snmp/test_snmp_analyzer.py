@@ -1,7 +1,14 @@
+import os
+import tempfile
+import time
 import unittest
 import logging
 from datetime import datetime, timedelta
 
+from scapy.all import IP, UDP
+from scapy.layers.snmp import SNMP, SNMPresponse, SNMPvarbind
+from scapy.asn1.asn1 import ASN1_COUNTER32, ASN1_IPADDRESS, ASN1_OID, ASN1_STRING, ASN1_TIME_TICKS
+
 from snmp_analyzer import SNMPAnalyzer, DatabaseManager, AnomalyDetector, SNMPPacketInfo
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -13,6 +20,9 @@ logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %
 - Valide la détection des community strings par défaut.
 - Contrôle la détection des traps venant de sources externes.
 - Vérifie la conversion sécurisée des valeurs numériques.
+- Vérifie le décodage typé des varbinds (type SMI conservé et stocké).
+- Vérifie que tous les horodatages sont stockés en UTC, même hors fuseau UTC.
+- Vérifie les compteurs d'alertes pré-agrégés (triggers, purge, recalcul).
 """
 class TestSNMPModule(unittest.TestCase):
     def setUp(self):
@@ -84,11 +94,164 @@ class TestSNMPModule(unittest.TestCase):
         self.assertIsNotNone(anomaly)
         self.assertIn("Trap depuis source externe", anomaly)
 
+    def test_recent_packets_ring_buffer(self):
+        analyzer = SNMPAnalyzer(interface=None, db_manager=None, verbosity="silent", recent_size=3)
+        for i in range(5):
+            packet_info = SNMPPacketInfo(
+                ts_ns=i, source_ip=f"10.0.0.{i}", dest_ip="10.0.0.254",
+                source_port=161, dest_port=40000, version="v2c", community_or_user="public",
+                request_type="RESPONSE", oid_list=("1.3.6.1.2.1.1.5.0",), values=(b"sw1",)
+            )
+            analyzer._handle_packet(packet_info, save_to_db=False)
+        recent = analyzer.get_recent_packets()
+        self.assertEqual([p.source_ip for p in recent], ["10.0.0.2", "10.0.0.3", "10.0.0.4"])
+        self.assertEqual(len(analyzer.get_recent_packets(1)), 1)
+
+    def test_packet_info_dict_round_trip(self):
+        legacy = {
+            "timestamp": datetime(2024, 1, 2, 3, 4, 5), "source_ip": "10.0.0.9", "dest_ip": "10.0.0.1",
+            "source_port": 161, "dest_port": 50000, "version": "v2c", "community_or_user": "public",
+            "request_type": "RESPONSE", "oids": [{"oid": "1.3.6.1.2.1.1.3.0", "value": 42}],
+            "enterprise_oid": None, "packet_size": 80, "response_time": 0.01, "error_status": None,
+            "request_id": 7,
+        }
+        packet_info = SNMPPacketInfo.from_dict(legacy)
+        self.assertEqual(packet_info.oid_list, ("1.3.6.1.2.1.1.3.0",))
+        self.assertEqual(packet_info.values, (42,))
+        result = packet_info.to_dict()
+        epoch_ns = result.pop("epoch_ns")
+        self.assertAlmostEqual(result.pop("timestamp").timestamp(), legacy.pop("timestamp").timestamp(), places=3)
+        self.assertEqual(result, legacy)
+        self.assertFalse(hasattr(packet_info, "__dict__"))
+
+        # epoch_ns explicite : aller-retour exact ; nombres ambigus (secondes, ms) refusés
+        again = SNMPPacketInfo.from_dict({**legacy, "epoch_ns": epoch_ns})
+        self.assertEqual(again.to_dict()["epoch_ns"], epoch_ns)
+        for bad in ({"epoch_ns": 1_704_164_645}, {"epoch_ns": 1.7e18}, {"timestamp": 1_704_164_645}):
+            with self.assertRaises(ValueError):
+                SNMPPacketInfo.from_dict({**legacy, **bad})
+
+    def test_publish_frame_to_ring(self):
+        fd, path = tempfile.mkstemp(suffix=".ring")
+        os.close(fd)
+        analyzer = SNMPAnalyzer(interface=None, db_manager=None, frame_ring_path=path)
+        analyzer.open_frame_ring()
+        try:
+            packet_info = SNMPPacketInfo(
+                ts_ns=time.monotonic_ns(), source_ip="10.0.0.9", dest_ip="10.0.0.1", source_port=161,
+                dest_port=50000, version="v2c", community_or_user="public", request_type="RESPONSE",
+                oid_list=("1.3.6.1.2.1.1.5.0",), values=(b"routeur",), request_id=12,
+            )
+            frame = analyzer.frame_ring.get(analyzer.publish_frame(packet_info, "a | b"))
+            self.assertEqual(frame["pdu_type"], "response")
+            self.assertEqual(frame["request_id"], 12)
+            self.assertEqual(frame["varbinds"][0]["value"], "routeur")
+            self.assertEqual(frame["varbinds"][0]["name"], "sysName")
+            self.assertEqual(frame["anomalies"], ["a", "b"])
+        finally:
+            analyzer.close_frame_ring()
+            os.remove(path)
+
     def test_extract_numeric_value(self):
         self.assertEqual(self.db_manager._extract_numeric_value("123"), 123.0)
         self.assertEqual(self.db_manager._extract_numeric_value(123), 123.0)
         self.assertIsNone(self.db_manager._extract_numeric_value("abc"))
         self.assertIsNone(self.db_manager._extract_numeric_value(None))
 
+    def test_typed_varbinds_stored(self):
+        packet = IP(src="10.0.0.7", dst="10.0.0.1") / UDP(sport=161, dport=50000) / SNMP(
+            community="public", PDU=SNMPresponse(varbindlist=[
+                SNMPvarbind(oid=ASN1_OID("1.3.6.1.2.1.2.2.1.10.1"), value=ASN1_COUNTER32(4294967295)),
+                SNMPvarbind(oid=ASN1_OID("1.3.6.1.2.1.1.3.0"), value=ASN1_TIME_TICKS(100)),
+                SNMPvarbind(oid=ASN1_OID("1.3.6.1.2.1.4.20.1.1.10.0.0.7"), value=ASN1_IPADDRESS("10.0.0.7")),
+                SNMPvarbind(oid=ASN1_OID("1.3.6.1.2.1.1.5.0"), value=ASN1_STRING(b"sw1")),
+            ]))
+        packet_info = self.analyzer._parse_snmp_packet(IP(bytes(packet)))
+        self.assertEqual(packet_info.value_types, ("Counter32", "TimeTicks", "IpAddress", "OctetString"))
+        self.assertEqual(packet_info.values, (4294967295, 100, "10.0.0.7", b"sw1"))
+
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        os.remove(path)
+        db = DatabaseManager(path)
+        try:
+            db.insert_metric(packet_info)
+            db.flush()
+            rows = db.conn.execute("SELECT value_raw, value_type, value_num FROM snmp_metrics ORDER BY id").fetchall()
+            self.assertEqual([tuple(r) for r in rows], [
+                ("4294967295", "Counter32", 4294967295.0), ("100", "TimeTicks", 100.0),
+                ("10.0.0.7", "IpAddress", None), ("sw1", "OctetString", None),
+            ])
+        finally:
+            db.close()
+            os.remove(path)
+
+    def test_timestamps_stored_in_utc(self):
+        previous = os.environ.get("TZ")
+        os.environ["TZ"] = "America/New_York"
+        time.tzset()
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        os.remove(path)
+        db = DatabaseManager(path)
+        try:
+            packet_info = SNMPPacketInfo(
+                ts_ns=time.monotonic_ns(), source_ip="10.0.0.8", dest_ip="10.0.0.1", source_port=161,
+                dest_port=50000, version="v2c", community_or_user="public", request_type="RESPONSE",
+                oid_list=("1.3.6.1.2.1.1.3.0",), values=(42,), value_types=("TimeTicks",),
+            )
+            db.insert_metric(packet_info)
+            db.insert_trap(packet_info)
+            db.insert_anomaly("10.0.0.8", "test", "warning")
+            # Métrique, trap et anomalie (CURRENT_TIMESTAMP, UTC) sur la même horloge
+            skew = db.conn.execute("""
+                SELECT MAX(ABS(julianday(m.ts) - julianday(a.ts)), ABS(julianday(t.ts) - julianday(a.ts))) * 86400
+                FROM snmp_metrics m, snmp_traps t, snmp_anomalies a
+            """).fetchone()[0]
+            self.assertLess(skew, 5)
+        finally:
+            db.close()
+            os.remove(path)
+            if previous is None:
+                del os.environ["TZ"]
+            else:
+                os.environ["TZ"] = previous
+            time.tzset()
+
+    def test_alert_counters(self):
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        os.remove(path)
+        db = DatabaseManager(path)
+        try:
+            db.insert_anomaly("10.0.0.1", "flood", "critical")
+            db.insert_anomaly("10.0.0.1", "community", "warning")
+            db.insert_anomaly("10.0.0.2", "flood", "critical")
+            by_hour = db.alert_counts_by_hour(hours=1)
+            self.assertEqual({(r["severity"], r["count"]) for r in by_hour}, {("critical", 2), ("warning", 1)})
+            top = db.alert_counts_by_source(limit=1)
+            self.assertEqual(top, [{"source_ip": "10.0.0.1", "count": 2,
+                                    "by_severity": {"critical": 1, "warning": 1}}])
+
+            # Modification : la ligne change de source
+            db.conn.execute("UPDATE snmp_anomalies SET source_ip = '10.0.0.2' WHERE description = 'community'")
+            self.assertEqual({r["source_ip"]: r["count"] for r in db.alert_counts_by_source()},
+                             {"10.0.0.1": 1, "10.0.0.2": 2})
+            db.conn.execute("UPDATE snmp_anomalies SET source_ip = '10.0.0.1' WHERE description = 'community'")
+
+            # Purge de rétention : décrément par trigger
+            db.conn.execute("UPDATE snmp_anomalies SET ts = datetime('now', '-40 days') WHERE source_ip = '10.0.0.2'")
+            db._cleanup_old_records()
+            self.assertEqual([r["source_ip"] for r in db.alert_counts_by_source()], ["10.0.0.1"])
+
+            # Base antérieure aux compteurs : recalcul
+            db.conn.execute("DELETE FROM snmp_alert_counts_source")
+            db.conn.commit()
+            self.assertEqual(db.rebuild_alert_counters(), 2)
+            self.assertEqual(db.alert_counts_by_source()[0]["count"], 2)
+        finally:
+            db.close()
+            os.remove(path)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,94 @@
+import io
+import os
+import tempfile
+import unittest
+
+from scapy.all import IP, UDP, DNS, DNSQR, Ether, wrpcap
+from scapy.layers.snmp import SNMP, SNMPget, SNMPresponse, SNMPtrapv1, SNMPvarbind
+from scapy.asn1.asn1 import ASN1_OID, ASN1_INTEGER, ASN1_STRING, ASN1_COUNTER32
+
+from snmp_decoder import DecodeError, decode_message, decode_records, iter_pcap
+
+"""
+- Vérifie le décodage BER d'un GET, d'une réponse typée et d'un trap v1.
+- Vérifie la lecture d'un pcap et le rejet des trames non SNMP.
+- Vérifie le refus du format pcapng.
+"""
+
+
+def get_packet(request_id=1):
+    return SNMP(community="public", PDU=SNMPget(id=request_id, varbindlist=[
+        SNMPvarbind(oid=ASN1_OID("1.3.6.1.2.1.1.1.0"))]))
+
+
+def response_packet():
+    return SNMP(community="private", PDU=SNMPresponse(id=42, varbindlist=[
+        SNMPvarbind(oid=ASN1_OID("1.3.6.1.2.1.1.5.0"), value=ASN1_STRING(b"router1")),
+        SNMPvarbind(oid=ASN1_OID("1.3.6.1.2.1.2.2.1.10.1"), value=ASN1_COUNTER32(123456)),
+        SNMPvarbind(oid=ASN1_OID("1.3.6.1.2.1.1.7.0"), value=ASN1_INTEGER(-5)),
+    ]))
+
+
+class TestSnmpDecoder(unittest.TestCase):
+    def test_get(self):
+        msg = decode_message(bytes(get_packet(7)))
+        self.assertEqual(msg["version"], "v2c")
+        self.assertEqual(msg["community"], "public")
+        self.assertEqual(msg["pdu_type"], "GET")
+        self.assertEqual(msg["request_id"], 7)
+        self.assertEqual(msg["varbinds"], [("1.3.6.1.2.1.1.1.0", "Null", None)])
+
+    def test_response_types(self):
+        msg = decode_message(bytes(response_packet()))
+        self.assertEqual(msg["pdu_type"], "RESPONSE")
+        self.assertEqual(msg["varbinds"], [
+            ("1.3.6.1.2.1.1.5.0", "OctetString", b"router1"),
+            ("1.3.6.1.2.1.2.2.1.10.1", "Counter32", 123456),
+            ("1.3.6.1.2.1.1.7.0", "Integer32", -5),
+        ])
+
+    def test_trap_v1(self):
+        pkt = SNMP(version=0, community="public", PDU=SNMPtrapv1(
+            enterprise=ASN1_OID("1.3.6.1.4.1.9"), agent_addr="10.0.0.1", generic_trap=2, specific_trap=0, time_stamp=100,
+            varbindlist=[SNMPvarbind(oid=ASN1_OID("1.3.6.1.2.1.2.2.1.1.3"), value=ASN1_INTEGER(3))]))
+        msg = decode_message(bytes(pkt))
+        self.assertEqual(msg["version"], "v1")
+        self.assertEqual(msg["pdu_type"], "TRAPv1")
+        self.assertEqual(msg["varbinds"][0][1:], ("Integer32", 3))
+
+    def test_invalid_message(self):
+        with self.assertRaises(DecodeError):
+            decode_message(b"\x30\x10\x02")
+
+    def test_pcap_records(self):
+        packets = [
+            Ether() / IP(src="10.0.0.5", dst="10.0.0.1") / UDP(sport=40000, dport=161) / get_packet(),
+            Ether() / IP(src="10.0.0.1", dst="10.0.0.5") / UDP(sport=161, dport=40000) / response_packet(),
+            Ether() / IP(src="10.0.0.5", dst="8.8.8.8") / UDP(sport=5353, dport=53) / DNS(qd=DNSQR(qname="a.b")),
+        ]
+        for i, pkt in enumerate(packets):
+            pkt.time = 1_700_000_000 + i
+        fd, path = tempfile.mkstemp(suffix=".pcap")
+        os.close(fd)
+        try:
+            wrpcap(path, packets)
+            with open(path, "rb") as f:
+                records = list(iter_pcap(f))
+        finally:
+            os.remove(path)
+        self.assertEqual(len(records), 3)
+        frames, rejected = decode_records(records, "import0000000001-", 0)
+        self.assertEqual(rejected, 1)
+        self.assertEqual([f["id"] for f in frames], ["import0000000001-000000000000", "import0000000001-000000000001"])
+        self.assertEqual(frames[1]["pdu_type"], "response")
+        self.assertEqual(frames[1]["src"], {"ip": "10.0.0.1", "port": 161})
+        self.assertEqual(frames[1]["timestamp"], "2023-11-14T22:13:21.000000Z")
+        self.assertEqual(frames[1]["varbinds"][0], {"oid": "1.3.6.1.2.1.1.5.0", "type": "OctetString", "value": "router1"})
+
+    def test_pcapng_rejected(self):
+        with self.assertRaises(DecodeError):
+            list(iter_pcap(io.BytesIO(b"\x0a\x0d\x0d\x0a" + b"\x00" * 28)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import storage
+
+"""
+- Vérifie la migration d'une base de l'ancienne API Flask vers le schéma commun.
+- Vérifie que BatchWriter n'écrit qu'au lot complet ou au flush.
+- Vérifie que les écritures des trois modules arrivent dans la même table.
+- Vérifie la valeur numérique selon le type SMI (entiers directs, texte, types non numériques).
+"""
+
+
+class TestStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "snmp.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_migrates_legacy_flask_schema(self):
+        legacy = sqlite3.connect(self.path)
+        legacy.executescript("""
+            CREATE TABLE snmp_metrics (id INTEGER PRIMARY KEY AUTOINCREMENT, ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                                       source_ip TEXT NOT NULL, oid TEXT NOT NULL, value_raw TEXT,
+                                       value_num REAL, latency_ms INTEGER);
+            CREATE TABLE snmp_anomalies (id INTEGER PRIMARY KEY AUTOINCREMENT, ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                                         source_ip TEXT, description TEXT, severity TEXT, type TEXT);
+            INSERT INTO snmp_metrics (source_ip, oid, value_raw) VALUES ('10.0.0.1', '1.3.6.1.2.1.1.3.0', '42');
+            INSERT INTO snmp_anomalies (source_ip, severity) VALUES ('10.0.0.1', 'critical');
+        """)
+        legacy.commit()
+        legacy.close()
+
+        conn = storage.connect(self.path)
+        self.assertTrue(storage.init_schema(conn))   # compteurs à reconstruire
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(snmp_metrics)")}
+        self.assertIn("device_id", columns)
+        self.assertEqual(conn.execute("SELECT value_raw FROM snmp_metrics").fetchone()[0], "42")
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(snmp_metrics)")}
+        self.assertIn("ix_snmp_metrics_device_oid_ts", indexes)
+        # Idempotent
+        self.assertFalse(storage.init_schema(conn))
+        conn.close()
+
+    def test_batch_writer_flushes_on_size_and_on_demand(self):
+        conn = storage.connect(self.path, check_same_thread=False)
+        storage.init_schema(conn)
+        conn.execute("INSERT INTO devices (name, ip_address) VALUES ('sw1', '10.0.0.1')")
+        conn.commit()
+        dev = storage.device_id(conn, "10.0.0.1")
+        reader = storage.connect(self.path)
+        count = lambda: reader.execute("SELECT COUNT(*) FROM snmp_metrics").fetchone()[0]
+
+        writer = storage.BatchWriter(conn, batch_size=3, flush_interval=0)
+        row = (None, "10.0.0.1", dev, "1.3.6.1.2.1.1.3.0", "42", "TimeTicks", storage.numeric_value(42, "TimeTicks"), 5)
+        writer.add_many(storage.INSERT_METRIC_SQL, [row, row])
+        self.assertEqual(count(), 0)
+        writer.add(storage.INSERT_METRIC_SQL, row)
+        self.assertEqual(count(), 3)
+        writer.add(storage.INSERT_METRIC_SQL, row)
+        writer.close()
+        self.assertEqual(count(), 4)
+        rows = reader.execute("SELECT DISTINCT device_id, value_num FROM snmp_metrics").fetchall()
+        self.assertEqual([tuple(r) for r in rows], [(dev, 42.0)])
+        reader.close()
+        conn.close()
+
+    def test_numeric_value_by_type(self):
+        self.assertEqual(storage.numeric_value(4294967295, "Counter32"), 4294967295.0)
+        self.assertEqual(storage.numeric_value(-3, "Integer32"), -3.0)
+        self.assertEqual(storage.numeric_value(b"0.15", "OctetString"), 0.15)
+        self.assertIsNone(storage.numeric_value(b"sw1", "OctetString"))
+        self.assertIsNone(storage.numeric_value("10.0.0.1", "IpAddress"))
+        self.assertIsNone(storage.numeric_value("1.3.6.1.4", "ObjectIdentifier"))
+        # Sans type (valeur déjà décodée) : comportement historique
+        self.assertEqual(storage.numeric_value("123"), 123.0)
+        self.assertEqual(storage.numeric_value(7), 7.0)
+        self.assertIsNone(storage.numeric_value("1.2.3"))
+        self.assertIsNone(storage.numeric_value(True))
+
+    def test_utc_ts(self):
+        self.assertEqual(storage.utc_ts(0), "1970-01-01 00:00:00")
+        aware = datetime(2024, 1, 1, 12, 0, tzinfo=timezone(timedelta(hours=-5)))
+        self.assertEqual(storage.utc_ts(aware), "2024-01-01 17:00:00")
+        self.assertIsNone(storage.utc_ts(None))
+
+    def test_pool_and_writer_share_schema(self):
+        pool = storage.ConnectionPool(self.path)
+        storage.init_schema(pool.connection())
+        conn = storage.connect(self.path, check_same_thread=False)
+        writer = storage.BatchWriter(conn, flush_interval=0)
+        writer.add(storage.INSERT_METRIC_SQL, ("2024-01-01 00:00:00", "10.0.0.2", None, "1.3.6.1", "up", "OctetString", None, None))
+        writer.add(storage.INSERT_TRAP_SQL, (None, "10.0.0.2", None, "v2c", "public", "1.3.6.1.6.3.1.1.5.3", "info", "{}"))
+        writer.close()
+        api = pool.connection()
+        self.assertEqual(tuple(api.execute("SELECT ts, value_num FROM snmp_metrics").fetchone()), ("2024-01-01 00:00:00", None))
+        self.assertEqual(api.execute("SELECT COUNT(*) FROM snmp_traps").fetchone()[0], 1)
+        pool.close_all()
+        conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()